@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU backend real-time factor per core count
+Runs a whole turn (audio encoder + prefill + greedy decode) on a Voxtral-shaped model in fp32,
+bf16 and int8 (dynamic, linear layers) with 1..N intra-op threads and reports the real-time
+factor (processing time / audio duration; < 1.0 keeps up with speech) and decode throughput.
+Use --model to load the real checkpoint instead of the random scaled-down one.
+"""
+
+import argparse
+import copy
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transformers import VoxtralConfig, VoxtralForConditionalGeneration, WhisperFeatureExtractor
+
+from src.models.cpu_backend import (bf16_supported, configure_cpu_threads, physical_core_count, prepare_cpu_model,
+                                    resolve_cpu_dtype)
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("CPU_BACKEND_BENCH")
+
+SAMPLE_RATE = 16000
+AUDIO_TOKEN_ID = 24
+
+
+def build_model(args) -> VoxtralForConditionalGeneration:
+    if args.model:
+        return VoxtralForConditionalGeneration.from_pretrained(args.model, torch_dtype=torch.float32,
+                                                               attn_implementation="sdpa").eval()
+    torch.manual_seed(0)
+    hidden = args.text_hidden_size
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=args.audio_hidden_size, intermediate_size=args.audio_hidden_size * 4,
+                          num_hidden_layers=args.audio_layers, num_attention_heads=max(1, args.audio_hidden_size // 64),
+                          num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=32000, hidden_size=hidden, intermediate_size=hidden * 3,
+                         num_hidden_layers=args.text_layers, num_attention_heads=max(1, hidden // 128),
+                         num_key_value_heads=max(1, hidden // 512), head_dim=128),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+
+
+def variant_model(base_model, variant: str):
+    """(model, compute dtype) for fp32 / bf16 / int8"""
+    model = copy.deepcopy(base_model)
+    if variant == "int8":
+        prepare_cpu_model(model, "int8")
+        return model, resolve_cpu_dtype("auto", "int8")
+    dtype = torch.bfloat16 if variant == "bf16" else torch.float32
+    return model.to(dtype), dtype
+
+
+def run_turn(model, dtype, features: torch.Tensor, input_ids: torch.Tensor, new_tokens: int) -> tuple:
+    """One turn (encode + prefill + decode in generate()); returns (seconds, decode tokens per second)"""
+    features = features.to(dtype)
+    with torch.no_grad():
+        start = time.perf_counter()
+        model.generate(input_ids=input_ids, input_features=features, max_new_tokens=1, min_new_tokens=1,
+                       do_sample=False)
+        first_token_s = time.perf_counter() - start
+        start = time.perf_counter()
+        model.generate(input_ids=input_ids, input_features=features, max_new_tokens=new_tokens,
+                       min_new_tokens=new_tokens, do_sample=False)
+        turn_s = time.perf_counter() - start
+    return turn_s, (new_tokens - 1) / max(turn_s - first_token_s, 1e-6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU backend's real-time factor per core count")
+    parser.add_argument("--model", default="", help="HF checkpoint (default: random scaled-down Voxtral)")
+    parser.add_argument("--text-hidden-size", type=int, default=1024, help="Voxtral-Mini uses 3072")
+    parser.add_argument("--text-layers", type=int, default=8, help="Voxtral-Mini uses 30")
+    parser.add_argument("--audio-hidden-size", type=int, default=512, help="Voxtral-Mini uses 1280")
+    parser.add_argument("--audio-layers", type=int, default=4, help="Voxtral-Mini uses 32")
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help="Default: 1, 2, 4 ... physical cores")
+    parser.add_argument("--variants", nargs="+", default=["fp32", "bf16", "int8"], choices=["fp32", "bf16", "int8"])
+    parser.add_argument("--iterations", type=int, default=2)
+    args = parser.parse_args()
+
+    cores = physical_core_count()
+    thread_counts = args.threads or sorted({1, cores} | {2 ** i for i in range(1, 8) if 2 ** i < cores})
+    base_model = build_model(args)
+    audio = (np.random.default_rng(0).standard_normal(int(args.audio_seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+    feature_extractor = WhisperFeatureExtractor(feature_size=128)
+    features = feature_extractor(audio, sampling_rate=SAMPLE_RATE, padding=True, truncation=False,
+                                 pad_to_multiple_of=feature_extractor.n_samples, return_tensors="pt")["input_features"]
+    features = features.reshape(-1, 128, 3000)
+    with torch.no_grad():
+        audio_tokens = base_model.get_audio_features(features).pooler_output.shape[0]
+    input_ids = torch.tensor([[1, 3] + [AUDIO_TOKEN_ID] * audio_tokens + [4]])
+
+    logger.info("=" * 78)
+    logger.info(f"CPU BACKEND BENCHMARK ({cores} physical cores, native bf16: {bf16_supported()}, "
+                f"{args.audio_seconds:g}s audio, {args.new_tokens} tokens)")
+    logger.info("=" * 78)
+    logger.info(f"{'threads':>7} | {'variant':>7} | {'turn ms':>9} | {'RTF':>6} | {'RTF x cores':>11} | {'decode tok/s':>12}")
+    logger.info("-" * 78)
+    for variant in args.variants:
+        model, dtype = variant_model(base_model, variant)
+        for threads in thread_counts:
+            configure_cpu_threads(threads)
+            run_turn(model, dtype, features, input_ids, 2)  # Warm up kernels for this thread count
+            results = [run_turn(model, dtype, features, input_ids, args.new_tokens) for _ in range(args.iterations)]
+            turn_s = statistics.median(result[0] for result in results)
+            tokens_per_s = statistics.median(result[1] for result in results)
+            rtf = turn_s / args.audio_seconds
+            logger.info(f"{threads:>7} | {variant:>7} | {turn_s * 1000:>9.1f} | {rtf:>6.3f} | {rtf * threads:>11.3f} | "
+                        f"{tokens_per_s:>12.1f}")
+        del model
+    logger.info("-" * 78)
+    logger.info("RTF x cores: core-seconds per second of audio (lower = more concurrent streams per node)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
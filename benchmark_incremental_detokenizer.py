@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Per-token CPU cost of streaming a reply as words
+Old path: TextIteratorStreamer (re-decodes everything since the last line break each step) +
+the word loop's split / word_buffer[1:] / generated_text += handling.
+New path: WordEventStream (windowed incremental decode, word events, O(1) per token).
+Both run on the decode thread in production, so every microsecond here delays the next step.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import torch
+from tokenizers import Tokenizer, decoders, models, normalizers, trainers
+from transformers import PreTrainedTokenizerFast, TextIteratorStreamer
+
+from src.models.incremental_detokenizer import WordEventStream
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("INCREMENTAL_DETOKENIZER_BENCH")
+
+REPLY_TEXT = ("Sure, I can help with that. The train leaves at seven, so you should be at the station "
+              "around half past six. Café prices near the platform are high, déjà vu for most travellers! ")
+
+
+def load_tokenizer(name: str):
+    """The named tokenizer, or a small Llama/Mistral-style BPE with byte fallback when unavailable"""
+    if name:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(name)
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>", byte_fallback=True))
+    tokenizer.normalizer = normalizers.Sequence([normalizers.Prepend("▁"), normalizers.Replace(" ", "▁")])
+    tokenizer.decoder = decoders.Sequence([decoders.Replace("▁", " "), decoders.ByteFallback(),
+                                           decoders.Fuse(), decoders.Strip(" ", 1, 0)])
+    tokenizer.train_from_iterator([REPLY_TEXT] * 50, trainers.BpeTrainer(vocab_size=400, special_tokens=["<unk>", "<s>", "</s>"]))
+    spec = json.loads(tokenizer.to_str())
+    for byte in range(256):
+        spec["model"]["vocab"].setdefault(f"<0x{byte:02X}>", len(spec["model"]["vocab"]))
+    return PreTrainedTokenizerFast(tokenizer_object=Tokenizer.from_str(json.dumps(spec)),
+                                   bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+
+def old_path(tokenizer, token_ids):
+    """TextIteratorStreamer + the previous word loop; returns (per-token µs list, words)"""
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=False, skip_special_tokens=True)
+    word_buffer, generated_text, words, timings = [], "", [], []
+    for token_id in token_ids:
+        start = time.perf_counter()
+        streamer.put(token_id)
+        while not streamer.text_queue.empty():
+            new_text = streamer.text_queue.get_nowait()
+            word_buffer.extend(new_text.split())
+            while len(word_buffer) >= 1:
+                chunk_text = " ".join(word_buffer[:1])
+                word_buffer = word_buffer[1:]
+                generated_text += chunk_text + " "
+                words.append(chunk_text)
+        timings.append((time.perf_counter() - start) * 1e6)
+    streamer.end()
+    while not streamer.text_queue.empty():
+        new_text = streamer.text_queue.get_nowait()
+        if new_text is not streamer.stop_signal:
+            words.extend(new_text.split())
+    return timings, words
+
+
+def new_path(tokenizer, token_ids):
+    """WordEventStream; returns (per-token µs list, words)"""
+    stream = WordEventStream(tokenizer, skip_special_tokens=True)
+    words, timings = [], []
+    for token_id in token_ids:
+        start = time.perf_counter()
+        words.extend(event.text for event in stream.add_tokens(token_id.tolist()) if event.kind == "word")
+        timings.append((time.perf_counter() - start) * 1e6)
+    words.extend(event.text for event in stream.finish() if event.kind == "word")
+    return timings, words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental detokenization against TextIteratorStreamer")
+    parser.add_argument("--tokenizer", default="", help="HF tokenizer name/path (default: built-in byte-fallback BPE)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[128, 512, 1024, 2048])
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args.tokenizer)
+    logger.info("=" * 84)
+    logger.info("INCREMENTAL DETOKENIZER BENCHMARK (per-token CPU on the decode thread)")
+    logger.info("=" * 84)
+    logger.info(f"{'tokens':>7} | {'old mean µs':>11} | {'old last-10% µs':>15} | {'new mean µs':>11} | "
+                f"{'new last-10% µs':>15} | {'speedup':>7} | {'same words':>10}")
+    logger.info("-" * 84)
+
+    for length in args.lengths:
+        token_ids = []
+        while len(token_ids) < length:
+            token_ids += tokenizer.encode(REPLY_TEXT, add_special_tokens=False)
+        # generate() hands the streamer one 1-element tensor per step
+        token_ids = [torch.tensor([token_id]) for token_id in token_ids[:length]]
+
+        old_timings, old_words = old_path(tokenizer, token_ids)
+        new_timings, new_words = new_path(tokenizer, token_ids)
+        tail = max(1, length // 10)
+        old_mean = sum(old_timings) / length
+        new_mean = sum(new_timings) / length
+        logger.info(f"{length:>7} | {old_mean:>11.1f} | {sum(old_timings[-tail:]) / tail:>15.1f} | {new_mean:>11.1f} | "
+                    f"{sum(new_timings[-tail:]) / tail:>15.1f} | {old_mean / new_mean:>6.1f}x | "
+                    f"{str(old_words == new_words):>10}")
+
+    logger.info("-" * 84)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
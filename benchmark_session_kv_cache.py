@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Per-turn TTFT over a long conversation, with and without session KV carry-over
+Baseline re-prefills the whole history every turn; carry-over prefills only the new turn
+(after promoting the session cache back from the CPU tier) on a random Llama decoder
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from src.models.kv_cache_utils import cache_to_tensors, tensors_to_cache
+from src.models.session_kv_cache import SessionKVCache
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("SESSION_KV_CACHE_BENCH")
+
+
+def build_model(hidden_size: int, layers: int, device: str) -> LlamaForCausalLM:
+    torch.manual_seed(0)
+    return LlamaForCausalLM(LlamaConfig(
+        vocab_size=32000,
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 4,
+        num_hidden_layers=layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        num_key_value_heads=max(1, hidden_size // 256),
+        max_position_embeddings=8192,
+        bos_token_id=None,
+        eos_token_id=None,
+    )).to(device).eval()
+
+
+def sync(device: str):
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-turn latency with session KV carry-over")
+    parser.add_argument("--hidden-size", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--turn-tokens", type=int, default=80, help="Instruction + audio tokens per user turn")
+    parser.add_argument("--response-tokens", type=int, default=30, help="Assistant tokens per turn")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    model = build_model(args.hidden_size, args.layers, args.device)
+    # Every turn is offloaded to CPU RAM right away, so each carry-over pays a promotion
+    session_cache = SessionKVCache(device=args.device, idle_offload_s=0.0)
+    generator = torch.Generator().manual_seed(0)
+
+    logger.info("=" * 80)
+    logger.info(f"SESSION KV CARRY-OVER BENCHMARK ({args.device}, hidden={args.hidden_size}, layers={args.layers})")
+    logger.info("=" * 80)
+    logger.info(f"{'turn':>4} | {'history tok':>11} | {'re-prefill ms':>13} | {'carry-over ms':>13} | {'speedup':>7}")
+    logger.info("-" * 80)
+
+    history = torch.empty(0, dtype=torch.long, device=args.device)
+    with torch.no_grad():
+        for turn in range(1, args.turns + 1):
+            turn_ids = torch.randint(1, 32000, (args.turn_tokens,), generator=generator).to(args.device)
+            full_ids = torch.cat([history, turn_ids]).unsqueeze(0)
+
+            # Baseline: prefill the whole conversation
+            sync(args.device)
+            start = time.perf_counter()
+            model(input_ids=full_ids, use_cache=True).logits[0, -1].argmax()
+            sync(args.device)
+            baseline_ms = (time.perf_counter() - start) * 1000
+
+            # Carry-over: promote the session cache, prefill the uncached tail only
+            sync(args.device)
+            start = time.perf_counter()
+            entry = session_cache.checkout("bench")
+            cached = entry.cached_tokens if entry is not None else 0
+            past_key_values = tensors_to_cache(entry.layers if entry is not None else [])
+            outputs = model(input_ids=full_ids[:, cached:], past_key_values=past_key_values, use_cache=True)
+            outputs.logits[0, -1].argmax()
+            sync(args.device)
+            carry_ms = (time.perf_counter() - start) * 1000
+
+            # Simulate the assistant response extending the conversation
+            response_ids = torch.randint(1, 32000, (args.response_tokens,), generator=generator).to(args.device)
+            outputs = model(input_ids=response_ids.unsqueeze(0), past_key_values=outputs.past_key_values, use_cache=True)
+            history = torch.cat([full_ids[0], response_ids])
+            session_cache.checkin("bench", history, cache_to_tensors(outputs.past_key_values))
+            session_cache.offload_idle()
+
+            logger.info(f"{turn:>4} | {full_ids.shape[1]:>11} | {baseline_ms:>13.1f} | {carry_ms:>13.1f} | "
+                        f"{baseline_ms / carry_ms:>6.2f}x")
+
+    logger.info("-" * 80)
+    stats = session_cache.get_stats()
+    logger.info(f"Promotions from CPU: {stats['promotions_from_cpu']}, avg {stats['avg_promote_ms']:.2f}ms; "
+                f"final cache {stats['bytes_by_tier']['cpu'] / 1024 ** 2:.1f}MB on CPU")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Greedy decode throughput, plain generate() vs draft-and-verify speculative decoding
+Random weights never agree with each other, so the draft runs a real small decoder (its cost is
+real) but proposes the target's greedy token at a fixed agreement rate; real Voxtral/draft
+pairs report their measured acceptance rate through get_model_info()
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from src.models.speculative_decoding import SpeculativeDecoder
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("SPECULATIVE_DECODING_BENCH")
+
+
+def build_model(hidden_size: int, layers: int, device: str) -> LlamaForCausalLM:
+    torch.manual_seed(0)
+    return LlamaForCausalLM(LlamaConfig(
+        vocab_size=32000,
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 4,
+        num_hidden_layers=layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        num_key_value_heads=max(1, hidden_size // 256),
+        max_position_embeddings=4096,
+        bos_token_id=None,
+        eos_token_id=None,
+    )).to(device).eval()
+
+
+class AgreeingDraft(torch.nn.Module):
+    """Small decoder whose next token is the target's greedy token with probability `agreement`"""
+
+    def __init__(self, draft: LlamaForCausalLM, prompt_len: int, continuation: torch.Tensor, agreement: float):
+        super().__init__()
+        self.draft = draft
+        self.prompt_len = prompt_len
+        self.continuation = continuation.tolist()
+        self.agrees = (torch.rand(len(self.continuation), generator=torch.Generator().manual_seed(1)) < agreement).tolist()
+
+    def forward(self, input_ids, past_key_values=None, use_cache=True, logits_to_keep=0):
+        outputs = self.draft(input_ids=input_ids, past_key_values=past_key_values, use_cache=use_cache,
+                             logits_to_keep=logits_to_keep)
+        index = past_key_values.get_seq_length() - self.prompt_len
+        if 0 <= index < len(self.continuation) and self.agrees[index]:
+            outputs.logits[:, -1] = 0.0
+            outputs.logits[:, -1, self.continuation[index]] = 1.0
+        return outputs
+
+
+def sync(device: str):
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding against greedy generate()")
+    parser.add_argument("--hidden-size", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=12)
+    parser.add_argument("--draft-hidden-size", type=int, default=256)
+    parser.add_argument("--draft-layers", type=int, default=2)
+    parser.add_argument("--agreement", type=float, default=0.7, help="Chance a draft token matches the target")
+    parser.add_argument("--prompt-tokens", type=int, default=200)
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    target = build_model(args.hidden_size, args.layers, args.device)
+    input_ids = torch.randint(1, 32000, (1, args.prompt_tokens), generator=torch.Generator().manual_seed(0))
+    input_ids = input_ids.to(args.device)
+    generation_kwargs = dict(input_ids=input_ids, max_new_tokens=args.new_tokens,
+                             min_new_tokens=args.new_tokens, do_sample=False)
+
+    def timed(generate_fn) -> tuple:
+        sync(args.device)
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = generate_fn(**generation_kwargs)
+        sync(args.device)
+        return (time.perf_counter() - start) * 1000, outputs
+
+    def median_run(generate_fn) -> tuple:
+        runs = [timed(generate_fn) for _ in range(args.iterations)]
+        return statistics.median(ms for ms, _ in runs), runs[-1][1]
+
+    logger.info("=" * 80)
+    logger.info(f"SPECULATIVE DECODING BENCHMARK ({args.device}, hidden={args.hidden_size}, layers={args.layers}, "
+                f"draft {args.draft_hidden_size}x{args.draft_layers}, agreement={args.agreement:.0%})")
+    logger.info("=" * 80)
+    logger.info(f"{'k':>3} | {'greedy tok/s':>12} | {'spec tok/s':>10} | {'accept':>6} | {'tok/pass':>8} | "
+                f"{'speedup':>7} | {'identical':>9}")
+    logger.info("-" * 80)
+
+    timed(target.generate)  # warm up
+    baseline_ms, expected = median_run(target.generate)
+    draft = AgreeingDraft(build_model(args.draft_hidden_size, args.draft_layers, args.device),
+                          args.prompt_tokens, expected[0, args.prompt_tokens:], args.agreement)
+    for num_draft_tokens in (1, 2, 4, 6):
+        decoder = SpeculativeDecoder(target, draft, num_draft_tokens=num_draft_tokens, draft_context_tokens=0)
+        spec_ms, outputs = median_run(decoder.generate)
+        stats = decoder.get_stats()
+        logger.info(f"{num_draft_tokens:>3} | {args.new_tokens / baseline_ms * 1000:>12.1f} | "
+                    f"{args.new_tokens / spec_ms * 1000:>10.1f} | {stats['acceptance_rate']:>6.0%} | "
+                    f"{stats['tokens_per_target_forward']:>8.2f} | {baseline_ms / spec_ms:>6.2f}x | "
+                    f"{str(torch.equal(outputs, expected)):>9}")
+
+    logger.info("-" * 80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Audio-encoder work left at end of speech, whole-utterance vs streamed frames
+Baseline featurizes and encodes the complete utterance after the endpoint; streaming encodes
+30 s windows while frames arrive, so the endpoint only pays for windows that are still stale
+(none when the trailing silence is held back by the client) on a random Voxtral audio encoder
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from transformers import VoxtralConfig, VoxtralForConditionalGeneration, WhisperFeatureExtractor
+
+from src.models.inference_executor import InferenceExecutor
+from src.models.streaming_audio_encoder import StreamingAudioEncoder
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("STREAMING_AUDIO_ENCODER_BENCH")
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 4096  # Browser ScriptProcessor chunk
+UTTERANCE_SECONDS = [2.0, 5.0, 15.0, 45.0]
+
+
+def build_model(hidden_size: int, layers: int, device: str) -> VoxtralForConditionalGeneration:
+    torch.manual_seed(0)
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=hidden_size, intermediate_size=hidden_size * 4, num_hidden_layers=layers,
+                          num_attention_heads=max(1, hidden_size // 64), num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=1,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16),
+    )).to(device).eval()
+
+
+def sync(device: str):
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-of-speech encoder latency with streamed frames")
+    parser.add_argument("--audio-hidden-size", type=int, default=384, help="Voxtral-Mini uses 1280")
+    parser.add_argument("--audio-layers", type=int, default=4, help="Voxtral-Mini uses 32")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    model = build_model(args.audio_hidden_size, args.audio_layers, args.device)
+    feature_extractor = WhisperFeatureExtractor(feature_size=128)
+    window_samples = feature_extractor.n_samples
+
+    def featurize(audio: np.ndarray) -> torch.Tensor:
+        return feature_extractor(audio, sampling_rate=SAMPLE_RATE, padding=True, truncation=False,
+                                 pad_to_multiple_of=window_samples, return_tensors="pt")["input_features"]
+
+    def encode(features: torch.Tensor) -> torch.Tensor:
+        embeds = model.get_audio_features(features.to(args.device)).pooler_output
+        sync(args.device)
+        return embeds
+
+    def baseline_ms(audio: np.ndarray) -> float:
+        """Endpoint cost today: featurize + encode the whole utterance"""
+        start = time.perf_counter()
+        with torch.no_grad():
+            # Split into 3000-frame windows the way the Voxtral processor does
+            features = featurize(audio)
+            windows = features.reshape(features.shape[1], -1, 3000).transpose(0, 1)
+            for window in windows:
+                encode(window.unsqueeze(0))
+        return (time.perf_counter() - start) * 1000
+
+    async def streamed_ms(encoder: StreamingAudioEncoder, audio: np.ndarray, tail_samples: int) -> float:
+        """Frames pushed as they are captured; `tail_samples` arrive after the last background encode"""
+        utterance = encoder.start("bench")
+        speech = audio[:len(audio) - tail_samples]
+        for start in range(0, len(speech), FRAME_SAMPLES):
+            encoder.push(utterance, speech[start:start + FRAME_SAMPLES])
+            # Real-time capture gives the encoder a frame period between pushes (frames keep
+            # coming, so a task only watching for a pause is not waited on)
+            while (utterance.encode_task is not None and not utterance.encode_task.done()
+                   and not utterance.waiting_for_pause):
+                await asyncio.sleep(0.001)
+        if tail_samples:
+            utterance.append(audio[-tail_samples:])
+        else:
+            # Trailing silence held back by the client: frames pause before the endpoint
+            await asyncio.sleep(encoder.pause_encode_s * 2)
+            if utterance.encode_task is not None:
+                await utterance.encode_task
+
+        start = time.perf_counter()
+        await encoder.finalize(utterance)
+        return (time.perf_counter() - start) * 1000
+
+    async def run():
+        executor = InferenceExecutor()
+        encoder = StreamingAudioEncoder(featurize, encode, executor, window_samples=window_samples,
+                                        sample_rate=SAMPLE_RATE, encode_interval_s=0.5, pause_encode_s=0.3,
+                                        max_utterance_s=0)
+
+        logger.info("=" * 80)
+        logger.info(f"STREAMING AUDIO ENCODER BENCHMARK ({args.device}, audio hidden={args.audio_hidden_size}, "
+                    f"layers={args.audio_layers})")
+        logger.info("=" * 80)
+        logger.info(f"{'utterance':>9} | {'windows':>7} | {'whole ms':>8} | {'held silence ms':>15} | {'live tail ms':>12}")
+        logger.info("-" * 80)
+
+        generator = np.random.default_rng(0)
+        for seconds in UTTERANCE_SECONDS:
+            audio = (generator.standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+            baseline_ms(audio)  # warm up
+            whole = statistics.median(baseline_ms(audio) for _ in range(args.iterations))
+            held = statistics.median([await streamed_ms(encoder, audio, 0) for _ in range(args.iterations)])
+            tail = statistics.median([await streamed_ms(encoder, audio, FRAME_SAMPLES) for _ in range(args.iterations)])
+            windows = -(-len(audio) // window_samples)
+            logger.info(f"{seconds:>8.1f}s | {windows:>7} | {whole:>8.1f} | {held:>15.1f} | {tail:>12.1f}")
+
+        logger.info("-" * 80)
+        stats = encoder.get_stats()
+        logger.info(f"Encodes: {stats['background_encodes']} in background ({stats['pause_encodes']} on pause), "
+                    f"{stats['endpoint_encodes']} at endpoint; "
+                    f"avg encode {stats['avg_encode_ms']:.1f}ms")
+        executor.shutdown()
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
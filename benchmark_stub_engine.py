@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: turn latency under load on the stub engine (no GPU)
+Drives concurrent sessions through a replica pool of deterministic stand-in engines and reports
+TTFT and turn time percentiles per concurrency level. Same seed -> same numbers, so a change to
+routing, queueing or the transports can be measured on a laptop before it meets a GPU.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.utils.compatibility import FallbackVoxtralModel
+from src.models.replica_pool import ModelReplicaPool
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("STUB_ENGINE_BENCH")
+logging.getLogger("compatibility").setLevel(logging.WARNING)
+logging.getLogger("replica_pool").setLevel(logging.WARNING)
+logging.getLogger("inference_executor").setLevel(logging.WARNING)
+
+SAMPLE_RATE = 16000
+
+
+def percentile(values, pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+async def run_load(args, sessions: int):
+    """`sessions` users each taking `turns` turns back to back; returns (ttft ms list, turn ms list)"""
+    pool = ModelReplicaPool(["cpu"] * args.replicas, model_factory=lambda device: FallbackVoxtralModel(
+        device, prefill_base_ms=args.prefill_base_ms, prefill_ms_per_audio_s=args.prefill_ms_per_audio_s,
+        decode_ms_per_token=args.decode_ms_per_token, jitter_ms=args.jitter_ms, output_words=args.output_words,
+        seed=args.seed))
+    await pool.initialize()
+    audio = (np.random.default_rng(args.seed).standard_normal(int(args.audio_seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+    ttfts, turn_times = [], []
+
+    async def session(session_id: str):
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            first = None
+            async for chunk in pool.stream_turn(session_id, audio, f"{session_id}-{turn}"):
+                if first is None and chunk.get("text"):
+                    first = (time.perf_counter() - start) * 1000
+            ttfts.append(first or 0.0)
+            turn_times.append((time.perf_counter() - start) * 1000)
+
+    try:
+        await asyncio.gather(*(session(f"s{i}") for i in range(sessions)))
+    finally:
+        for model in pool.models():
+            model.inference_executor.shutdown()
+    return ttfts, turn_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark turn latency under load on the stub engine")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--replicas", type=int, default=1)
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument("--prefill-base-ms", type=float, default=30.0)
+    parser.add_argument("--prefill-ms-per-audio-s", type=float, default=20.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=25.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--output-words", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.info("=" * 78)
+    logger.info(f"STUB ENGINE LOAD BENCHMARK ({args.replicas} replica(s), {args.audio_seconds:g}s audio, "
+                f"{args.output_words} words, seed {args.seed})")
+    logger.info("=" * 78)
+    logger.info(f"{'sessions':>8} | {'TTFT p50':>9} | {'TTFT p95':>9} | {'turn p50':>9} | {'turn p95':>9} | {'turns/s':>8}")
+    logger.info("-" * 78)
+    for sessions in args.concurrency:
+        start = time.perf_counter()
+        ttfts, turn_times = asyncio.run(run_load(args, sessions))
+        throughput = len(turn_times) / (time.perf_counter() - start)
+        logger.info(f"{sessions:>8} | {statistics.median(ttfts):>7.1f}ms | {percentile(ttfts, 95):>7.1f}ms | "
+                    f"{statistics.median(turn_times):>7.1f}ms | {percentile(turn_times, 95):>7.1f}ms | {throughput:>8.2f}")
+    logger.info("-" * 78)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,7 +27,12 @@ if project_root not in sys.path:
 from src.utils.config import config
 from src.utils.logging_config import logger
 from src.managers.conversation_manager import ConversationManager
+from src.managers.endpointing_manager import PredictiveEndpointer
 from src.models.tts_manager import TTSManager
+from src.models.cancellation import CancellationToken
+from src.models.filler_bank import FillerBank, FillerPolicy
+from src.models.streaming_tts import SegmentChunker, StreamingTTSPipeline, stream_tts_frames
+from src.utils.audio_output import AUDIO_FORMATS, AudioOutputEncoder, negotiate_output_format
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -50,12 +55,77 @@ _tts_manager = None
 conversation_manager = ConversationManager(context_window=5, max_history=100)
 streaming_logger.info("✅ Conversation manager initialized (context_window=5, max_history=100)")
 
+# Predictive endpointing: streamed turns start at a short pause, output held until the endpoint is confirmed
+predictive_endpointer = PredictiveEndpointer(
+    enabled=getattr(config.inference, 'predictive_endpointing', True),
+    pause_ms=getattr(config.inference, 'predictive_pause_ms', 300),
+    max_per_utterance=getattr(config.inference, 'predictive_max_per_utterance', 3)
+)
+
+# Sentence-level TTS: segments are synthesized while the rest of the reply is decoded
+tts_config = getattr(config, 'tts', None)
+
+def create_tts_pipeline(tts_manager, send_audio, language, emotion_for, cancel_token, voice=None):
+    """TTS pipeline of one turn (one segment for the whole reply if streaming_segments is off)"""
+    chunker = SegmentChunker(
+        min_words=getattr(tts_config, 'segment_min_words', 4),
+        max_words=getattr(tts_config, 'segment_max_words', 24),
+        first_min_words=getattr(tts_config, 'first_segment_min_words', 2),
+        enabled=getattr(tts_config, 'streaming_segments', True)
+    )
+    return StreamingTTSPipeline(tts_manager, send_audio, language=language, emotion_for=emotion_for,
+                                cancel_token=cancel_token, chunker=chunker, voice=voice)
+
+# /ws/tts streaming mode: short first segment, audio cut into frames of this length
+stream_frame_ms = getattr(tts_config, 'stream_frame_ms', 200)
+
+def create_stream_chunker():
+    return SegmentChunker(
+        min_words=getattr(tts_config, 'segment_min_words', 4),
+        max_words=getattr(tts_config, 'segment_max_words', 24),
+        first_min_words=getattr(tts_config, 'first_segment_min_words', 2),
+        first_max_words=getattr(tts_config, 'stream_first_segment_max_words', 8)
+    )
+
+def create_output_encoder(params):
+    """Audio output format of one client, from the audio_format / sample_rate it connected with"""
+    return AudioOutputEncoder(negotiate_output_format(
+        params,
+        allowed=getattr(tts_config, 'output_formats', AUDIO_FORMATS),
+        default_codec=getattr(tts_config, 'default_output_format', 'wav'),
+        opus_bitrate=getattr(tts_config, 'opus_bitrate', 32000)
+    ))
+
+# Filler phrases: a turn expected to be slow to its first audio starts with a pre-synthesized one
+filler_bank = None  # Built at startup by build_filler_bank()
+filler_policy = FillerPolicy(
+    threshold_ms=getattr(tts_config, 'filler_threshold_ms', 700.0),
+    delay_ms=getattr(tts_config, 'filler_delay_ms', 0.0)
+)
+
+async def build_filler_bank():
+    """Synthesize the filler phrases for every language and voice (once, never during a turn)"""
+    global filler_bank
+    if not getattr(tts_config, 'filler_enabled', True):
+        return
+    tts_manager = get_tts_manager()
+    if not tts_manager or not tts_manager.is_initialized:
+        streaming_logger.warning("⚠️ TTS unavailable - no filler phrases")
+        return
+    bank = FillerBank(getattr(tts_config, 'filler_phrases', None), earcon=getattr(tts_config, 'filler_earcon', True))
+    await bank.build(tts_manager, voices=[None, *sorted(getattr(tts_manager, 'voice_profiles', {}))])
+    filler_bank = bank
+
 # PHASE 2: Initialize TTS manager for voice output
 def get_tts_manager():
     """Get or initialize TTS manager instance"""
     global _tts_manager
     if _tts_manager is None:
-        _tts_manager = TTSManager(model_name="chatterbox", device="cuda")
+        if getattr(config.model, 'engine', 'voxtral') == "stub":
+            from src.utils.compatibility import FallbackTTSManager
+            _tts_manager = FallbackTTSManager.from_config(config)
+        else:
+            _tts_manager = TTSManager(model_name="chatterbox", device="cuda")
         streaming_logger.info("✅ TTS manager initialized")
     return _tts_manager
 
@@ -537,6 +607,7 @@ async def home(request: Request):
         let audioWorkletNode = null;
         let isStreaming = false;
         let wsUrl = '';
+        let audioOutput = { codec: 'wav', sample_rate: null };  // Negotiated at connect (connection message)
         let chunkCounter = 0;
         let streamStartTime = null;
         let latencySum = 0;
@@ -554,10 +625,27 @@ async def home(request: Request):
         let pendingResponse = false;
         let lastResponseText = '';  // For deduplication
 
+        // Streamed utterances: frames go to the server while the user speaks
+        let streamingAudioInput = false;  // Enabled by the server's connection message
+        let streamingUtteranceId = null;
+        let utteranceCounter = 0;
+        let heldSilenceFrames = [];  // Trailing silence, only sent if speech resumes
+
+        // Predictive endpointing: a short pause starts the turn early, the server holds its output
+        let predictiveEndpointing = false;  // Enabled by the server's connection message
+        let predictivePauseMs = 300;
+        let speculativeEndpointSent = false;
+
+        // Barge-in: speech while a response is pending cancels it on the server
+        let bargeInFrames = 0;
+        let bargeInBuffer = [];
+
         // Audio playback queue management
         let audioQueue = [];
         let isPlayingAudio = false;
+        let nextAudioIsFiller = false;  // Set by a filler_audio message for the binary message after it
         let currentAudio = null;
+        let currentSource = null;  // Web Audio source playing a TTS chunk
 
         // Mode variables (Voxtral ASR-only)
         let currentMode = 'transcribe';
@@ -730,6 +818,8 @@ async def home(request: Request):
         const CHUNK_SIZE = 4096;
         const MIN_SPEECH_DURATION = 800;     // INCREASED: Minimum speech duration (was 500)
         const END_OF_SPEECH_SILENCE = 1200;   // INCREASED: End of speech silence (was 800)
+        const PRE_ROLL_SAMPLES = SAMPLE_RATE / 2;  // Audio before speech onset sent with the first frame
+        const BARGE_IN_FRAMES = 2;  // Consecutive speech frames (~0.5s) that interrupt a pending response
         const SPEECH_THRESHOLD = 0.025;     // INCREASED: Speech threshold (was 0.01)
         const LATENCY_WARNING_THRESHOLD = 1000;
 
@@ -965,12 +1055,44 @@ async def home(request: Request):
             }
         }
 
+        // Audio formats this browser can play, best first, and its playback rate
+        function audioFormatQuery() {
+            const probe = document.createElement('audio');
+            const formats = [];
+            if (probe.canPlayType('audio/ogg; codecs=opus')) formats.push('opus-ogg');
+            if (probe.canPlayType('audio/webm; codecs=opus')) formats.push('opus-webm');
+            formats.push('pcm16', 'wav');
+            const sampleRate = audioContext ? audioContext.sampleRate : 48000;
+            return `?audio_format=${formats.join(',')}&sample_rate=${sampleRate}`;
+        }
+
+        // Raw PCM16 / mu-law needs no decoding: samples go straight into an AudioBuffer
+        function rawAudioBuffer(arrayBuffer) {
+            let samples;
+            if (audioOutput.codec === 'mulaw') {
+                const codes = new Uint8Array(arrayBuffer);
+                samples = new Float32Array(codes.length);
+                for (let i = 0; i < codes.length; i++) {
+                    const code = ~codes[i] & 0xFF;
+                    const magnitude = ((((code & 0x0F) << 3) + 0x84) << ((code >> 4) & 0x07)) - 0x84;
+                    samples[i] = ((code & 0x80) ? -magnitude : magnitude) / 32768;
+                }
+            } else {
+                const pcm = new Int16Array(arrayBuffer, 0, Math.floor(arrayBuffer.byteLength / 2));
+                samples = new Float32Array(pcm.length);
+                for (let i = 0; i < pcm.length; i++) samples[i] = pcm[i] / 32768;
+            }
+            const buffer = audioContext.createBuffer(1, samples.length, audioOutput.sample_rate || audioContext.sampleRate);
+            buffer.copyToChannel(samples, 0);
+            return buffer;
+        }
+
         async function connect() {
             try {
                 updateStatus('Connecting to Voxtral conversational AI...', 'loading');
                 log('Attempting WebSocket connection...');
                 
-                ws = new WebSocket(wsUrl);
+                ws = new WebSocket(wsUrl + audioFormatQuery());
                 
                 return new Promise((resolve, reject) => {
                     ws.onopen = () => {
@@ -1040,8 +1162,23 @@ async def home(request: Request):
             switch(data.type) {
                 case 'connection':
                     log('Connected to Voxtral AI');
+                    streamingAudioInput = data.streaming_audio_input === true;
+                    log(`Audio input mode: ${streamingAudioInput ? 'streamed frames' : 'complete utterances'}`);
+                    if (data.predictive_endpointing) {
+                        predictiveEndpointing = data.predictive_endpointing.enabled === true;
+                        predictivePauseMs = data.predictive_endpointing.pause_ms || predictivePauseMs;
+                    }
+                    if (data.audio_output) {
+                        audioOutput = data.audio_output;
+                        log(`Audio output: ${audioOutput.codec} @ ${audioOutput.sample_rate || 'native'} Hz`);
+                    }
                     updateConnectionStatus(true);
                     break;
+
+                case 'interim_transcript':
+                    log(`🎙️ Interim: "${data.stable_text}" + "${data.unstable_text}" (${data.audio_ms}ms audio)`);
+                    updateStatus('🎙️ ' + [data.stable_text, data.unstable_text].filter(t => t).join(' '), 'info');
+                    break;
                     
                 case 'text_chunk':
                     // Handle chunked text responses
@@ -1083,6 +1220,17 @@ async def home(request: Request):
                     log(`Speech response received`);
                     break;
 
+                case 'filler_audio':
+                    // Played while the reply is prepared; dropped if the reply's audio comes first
+                    nextAudioIsFiller = true;
+                    log(`💬 Filler for ${data.chunk_id}: ${data.earcon ? 'thinking tone' : '"' + data.text + '"'}`);
+                    break;
+
+                case 'turn_cancelled':
+                    // Sent instead of conversation_complete; the next utterance is already being captured
+                    log(`🛑 Turn ${data.chunk_id} cancelled (${data.reason})`);
+                    break;
+
                 case 'conversation_complete':
                     log('📨 [WEBSOCKET] Received conversation_complete message');
 
@@ -1142,6 +1290,12 @@ async def home(request: Request):
 
         // PHASE 4: Handle binary audio chunks from WebSocket
         async function handleAudioChunkBinary(audioData) {
+            const isFiller = nextAudioIsFiller;
+            nextAudioIsFiller = false;
+            if (!isFiller) {
+                // The reply's own audio: a filler still waiting to play is no longer needed
+                audioQueue = audioQueue.filter(item => !item.filler);
+            }
             try {
                 // Convert Blob to ArrayBuffer if needed
                 let arrayBuffer = audioData;
@@ -1156,7 +1310,8 @@ async def home(request: Request):
                     chunkId: audioQueue.length,
                     audioBuffer: arrayBuffer,
                     metadata: { size: arrayBuffer.byteLength },
-                    voice: 'tts'
+                    voice: 'tts',
+                    filler: isFiller
                 });
 
                 log(`🎵 [PHASE 4] Audio queue length: ${audioQueue.length}`);
@@ -1257,35 +1412,46 @@ async def home(request: Request):
                     return;
                 }
 
-                log(`🎵 [PHASE 4] Decoding audio buffer (${audioItem.audioBuffer.byteLength} bytes)`);
+                const playDecoded = (decodedBuffer) => {
+                    log(`🎵 [PHASE 4] Decoded audio buffer: ${decodedBuffer.duration.toFixed(2)}s, channels: ${decodedBuffer.numberOfChannels}`);
 
-                audioContext.decodeAudioData(
-                    audioItem.audioBuffer,
-                    (decodedBuffer) => {
-                        log(`🎵 [PHASE 4] Decoded audio buffer: ${decodedBuffer.duration.toFixed(2)}s, channels: ${decodedBuffer.numberOfChannels}`);
+                    const source = audioContext.createBufferSource();
+                    source.buffer = decodedBuffer;
+                    source.connect(audioContext.destination);
 
-                        const source = audioContext.createBufferSource();
-                        source.buffer = decodedBuffer;
-                        source.connect(audioContext.destination);
+                    source.onended = () => {
+                        log(`✅ [PHASE 4] Audio chunk ${audioItem.chunkId} finished playing`);
+                        if (currentSource === source) {
+                            currentSource = null;
+                        }
+                        resolve();
+                    };
 
-                        source.onended = () => {
-                            log(`✅ [PHASE 4] Audio chunk ${audioItem.chunkId} finished playing`);
-                            resolve();
-                        };
+                    source.onerror = (e) => {
+                        log(`❌ [PHASE 4] Audio source error: ${e}`);
+                        reject(e);
+                    };
 
-                        source.onerror = (e) => {
-                            log(`❌ [PHASE 4] Audio source error: ${e}`);
-                            reject(e);
-                        };
+                    try {
+                        source.start(0);
+                        currentSource = source;
+                        log(`🎵 [PHASE 4] Started playing audio chunk ${audioItem.chunkId}`);
+                    } catch (e) {
+                        log(`❌ [PHASE 4] Failed to start audio: ${e}`);
+                        reject(e);
+                    }
+                };
 
-                        try {
-                            source.start(0);
-                            log(`🎵 [PHASE 4] Started playing audio chunk ${audioItem.chunkId}`);
-                        } catch (e) {
-                            log(`❌ [PHASE 4] Failed to start audio: ${e}`);
-                            reject(e);
-                        }
-                    },
+                if (audioOutput.codec === 'pcm16' || audioOutput.codec === 'mulaw') {
+                    playDecoded(rawAudioBuffer(audioItem.audioBuffer));
+                    return;
+                }
+
+                log(`🎵 [PHASE 4] Decoding audio buffer (${audioItem.audioBuffer.byteLength} bytes)`);
+
+                audioContext.decodeAudioData(
+                    audioItem.audioBuffer,
+                    playDecoded,
                     (error) => {
                         log(`❌ [PHASE 4] Failed to decode audio: ${error}`);
                         reject(error);
@@ -1350,6 +1516,11 @@ async def home(request: Request):
             // CRITICAL: Reset audio buffer for continuous streaming
             continuousAudioBuffer = [];
             lastResponseText = '';
+            streamingUtteranceId = null;
+            heldSilenceFrames = [];
+            speculativeEndpointSent = false;
+            bargeInFrames = 0;
+            bargeInBuffer = [];
 
             log('✅ [RESET] VAD state reset complete - ready for next utterance');
         }
@@ -1698,6 +1869,34 @@ async def home(request: Request):
             }
         }
 
+        // Barge-in: drop queued and playing TTS audio
+        function stopAudioPlayback() {
+            audioQueue = [];
+            if (currentSource) {
+                try {
+                    currentSource.stop();
+                } catch (e) {
+                    // Already stopped
+                }
+                currentSource = null;
+            }
+            if (currentAudio) {
+                currentAudio.pause();
+                currentAudio = null;
+            }
+            updateAudioQueueDisplay();
+        }
+
+        function bargeIn() {
+            log('🛑 Barge-in: speech during the pending response - cancelling it');
+            sendCancel('barge_in');
+            stopAudioPlayback();
+            // The speech frames that triggered the barge-in become the new utterance's pre-roll
+            const preRoll = bargeInBuffer;
+            resetForNextInput();
+            continuousAudioBuffer = preRoll;
+        }
+
         function pauseAudioPlayback() {
             if (audioContext && audioContext.state === 'running') {
                 audioContext.suspend();
@@ -1862,18 +2061,25 @@ async def home(request: Request):
                         lastVadUpdate = now;
                     }
 
-                    if (!isStreaming || pendingResponse) {
-                        if (!isStreaming) {
-                            // Silently skip - streaming not active
-                        } else if (pendingResponse) {
-                            // Silently skip - waiting for response
-                        }
+                    if (!isStreaming) {
+                        // Silently skip - streaming not active
                         return;
                     }
 
                     const inputBuffer = event.inputBuffer;
                     const inputData = inputBuffer.getChannelData(0);
 
+                    if (pendingResponse) {
+                        // Waiting for the response: only sustained speech (barge-in) gets through
+                        bargeInFrames = detectSpeechInBuffer(inputData) ? bargeInFrames + 1 : 0;
+                        if (bargeInFrames < BARGE_IN_FRAMES) {
+                            bargeInBuffer.push(...inputData);
+                            bargeInBuffer = bargeInBuffer.slice(-PRE_ROLL_SAMPLES);
+                            return;
+                        }
+                        bargeIn();
+                    }
+
                     // Update volume meter and VAD indicator
                     updateVolumeMeter(inputData);
 
@@ -1890,16 +2096,48 @@ async def home(request: Request):
                             speechStartTime = now;
                             isSpeechActive = true;
                             silenceStartTime = null;
+                            if (isPlayingAudio) {
+                                // User talks over the spoken answer: stop it
+                                stopAudioPlayback();
+                            }
                             log('Speech detected - starting continuous capture');
                             updateVadStatus('speech');
                         }
                         lastSpeechTime = now;
+                        // Speech resumed after a pause: the endpoint timer starts over
+                        silenceStartTime = null;
+                        speculativeEndpointSent = false;
                     } else if (isSpeechActive && !silenceStartTime) {
                         // Silence started after speech
                         silenceStartTime = now;
                         updateVadStatus('silence');
                     }
 
+                    // Streamed utterance: the server encodes audio while the user is still speaking
+                    if (streamingAudioInput && isSpeechActive) {
+                        if (streamingUtteranceId === null) {
+                            // Speech onset: open the utterance with a short pre-roll (includes this frame)
+                            streamingUtteranceId = `${utteranceCounter++}_${now}`;
+                            sendAudioFrame(new Float32Array(continuousAudioBuffer.slice(-PRE_ROLL_SAMPLES)));
+                        } else if (!hasSpeech) {
+                            // Hold trailing silence so the server's last encode already covers the utterance
+                            heldSilenceFrames.push(new Float32Array(inputData));
+                        } else {
+                            heldSilenceFrames.forEach(frame => sendAudioFrame(frame));
+                            heldSilenceFrames = [];
+                            sendAudioFrame(new Float32Array(inputData));
+                        }
+                    }
+
+                    // Short pause: let the server start the turn before the endpoint is certain
+                    if (predictiveEndpointing && streamingAudioInput && streamingUtteranceId !== null &&
+                        isSpeechActive && silenceStartTime && !speculativeEndpointSent &&
+                        (now - silenceStartTime >= predictivePauseMs) &&
+                        (lastSpeechTime - speechStartTime >= MIN_SPEECH_DURATION)) {
+                        sendSpeculativeEndpoint();
+                        speculativeEndpointSent = true;
+                    }
+
                     // Check if we should process accumulated speech
                     if (isSpeechActive && silenceStartTime && 
                         (now - silenceStartTime >= END_OF_SPEECH_SILENCE) && 
@@ -1907,10 +2145,17 @@ async def home(request: Request):
 
                         // Process the complete utterance
                         log(`Processing ULTRA-FAST utterance: ${continuousAudioBuffer.length} samples, ${lastSpeechTime - speechStartTime}ms duration`);
-                        sendCompleteUtterance(new Float32Array(continuousAudioBuffer));
+                        if (streamingAudioInput && streamingUtteranceId !== null) {
+                            sendEndOfUtterance();
+                        } else {
+                            sendCompleteUtterance(new Float32Array(continuousAudioBuffer));
+                        }
 
                         // FIXED: Reset for next utterance
                         continuousAudioBuffer = [];
+                        streamingUtteranceId = null;
+                        heldSilenceFrames = [];
+                        speculativeEndpointSent = false;
                         isSpeechActive = false;
                         speechStartTime = null;
                         lastSpeechTime = null;
@@ -2072,6 +2317,55 @@ async def home(request: Request):
             }
         }
         
+        function sendCancel(reason) {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            ws.send(JSON.stringify({ type: 'cancel', reason: reason }));
+            log(`Sent cancel (${reason})`);
+        }
+
+        function sendAudioFrame(audioData) {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            ws.send(JSON.stringify({
+                type: 'audio_frame',
+                utterance_id: streamingUtteranceId,
+                audio_data: arrayBufferToBase64(audioData.buffer),
+                language: getLanguage()
+            }));
+        }
+
+        function sendEndOfUtterance() {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                log('Cannot end utterance - WebSocket not connected');
+                return;
+            }
+            ws.send(JSON.stringify({
+                type: 'end_of_utterance',
+                utterance_id: streamingUtteranceId,
+                chunk_id: chunkCounter++,
+                timestamp: Date.now(),
+                language: getLanguage()
+            }));
+            log(`Sent end of utterance ${streamingUtteranceId} (chunk ${chunkCounter})`);
+        }
+
+        function sendSpeculativeEndpoint() {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            ws.send(JSON.stringify({
+                type: 'speculative_endpoint',
+                utterance_id: streamingUtteranceId,
+                chunk_id: chunkCounter++,
+                timestamp: Date.now(),
+                language: getLanguage()
+            }));
+            log(`Sent speculative endpoint for ${streamingUtteranceId} (chunk ${chunkCounter})`);
+        }
+
         function arrayBufferToBase64(buffer) {
             const bytes = new Uint8Array(buffer);
             let binary = '';
@@ -2125,14 +2419,13 @@ async def api_status():
         performance_summary = performance_monitor.get_performance_summary()
         
         # Determine overall health status
+        replica_status = unified_manager.get_replica_status()
         is_healthy = (
             unified_manager.is_initialized and
-            model_info['unified_manager']['voxtral_initialized']
+            model_info['unified_manager']['voxtral_initialized'] and
+            replica_status["router"].get("healthy_replicas", 1) > 0
         )
 
-        voxtral_model = get_voxtral_model()
-        model_info = voxtral_model.get_model_info()
-
         return JSONResponse({
             "status": "healthy" if is_healthy else "initializing",
             "timestamp": time.time(),
@@ -2147,7 +2440,15 @@ async def api_status():
                 "average_latency_ms": performance_summary["statistics"]["average_latency_ms"],
                 "operations_within_target": performance_summary["statistics"]["operations_within_target"]
             },
-            "model": model_info,
+            "model": model_info.get("voxtral", {}),
+            "replicas": replica_status,
+            "predictive_endpointing": predictive_endpointer.get_stats(),
+            "tts_cache": _tts_manager.get_cache_stats() if _tts_manager is not None else None,
+            "tts_workers": _tts_manager.get_worker_stats() if _tts_manager is not None else None,
+            "tts_batching": _tts_manager.get_batch_stats() if _tts_manager is not None else None,
+            "tts_backends": _tts_manager.get_backend_stats() if _tts_manager is not None else None,
+            "tts_voices": _tts_manager.get_voice_stats() if _tts_manager is not None else None,
+            "tts_fillers": {**filler_policy.get_stats(), "bank": filler_bank.get_stats() if filler_bank else None},
             "config": {
                 "sample_rate": config.audio.sample_rate,
                 "tcp_ports": config.server.tcp_ports,
@@ -2280,12 +2581,254 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     client_id = f"{websocket.client.host}:{websocket.client.port}"
     streaming_logger.info(f"[CONVERSATION] Client connected: {client_id}")
-    
+    inference_config = getattr(config, 'inference', None)
+    streaming_audio_input = getattr(inference_config, 'streaming_audio_input', True)
+    streaming_utterance = None  # Utterance currently being streamed in audio_frame messages
+    streaming_model = None  # Replica encoding it
+    current_turn = None  # Task answering the latest turn
+    current_cancel = None  # That turn's CancellationToken
+    speculative_turn = None  # Turn started at a short pause, waiting for its endpoint
+    output_encoder = create_output_encoder(websocket.query_params)  # Codec and rate this client plays
+    client_voice = websocket.query_params.get("voice")  # Voice profile of this client (default: the server's)
+    # This client's filler encodings are made now, so its first slow turn can send one at once
+    filler_prepare = (asyncio.create_task(filler_bank.prepare(output_encoder.output_format, client_voice))
+                      if filler_bank is not None else None)
+
+    async def send_interim_transcript(interim):
+        await websocket.send_json({"type": "interim_transcript", **interim})
+
+    def cancel_current_turn(reason: str) -> bool:
+        """Stop the turn being answered (barge-in, cancel message, disconnect)"""
+        if current_turn is None or current_turn.done():
+            return False
+        current_cancel.cancel(reason)
+        current_turn.cancel()
+        streaming_logger.info(f"🛑 [CONVERSATION] Cancelled turn {current_cancel.turn_id} for {client_id} ({reason})")
+        return True
+
+    def abandon_speculative_turn(reason: str):
+        """The speculative turn will not be confirmed: cancel it without the client ever seeing it"""
+        nonlocal speculative_turn
+        if speculative_turn is not None and speculative_turn.outcome is None:
+            predictive_endpointer.abandon(speculative_turn, reason)
+            if current_turn is speculative_turn.task:
+                cancel_current_turn(reason)
+        speculative_turn = None
+
+    async def run_turn(audio_data, chunk_id, language, streaming_audio, cancel_token, speculative=None):
+        """Answer one user turn; runs as a task so barge-in and cancel messages are still received"""
+        # Process with CHUNKED STREAMING
+        unified_manager = get_unified_manager()
+
+        async def send_json(message):
+            # A speculative turn's messages are held until its endpoint is confirmed
+            if speculative is not None:
+                await speculative.send(websocket.send_json, message)
+            else:
+                await websocket.send_json(message)
+
+        async def send_bytes(data):
+            if speculative is not None:
+                await speculative.send(websocket.send_bytes, data)
+            else:
+                await websocket.send_bytes(data)
+
+        async def send_audio(wav_bytes):
+            # Re-encoded off the event loop into the client's negotiated format
+            audio_bytes = await output_encoder.encode_async(wav_bytes)
+            if not audio_bytes:
+                return  # Not encodable in a raw format; the encoder logged it
+            if filler_turn is not None:
+                await filler_turn.real_audio()  # The reply's audio is ready: a filler not yet sent is dropped
+            await send_bytes(audio_bytes)
+
+        async def send_filler(filler, payload):
+            await send_json({"type": "filler_audio", "chunk_id": chunk_id, "text": filler.text,
+                             "earcon": filler.is_earcon})
+            await send_bytes(payload)
+
+        tts_pipeline = None
+        filler_turn = None
+        try:
+            # Track processing time for metrics and profiling
+            processing_start_time = time.time()
+            first_chunk_time = None
+            chunk_times = []
+
+            # Sentences of the reply are synthesized while it is still being generated
+            tts_manager = get_tts_manager()  # CRITICAL FIX: Get TTS manager from global scope
+            if tts_manager and tts_manager.is_initialized:
+                emotion_detector = unified_manager.voxtral_model.get_emotion_detector()
+
+                def emotion_for(reply_text):
+                    # PHASE 7: Emotion of the reply so far, re-detected for every segment
+                    if not emotion_detector:
+                        return "neutral"
+                    emotion, confidence = emotion_detector.detect_emotion(reply_text)
+                    streaming_logger.debug(f"🎭 [PHASE 7] Detected emotion: {emotion} (confidence: {confidence:.2f})")
+                    return emotion
+
+                tts_pipeline = create_tts_pipeline(tts_manager, send_audio, language, emotion_for, cancel_token,
+                                                   client_voice)
+                if speculative is None:
+                    # Fills the silence until the first segment is synthesized (a speculative turn's
+                    # output is held anyway, and it started early to be quick)
+                    filler_turn = filler_policy.start_turn(filler_bank, language, client_voice,
+                                                           output_encoder.output_format, send_filler)
+
+            # PHASE 1: Track full response for conversation manager
+            full_response = ""
+
+            # PHASE 1: Get conversation context for context-aware responses
+            conversation_context = conversation_manager.get_context()
+            streaming_logger.debug(f"📝 [PHASE 1] Conversation context: {len(conversation_context)} chars, {len(conversation_manager.history)} turns")
+
+            # Use CHUNKED STREAMING method
+            # PHASE 5: Pass language parameter for multi-language support
+            chunk_counter = 0
+            # Routed to the least-loaded replica, or the one holding this session's KV cache / streamed audio
+            async for text_chunk in unified_manager.replica_pool.stream_turn(
+                client_id,  # Carry this connection's KV cache over between turns
+                audio_data, chunk_id, mode="conversation", conversation_context=conversation_context, language=language,
+                streaming_audio=streaming_audio,
+                cancel_token=cancel_token,
+                speculative=speculative is not None
+            ):
+                if text_chunk['success'] and text_chunk['text'].strip():
+                    # Track first chunk latency
+                    if first_chunk_time is None:
+                        first_chunk_time = time.time() - processing_start_time
+                        streaming_logger.info(f"⚡ First chunk latency: {first_chunk_time*1000:.1f}ms")
+
+                    chunk_time = time.time() - processing_start_time
+                    chunk_times.append(chunk_time)
+
+                    # PHASE 1: Accumulate response text
+                    full_response += text_chunk['text'] + " "
+                    if tts_pipeline is not None:
+                        tts_pipeline.push_word(text_chunk['text'])
+
+                    # Send text chunk immediately
+                    # PHASE 3: Send text chunk with audio metadata
+                    await send_json({
+                        "type": "text_chunk",
+                        "chunk_id": f"{chunk_id}_{chunk_counter}",
+                        "text": text_chunk['text'],
+                        "has_audio": text_chunk.get('audio') is not None,  # PHASE 3
+                        "is_final": text_chunk.get('is_final', False),
+                        "processing_time_ms": int(chunk_time * 1000)
+                    })
+                    streaming_logger.debug(f"📤 Text chunk {chunk_counter}: '{text_chunk['text']}' ({int(chunk_time*1000)}ms)")
+
+                    # PHASE 3: Send audio bytes separately if available
+                    if text_chunk.get('audio'):
+                        try:
+                            await send_audio(text_chunk['audio'])
+                            streaming_logger.debug(f"🎵 [PHASE 3] Sent {len(text_chunk['audio'])} bytes of audio for chunk {chunk_counter}")
+                        except Exception as e:
+                            streaming_logger.warning(f"⚠️ [PHASE 3] Failed to send audio chunk: {e}")
+
+                    chunk_counter += 1
+
+            if cancel_token.is_cancelled:
+                # Generation stopped early for a cancelled turn: same handling as a cancelled task
+                raise asyncio.CancelledError()
+
+            # Calculate total latency and profiling metrics
+            total_latency_ms = int((time.time() - processing_start_time) * 1000)
+            avg_chunk_time = int(np.mean(chunk_times) * 1000) if chunk_times else 0
+            streaming_logger.info(f"✅ CHUNKED STREAMING complete for {chunk_id}: {chunk_counter} chunks in {total_latency_ms}ms (avg chunk: {avg_chunk_time}ms, first: {int(first_chunk_time*1000) if first_chunk_time else 0}ms)")
+
+            # Synthesize the last segment and wait until every segment's audio has been sent
+            tts_stats = None
+            if tts_pipeline is not None and full_response.strip():
+                try:
+                    tts_stats = await tts_pipeline.finish()
+                    if speculative is None:
+                        filler_policy.observe(tts_stats['first_audio_ms'])
+                    streaming_logger.info(f"🎵 [PHASE 3] Sent {tts_stats['sent_segments']}/{tts_stats['segments']} audio "
+                                          f"segments ({tts_stats['audio_bytes']} bytes), first audio at "
+                                          f"{tts_stats['first_audio_ms'] or 0:.1f}ms")
+                except Exception as e:
+                    streaming_logger.warning(f"⚠️ [PHASE 3] TTS synthesis failed: {e}")
+
+            if speculative is not None:
+                # Speculative turn: everything that could run ahead is done; the history only
+                # changes once the endpoint is confirmed (abandoning cancels this wait)
+                speculative.mark_ready()
+                await speculative.wait_confirmed()
+
+            # PHASE 1: Add user and assistant messages to conversation manager
+            # OPTIMIZATION: Use placeholder for user message (actual transcription would require second model pass)
+            # The AI response is based on the audio content, so we store a reference to it
+            if full_response.strip():
+                # CRITICAL FIX: Use placeholder instead of re-transcribing (avoids double model inference)
+                # The user's actual words are captured in the audio, and the AI response is based on them
+                user_message = f"[User audio input - {len(audio_data)} samples, {len(audio_data)/16000:.2f}s]"
+
+                conversation_manager.add_turn(
+                    "user",
+                    user_message,
+                    metadata={"chunk_id": chunk_id, "audio_samples": len(audio_data), "duration_s": len(audio_data)/16000}
+                )
+                streaming_logger.debug(f"📝 [PHASE 1] Added user message to conversation")
+
+                # Add assistant response
+                conversation_manager.add_turn(
+                    "assistant",
+                    full_response.strip(),
+                    latency_ms=total_latency_ms,
+                    metadata={"chunk_id": chunk_id, "chunks": chunk_counter}
+                )
+                streaming_logger.info(f"📝 [PHASE 1] Added assistant response to conversation (latency: {total_latency_ms}ms)")
+
+                # Log conversation summary
+                summary = conversation_manager.get_history_summary()
+                streaming_logger.info(f"📊 [PHASE 1] Conversation summary: {summary['total_turns']} turns, {summary['total_characters']} chars")
+
+            # CRITICAL FIX: Send conversation_complete message to reset VAD state
+            # This allows the frontend to call resetForNextInput() and enable continuous streaming
+            await send_json({
+                "type": "conversation_complete",
+                "chunk_id": chunk_id,
+                "total_chunks": chunk_counter,
+                "total_latency_ms": total_latency_ms,
+                "first_audio_ms": int(tts_stats['first_audio_ms']) if tts_stats and tts_stats['first_audio_ms'] else None,
+                "audio_segments": tts_stats['sent_segments'] if tts_stats else 0,
+                "meets_target": total_latency_ms < 500
+            })
+            streaming_logger.info(f"📨 Sent conversation_complete message for {chunk_id} ({total_latency_ms}ms)")
+
+        except asyncio.CancelledError:
+            cancel_token.cancel("cancelled")
+            if cancel_token.reason != "disconnect":
+                # No conversation_complete: the client has already moved on to the next utterance
+                try:
+                    await send_json({"type": "turn_cancelled", "chunk_id": chunk_id, "reason": cancel_token.reason})
+                except Exception:
+                    pass
+        except Exception as e:
+            streaming_logger.error(f"❌ CHUNKED STREAMING error for {chunk_id}: {e}")
+            await send_json({
+                "type": "error",
+                "message": "Sorry, there was an error.",
+                "error": str(e)
+            })
+        finally:
+            if tts_pipeline is not None:
+                # Barge-in, disconnect or error: no more segments for this turn
+                tts_pipeline.cancel()
+            if filler_turn is not None:
+                filler_turn.cancel()
+
     try:
         await websocket.send_json({
             "type": "connection", 
             "message": "Connected to Voxtral AI",
-            "streaming_enabled": True
+            "streaming_enabled": True,
+            "streaming_audio_input": streaming_audio_input,
+            "predictive_endpointing": predictive_endpointer.client_settings() if streaming_audio_input else None,
+            "audio_output": output_encoder.output_format.to_dict()
         })
         
         while True:
@@ -2294,166 +2837,111 @@ async def websocket_endpoint(websocket: WebSocket):
                 message = await websocket.receive_json()
                 message_type = message.get("type")
                 
-                if message_type == "audio_chunk":
+                if message_type == "audio_frame" and streaming_audio_input:
+                    # Frames arrive while the user speaks; windows are encoded in the background
+                    try:
+                        frame = np.frombuffer(base64.b64decode(message.get("audio_data", "")), dtype=np.float32)
+                    except Exception as e:
+                        streaming_logger.error(f"❌ Audio frame decoding error: {e}")
+                        continue
+
+                    utterance_id = str(message.get("utterance_id", ""))
+                    if speculative_turn is not None:
+                        # More audio after the pause: the user was not done. Drop the speculative turn;
+                        # the frames extend the same utterance and its encoded windows are kept
+                        abandon_speculative_turn("speech_resumed" if speculative_turn.utterance_id == utterance_id
+                                                 else "barge_in")
+                    if streaming_utterance is None or streaming_utterance.utterance_id != utterance_id:
+                        # The user started a new utterance while the last one is still being answered
+                        cancel_current_turn("barge_in")
+                        if streaming_utterance is not None:
+                            predictive_endpointer.end_utterance(streaming_utterance.utterance_id)
+                        if streaming_utterance is not None:
+                            streaming_model.discard_streaming_utterance(streaming_utterance)
+                        # The replica that encodes the utterance also answers it (routed now, pinned for the turn)
+                        streaming_model = get_unified_manager().replica_pool.route(client_id).model
+                        streaming_utterance = streaming_model.start_streaming_utterance(
+                            utterance_id, language=message.get("language", "en"), on_interim=send_interim_transcript
+                        )
+                        streaming_logger.debug(f"🎙️ Streaming utterance {utterance_id} started for {client_id}")
+                    streaming_model.push_streaming_audio(streaming_utterance, frame)
+
+                elif message_type == "speculative_endpoint":
+                    # Short pause in a streamed utterance: start the turn now on the audio so far
+                    utterance_id = str(message.get("utterance_id", ""))
+                    if streaming_utterance is None or streaming_utterance.utterance_id != utterance_id:
+                        continue
+                    chunk_id = message.get("chunk_id", int(time.time() * 1000))
+                    abandon_speculative_turn("superseded")
+                    speculation = predictive_endpointer.start(utterance_id, streaming_utterance.num_samples, chunk_id)
+                    if speculation is None:
+                        continue
+                    cancel_current_turn("superseded")
+                    current_cancel = CancellationToken(str(chunk_id))
+                    current_turn = asyncio.create_task(
+                        run_turn(streaming_utterance.audio(), chunk_id, message.get("language", "en"),
+                                 streaming_utterance, current_cancel, speculation)
+                    )
+                    speculation.task = current_turn
+                    speculative_turn = speculation
+
+                elif message_type == "cancel":
+                    # Explicit cancel (e.g. the client detected barge-in during playback)
+                    abandon_speculative_turn("client_cancel")
+                    if not cancel_current_turn(message.get("reason", "client_cancel")):
+                        streaming_logger.debug(f"No turn to cancel for {client_id}")
+
+                elif message_type in ("audio_chunk", "end_of_utterance"):
                     chunk_id = message.get("chunk_id", int(time.time() * 1000))
                     # PHASE 5: Get language from message, default to English
                     language = message.get("language", "en")
                     streaming_logger.debug(f"[CHUNKED] Processing chunk {chunk_id} for {client_id} (language={language})")
 
-                    # Decode audio data with improved quality handling
-                    try:
-                        audio_data_b64 = message.get("audio_data", "")
-                        if not audio_data_b64:
+                    streaming_audio = None
+                    if message_type == "end_of_utterance":
+                        # Endpoint of a streamed utterance: its audio is already on the server
+                        streaming_audio, streaming_utterance = streaming_utterance, None
+                        if streaming_audio is None or streaming_audio.num_samples == 0:
+                            abandon_speculative_turn("superseded")
                             continue
+                        predictive_endpointer.end_utterance(streaming_audio.utterance_id)
+                        if predictive_endpointer.can_confirm(speculative_turn, str(message.get("utterance_id", "")),
+                                                             streaming_audio.num_samples):
+                            # The pause was the endpoint: the turn is already under way, release its output
+                            confirmed, speculative_turn = speculative_turn, None
+                            await predictive_endpointer.confirm(confirmed)
+                            continue
+                    abandon_speculative_turn("superseded")
 
-                        audio_bytes = base64.b64decode(audio_data_b64)
-                        audio_data = np.frombuffer(audio_bytes, dtype=np.float32)
-
-                        # OPTIMIZATION: Normalize audio to prevent clipping and improve quality
-                        max_val = np.max(np.abs(audio_data))
-                        if max_val > 0:
-                            audio_data = audio_data / max_val * 0.95  # Normalize to 0.95 to prevent clipping
+                    # Decode audio data with improved quality handling
+                    try:
+                        if streaming_audio is not None:
+                            # Not peak-normalized: windows were encoded before the utterance peak was known
+                            audio_data = streaming_audio.audio()
+                        else:
+                            audio_data_b64 = message.get("audio_data", "")
+                            if not audio_data_b64:
+                                continue
+
+                            audio_bytes = base64.b64decode(audio_data_b64)
+                            audio_data = np.frombuffer(audio_bytes, dtype=np.float32)
+
+                            # OPTIMIZATION: Normalize audio to prevent clipping and improve quality
+                            max_val = np.max(np.abs(audio_data))
+                            if max_val > 0:
+                                audio_data = audio_data / max_val * 0.95  # Normalize to 0.95 to prevent clipping
 
                         streaming_logger.debug(f"📊 Audio stats: length={len(audio_data)}, max={np.max(np.abs(audio_data)):.4f}, energy={np.sqrt(np.mean(audio_data**2)):.6f}")
                     except Exception as e:
                         streaming_logger.error(f"❌ Audio decoding error: {e}")
                         continue
                     
-                    # Process with CHUNKED STREAMING
-                    unified_manager = get_unified_manager()
-
-                    try:
-                        # Track processing time for metrics and profiling
-                        processing_start_time = time.time()
-                        first_chunk_time = None
-                        chunk_times = []
-
-                        # PHASE 1: Track full response for conversation manager
-                        full_response = ""
-
-                        # PHASE 1: Get conversation context for context-aware responses
-                        conversation_context = conversation_manager.get_context()
-                        streaming_logger.debug(f"📝 [PHASE 1] Conversation context: {len(conversation_context)} chars, {len(conversation_manager.history)} turns")
-
-                        # Use CHUNKED STREAMING method
-                        # PHASE 5: Pass language parameter for multi-language support
-                        chunk_counter = 0
-                        async for text_chunk in unified_manager.voxtral_model.process_realtime_chunk_streaming(
-                            audio_data, chunk_id, mode="conversation", conversation_context=conversation_context, language=language
-                        ):
-                            if text_chunk['success'] and text_chunk['text'].strip():
-                                # Track first chunk latency
-                                if first_chunk_time is None:
-                                    first_chunk_time = time.time() - processing_start_time
-                                    streaming_logger.info(f"⚡ First chunk latency: {first_chunk_time*1000:.1f}ms")
-
-                                chunk_time = time.time() - processing_start_time
-                                chunk_times.append(chunk_time)
-
-                                # PHASE 1: Accumulate response text
-                                full_response += text_chunk['text'] + " "
-
-                                # Send text chunk immediately
-                                # PHASE 3: Send text chunk with audio metadata
-                                await websocket.send_json({
-                                    "type": "text_chunk",
-                                    "chunk_id": f"{chunk_id}_{chunk_counter}",
-                                    "text": text_chunk['text'],
-                                    "has_audio": text_chunk.get('audio') is not None,  # PHASE 3
-                                    "is_final": text_chunk.get('is_final', False),
-                                    "processing_time_ms": int(chunk_time * 1000)
-                                })
-                                streaming_logger.debug(f"📤 Text chunk {chunk_counter}: '{text_chunk['text']}' ({int(chunk_time*1000)}ms)")
-
-                                # PHASE 3: Send audio bytes separately if available
-                                if text_chunk.get('audio'):
-                                    try:
-                                        await websocket.send_bytes(text_chunk['audio'])
-                                        streaming_logger.debug(f"🎵 [PHASE 3] Sent {len(text_chunk['audio'])} bytes of audio for chunk {chunk_counter}")
-                                    except Exception as e:
-                                        streaming_logger.warning(f"⚠️ [PHASE 3] Failed to send audio chunk: {e}")
-
-                                chunk_counter += 1
-
-                        # Calculate total latency and profiling metrics
-                        total_latency_ms = int((time.time() - processing_start_time) * 1000)
-                        avg_chunk_time = int(np.mean(chunk_times) * 1000) if chunk_times else 0
-                        streaming_logger.info(f"✅ CHUNKED STREAMING complete for {chunk_id}: {chunk_counter} chunks in {total_latency_ms}ms (avg chunk: {avg_chunk_time}ms, first: {int(first_chunk_time*1000) if first_chunk_time else 0}ms)")
-
-                        # PHASE 1: Add user and assistant messages to conversation manager
-                        # OPTIMIZATION: Use placeholder for user message (actual transcription would require second model pass)
-                        # The AI response is based on the audio content, so we store a reference to it
-                        if full_response.strip():
-                            # CRITICAL FIX: Use placeholder instead of re-transcribing (avoids double model inference)
-                            # The user's actual words are captured in the audio, and the AI response is based on them
-                            user_message = f"[User audio input - {len(audio_data)} samples, {len(audio_data)/16000:.2f}s]"
-
-                            conversation_manager.add_turn(
-                                "user",
-                                user_message,
-                                metadata={"chunk_id": chunk_id, "audio_samples": len(audio_data), "duration_s": len(audio_data)/16000}
-                            )
-                            streaming_logger.debug(f"📝 [PHASE 1] Added user message to conversation")
-
-                            # Add assistant response
-                            conversation_manager.add_turn(
-                                "assistant",
-                                full_response.strip(),
-                                latency_ms=total_latency_ms,
-                                metadata={"chunk_id": chunk_id, "chunks": chunk_counter}
-                            )
-                            streaming_logger.info(f"📝 [PHASE 1] Added assistant response to conversation (latency: {total_latency_ms}ms)")
-
-                            # Log conversation summary
-                            summary = conversation_manager.get_history_summary()
-                            streaming_logger.info(f"📊 [PHASE 1] Conversation summary: {summary['total_turns']} turns, {summary['total_characters']} chars")
-
-                        # OPTIMIZATION: Generate TTS audio after full response is complete
-                        # This reduces latency by batching TTS instead of calling per-word
-                        tts_manager = get_tts_manager()  # CRITICAL FIX: Get TTS manager from global scope
-                        if full_response.strip() and tts_manager and tts_manager.is_initialized:
-                            try:
-                                streaming_logger.info(f"🎵 [PHASE 3] Generating TTS audio for full response ({len(full_response)} chars)")
-                                tts_start = time.time()
-
-                                # Detect emotion from full response
-                                emotion = "neutral"
-                                emotion_detector = unified_manager.voxtral_model.get_emotion_detector()
-                                if emotion_detector:
-                                    emotion, confidence = emotion_detector.detect_emotion(full_response)
-                                    streaming_logger.debug(f"🎭 [PHASE 7] Detected emotion: {emotion} (confidence: {confidence:.2f})")
-
-                                # Synthesize full response to audio
-                                audio_bytes = await tts_manager.synthesize(full_response, language=language, emotion=emotion)
-
-                                if audio_bytes:
-                                    tts_time = (time.time() - tts_start) * 1000
-                                    streaming_logger.info(f"🎵 [PHASE 3] Generated {len(audio_bytes)} bytes of audio in {tts_time:.1f}ms")
-
-                                    # Send audio as binary data
-                                    await websocket.send_bytes(audio_bytes)
-                                    streaming_logger.debug(f"🎵 [PHASE 3] Sent audio to client")
-                            except Exception as e:
-                                streaming_logger.warning(f"⚠️ [PHASE 3] TTS synthesis failed: {e}")
-
-                        # CRITICAL FIX: Send conversation_complete message to reset VAD state
-                        # This allows the frontend to call resetForNextInput() and enable continuous streaming
-                        await websocket.send_json({
-                            "type": "conversation_complete",
-                            "chunk_id": chunk_id,
-                            "total_chunks": chunk_counter,
-                            "total_latency_ms": total_latency_ms,
-                            "meets_target": total_latency_ms < 500
-                        })
-                        streaming_logger.info(f"📨 Sent conversation_complete message for {chunk_id} ({total_latency_ms}ms)")
-
-                    except Exception as e:
-                        streaming_logger.error(f"❌ CHUNKED STREAMING error for {chunk_id}: {e}")
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": "Sorry, there was an error.",
-                            "error": str(e)
-                        })
+                    # Answer in a task: the receive loop keeps listening for barge-in and cancel
+                    cancel_current_turn("superseded")
+                    current_cancel = CancellationToken(str(chunk_id))
+                    current_turn = asyncio.create_task(
+                        run_turn(audio_data, chunk_id, language, streaming_audio, current_cancel)
+                    )
                     
             except WebSocketDisconnect:
                 break
@@ -2472,6 +2960,23 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         streaming_logger.error(f"❌ WebSocket connection error for {client_id}: {e}")
     finally:
+        # Stop answering a client that is gone, then release its session state
+        abandon_speculative_turn("disconnect")
+        cancel_current_turn("disconnect")
+        if filler_prepare is not None:
+            filler_prepare.cancel()
+        # Release the session's carried-over KV cache and any half-streamed utterance
+        try:
+            if streaming_utterance is not None:
+                streaming_model.discard_streaming_utterance(streaming_utterance)
+            get_unified_manager().replica_pool.end_session(client_id)
+        except Exception as e:
+            streaming_logger.debug(f"Session cache cleanup skipped for {client_id}: {e}")
+        audio_stats = output_encoder.get_stats()
+        if audio_stats["segments"]:
+            streaming_logger.info(f"🎵 [CONVERSATION] {audio_stats['format']['codec']} audio for {client_id}: "
+                                  f"{audio_stats['output_bytes']} bytes sent for {audio_stats['input_bytes']} "
+                                  f"WAV bytes ({audio_stats['compression_ratio']:.1f}x smaller)")
         streaming_logger.info(f"[CONVERSATION] Connection closed: {client_id}")
 
 
@@ -2482,6 +2987,7 @@ async def websocket_tts(websocket: WebSocket):
     await websocket.accept()
     client_id = f"{websocket.client.host}:{websocket.client.port}"
     streaming_logger.info(f"🎵 [TTS] Client connected: {client_id}")
+    output_encoder = create_output_encoder(websocket.query_params)
 
     try:
         tts_manager = get_tts_manager()
@@ -2492,7 +2998,8 @@ async def websocket_tts(websocket: WebSocket):
         await websocket.send_json({
             "type": "connection",
             "message": "Connected to TTS service",
-            "tts_available": tts_manager.is_initialized
+            "tts_available": tts_manager.is_initialized,
+            "audio_output": output_encoder.output_format.to_dict()
         })
 
         while True:
@@ -2506,18 +3013,38 @@ async def websocket_tts(websocket: WebSocket):
                     language = message.get("language", "en")
                     emotion = message.get("emotion", "neutral")
                     chunk_id = message.get("chunk_id", "tts_chunk")
+                    voice = message.get("voice") or websocket.query_params.get("voice")
 
                     if not text:
                         streaming_logger.warning("⚠️ [TTS] Empty text provided")
                         continue
 
+                    if message.get("stream"):
+                        # Progressive mode: numbered frames as each segment is synthesized
+                        stats = await stream_tts_frames(
+                            tts_manager, text, websocket.send_bytes,
+                            lambda audio: output_encoder.encode_frames_async(audio, stream_frame_ms),
+                            language=language, emotion=emotion, chunker=create_stream_chunker(), voice=voice
+                        )
+                        if not stats["frames"]:
+                            await websocket.send_json({
+                                "type": "error",
+                                "message": "TTS synthesis failed",
+                                "chunk_id": chunk_id
+                            })
+                        streaming_logger.debug(f"🎵 [TTS] Streamed {stats['frames']} frames for chunk {chunk_id}, "
+                                               f"first at {stats['first_frame_ms'] or 0:.1f}ms")
+                        continue
+
                     streaming_logger.debug(f"🎵 [TTS] Synthesizing: '{text[:50]}...' (lang={language})")
 
                     # Synthesize text to speech
-                    audio_bytes = await tts_manager.synthesize(text, language, emotion)
+                    audio_bytes = await tts_manager.synthesize(text, language, emotion, voice=voice)
 
                     if audio_bytes:
-                        # Send audio as binary data
+                        # Send audio as binary data, in the format negotiated at connect
+                        audio_bytes = await output_encoder.encode_async(audio_bytes)
+                    if audio_bytes:
                         await websocket.send_bytes(audio_bytes)
                         streaming_logger.debug(f"🎵 [TTS] Sent {len(audio_bytes)} bytes of audio for chunk {chunk_id}")
                     else:
@@ -2589,6 +3116,11 @@ async def initialize_models_at_startup():
             else:
                 raise Exception("Unified model manager initialization failed")
         
+        try:
+            await build_filler_bank()
+        except Exception as e:
+            streaming_logger.warning(f"⚠️ Filler phrases unavailable: {e}")
+
         streaming_logger.info("🎉 ULTRA-FAST system ready for <500ms conversations!")
 
     except Exception as e:
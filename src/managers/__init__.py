@@ -3,6 +3,7 @@ Managers package for Voxtral application
 """
 
 from src.managers.conversation_manager import ConversationManager
+from src.managers.endpointing_manager import PredictiveEndpointer, SpeculativeTurn
 
-__all__ = ['ConversationManager']
+__all__ = ['ConversationManager', 'PredictiveEndpointer', 'SpeculativeTurn']
 
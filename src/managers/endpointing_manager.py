@@ -0,0 +1,167 @@
+"""
+Predictive endpointing for streamed utterances
+The browser confirms the end of an utterance only after a long trailing silence. With
+predictive endpointing it also reports a short pause, and the server starts the turn right
+away on the audio it already has. The turn's output is held until the endpoint is confirmed;
+if the user speaks again first, the speculative turn is cancelled and the new audio is merged
+into the same utterance. Wasted compute and saved latency are tracked to tune the pause.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Setup logging
+endpointing_logger = logging.getLogger("endpointing_manager")
+endpointing_logger.setLevel(logging.INFO)
+
+
+class SpeculativeTurn:
+    """
+    A turn started at a short pause; its messages are held until `confirm()`
+
+    The turn sends through `send()` and calls `mark_ready()` + `wait_confirmed()` before any
+    side effect that must not happen for an abandoned turn (conversation history, completion).
+    """
+
+    def __init__(self, utterance_id: str, num_samples: int, chunk_id: Any):
+        self.utterance_id = utterance_id
+        self.num_samples = num_samples
+        self.chunk_id = chunk_id
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.resolved_at: Optional[float] = None
+        self.outcome: Optional[str] = None  # "confirmed" or the abandon reason
+        self.held: List[tuple] = []
+        self.held_chunks = 0
+        self.task: Optional[asyncio.Task] = None
+        self._confirmed = asyncio.Event()
+
+    @property
+    def confirmed(self) -> bool:
+        return self._confirmed.is_set()
+
+    async def send(self, send_fn: Callable[[Any], Awaitable[None]], message: Any):
+        """Send now once confirmed, else hold the message for the flush"""
+        if self.confirmed:
+            await send_fn(message)
+            return
+        self.held.append((send_fn, message))
+        if isinstance(message, dict) and message.get("type") == "text_chunk":
+            self.held_chunks += 1
+
+    def mark_ready(self):
+        """All work that can run ahead is done (generation, TTS); only held output remains"""
+        if self.ready_at is None:
+            self.ready_at = time.time()
+
+    async def wait_confirmed(self):
+        await self._confirmed.wait()
+
+    async def flush(self):
+        """Release held messages in order, then pass later ones straight through"""
+        while self.held:
+            send_fn, message = self.held.pop(0)
+            await send_fn(message)
+        self._confirmed.set()
+
+    def work_ahead_ms(self) -> float:
+        """Time the turn spent working before it was resolved"""
+        end = self.resolved_at or time.time()
+        if self.ready_at is not None:
+            end = min(end, self.ready_at)
+        return max(0.0, (end - self.started_at) * 1000)
+
+
+class PredictiveEndpointer:
+    """
+    Starts, confirms and abandons speculative turns, and keeps their metrics
+
+    Args:
+        enabled: Offer predictive endpointing to clients
+        pause_ms: Trailing silence after which the client reports a possible endpoint
+        max_per_utterance: Speculative turns started per utterance at most (bounds wasted compute)
+    """
+
+    def __init__(self, enabled: bool = True, pause_ms: int = 300, max_per_utterance: int = 3):
+        self.enabled = enabled
+        self.pause_ms = pause_ms
+        self.max_per_utterance = max(1, int(max_per_utterance))
+        self._attempts: Dict[str, int] = {}
+        self.stats = {
+            "speculative_turns": 0,
+            "confirmed": 0,
+            "abandoned": 0,
+            "skipped_over_limit": 0,
+            "total_saved_latency_ms": 0.0,
+            "total_wasted_compute_ms": 0.0,
+            "wasted_chunks": 0,
+        }
+
+        endpointing_logger.info(f"🔮 Predictive endpointing {'enabled' if enabled else 'disabled'} "
+                                f"(pause {pause_ms}ms, max {self.max_per_utterance} per utterance)")
+
+    def client_settings(self) -> Dict[str, Any]:
+        """Settings sent to the browser in the connection message"""
+        return {"enabled": self.enabled, "pause_ms": self.pause_ms}
+
+    def start(self, utterance_id: str, num_samples: int, chunk_id: Any) -> Optional[SpeculativeTurn]:
+        """A speculative turn for the utterance's current audio, or None (disabled / over the limit)"""
+        if not self.enabled or num_samples == 0:
+            return None
+        attempts = self._attempts.get(utterance_id, 0)
+        if attempts >= self.max_per_utterance:
+            self.stats["skipped_over_limit"] += 1
+            return None
+        self._attempts[utterance_id] = attempts + 1
+        self.stats["speculative_turns"] += 1
+        return SpeculativeTurn(utterance_id, num_samples, chunk_id)
+
+    def can_confirm(self, turn: Optional[SpeculativeTurn], utterance_id: str, num_samples: int) -> bool:
+        """The endpoint matches the speculation: same utterance, no audio since, turn still alive"""
+        return (turn is not None and turn.outcome is None and turn.utterance_id == utterance_id
+                and turn.num_samples == num_samples and turn.task is not None
+                and not (turn.task.done() and (turn.task.cancelled() or turn.task.exception() is not None)))
+
+    async def confirm(self, turn: SpeculativeTurn) -> float:
+        """Endpoint confirmed: release the turn's output; returns the latency saved in ms"""
+        turn.resolved_at = time.time()
+        turn.outcome = "confirmed"
+        saved_ms = turn.work_ahead_ms()
+        self.stats["confirmed"] += 1
+        self.stats["total_saved_latency_ms"] += saved_ms
+        self._attempts.pop(turn.utterance_id, None)
+        endpointing_logger.info(f"🔮 Speculative turn {turn.chunk_id} confirmed: {saved_ms:.0f}ms ahead, "
+                                f"{turn.held_chunks} held chunks released")
+        await turn.flush()
+        return saved_ms
+
+    def abandon(self, turn: Optional[SpeculativeTurn], reason: str = "speech_resumed") -> float:
+        """The user kept talking (or the utterance went away): its work is wasted; returns it in ms"""
+        if turn is None or turn.outcome is not None:
+            return 0.0
+        turn.resolved_at = time.time()
+        turn.outcome = reason
+        wasted_ms = turn.work_ahead_ms()
+        self.stats["abandoned"] += 1
+        self.stats["total_wasted_compute_ms"] += wasted_ms
+        self.stats["wasted_chunks"] += turn.held_chunks
+        turn.held.clear()
+        if reason != "speech_resumed":
+            self._attempts.pop(turn.utterance_id, None)
+        endpointing_logger.info(f"🔮 Speculative turn {turn.chunk_id} abandoned ({reason}) after {wasted_ms:.0f}ms")
+        return wasted_ms
+
+    def end_utterance(self, utterance_id: str):
+        self._attempts.pop(utterance_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        started = stats["speculative_turns"]
+        stats["enabled"] = self.enabled
+        stats["pause_ms"] = self.pause_ms
+        stats["hit_rate"] = stats["confirmed"] / started if started else 0.0
+        stats["avg_saved_latency_ms"] = stats["total_saved_latency_ms"] / stats["confirmed"] if stats["confirmed"] else 0.0
+        stats["avg_wasted_compute_ms"] = stats["total_wasted_compute_ms"] / stats["abandoned"] if stats["abandoned"] else 0.0
+        return stats
@@ -0,0 +1,86 @@
+"""
+Per-turn cancellation for generation and speech synthesis
+A conversation turn owns one CancellationToken. Barge-in, client disconnects and explicit
+cancel requests flip it from the event loop; decode loops running on worker threads check it
+between steps, so the GPU is handed back to other sessions within one decode step.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import torch
+
+try:
+    from transformers import StoppingCriteria, StoppingCriteriaList
+except ImportError:
+    StoppingCriteria = object
+    StoppingCriteriaList = list
+
+# Setup logging
+cancellation_logger = logging.getLogger("cancellation")
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag for one turn
+
+    Only the first cancel() counts; its reason and time are kept so consumers can report
+    why and how quickly they stopped.
+    """
+
+    def __init__(self, turn_id: str = ""):
+        self.turn_id = turn_id
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the turn; returns False when it was already cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self._event.set()
+        cancellation_logger.debug(f"🛑 Turn {self.turn_id} cancelled ({reason})")
+        return True
+
+    def __repr__(self) -> str:
+        state = f"cancelled ({self.reason})" if self.is_cancelled else "active"
+        return f"CancellationToken(turn_id={self.turn_id!r}, {state})"
+
+
+class CancellationStoppingCriteria(StoppingCriteria):
+    """
+    generate() stopping criterion that ends every sequence once the token is cancelled
+
+    Args:
+        token: The turn's cancellation token
+        on_stop: Optional callback(token) run once, on the decode thread, when generation stops
+    """
+
+    def __init__(self, token: CancellationToken, on_stop: Optional[Callable[[CancellationToken], None]] = None):
+        self.token = token
+        self.on_stop = on_stop
+        self._stopped = False
+
+    def __call__(self, input_ids: torch.Tensor, scores: Optional[torch.Tensor] = None, **kwargs) -> torch.Tensor:
+        cancelled = self.token.is_cancelled
+        if cancelled and not self._stopped:
+            self._stopped = True
+            if self.on_stop is not None:
+                self.on_stop(self.token)
+        return torch.full((input_ids.shape[0],), cancelled, dtype=torch.bool, device=input_ids.device)
+
+
+def cancellation_stopping_criteria(token: CancellationToken,
+                                   on_stop: Optional[Callable[[CancellationToken], None]] = None):
+    """`stopping_criteria=` value for generate() that honours `token`"""
+    return StoppingCriteriaList([CancellationStoppingCriteria(token, on_stop=on_stop)])
@@ -0,0 +1,255 @@
+"""
+Pre-synthesized filler phrases and earcons
+Between the end of the user's speech and the first TTS audio the user hears silence covering
+prefill, decode and the first segment's synthesis. Short acknowledgements ("Mm-hm.", "Let me
+check.") are synthesized once at startup per language and voice, plus a language-neutral
+thinking tone; each client's encoding of them is kept ready to send. When the predicted time
+to first audio is above a threshold, a turn starts with one of them - unless the reply's own
+audio is ready first - so there is no GPU work per turn.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.audio_io import encode_wav_bytes
+from src.utils.audio_output import AudioOutputEncoder, OutputFormat
+
+# Setup logging
+filler_logger = logging.getLogger("filler_bank")
+
+DEFAULT_FILLER_PHRASES = {
+    "en": ["Mm-hm.", "Let me check.", "One moment.", "Okay, so."],
+    "es": ["Mm-hm.", "Déjame ver.", "Un momento."],
+    "fr": ["Mm-hm.", "Voyons voir.", "Un instant."],
+    "de": ["Mm-hm.", "Moment mal.", "Einen Augenblick."],
+    "hi": ["हम्म।", "एक पल।", "देखता हूँ।"],
+}
+
+EARCON_TEXT = "[thinking]"
+
+
+def thinking_tone_wav(sample_rate: int = 22050, duration_ms: float = 360.0) -> bytes:
+    """A soft two-note chime: the filler for languages and voices without phrases"""
+    t = np.arange(int(sample_rate * duration_ms / 1000)) / sample_rate
+    note_s = duration_ms / 2000
+    local = t % note_s  # Time within the current note
+    frequency = np.where(t < note_s, 660.0, 880.0)
+    envelope = np.minimum(1.0, local / 0.01) * np.minimum(1.0, (note_s - local) / 0.03) * np.exp(-4.0 * local)
+    tone = 0.12 * envelope * np.sin(2 * np.pi * frequency * t)
+    return encode_wav_bytes(tone.astype(np.float32), sample_rate)
+
+
+@dataclass
+class Filler:
+    """One pre-synthesized filler: WAV at the TTS rate"""
+    text: str
+    language: str
+    voice: str
+    wav_bytes: bytes
+
+    @property
+    def is_earcon(self) -> bool:
+        return self.text == EARCON_TEXT
+
+
+class FillerBank:
+    """
+    Filler audio per (language, voice), encoded once per client output format
+
+    `build()` synthesizes every phrase for every voice through the TTS manager (so its audio
+    cache makes later startups nearly free). `pick()` rotates through a language's phrases so
+    consecutive turns do not repeat the same one and falls back to the thinking tone.
+    `encode()` returns a filler in a client's format, encoding it only the first time.
+
+    Args:
+        phrases: Language code -> filler phrases
+        earcon: Keep a thinking tone for languages and voices without phrases
+        sample_rate: Rate of the thinking tone (clients' encoders resample it)
+    """
+
+    def __init__(self, phrases: Optional[Dict[str, List[str]]] = None, earcon: bool = True,
+                 sample_rate: int = 22050):
+        self.phrases = {language: list(texts) for language, texts in
+                        (DEFAULT_FILLER_PHRASES if phrases is None else phrases).items() if texts}
+        self.earcon = Filler(EARCON_TEXT, "", "", thinking_tone_wav(sample_rate)) if earcon else None
+        self._fillers: Dict[Tuple[str, str], List[Filler]] = {}
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._encoded: Dict[Tuple[int, str, int, int], bytes] = {}
+        self.stats = {"phrases": 0, "failed_phrases": 0, "build_ms": 0.0, "encoded_payloads": 0}
+
+    async def build(self, tts_manager: Any, voices: Iterable[Optional[str]] = (None,)):
+        """Synthesize every phrase for every voice (None: the manager's own voice)"""
+        start = time.time()
+        jobs = [(language, voice, text) for voice in voices for language, texts in self.phrases.items()
+                for text in texts]
+
+        async def synthesize(language: str, voice: Optional[str], text: str) -> Optional[bytes]:
+            voice_kwargs = {"voice": voice} if voice else {}
+            try:
+                return await tts_manager.synthesize(text, language=language, emotion="neutral", **voice_kwargs)
+            except Exception as e:
+                filler_logger.warning(f"⚠️ Filler '{text}' ({language}) failed: {e}")
+                return None
+
+        # Submitted together, so the TTS batch scheduler can synthesize them as batches
+        results = await asyncio.gather(*(synthesize(*job) for job in jobs))
+        for (language, voice, text), wav_bytes in zip(jobs, results):
+            if not wav_bytes:
+                self.stats["failed_phrases"] += 1
+                continue
+            self._fillers.setdefault((language, voice or ""), []).append(Filler(text, language, voice or "", wav_bytes))
+            self.stats["phrases"] += 1
+        self.stats["build_ms"] = (time.time() - start) * 1000
+        filler_logger.info(f"💬 Filler bank ready: {self.stats['phrases']} phrases in "
+                           f"{len({language for language, _ in self._fillers})} languages "
+                           f"({self.stats['build_ms']:.0f}ms)")
+
+    def pick(self, language: str, voice: Optional[str] = None) -> Optional[Filler]:
+        """The next filler for this language and voice, else the thinking tone"""
+        key = (language, voice or "")
+        fillers = self._fillers.get(key)
+        if not fillers:
+            return self.earcon
+        index = self._next.get(key, 0)
+        self._next[key] = (index + 1) % len(fillers)
+        return fillers[index]
+
+    def encode(self, filler: Filler, output_format: OutputFormat) -> bytes:
+        """The filler in a client's output format; encoded once per format"""
+        key = (id(filler), output_format.codec, output_format.sample_rate, output_format.opus_bitrate)
+        payload = self._encoded.get(key)
+        if payload is None:
+            payload = AudioOutputEncoder(output_format).encode(filler.wav_bytes)
+            self._encoded[key] = payload
+            self.stats["encoded_payloads"] = len(self._encoded)
+        return payload
+
+    async def encode_async(self, filler: Filler, output_format: OutputFormat) -> bytes:
+        key = (id(filler), output_format.codec, output_format.sample_rate, output_format.opus_bitrate)
+        if key in self._encoded:
+            return self._encoded[key]
+        return await asyncio.to_thread(self.encode, filler, output_format)
+
+    async def prepare(self, output_format: OutputFormat, voice: Optional[str] = None):
+        """Encode a client's fillers when it connects, so its first turn sends them at once"""
+        fillers = [filler for (_, filler_voice), fillers in self._fillers.items() if filler_voice == (voice or "")
+                   for filler in fillers]
+        if self.earcon is not None:
+            fillers.append(self.earcon)
+        for filler in fillers:
+            await self.encode_async(filler, output_format)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["languages"] = sorted({language for language, _ in self._fillers})
+        stats["earcon"] = self.earcon is not None
+        return stats
+
+
+class FillerTurn:
+    """One turn's filler: sent right away unless the reply's own audio is ready first"""
+
+    def __init__(self, policy: "FillerPolicy", bank: FillerBank, filler: Filler, output_format: OutputFormat,
+                 send: Callable[[Filler, bytes], Awaitable[None]], delay_ms: float = 0.0):
+        self.policy = policy
+        self.bank = bank
+        self.filler = filler
+        self.output_format = output_format
+        self.send = send
+        self.delay_s = max(0.0, delay_ms) / 1000
+        self.real_audio_started = False
+        self.sending = False
+        self.played = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._play())
+
+    async def _play(self):
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        payload = await self.bank.encode_async(self.filler, self.output_format)
+        if self.real_audio_started or not payload:
+            return
+        self.sending = True
+        await self.send(self.filler, payload)
+        self.played = True
+        self.policy.stats["played"] += 1
+
+    async def real_audio(self):
+        """
+        The reply's first audio is about to be sent: a filler not yet on its way is dropped, one
+        being sent is finished first (its announcement and audio must reach the client together)
+        """
+        if self.real_audio_started:
+            return
+        self.real_audio_started = True
+        if self._task is None or self._task.done():
+            return
+        if self.sending:
+            await asyncio.wait({self._task})
+        else:
+            self._task.cancel()
+            self.policy.stats["dropped"] += 1
+
+    def cancel(self):
+        """The turn is over (finished, barge-in, disconnect)"""
+        if self._task is not None and not self._task.done() and not self.sending:
+            self._task.cancel()
+
+
+class FillerPolicy:
+    """
+    Decide per turn whether to start with a filler
+
+    The time from the start of a turn to its first audio is predicted as an exponential
+    moving average of recent turns; a turn whose prediction exceeds `threshold_ms` gets a
+    filler. Until a turn has been observed nothing is predicted and no filler plays.
+
+    Args:
+        threshold_ms: Predicted time to first audio above which a filler plays
+        delay_ms: Wait this long before sending the filler (real audio in time drops it)
+        smoothing: Weight of the latest turn in the moving average
+    """
+
+    def __init__(self, threshold_ms: float = 700.0, delay_ms: float = 0.0, smoothing: float = 0.3):
+        self.threshold_ms = threshold_ms
+        self.delay_ms = delay_ms
+        self.smoothing = min(1.0, max(0.0, smoothing))
+        self.predicted_ms: Optional[float] = None
+        self.stats = {"turns": 0, "started": 0, "played": 0, "dropped": 0, "skipped_fast": 0}
+
+    def observe(self, first_audio_ms: Optional[float]):
+        """Time to first audio of a finished turn"""
+        if first_audio_ms is None:
+            return
+        if self.predicted_ms is None:
+            self.predicted_ms = float(first_audio_ms)
+        else:
+            self.predicted_ms += self.smoothing * (first_audio_ms - self.predicted_ms)
+
+    def start_turn(self, bank: Optional[FillerBank], language: str, voice: Optional[str],
+                   output_format: OutputFormat, send: Callable[[Filler, bytes], Awaitable[None]]) -> Optional[FillerTurn]:
+        """The turn's filler, already started, or None if the turn is expected to answer quickly"""
+        self.stats["turns"] += 1
+        if bank is None or self.predicted_ms is None or self.predicted_ms < self.threshold_ms:
+            self.stats["skipped_fast"] += 1
+            return None
+        filler = bank.pick(language, voice)
+        if filler is None:
+            return None
+        turn = FillerTurn(self, bank, filler, output_format, send, self.delay_ms)
+        turn.start()
+        self.stats["started"] += 1
+        return turn
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["predicted_first_audio_ms"] = self.predicted_ms
+        stats["threshold_ms"] = self.threshold_ms
+        return stats
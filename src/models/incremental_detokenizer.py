@@ -0,0 +1,227 @@
+"""
+Incremental detokenization with word and phrase events
+TextIteratorStreamer re-decodes every token since the last line break on each step, and the
+caller then re-splits the text into words. Here each token is decoded inside a small sliding
+window (the tokens since the last emitted text plus one token of left context), so the work per
+token stays constant however long the reply gets, and words/phrases come out ready to use.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional
+
+# Setup logging
+detokenizer_logger = logging.getLogger("incremental_detokenizer")
+
+# Words ending with one of these close a phrase (the TTS / chunking unit)
+PHRASE_END_CHARS = frozenset(".?!,;:")
+SENTENCE_END_CHARS = frozenset(".?!")
+
+
+@dataclass
+class TextEvent:
+    """A completed word, or the phrase that a word just closed"""
+    kind: str  # "word" or "phrase"
+    text: str
+    index: int  # Word index of the word, or of the phrase's last word
+    sentence_end: bool = False
+
+
+class IncrementalDetokenizer:
+    """
+    Decode a growing token sequence piece by piece
+
+    Keeps two offsets into the token list: text up to `read_offset` has been emitted, and
+    `prefix_offset` is where the decode window starts (one token of context, so sentencepiece
+    leading-space merges decode like they would in the full sequence). A window that ends in
+    an incomplete multi-byte character decodes to U+FFFD and is held until the rest arrives.
+    """
+
+    def __init__(self, tokenizer: Any, skip_special_tokens: bool = True):
+        self.tokenizer = tokenizer
+        self.skip_special_tokens = skip_special_tokens
+        self.token_ids: List[int] = []
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+    def add(self, token_id: int) -> str:
+        """Append one token; returns the newly completed text (possibly empty)"""
+        self.token_ids.append(int(token_id))
+        prefix_text = self._decode(self.prefix_offset, self.read_offset)
+        new_text = self._decode(self.prefix_offset, len(self.token_ids))
+        if len(new_text) <= len(prefix_text) or new_text.endswith("�"):
+            # Nothing printable yet (special token, or a split multi-byte character)
+            return ""
+        delta = new_text[len(prefix_text):]
+        self.prefix_offset = self.read_offset
+        self.read_offset = len(self.token_ids)
+        return delta
+
+    def flush(self) -> str:
+        """Text still held back at the end of generation"""
+        if self.read_offset >= len(self.token_ids):
+            return ""
+        prefix_text = self._decode(self.prefix_offset, self.read_offset)
+        new_text = self._decode(self.prefix_offset, len(self.token_ids))
+        self.prefix_offset = self.read_offset = len(self.token_ids)
+        return new_text[len(prefix_text):]
+
+    def _decode(self, start: int, end: int) -> str:
+        if start >= end:
+            return ""
+        return self.tokenizer.decode(self.token_ids[start:end], skip_special_tokens=self.skip_special_tokens)
+
+
+class WordSegmenter:
+    """
+    Turn streamed text deltas into word and phrase events
+
+    A word is complete once whitespace follows it; the last word is completed by `flush()`.
+    Only the unfinished word and the current phrase's words are buffered.
+    """
+
+    def __init__(self):
+        self.partial = ""
+        self.phrase_words: List[str] = []
+        self.word_count = 0
+
+    def feed(self, text: str) -> List[TextEvent]:
+        if not text:
+            return []
+        pieces = (self.partial + text).split()
+        if not text[-1].isspace():
+            # The last piece may continue in the next delta
+            self.partial = pieces.pop() if pieces else ""
+        else:
+            self.partial = ""
+        events = []
+        for word in pieces:
+            self._add_word(word, events)
+        return events
+
+    def flush(self) -> List[TextEvent]:
+        events = []
+        if self.partial:
+            self._add_word(self.partial, events)
+            self.partial = ""
+        if self.phrase_words:
+            self._close_phrase(events)
+        return events
+
+    def _add_word(self, word: str, events: List[TextEvent]):
+        events.append(TextEvent("word", word, self.word_count))
+        self.word_count += 1
+        self.phrase_words.append(word)
+        if word[-1] in PHRASE_END_CHARS:
+            self._close_phrase(events)
+
+    def _close_phrase(self, events: List[TextEvent]):
+        last_char = self.phrase_words[-1][-1]
+        events.append(TextEvent("phrase", " ".join(self.phrase_words), self.word_count - 1,
+                                sentence_end=last_char in SENTENCE_END_CHARS))
+        self.phrase_words = []
+
+
+class WordEventStream:
+    """Tokens in, word/phrase events out - the synchronous core shared by the streamers"""
+
+    def __init__(self, tokenizer: Any, skip_special_tokens: bool = True):
+        self.detokenizer = IncrementalDetokenizer(tokenizer, skip_special_tokens=skip_special_tokens)
+        self.segmenter = WordSegmenter()
+        self.words: List[str] = []
+
+    def add_tokens(self, token_ids: Iterable[int]) -> List[TextEvent]:
+        events = []
+        for token_id in token_ids:
+            events.extend(self.segmenter.feed(self.detokenizer.add(token_id)))
+        self._record(events)
+        return events
+
+    def finish(self) -> List[TextEvent]:
+        events = self.segmenter.feed(self.detokenizer.flush()) + self.segmenter.flush()
+        self._record(events)
+        return events
+
+    @property
+    def text(self) -> str:
+        """Everything emitted so far, words joined by single spaces"""
+        return " ".join(self.words)
+
+    def _record(self, events: List[TextEvent]):
+        self.words.extend(event.text for event in events if event.kind == "word")
+
+
+class AsyncWordStreamer:
+    """
+    generate() streamer that delivers TextEvents to an asyncio consumer
+
+    `put()`/`end()` run on the decode thread and hand each step's events to the consumer's
+    loop in one call; `async for event in streamer` yields them. Errors queued with `fail()`
+    are re-raised from the iteration, like AsyncTokenStreamer.
+
+    Args:
+        tokenizer: Tokenizer used to decode the generated ids
+        skip_prompt: Ignore the first put() (the prompt ids)
+        timeout: Seconds to wait for the next event before raising TimeoutError
+        skip_special_tokens: Passed to tokenizer.decode
+    """
+
+    _END = object()
+
+    def __init__(self, tokenizer: Any, skip_prompt: bool = True, timeout: Optional[float] = None,
+                 skip_special_tokens: bool = True):
+        self.events = WordEventStream(tokenizer, skip_special_tokens=skip_special_tokens)
+        self.skip_prompt = skip_prompt
+        self.timeout = timeout
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._pending: List[TextEvent] = []
+        self._next_prompt = True
+        self.future = None
+
+    @property
+    def text(self) -> str:
+        return self.events.text
+
+    def put(self, value):
+        if self.skip_prompt and self._next_prompt:
+            self._next_prompt = False
+            return
+        self._next_prompt = False
+        if hasattr(value, "tolist"):
+            value = value.tolist()
+        if value and isinstance(value[0], list):
+            if len(value) > 1:
+                raise ValueError("AsyncWordStreamer only supports batch size 1")
+            value = value[0]
+        events = self.events.add_tokens(value if isinstance(value, list) else [value])
+        if events:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, events)
+
+    def end(self):
+        events = self.events.finish()
+        if events:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, events)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, self._END)
+
+    def fail(self, error: BaseException):
+        """Queue an error for the consumer (safe to call from any thread)"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, error)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> TextEvent:
+        while not self._pending:
+            try:
+                value = await asyncio.wait_for(self.queue.get(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("No generated text within the streamer timeout")
+            if value is self._END:
+                raise StopAsyncIteration()
+            if isinstance(value, BaseException):
+                raise value
+            self._pending = value
+            self._pending.reverse()
+        return self._pending.pop()
@@ -0,0 +1,200 @@
+"""
+Bounded inference executor bridging blocking model calls into asyncio
+A fixed pool of worker threads owns GPU access; callers await results or stream tokens
+through a per-request asyncio queue without blocking the event loop
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from src.models.incremental_detokenizer import AsyncWordStreamer
+
+try:
+    from transformers import AsyncTextIteratorStreamer
+except ImportError:
+    AsyncTextIteratorStreamer = None
+
+# Setup logging
+executor_logger = logging.getLogger("inference_executor")
+
+
+if AsyncTextIteratorStreamer is not None:
+    class AsyncTokenStreamer(AsyncTextIteratorStreamer):
+        """
+        AsyncTextIteratorStreamer that also surfaces generation failures
+
+        Text pieces land on an asyncio queue owned by the consumer's loop. If generate()
+        raises, the exception is queued and re-raised from `async for` instead of leaving
+        the consumer waiting for a stop signal that never comes.
+        """
+
+        def fail(self, error: BaseException):
+            """Queue an error for the consumer (safe to call from any thread)"""
+            self.loop.call_soon_threadsafe(self.text_queue.put_nowait, error)
+
+        async def __anext__(self):
+            value = await super().__anext__()
+            if isinstance(value, BaseException):
+                raise value
+            return value
+else:
+    AsyncTokenStreamer = None
+
+
+class InferenceExecutor:
+    """
+    Fixed-size executor that serializes access to the model
+
+    Every job runs on one of `max_workers` threads while holding `lock` (the model lock),
+    so the number of inference threads is bounded no matter how many sessions are active.
+    Jobs waiting for a worker or for the lock are reported as queue depth and wait time.
+    A streamed job given a `cancel_token` that is cancelled by the time it gets the lock
+    is skipped (its stream just ends), so a cancelled turn never pays for its prefill.
+    """
+
+    def __init__(self, max_workers: int = 1, lock: Optional[Any] = None, name: str = "voxtral-inference"):
+        self.max_workers = max(1, int(max_workers))
+        self.lock = lock if lock is not None else threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._recent_wait_ms = deque(maxlen=100)
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "peak_queue_depth": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_run_ms": 0.0,
+            "skipped_cancelled": 0,
+        }
+
+        executor_logger.info(f"🧵 Inference executor ready ({self.max_workers} worker(s))")
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking model call on the executor and await its result"""
+        return await self._submit(fn, *args, **kwargs)
+
+    def stream_generate(self, generate_fn: Callable, generation_kwargs: Dict[str, Any], tokenizer: Any,
+                        timeout: Optional[float] = 60.0, cancel_token: Optional[Any] = None,
+                        **decode_kwargs) -> "AsyncTokenStreamer":
+        """
+        Start `generate_fn(**generation_kwargs, streamer=...)` on the executor
+
+        Must be called from a running event loop. Returns an AsyncTokenStreamer to consume
+        with `async for new_text in streamer`; `streamer.future` resolves when generation ends
+        (cancelling it drops a job that has not started).
+        """
+        if AsyncTokenStreamer is None:
+            raise RuntimeError("AsyncTextIteratorStreamer requires a newer transformers release")
+
+        streamer = AsyncTokenStreamer(tokenizer, skip_prompt=True, timeout=timeout, **decode_kwargs)
+        return self._start_stream(streamer, generate_fn, generation_kwargs, cancel_token)
+
+    def stream_words(self, generate_fn: Callable, generation_kwargs: Dict[str, Any], tokenizer: Any,
+                     timeout: Optional[float] = 60.0, skip_special_tokens: bool = True,
+                     cancel_token: Optional[Any] = None) -> AsyncWordStreamer:
+        """
+        Like stream_generate(), but yields TextEvents (words and phrases) instead of text pieces
+
+        Detokenization is incremental, so the decode thread does constant work per token.
+        """
+        streamer = AsyncWordStreamer(tokenizer, skip_prompt=True, timeout=timeout,
+                                     skip_special_tokens=skip_special_tokens)
+        return self._start_stream(streamer, generate_fn, generation_kwargs, cancel_token)
+
+    def _start_stream(self, streamer: Any, generate_fn: Callable, generation_kwargs: Dict[str, Any],
+                      cancel_token: Optional[Any] = None) -> Any:
+        future = self._submit_job(generate_fn, (), dict(generation_kwargs, streamer=streamer), cancel_token)
+
+        def _on_done(done_future: asyncio.Future):
+            if done_future.cancelled():
+                streamer.fail(asyncio.CancelledError())
+            elif done_future.exception() is not None:
+                streamer.fail(done_future.exception())
+
+        future.add_done_callback(_on_done)
+        streamer.future = future
+        return streamer
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and wait-time metrics"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+            stats["queue_depth"] = self._queued
+            stats["running"] = self._running
+            recent = list(self._recent_wait_ms)
+        stats["max_workers"] = self.max_workers
+        started = stats["completed"] + stats["failed"] + stats["running"]
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / started if started else 0.0
+        stats["recent_avg_wait_ms"] = sum(recent) / len(recent) if recent else 0.0
+        finished = stats["completed"] + stats["failed"]
+        stats["avg_run_ms"] = stats["total_run_ms"] / finished if finished else 0.0
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker threads"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args, **kwargs) -> asyncio.Future:
+        return self._submit_job(fn, args, kwargs)
+
+    def _submit_job(self, fn: Callable, args: tuple, kwargs: dict, cancel_token: Optional[Any] = None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        with self._stats_lock:
+            self.stats["submitted"] += 1
+            self._queued += 1
+            self.stats["peak_queue_depth"] = max(self.stats["peak_queue_depth"], self._queued)
+        job = self._executor.submit(self._run_job, time.time(), fn, args, kwargs, cancel_token)
+
+        def _on_done(done_job):
+            # Only true for a job cancelled before a worker picked it up: it never ran
+            if done_job.cancelled():
+                with self._stats_lock:
+                    self._queued -= 1
+                    self.stats["skipped_cancelled"] += 1
+
+        job.add_done_callback(_on_done)
+        # Cancelling the asyncio future cancels the job if it has not started
+        return asyncio.wrap_future(job, loop=loop)
+
+    def _run_job(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict,
+                 cancel_token: Optional[Any] = None) -> Any:
+        with self.lock:
+            started_at = time.time()
+            wait_ms = (started_at - submitted_at) * 1000
+            with self._stats_lock:
+                self._queued -= 1
+                if cancel_token is not None and cancel_token.is_cancelled:
+                    # Cancelled while waiting for a worker or the lock: nobody wants the prefill
+                    self.stats["skipped_cancelled"] += 1
+                    if "streamer" in kwargs:
+                        kwargs["streamer"].end()
+                    return None
+                self._running += 1
+                self.stats["total_wait_ms"] += wait_ms
+                self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], wait_ms)
+                self._recent_wait_ms.append(wait_ms)
+
+            succeeded = False
+            try:
+                with torch.no_grad():
+                    result = fn(*args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                with self._stats_lock:
+                    self._running -= 1
+                    self.stats["completed" if succeeded else "failed"] += 1
+                    self.stats["total_run_ms"] += (time.time() - started_at) * 1000
+                if not succeeded:
+                    executor_logger.error(f"❌ Inference job failed after waiting {wait_ms:.1f}ms")
@@ -0,0 +1,466 @@
+"""
+Continuous batching scheduler for concurrent conversation turns
+Admits new sequences at token boundaries, decodes all active sequences in one batched
+forward pass per step and retires finished sequences without stalling the others
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import torch
+
+from src.models.kv_cache_utils import (
+    cache_to_tensors,
+    tensors_to_cache,
+    cache_seq_length,
+    pad_cache_left,
+    slice_cache,
+    select_cache_rows,
+    concat_cache_rows,
+)
+
+# Setup logging
+scheduler_logger = logging.getLogger("inference_scheduler")
+
+_FINISHED = object()
+
+
+@dataclass
+class ScheduledSequence:
+    """
+    One generation request owned by the scheduler
+
+    Consumed with `async for token_id in sequence` from the event loop that submitted it.
+    """
+    request_id: str
+    inputs: Dict[str, Any]
+    max_new_tokens: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    tokens: List[int] = field(default_factory=list)
+    submitted_at: float = field(default_factory=time.time)
+    admitted_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    finish_reason: Optional[str] = None
+    prefix: Optional[Tuple[Any, torch.Tensor]] = None  # (prefix cache key, prefix token ids)
+    prefix_tokens_reused: int = 0
+    cancel_token: Optional[Any] = None  # CancellationToken; the row is dropped at the next step once set
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.is_cancelled
+
+    @property
+    def finished(self) -> bool:
+        return self.finish_reason is not None
+
+    @property
+    def queue_wait_ms(self) -> Optional[float]:
+        if self.admitted_at is None:
+            return None
+        return (self.admitted_at - self.submitted_at) * 1000
+
+    @property
+    def first_token_latency_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.submitted_at) * 1000
+
+    def _publish(self, item: Any):
+        """Hand an item to the consumer's event loop (called from the scheduler thread)"""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # Consumer loop already closed - nothing left to deliver to
+            pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> int:
+        item = await self.queue.get()
+        if item is _FINISHED:
+            raise StopAsyncIteration
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+
+class ContinuousBatchingScheduler:
+    """
+    Token-level scheduler over a causal LM with a dynamic KV cache
+
+    Each step the scheduler prefills newly admitted sequences individually, left-pads their
+    KV cache into the running batch and runs a single batched greedy decode step for all
+    active sequences. Sequences that hit EOS or `max_new_tokens` are removed from the batch
+    immediately, so short turns never wait for long ones.
+    """
+
+    def __init__(self,
+                 model: Any,
+                 eos_token_id: Optional[Any] = None,
+                 max_batch_size: int = 8,
+                 lock: Optional[Any] = None,
+                 device: Optional[Any] = None,
+                 prefix_cache: Optional[Any] = None):
+        self.model = model
+        self.prefix_cache = prefix_cache
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.lock = lock if lock is not None else threading.Lock()
+        self.device = device if device is not None else getattr(model, "device", torch.device("cpu"))
+
+        if eos_token_id is None:
+            eos_token_id = getattr(getattr(model, "generation_config", None), "eos_token_id", None)
+        if isinstance(eos_token_id, Iterable) and not isinstance(eos_token_id, (str, bytes)):
+            self.eos_token_ids = {int(token) for token in eos_token_id}
+        else:
+            self.eos_token_ids = set() if eos_token_id is None else {int(eos_token_id)}
+
+        # Waiting room (touched by submitters and the scheduler thread)
+        self._waiting: deque = deque()
+        self._waiting_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._request_counter = itertools.count()
+
+        # Batch state (only touched by the scheduler thread)
+        self._rows: List[ScheduledSequence] = []
+        self._cache: List = []
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._next_positions: Optional[torch.Tensor] = None
+        self._last_tokens: Optional[torch.Tensor] = None
+
+        # Statistics
+        self.stats = {
+            "admitted": 0,
+            "retired": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "generated_tokens": 0,
+            "decode_steps": 0,
+            "decode_rows": 0,
+            "peak_batch_size": 0,
+            "total_queue_wait_ms": 0.0,
+            "busy_time_s": 0.0,
+        }
+
+        scheduler_logger.info(f"🔀 Continuous batching scheduler ready (max_batch_size={self.max_batch_size})")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, inputs: Dict[str, Any], max_new_tokens: int = 100,
+               request_id: Optional[str] = None,
+               prefix: Optional[Tuple[Any, torch.Tensor]] = None,
+               cancel_token: Optional[Any] = None) -> ScheduledSequence:
+        """
+        Queue a prompt for generation; must be called from a running event loop
+
+        Args:
+            inputs: Model inputs for a single sequence (input_ids [1, T] plus any extras
+                    such as attention_mask or input_features used only during prefill)
+            max_new_tokens: Generation budget for this sequence
+            request_id: Optional identifier used in logs and stats
+            prefix: Optional (key, token ids) of a fixed prompt prefix to start from the prefix cache
+            cancel_token: Optional CancellationToken; once cancelled the sequence finishes early
+
+        Returns:
+            ScheduledSequence to iterate with `async for token_id in sequence`
+        """
+        loop = asyncio.get_running_loop()
+        sequence = ScheduledSequence(
+            request_id=request_id or f"seq_{next(self._request_counter)}",
+            inputs=inputs,
+            max_new_tokens=max(1, int(max_new_tokens)),
+            loop=loop,
+            prefix=prefix,
+            cancel_token=cancel_token,
+        )
+        self._ensure_running()
+        with self._waiting_lock:
+            self._waiting.append(sequence)
+        self._wakeup.set()
+        return sequence
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the scheduler thread; pending and active sequences are failed"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        error = RuntimeError("Inference scheduler shut down")
+        with self._waiting_lock:
+            pending = list(self._waiting) + list(self._rows)
+            self._waiting.clear()
+        self._rows = []
+        self._reset_batch()
+        for sequence in pending:
+            if not sequence.finished:
+                sequence.finish_reason = "shutdown"
+                sequence._publish(error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of scheduler statistics"""
+        stats = dict(self.stats)
+        with self._waiting_lock:
+            stats["waiting_sequences"] = len(self._waiting)
+        stats["active_sequences"] = len(self._rows)
+        stats["max_batch_size"] = self.max_batch_size
+        stats["avg_batch_size"] = (
+            stats["decode_rows"] / stats["decode_steps"] if stats["decode_steps"] else 0.0
+        )
+        stats["avg_queue_wait_ms"] = (
+            stats["total_queue_wait_ms"] / stats["admitted"] if stats["admitted"] else 0.0
+        )
+        stats["tokens_per_second"] = (
+            stats["generated_tokens"] / stats["busy_time_s"] if stats["busy_time_s"] > 0 else 0.0
+        )
+        return stats
+
+    # ------------------------------------------------------------------
+    # Scheduler loop
+    # ------------------------------------------------------------------
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        scheduler_logger.debug("🔀 Scheduler loop started")
+        while not self._stop_event.is_set():
+            with self._waiting_lock:
+                has_waiting = bool(self._waiting)
+            if not self._rows and not has_waiting:
+                self._wakeup.wait(timeout=0.1)
+                self._wakeup.clear()
+                continue
+
+            step_start = time.time()
+            try:
+                with self.lock, torch.no_grad():
+                    self._admit_waiting()
+                    if self._rows:
+                        self._decode_step()
+            except Exception as e:
+                scheduler_logger.error(f"❌ Scheduler step failed: {e}")
+                self._fail_active(e)
+            self.stats["busy_time_s"] += time.time() - step_start
+        scheduler_logger.debug("🔀 Scheduler loop stopped")
+
+    def _admit_waiting(self):
+        """Prefill waiting sequences while there is room in the batch (token boundary)"""
+        while len(self._rows) < self.max_batch_size:
+            with self._waiting_lock:
+                if not self._waiting:
+                    return
+                sequence = self._waiting.popleft()
+            if sequence.cancelled:
+                # Cancelled while queued: never prefilled
+                self._cancel(sequence)
+                continue
+            try:
+                self._prefill(sequence)
+            except Exception as e:
+                scheduler_logger.error(f"❌ Prefill failed for {sequence.request_id}: {e}")
+                self.stats["failed"] += 1
+                sequence.finish_reason = "error"
+                sequence._publish(e)
+
+    def _prefill(self, sequence: ScheduledSequence):
+        """Run the prompt through the model and merge the new row into the running batch"""
+        sequence.admitted_at = time.time()
+        self.stats["admitted"] += 1
+        self.stats["total_queue_wait_ms"] += sequence.queue_wait_ms
+
+        inputs = {
+            key: value.to(self.device) if isinstance(value, torch.Tensor) else value
+            for key, value in sequence.inputs.items()
+        }
+        # Prompt tensors are no longer needed once prefilled
+        sequence.inputs = {}
+        input_ids = inputs["input_ids"]
+        attention_mask = inputs.pop("attention_mask", None)
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+
+        # Start from the cached prompt prefix when there is one; only the tail is prefilled
+        past_key_values = None
+        if sequence.prefix is not None and self.prefix_cache is not None:
+            prefix_key, prefix_ids = sequence.prefix
+            past_key_values, prefix_len = self.prefix_cache.prepare(prefix_key, prefix_ids, input_ids)
+            if past_key_values is not None:
+                inputs["input_ids"] = input_ids[:, prefix_len:]
+                if "inputs_embeds" in inputs:
+                    inputs["inputs_embeds"] = inputs["inputs_embeds"][:, prefix_len:]
+                sequence.prefix_tokens_reused = prefix_len
+
+        if "inputs_embeds" in inputs:
+            # Audio already encoded upstream (streamed utterance): embeddings replace the ids
+            inputs.pop("input_ids")
+        outputs = self.model(**inputs, attention_mask=attention_mask,
+                             past_key_values=past_key_values, use_cache=True)
+        next_token = int(outputs.logits[0, -1].argmax(-1))
+        row_cache = cache_to_tensors(outputs.past_key_values)
+        next_position = int(attention_mask[0].sum())
+
+        if self._emit(sequence, next_token):
+            self._retire(sequence)
+            return
+        self._merge_row(sequence, row_cache, attention_mask, next_token, next_position)
+
+    def _merge_row(self, sequence: ScheduledSequence, row_cache: List,
+                   row_mask: torch.Tensor, next_token: int, next_position: int):
+        """Left-pad the new row or the batch so both share a sequence length, then stack"""
+        row_mask = row_mask.to(device=self.device, dtype=torch.long)
+        token = torch.tensor([next_token], device=self.device, dtype=torch.long)
+        position = torch.tensor([next_position], device=self.device, dtype=torch.long)
+
+        if not self._rows:
+            self._rows = [sequence]
+            self._cache = row_cache
+            self._attention_mask = row_mask
+            self._last_tokens = token
+            self._next_positions = position
+        else:
+            batch_len = cache_seq_length(self._cache)
+            row_len = cache_seq_length(row_cache)
+            if row_len < batch_len:
+                row_cache = pad_cache_left(row_cache, batch_len - row_len)
+                row_mask = torch.cat([row_mask.new_zeros(1, batch_len - row_len), row_mask], dim=1)
+            elif row_len > batch_len:
+                pad = row_len - batch_len
+                self._cache = pad_cache_left(self._cache, pad)
+                self._attention_mask = torch.cat(
+                    [self._attention_mask.new_zeros(len(self._rows), pad), self._attention_mask], dim=1
+                )
+            self._rows.append(sequence)
+            self._cache = concat_cache_rows(self._cache, row_cache)
+            self._attention_mask = torch.cat([self._attention_mask, row_mask], dim=0)
+            self._last_tokens = torch.cat([self._last_tokens, token])
+            self._next_positions = torch.cat([self._next_positions, position])
+
+        self.stats["peak_batch_size"] = max(self.stats["peak_batch_size"], len(self._rows))
+
+    def _decode_step(self):
+        """One batched greedy step for every active sequence"""
+        if any(sequence.cancelled for sequence in self._rows):
+            # Cancelled turns leave the batch before the step instead of decoding for nobody
+            keep = []
+            for row, sequence in enumerate(self._rows):
+                if sequence.cancelled:
+                    self._cancel(sequence)
+                else:
+                    keep.append(row)
+            self._drop_rows(keep)
+            if not self._rows:
+                return
+
+        batch_size = len(self._rows)
+        attention_mask = torch.cat(
+            [self._attention_mask, self._attention_mask.new_ones(batch_size, 1)], dim=1
+        )
+        outputs = self.model(
+            input_ids=self._last_tokens.unsqueeze(-1),
+            attention_mask=attention_mask,
+            position_ids=self._next_positions.unsqueeze(-1),
+            past_key_values=tensors_to_cache(self._cache),
+            use_cache=True,
+        )
+        next_tokens = outputs.logits[:, -1, :].argmax(-1)
+
+        self._cache = cache_to_tensors(outputs.past_key_values)
+        self._attention_mask = attention_mask
+        self._last_tokens = next_tokens
+        self._next_positions = self._next_positions + 1
+        self.stats["decode_steps"] += 1
+        self.stats["decode_rows"] += batch_size
+
+        keep = []
+        for row, (sequence, token) in enumerate(zip(self._rows, next_tokens.tolist())):
+            if self._emit(sequence, token):
+                self._retire(sequence)
+            else:
+                keep.append(row)
+
+        if len(keep) < batch_size:
+            self._drop_rows(keep)
+
+    def _emit(self, sequence: ScheduledSequence, token: int) -> bool:
+        """Deliver a token to its consumer; returns True when the sequence is finished"""
+        if token in self.eos_token_ids:
+            sequence.finish_reason = "eos"
+            return True
+
+        if sequence.first_token_at is None:
+            sequence.first_token_at = time.time()
+        sequence.tokens.append(token)
+        sequence._publish(token)
+        self.stats["generated_tokens"] += 1
+
+        if len(sequence.tokens) >= sequence.max_new_tokens:
+            sequence.finish_reason = "length"
+            return True
+        return False
+
+    def _retire(self, sequence: ScheduledSequence):
+        sequence.finished_at = time.time()
+        self.stats["retired"] += 1
+        sequence._publish(_FINISHED)
+        scheduler_logger.debug(
+            f"🏁 {sequence.request_id} retired ({sequence.finish_reason}, {len(sequence.tokens)} tokens)"
+        )
+
+    def _cancel(self, sequence: ScheduledSequence):
+        sequence.finish_reason = "cancelled"
+        self.stats["cancelled"] += 1
+        self._retire(sequence)
+
+    def _drop_rows(self, keep: List[int]):
+        """Remove retired rows and trim padding columns no remaining row needs"""
+        if not keep:
+            self._rows = []
+            self._reset_batch()
+            return
+
+        rows = torch.tensor(keep, device=self.device, dtype=torch.long)
+        self._rows = [self._rows[row] for row in keep]
+        self._cache = select_cache_rows(self._cache, rows)
+        self._attention_mask = self._attention_mask.index_select(0, rows)
+        self._last_tokens = self._last_tokens.index_select(0, rows)
+        self._next_positions = self._next_positions.index_select(0, rows)
+
+        # Columns that are padding for every remaining row can go
+        used_columns = self._attention_mask.any(dim=0).nonzero()
+        first_used = int(used_columns[0]) if len(used_columns) else 0
+        if first_used > 0:
+            self._cache = slice_cache(self._cache, first_used)
+            self._attention_mask = self._attention_mask[:, first_used:]
+
+    def _reset_batch(self):
+        self._cache = []
+        self._attention_mask = None
+        self._next_positions = None
+        self._last_tokens = None
+
+    def _fail_active(self, error: Exception):
+        """Fail every active sequence after an unrecoverable batched step"""
+        for sequence in self._rows:
+            if not sequence.finished:
+                sequence.finish_reason = "error"
+                self.stats["failed"] += 1
+                sequence._publish(error)
+        self._rows = []
+        self._reset_batch()
@@ -0,0 +1,108 @@
+"""
+KV cache helpers shared by the inference scheduler and cache layers
+Converts between transformers cache objects and plain per-layer (key, value) tensors
+"""
+
+import logging
+from typing import Any, List, Tuple
+
+import torch
+
+try:
+    from transformers import DynamicCache
+except ImportError:
+    DynamicCache = None
+
+# Setup logging
+kv_logger = logging.getLogger("kv_cache_utils")
+
+# Per-layer (key, value) tensors shaped [batch, heads, seq_len, head_dim]
+LayerTensors = List[Tuple[torch.Tensor, torch.Tensor]]
+
+
+def cache_to_tensors(cache: Any) -> LayerTensors:
+    """
+    Extract per-layer (key, value) tensors from a transformers cache
+
+    Supports the layered `DynamicCache` (transformers >= 4.56), the older
+    `key_cache`/`value_cache` lists and legacy tuple-of-tuples caches.
+    """
+    if cache is None:
+        return []
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "key_cache"):
+        return list(zip(cache.key_cache, cache.value_cache))
+    return [(layer[0], layer[1]) for layer in cache]
+
+
+def tensors_to_cache(layers: LayerTensors) -> Any:
+    """Build a `DynamicCache` holding the given per-layer (key, value) tensors"""
+    if DynamicCache is None:
+        return tuple(layers)
+    try:
+        return DynamicCache(ddp_cache_data=layers)
+    except TypeError:
+        return DynamicCache.from_legacy_cache(tuple(layers))
+
+
+def cache_seq_length(layers: LayerTensors) -> int:
+    """Number of cached positions"""
+    if not layers:
+        return 0
+    return layers[0][0].shape[-2]
+
+
+def cache_nbytes(layers: LayerTensors) -> int:
+    """Total bytes held by the cached key/value tensors"""
+    return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in layers)
+
+
+def pad_cache_left(layers: LayerTensors, pad: int) -> LayerTensors:
+    """Left-pad every layer with `pad` zero positions (masked out by the attention mask)"""
+    if pad <= 0:
+        return layers
+    padded = []
+    for key, value in layers:
+        key_pad = key.new_zeros(key.shape[:-2] + (pad, key.shape[-1]))
+        value_pad = value.new_zeros(value.shape[:-2] + (pad, value.shape[-1]))
+        padded.append((torch.cat([key_pad, key], dim=-2), torch.cat([value_pad, value], dim=-2)))
+    return padded
+
+
+def slice_cache(layers: LayerTensors, start: int = 0, end: int = None) -> LayerTensors:
+    """Keep positions [start:end) in every layer"""
+    return [(key[..., start:end, :], value[..., start:end, :]) for key, value in layers]
+
+
+def select_cache_rows(layers: LayerTensors, rows: torch.Tensor) -> LayerTensors:
+    """Keep only the given batch rows in every layer"""
+    return [(key.index_select(0, rows), value.index_select(0, rows)) for key, value in layers]
+
+
+def concat_cache_rows(first: LayerTensors, second: LayerTensors) -> LayerTensors:
+    """Stack two caches of equal sequence length along the batch dimension"""
+    return [
+        (torch.cat([k1, k2], dim=0), torch.cat([v1, v2], dim=0))
+        for (k1, v1), (k2, v2) in zip(first, second)
+    ]
+
+
+def move_cache(layers: LayerTensors, device: Any, non_blocking: bool = False) -> LayerTensors:
+    """Move every layer to `device`"""
+    return [
+        (key.to(device, non_blocking=non_blocking), value.to(device, non_blocking=non_blocking))
+        for key, value in layers
+    ]
+
+
+def clone_cache(layers: LayerTensors) -> LayerTensors:
+    """Deep-copy every layer so generation can extend the copy without touching the original"""
+    return [(key.clone(), value.clone()) for key, value in layers]
+
+
+def crop_cache(cache: Any, length: int):
+    """Drop cached positions past `length` in place (negative crop works on old and new releases)"""
+    excess = cache.get_seq_length() - length
+    if excess > 0:
+        cache.crop(-excess)
@@ -0,0 +1,212 @@
+"""
+Pre-quantized local model snapshots
+Loading from the hub re-resolves metadata over the network and re-quantizes the fp16 weights
+with BitsAndBytes on every boot. A snapshot is written once, with the weights already quantized
+and converted to safetensors, next to the processor/tokenizer files and a manifest; startup then
+loads it with local_files_only (no network) and the safetensors shards are memory-mapped
+instead of read and converted.
+
+Create one with:
+    python -m src.models.model_snapshot [--output DIR] [--include-tts] [--checksum]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import torch
+
+# Setup logging
+snapshot_logger = logging.getLogger("model_snapshot")
+
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = "snapshot_manifest.json"
+
+
+def default_snapshot_dir(cache_dir: str, model_name: str) -> str:
+    """<cache_dir>/snapshots/<org>--<model>"""
+    return os.path.join(cache_dir, "snapshots", model_name.replace("/", "--"))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as snapshot_file:
+        for block in iter(lambda: snapshot_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _describe_files(root: str, checksum: bool) -> Dict[str, Dict[str, Any]]:
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root)
+            if relative == MANIFEST_NAME:
+                continue
+            entry = {"size": os.path.getsize(path)}
+            if checksum:
+                entry["sha256"] = _file_sha256(path)
+            files[relative] = entry
+    return files
+
+
+def _quantization_name(model) -> str:
+    quantization_config = getattr(model.config, "quantization_config", None)
+    if quantization_config is None:
+        return "none"
+    if isinstance(quantization_config, dict):
+        method = quantization_config.get("quant_method", "unknown")
+        bits = "4bit" if quantization_config.get("load_in_4bit") else "8bit" if quantization_config.get("load_in_8bit") else ""
+    else:
+        method = getattr(quantization_config, "quant_method", "unknown")
+        method = getattr(method, "value", method)
+        bits = "4bit" if getattr(quantization_config, "load_in_4bit", False) else \
+            "8bit" if getattr(quantization_config, "load_in_8bit", False) else ""
+    return f"{method}-{bits}" if bits else str(method)
+
+
+def create_snapshot(output_dir: str, model_name: str, model, processor,
+                    components: Optional[Dict[str, tuple]] = None, checksum: bool = False) -> Dict[str, Any]:
+    """
+    Write a snapshot: model weights (as loaded, i.e. already quantized), processor and any
+    extra components (name -> (model, processor)), then the manifest
+
+    The manifest is written last, so a directory without one is an interrupted snapshot and
+    is never loaded.
+
+    Returns:
+        The manifest
+    """
+    start_time = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    component_info = {}
+    for name, (component_model, component_processor) in {"model": (model, processor), **(components or {})}.items():
+        snapshot_logger.info(f"💾 Writing snapshot component '{name}' to {output_dir}")
+        component_model.save_pretrained(os.path.join(output_dir, name), safe_serialization=True)
+        if component_processor is not None:
+            component_processor.save_pretrained(os.path.join(output_dir, f"{name}_processor"))
+        component_info[name] = {
+            "class": type(component_model).__name__,
+            "dtype": str(getattr(component_model, "dtype", "")).replace("torch.", ""),
+            "quantization": _quantization_name(component_model),
+            "processor": component_processor is not None,
+        }
+
+    import transformers
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "model_name": model_name,
+        "created_at": time.time(),
+        "transformers_version": transformers.__version__,
+        "torch_version": torch.__version__,
+        "components": component_info,
+        "files": _describe_files(output_dir, checksum),
+    }
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    total_bytes = sum(entry["size"] for entry in manifest["files"].values())
+    snapshot_logger.info(f"✅ Snapshot written in {time.time() - start_time:.1f}s: "
+                         f"{len(manifest['files'])} files, {total_bytes / 1e9:.2f} GB")
+    return manifest
+
+
+def load_manifest(snapshot_dir: str, model_name: Optional[str] = None, verify_checksums: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    The snapshot's manifest if the snapshot is complete and usable here, else None
+
+    Checks the manifest version, the model name, the transformers major version it was
+    written with, and that every listed file exists with its recorded size (and hash when
+    `verify_checksums` is set).
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError) as e:
+        snapshot_logger.warning(f"⚠️ Unreadable snapshot manifest {manifest_path}: {e}")
+        return None
+
+    import transformers
+    problem = None
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        problem = f"manifest version {manifest.get('version')}"
+    elif model_name and manifest.get("model_name") != model_name:
+        problem = f"snapshot is for {manifest.get('model_name')}"
+    elif str(manifest.get("transformers_version", "")).split(".")[0] != transformers.__version__.split(".")[0]:
+        problem = f"written with transformers {manifest.get('transformers_version')}"
+    else:
+        for relative, entry in manifest.get("files", {}).items():
+            path = os.path.join(snapshot_dir, relative)
+            if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+                problem = f"{relative} is missing or truncated"
+                break
+            if verify_checksums and entry.get("sha256") and _file_sha256(path) != entry["sha256"]:
+                problem = f"{relative} checksum mismatch"
+                break
+    if problem:
+        snapshot_logger.warning(f"⚠️ Ignoring snapshot {snapshot_dir}: {problem}")
+        return None
+    return manifest
+
+
+def load_component(snapshot_dir: str, name: str, model_cls, processor_cls=None, **model_kwargs):
+    """
+    Load one snapshot component without network access; returns (model, processor)
+
+    Quantized weights load as stored (the saved config carries the quantization config), and
+    safetensors shards are memory-mapped by from_pretrained.
+    """
+    model = model_cls.from_pretrained(os.path.join(snapshot_dir, name), local_files_only=True, **model_kwargs)
+    processor = None
+    processor_dir = os.path.join(snapshot_dir, f"{name}_processor")
+    if processor_cls is not None and os.path.isdir(processor_dir):
+        processor = processor_cls.from_pretrained(processor_dir, local_files_only=True)
+    return model, processor
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from src.utils.config import config
+
+    parser = argparse.ArgumentParser(description="Write a pre-quantized local snapshot of the Voxtral model")
+    parser.add_argument("--output", default="", help="Snapshot directory (default: model.snapshot_dir)")
+    parser.add_argument("--include-tts", action="store_true", help="Also snapshot the TTS model")
+    parser.add_argument("--checksum", action="store_true", help="Record sha256 of every file in the manifest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def snapshot():
+        from src.models.voxtral_model_realtime import VoxtralModel
+
+        voxtral = VoxtralModel()
+        processor, model = voxtral._load_from_hub(voxtral._check_flash_attention_availability())
+        components = {}
+        if args.include_tts:
+            from src.models.tts_manager import TTSManager
+            # Loaded in this process (no worker pool, batcher or audio cache): its weights are saved
+            tts_manager = TTSManager(model_name="chatterbox", device=voxtral.device, worker_processes=0,
+                                     batch_max_size=1, use_audio_cache=False)
+            if tts_manager.is_initialized and tts_manager.model is not None:
+                components["tts"] = (tts_manager.model, tts_manager.processor)
+            else:
+                snapshot_logger.warning("⚠️ TTS model not available - snapshot without it")
+        create_snapshot(args.output or voxtral.snapshot_dir, config.model.name, model, processor,
+                        components=components, checksum=args.checksum)
+
+    asyncio.run(snapshot())
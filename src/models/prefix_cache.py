@@ -0,0 +1,153 @@
+"""
+Prompt prefix KV cache
+Computes the key/value states of each fixed instruction prompt once and starts every turn
+from a copy, so only the per-turn context and audio tokens are prefilled
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import torch
+
+from src.models.kv_cache_utils import (
+    LayerTensors,
+    cache_to_tensors,
+    tensors_to_cache,
+    cache_nbytes,
+    clone_cache,
+)
+
+# Setup logging
+prefix_logger = logging.getLogger("prefix_cache")
+
+
+@dataclass
+class PrefixCacheEntry:
+    """KV states for one fixed prompt prefix"""
+    key: Hashable
+    token_ids: torch.Tensor  # [prefix_len] on the model device
+    layers: LayerTensors
+    nbytes: int
+    build_ms: float
+    created_at: float
+    hits: int = 0
+
+    @property
+    def length(self) -> int:
+        return int(self.token_ids.shape[0])
+
+
+class PromptPrefixCache:
+    """
+    LRU of prompt-prefix KV caches keyed by (mode, language, template version)
+
+    Entries are built lazily on first use. Callers must hold the model lock while calling
+    `prepare()` because a miss runs a forward pass. A stored prefix is only reused when the
+    request's input_ids really start with it; otherwise the turn falls back to a full prefill.
+    """
+
+    def __init__(self, model: Any, max_entries: int = 16):
+        self.model = model
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[Hashable, PrefixCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale_rebuilds": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "tokens_reused": 0,
+            "total_build_ms": 0.0,
+        }
+
+    def prepare(self, key: Hashable, prefix_ids: torch.Tensor,
+                input_ids: torch.Tensor) -> Tuple[Optional[Any], int]:
+        """
+        Get a private cache covering the prompt prefix of `input_ids`
+
+        Args:
+            key: Prefix identity, e.g. (mode, language, template_version)
+            prefix_ids: 1-D token ids of the fixed prefix
+            input_ids: Full request input_ids [1, T]
+
+        Returns:
+            (DynamicCache copy of the prefix, prefix length), or (None, 0) when the
+            request does not start with the prefix and must be prefilled in full
+        """
+        prefix_len = int(prefix_ids.shape[0])
+        if (prefix_len == 0 or input_ids.shape[0] != 1 or input_ids.shape[1] <= prefix_len
+                or not torch.equal(input_ids[0, :prefix_len].to(prefix_ids.device), prefix_ids)):
+            self.stats["bypassed"] += 1
+            return None, 0
+
+        entry = self._get_or_build(key, prefix_ids)
+        self.stats["tokens_reused"] += prefix_len
+        return tensors_to_cache(clone_cache(entry.layers)), prefix_len
+
+    def clear(self):
+        """Drop all entries (e.g. after reloading the model)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus per-entry sizes"""
+        with self._lock:
+            entries = list(self._entries.values())
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(entries)
+        stats["total_bytes"] = sum(entry.nbytes for entry in entries)
+        stats["prefixes"] = {
+            str(entry.key): {"tokens": entry.length, "hits": entry.hits, "build_ms": round(entry.build_ms, 1)}
+            for entry in entries
+        }
+        return stats
+
+    def _get_or_build(self, key: Hashable, prefix_ids: torch.Tensor) -> PrefixCacheEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and torch.equal(entry.token_ids, prefix_ids):
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                self.stats["hits"] += 1
+                return entry
+
+        if entry is not None:
+            # Same key but different tokens: tokenizer or template changed underneath us
+            self.stats["stale_rebuilds"] += 1
+        self.stats["misses"] += 1
+        entry = self._build(key, prefix_ids)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def _build(self, key: Hashable, prefix_ids: torch.Tensor) -> PrefixCacheEntry:
+        start_time = time.time()
+        with torch.no_grad():
+            outputs = self.model(input_ids=prefix_ids.unsqueeze(0), use_cache=True)
+        layers = cache_to_tensors(outputs.past_key_values)
+        build_ms = (time.time() - start_time) * 1000
+        self.stats["total_build_ms"] += build_ms
+
+        entry = PrefixCacheEntry(
+            key=key,
+            token_ids=prefix_ids,
+            layers=layers,
+            nbytes=cache_nbytes(layers),
+            build_ms=build_ms,
+            created_at=time.time(),
+        )
+        prefix_logger.info(f"🧠 Prefix cache built for {key}: {entry.length} tokens, "
+                           f"{entry.nbytes / 1024:.1f} KB in {build_ms:.1f}ms")
+        return entry
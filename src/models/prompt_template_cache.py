@@ -0,0 +1,225 @@
+"""
+Pre-tokenized prompt templates
+Renders the chat template once per (mode, language, has_context) with probe audio, learns
+where the per-turn context and audio placeholder tokens go, and afterwards assembles each
+turn's input_ids by splicing - no Jinja rendering, no re-tokenizing the fixed instructions
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import torch
+
+# Setup logging
+template_logger = logging.getLogger("prompt_template_cache")
+
+# Probe contexts: the first locates the context tokens, the second validates the splice
+LOCATE_CONTEXT = "Previous conversation:\nUser: probe\n\nTake the previous conversation into account when you respond."
+VALIDATE_CONTEXT = ("Previous conversation:\nUser: What's the weather like in Paris today?\n"
+                    "AI: Sunny, around 24 degrees.\n\nTake the previous conversation into account when you respond.")
+
+
+@dataclass
+class PromptTemplate:
+    """Token layout of one prompt: head [context] tail [audio tokens x windows] suffix"""
+    key: Hashable
+    instruction: str
+    head_ids: List[int]
+    tail_ids: List[int]
+    suffix_ids: List[int]
+    audio_token_id: int
+    tokens_per_window: int
+    has_context: bool
+    build_ms: float
+    uses: int = 0
+
+    def input_ids(self, num_windows: int, context_ids: Optional[List[int]] = None) -> torch.Tensor:
+        """input_ids [1, T] for an utterance of `num_windows` encoder windows"""
+        ids = list(self.head_ids)
+        if self.has_context:
+            ids += context_ids or []
+        ids += self.tail_ids
+        ids += [self.audio_token_id] * (self.tokens_per_window * max(1, int(num_windows)))
+        ids += self.suffix_ids
+        return torch.tensor([ids], dtype=torch.long)
+
+
+class PromptTemplateCache:
+    """
+    Pre-tokenized prompt layouts keyed by (mode, language, has_context, template version)
+
+    Args:
+        render_fn: render_fn(instruction, context_text, num_samples) -> 1-D input_ids from the
+            real processor, for silent probe audio of `num_samples` samples
+        encode_fn: encode_fn(text) -> token ids without special tokens (per-turn context only)
+        audio_token_id: Placeholder token the processor emits for encoded audio
+        window_samples: Samples per encoder window (30 s)
+
+    A layout is only used after the splice reproduced the processor's ids for a probe it was
+    not derived from; anything the template does that splicing cannot express (text merged
+    across chunk boundaries, audio token counts that depend on exact length) marks the key
+    as unusable and those turns keep going through the processor.
+    """
+
+    def __init__(self,
+                 render_fn: Callable[[str, str, int], torch.Tensor],
+                 encode_fn: Callable[[str], List[int]],
+                 audio_token_id: int,
+                 window_samples: int):
+        self.render_fn = render_fn
+        self.encode_fn = encode_fn
+        self.audio_token_id = int(audio_token_id)
+        self.window_samples = int(window_samples)
+        self._templates: Dict[Hashable, Optional[PromptTemplate]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "fallbacks": 0,
+            "builds": 0,
+            "validation_failures": 0,
+            "total_build_ms": 0.0,
+        }
+
+    def get(self, key: Hashable, instruction: str, has_context: bool) -> Optional[PromptTemplate]:
+        """Template for `key`, built on first use; None when the layout cannot be spliced"""
+        with self._lock:
+            template = self._templates.get(key, False)
+            if template is False or (template is not None and template.instruction != instruction):
+                template = self._build(key, instruction, has_context)
+                self._templates[key] = template
+            if template is None:
+                self.stats["fallbacks"] += 1
+            else:
+                template.uses += 1
+                self.stats["hits"] += 1
+            return template
+
+    def encode_context(self, context_text: str) -> List[int]:
+        return list(self.encode_fn(context_text)) if context_text else []
+
+    def num_windows(self, num_samples: int) -> int:
+        return max(1, -(-int(num_samples) // self.window_samples))
+
+    def input_ids(self, template: PromptTemplate, num_samples: int, context_text: str = "") -> torch.Tensor:
+        """input_ids [1, T] for an utterance of `num_samples` samples"""
+        context_ids = self.encode_context(context_text) if template.has_context else None
+        return template.input_ids(self.num_windows(num_samples), context_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["templates"] = sum(1 for template in self._templates.values() if template is not None)
+            stats["unusable"] = sum(1 for template in self._templates.values() if template is None)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _build(self, key: Hashable, instruction: str, has_context: bool) -> Optional[PromptTemplate]:
+        start_time = time.time()
+        self.stats["builds"] += 1
+        try:
+            template = self._derive(key, instruction, has_context)
+        except Exception as e:
+            template_logger.warning(f"⚠️ Prompt template for {key} could not be derived: {e}")
+            template = None
+
+        if template is not None and not self._validate(template):
+            self.stats["validation_failures"] += 1
+            template_logger.warning(f"⚠️ Prompt template for {key} does not reproduce the processor output; "
+                                    f"these turns keep using apply_chat_template")
+            template = None
+
+        build_ms = (time.time() - start_time) * 1000
+        self.stats["total_build_ms"] += build_ms
+        if template is not None:
+            template.build_ms = build_ms
+            template_logger.info(f"🧩 Prompt template for {key}: {len(template.head_ids) + len(template.tail_ids)} "
+                                 f"static tokens + {len(template.suffix_ids)} suffix, "
+                                 f"{template.tokens_per_window} audio tokens/window ({build_ms:.1f}ms)")
+        return template
+
+    def _render(self, instruction: str, context_text: str, num_samples: int) -> List[int]:
+        input_ids = self.render_fn(instruction, context_text, num_samples)
+        return [int(token_id) for token_id in input_ids.reshape(-1).tolist()]
+
+    def _split_audio(self, ids: List[int]) -> Tuple[List[int], int, List[int]]:
+        """(before, audio token count, after) of a prompt with one contiguous audio run"""
+        positions = [index for index, token_id in enumerate(ids) if token_id == self.audio_token_id]
+        if not positions:
+            raise ValueError("no audio placeholder tokens in the rendered prompt")
+        first, last = positions[0], positions[-1]
+        if last - first + 1 != len(positions):
+            raise ValueError("audio placeholder tokens are not contiguous")
+        return ids[:first], len(positions), ids[last + 1:]
+
+    def _derive(self, key: Hashable, instruction: str, has_context: bool) -> PromptTemplate:
+        context_text = LOCATE_CONTEXT if has_context else ""
+
+        # Audio: the token count must depend on the window count only
+        before, tokens_per_window, suffix = self._split_audio(self._render(instruction, context_text, self.window_samples))
+        for num_samples, windows in ((self.window_samples // 60, 1), (2 * self.window_samples, 2)):
+            probe_before, count, probe_suffix = self._split_audio(self._render(instruction, context_text, num_samples))
+            if probe_before != before or probe_suffix != suffix or count != tokens_per_window * windows:
+                raise ValueError(f"audio layout changes with length ({count} tokens for {num_samples} samples)")
+
+        head_ids, tail_ids = before, []
+        if has_context:
+            # The context tokens sit where the prompt with context differs from the one without
+            plain_before, _, _ = self._split_audio(self._render(instruction, "", self.window_samples))
+            common_prefix = 0
+            while (common_prefix < min(len(before), len(plain_before))
+                   and before[common_prefix] == plain_before[common_prefix]):
+                common_prefix += 1
+            common_suffix = 0
+            while (common_suffix < min(len(before), len(plain_before)) - common_prefix
+                   and before[-1 - common_suffix] == plain_before[-1 - common_suffix]):
+                common_suffix += 1
+            middle = before[common_prefix:len(before) - common_suffix]
+            context_ids = self.encode_context(context_text)
+            offset = self._find(middle, context_ids)
+            if offset is None:
+                raise ValueError("context tokens are not a contiguous run of the rendered prompt")
+            head_ids = before[:common_prefix] + middle[:offset]
+            tail_ids = middle[offset + len(context_ids):] + before[len(before) - common_suffix:]
+
+        return PromptTemplate(
+            key=key,
+            instruction=instruction,
+            head_ids=head_ids,
+            tail_ids=tail_ids,
+            suffix_ids=suffix,
+            audio_token_id=self.audio_token_id,
+            tokens_per_window=tokens_per_window,
+            has_context=has_context,
+            build_ms=0.0,
+        )
+
+    def _validate(self, template: PromptTemplate) -> bool:
+        """Spliced ids must equal the processor's for a context and length the layout was not derived from"""
+        context_text = VALIDATE_CONTEXT if template.has_context else ""
+        num_samples = self.window_samples + self.window_samples // 3
+        try:
+            expected = self._render(template.instruction, context_text, num_samples)
+            actual = self.input_ids(template, num_samples, context_text)[0].tolist()
+        except Exception as e:
+            template_logger.warning(f"⚠️ Prompt template validation failed for {template.key}: {e}")
+            return False
+        return actual == expected
+
+    @staticmethod
+    def _find(haystack: List[int], needle: List[int]) -> Optional[int]:
+        if not needle:
+            return None
+        for offset in range(len(haystack) - len(needle) + 1):
+            if haystack[offset:offset + len(needle)] == needle:
+                return offset
+        return None
@@ -0,0 +1,313 @@
+"""
+Multi-replica model pool with a session-aware router
+One VoxtralModel serializes every turn behind its model lock, however many GPUs or cores the
+node has. The pool loads one replica per configured device (cuda:0, cuda:1, ... or several CPU
+replicas), each with its own model lock and inference executor, and a router assigns turns to
+the replica with the fewest outstanding tokens. Sessions stick to the replica that holds their
+KV cache and streamed audio unless that replica is loaded well beyond the least-loaded one.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+# Setup logging
+pool_logger = logging.getLogger("replica_pool")
+
+AUDIO_TOKENS_PER_WINDOW = 375  # Voxtral: one 30 s encoder window -> 375 audio tokens
+WINDOW_SAMPLES = 480000
+
+
+def estimate_turn_tokens(audio_samples: int, context_chars: int = 0, max_new_tokens: int = 100) -> int:
+    """Tokens a turn will cost its replica: audio windows + context text + decode budget"""
+    windows = max(1, math.ceil(audio_samples / WINDOW_SAMPLES))
+    return windows * AUDIO_TOKENS_PER_WINDOW + context_chars // 4 + max_new_tokens
+
+
+class ModelReplica:
+    """One loaded model on one device, with its live load and health"""
+
+    def __init__(self, replica_id: int, device: str, model: Any):
+        self.replica_id = replica_id
+        self.device = device
+        self.model = model
+        self.outstanding_tokens = 0
+        self.active_turns = 0
+        self.pinned_sessions = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.unhealthy_since: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.turns_served = 0
+        self.failed_turns = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "replica_id": self.replica_id,
+            "device": self.device,
+            "healthy": self.healthy,
+            "initialized": bool(getattr(self.model, "is_initialized", False)),
+            "outstanding_tokens": self.outstanding_tokens,
+            "active_turns": self.active_turns,
+            "pinned_sessions": self.pinned_sessions,
+            "turns_served": self.turns_served,
+            "failed_turns": self.failed_turns,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaLease:
+    """A turn's claim on a replica; `release()` returns its outstanding tokens (idempotent)"""
+
+    def __init__(self, router: "ReplicaRouter", replica: ModelReplica, session_id: Optional[str], tokens: int):
+        self.router = router
+        self.replica = replica
+        self.session_id = session_id
+        self.tokens = tokens
+        self.released = False
+
+    def consume(self, tokens: int):
+        """Part of the turn is done (e.g. prefill, decoded words); lower the replica's load"""
+        self.router._consume(self, tokens)
+
+    def release(self, error: Optional[str] = None):
+        self.router._release(self, error)
+
+
+class ReplicaRouter:
+    """
+    Least-outstanding-tokens routing with soft session affinity
+
+    A session goes back to the replica it used last while that replica carries at most
+    `affinity_slack_tokens` more outstanding tokens than the least-loaded healthy replica;
+    otherwise it moves, and `on_session_moved(session_id, old_replica)` lets the caller drop
+    the session state left behind. A replica failing `max_failures` turns in a row is taken
+    out of rotation for `recovery_s` seconds, then retried.
+    """
+
+    def __init__(self, replicas: List[ModelReplica], affinity_slack_tokens: int = 512, max_failures: int = 3,
+                 recovery_s: float = 30.0, on_session_moved: Optional[Callable[[str, ModelReplica], None]] = None):
+        self.replicas = replicas
+        self.affinity_slack_tokens = affinity_slack_tokens
+        self.max_failures = max(1, int(max_failures))
+        self.recovery_s = recovery_s
+        self.on_session_moved = on_session_moved
+        self.affinity: Dict[str, ModelReplica] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "routed_turns": 0,
+            "affinity_hits": 0,
+            "affinity_moves": 0,
+            "new_sessions": 0,
+            "no_healthy_replica": 0,
+        }
+
+    def _eligible(self, now: float) -> List[ModelReplica]:
+        eligible = []
+        for replica in self.replicas:
+            if not replica.healthy and replica.unhealthy_since is not None and now - replica.unhealthy_since >= self.recovery_s:
+                # Half-open: let the next turn probe it
+                replica.healthy = True
+                replica.consecutive_failures = self.max_failures - 1
+                pool_logger.info(f"🔁 Replica {replica.replica_id} ({replica.device}) back in rotation for a retry")
+            if replica.healthy:
+                eligible.append(replica)
+        return eligible
+
+    def route(self, session_id: Optional[str] = None) -> ModelReplica:
+        """Pick the replica for a session's next turn (and remember it); raises if none is healthy"""
+        moved_from = None
+        with self._lock:
+            eligible = self._eligible(time.time())
+            if not eligible:
+                self.stats["no_healthy_replica"] += 1
+                raise RuntimeError("No healthy model replica available")
+            # Ties (e.g. idle replicas) go to the replica with the fewest sessions pinned to it
+            least = min(eligible, key=lambda replica: (replica.outstanding_tokens, replica.active_turns,
+                                                       replica.pinned_sessions, replica.replica_id))
+            chosen = least
+            previous = self.affinity.get(session_id) if session_id else None
+            if previous is not None:
+                if previous in eligible and previous.outstanding_tokens <= least.outstanding_tokens + self.affinity_slack_tokens:
+                    chosen = previous
+                    self.stats["affinity_hits"] += 1
+                elif previous is not least:
+                    moved_from = previous
+                    self.stats["affinity_moves"] += 1
+            elif session_id:
+                self.stats["new_sessions"] += 1
+            if session_id:
+                self._pin(session_id, chosen)
+        if moved_from is not None:
+            pool_logger.info(f"↪️ Session {session_id} moved from replica {moved_from.replica_id} to {chosen.replica_id}")
+            if self.on_session_moved is not None:
+                self.on_session_moved(session_id, moved_from)
+        return chosen
+
+    def acquire(self, session_id: Optional[str], tokens: int, replica: Optional[ModelReplica] = None) -> ReplicaLease:
+        """Claim `tokens` of load on `replica` (routed when not given) for one turn"""
+        replica = replica or self.route(session_id)
+        with self._lock:
+            replica.outstanding_tokens += tokens
+            replica.active_turns += 1
+            self.stats["routed_turns"] += 1
+            if session_id:
+                self._pin(session_id, replica)
+        return ReplicaLease(self, replica, session_id, tokens)
+
+    def replica_for(self, session_id: str) -> Optional[ModelReplica]:
+        with self._lock:
+            return self.affinity.get(session_id)
+
+    def end_session(self, session_id: str) -> Optional[ModelReplica]:
+        with self._lock:
+            replica = self.affinity.pop(session_id, None)
+            if replica is not None:
+                replica.pinned_sessions -= 1
+            return replica
+
+    def _pin(self, session_id: str, replica: ModelReplica):
+        previous = self.affinity.get(session_id)
+        if previous is not replica:
+            if previous is not None:
+                previous.pinned_sessions -= 1
+            replica.pinned_sessions += 1
+            self.affinity[session_id] = replica
+
+    def _consume(self, lease: ReplicaLease, tokens: int):
+        with self._lock:
+            if lease.released:
+                return
+            tokens = min(tokens, lease.tokens)
+            lease.tokens -= tokens
+            lease.replica.outstanding_tokens -= tokens
+
+    def _release(self, lease: ReplicaLease, error: Optional[str]):
+        with self._lock:
+            if lease.released:
+                return
+            lease.released = True
+            replica = lease.replica
+            replica.outstanding_tokens -= lease.tokens
+            replica.active_turns -= 1
+            replica.turns_served += 1
+            if error is None:
+                replica.consecutive_failures = 0
+                return
+            replica.failed_turns += 1
+            replica.consecutive_failures += 1
+            replica.last_error = error
+            if replica.healthy and replica.consecutive_failures >= self.max_failures:
+                replica.healthy = False
+                replica.unhealthy_since = time.time()
+                pool_logger.error(f"❌ Replica {replica.replica_id} ({replica.device}) taken out of rotation "
+                                  f"after {replica.consecutive_failures} failed turns: {error}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["sessions"] = len(self.affinity)
+        stats["healthy_replicas"] = sum(replica.healthy for replica in self.replicas)
+        return stats
+
+
+class ModelReplicaPool:
+    """
+    N model replicas behind a ReplicaRouter
+
+    Args:
+        devices: One entry per replica ("cuda:0", "cuda:1", "cpu", ...)
+        model_factory: device -> uninitialized model (VoxtralModel(device=...))
+        affinity_slack_tokens, max_failures, recovery_s: See ReplicaRouter
+    """
+
+    def __init__(self, devices: List[str], model_factory: Callable[[str], Any], affinity_slack_tokens: int = 512,
+                 max_failures: int = 3, recovery_s: float = 30.0):
+        self.devices = list(devices) or ["cpu"]
+        self.model_factory = model_factory
+        self.replicas: List[ModelReplica] = []
+        self.router = ReplicaRouter(self.replicas, affinity_slack_tokens=affinity_slack_tokens,
+                                    max_failures=max_failures, recovery_s=recovery_s,
+                                    on_session_moved=self._drop_session_state)
+
+    @property
+    def primary(self):
+        """Replica 0's model (endpoints that are not routed per session use it)"""
+        return self.replicas[0].model if self.replicas else None
+
+    def models(self) -> List[Any]:
+        return [replica.model for replica in self.replicas]
+
+    async def initialize(self):
+        """Load the replicas one after another (keeps peak host memory to one load at a time)"""
+        for replica_id, device in enumerate(self.devices):
+            start_time = time.time()
+            model = self.model_factory(device)
+            await model.initialize()
+            self.replicas.append(ModelReplica(replica_id, device, model))
+            pool_logger.info(f"✅ Replica {replica_id} ready on {device} in {time.time() - start_time:.2f}s")
+
+    def add_replica(self, device: str, model: Any) -> ModelReplica:
+        """Register an already-initialized model as a replica"""
+        replica = ModelReplica(len(self.replicas), device, model)
+        self.replicas.append(replica)
+        return replica
+
+    def route(self, session_id: Optional[str] = None) -> ModelReplica:
+        return self.router.route(session_id)
+
+    async def stream_turn(self, session_id: Optional[str], audio_data, chunk_id, conversation_context: str = "",
+                          streaming_audio=None, replica: Optional[ModelReplica] = None,
+                          max_new_tokens: int = 100, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        process_realtime_chunk_streaming on the routed replica, with load accounting
+
+        A streamed utterance must be answered by the replica that encoded it: pass that
+        replica (or leave the session's affinity in place) together with `streaming_audio`.
+        """
+        if replica is None and streaming_audio is not None and session_id:
+            replica = self.router.replica_for(session_id)
+        tokens = estimate_turn_tokens(len(audio_data), len(conversation_context), max_new_tokens)
+        prefill_tokens = tokens - max_new_tokens
+        lease = self.router.acquire(session_id, tokens, replica=replica)
+        error = None
+        prefilled = False
+        try:
+            async for chunk in lease.replica.model.process_realtime_chunk_streaming(
+                audio_data, chunk_id, conversation_context=conversation_context, session_id=session_id,
+                streaming_audio=streaming_audio, **kwargs
+            ):
+                if chunk.get("error") and chunk.get("error") != "No speech detected":
+                    error = chunk["error"]
+                elif chunk.get("text"):
+                    if not prefilled:
+                        lease.consume(prefill_tokens)
+                        prefilled = True
+                    lease.consume(1)
+                chunk["replica_id"] = lease.replica.replica_id
+                yield chunk
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            lease.release(error)
+
+    def end_session(self, session_id: str):
+        replica = self.router.end_session(session_id)
+        if replica is not None:
+            self._drop_session_state(session_id, replica)
+
+    def _drop_session_state(self, session_id: str, replica: ModelReplica):
+        try:
+            replica.model.end_session(session_id)
+        except Exception as e:
+            pool_logger.debug(f"Session cleanup on replica {replica.replica_id} skipped: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "replicas": [replica.get_status() for replica in self.replicas],
+            "router": self.router.get_stats(),
+        }
@@ -0,0 +1,268 @@
+"""
+Per-session KV cache carry-over with device / CPU / disk tiering
+Keeps each conversation's past key/values between turns so a new turn only prefills its
+own audio and instruction. Idle sessions move to CPU RAM and, past the RAM budget, to
+memory-mapped files; everything is evicted LRU-first under configurable byte budgets.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import torch
+
+from src.models.kv_cache_utils import LayerTensors, cache_nbytes, move_cache
+
+# Setup logging
+session_kv_logger = logging.getLogger("session_kv_cache")
+
+TIER_DEVICE = "device"
+TIER_CPU = "cpu"
+TIER_DISK = "disk"
+
+
+@dataclass
+class SessionKVEntry:
+    """Cached conversation state for one session"""
+    session_id: str
+    token_ids: torch.Tensor  # 1-D CPU tensor of every token the cache was built from
+    layers: Optional[LayerTensors]  # None while the entry lives on disk
+    nbytes: int
+    tier: str
+    last_used: float
+    disk_path: Optional[str] = None
+
+    @property
+    def cached_tokens(self) -> int:
+        return int(self.layers[0][0].shape[-2]) if self.layers else 0
+
+
+class SessionKVCache:
+    """
+    Tiered store of per-session KV caches
+
+    A session's cache is checked out for the duration of a turn (promoted back to the
+    device if it had been offloaded) and checked in afterwards with the extended cache.
+    """
+
+    def __init__(self,
+                 device: Any = "cpu",
+                 device_budget_bytes: int = 1024 ** 3,
+                 cpu_budget_bytes: int = 4 * 1024 ** 3,
+                 disk_budget_bytes: int = 0,
+                 disk_dir: Optional[str] = None,
+                 idle_offload_s: float = 5.0,
+                 max_tokens: int = 4096):
+        self.device = torch.device(device)
+        self.device_budget_bytes = int(device_budget_bytes)
+        self.cpu_budget_bytes = int(cpu_budget_bytes)
+        self.disk_budget_bytes = int(disk_budget_bytes) if disk_dir else 0
+        self.disk_dir = disk_dir
+        self.idle_offload_s = idle_offload_s
+        self.max_tokens = max_tokens
+        self._entries: Dict[str, SessionKVEntry] = {}
+        self._lock = threading.RLock()
+        self._pin_memory = self.device.type == "cuda"
+
+        if self.disk_budget_bytes > 0:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "promotions_from_cpu": 0,
+            "promotions_from_disk": 0,
+            "offloads_to_cpu": 0,
+            "spills_to_disk": 0,
+            "evictions": 0,
+            "rejected_too_long": 0,
+            "total_promote_ms": 0.0,
+        }
+
+        session_kv_logger.info(
+            f"💾 Session KV cache ready (device {self.device_budget_bytes / 1024 ** 2:.0f}MB, "
+            f"cpu {self.cpu_budget_bytes / 1024 ** 2:.0f}MB, disk {self.disk_budget_bytes / 1024 ** 2:.0f}MB)"
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def has(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def checkout(self, session_id: str) -> Optional[SessionKVEntry]:
+        """
+        Take a session's cache for a new turn, moved back onto the device
+
+        The entry leaves the store until it is checked in again, so the caller owns it.
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+
+            start_time = time.time()
+            if entry.tier == TIER_DISK:
+                entry.layers = self._load_from_disk(entry)
+                self.stats["promotions_from_disk"] += 1
+            elif entry.tier == TIER_CPU:
+                self.stats["promotions_from_cpu"] += 1
+            if entry.tier != TIER_DEVICE:
+                entry.layers = move_cache(entry.layers, self.device, non_blocking=self._pin_memory)
+                entry.tier = TIER_DEVICE
+                promote_ms = (time.time() - start_time) * 1000
+                self.stats["total_promote_ms"] += promote_ms
+                session_kv_logger.debug(f"💾 Promoted {session_id} to device in {promote_ms:.1f}ms")
+
+            entry.last_used = time.time()
+            return entry
+
+    def checkin(self, session_id: str, token_ids: torch.Tensor, layers: LayerTensors):
+        """Store a session's cache after a turn, then enforce tier budgets"""
+        token_ids = token_ids.detach().to("cpu").flatten()
+        if self.max_tokens and token_ids.shape[0] > self.max_tokens:
+            # Too long to keep carrying over; the next turn rebuilds from the text context
+            self.stats["rejected_too_long"] += 1
+            self.drop(session_id)
+            session_kv_logger.info(f"💾 Session {session_id} exceeded {self.max_tokens} tokens - cache reset")
+            return
+
+        entry = SessionKVEntry(
+            session_id=session_id,
+            token_ids=token_ids,
+            layers=layers,
+            nbytes=cache_nbytes(layers),
+            tier=TIER_DEVICE,
+            last_used=time.time(),
+        )
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if previous is not None:
+                self._delete_disk_file(previous)
+            self._entries[session_id] = entry
+            self._enforce_budgets()
+
+    def drop(self, session_id: str):
+        """Forget a session (e.g. on disconnect)"""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._delete_disk_file(entry)
+
+    def offload_idle(self, now: Optional[float] = None):
+        """Move device-resident caches idle for longer than `idle_offload_s` to CPU RAM"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.tier == TIER_DEVICE and now - entry.last_used >= self.idle_offload_s:
+                    self._move_to_cpu(entry)
+            self._enforce_budgets()
+
+    def tier_bytes(self) -> Dict[str, int]:
+        with self._lock:
+            totals = {TIER_DEVICE: 0, TIER_CPU: 0, TIER_DISK: 0}
+            for entry in self._entries.values():
+                totals[entry.tier] += entry.nbytes
+            return totals
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["sessions"] = len(self._entries)
+            stats["sessions_by_tier"] = {
+                tier: sum(1 for e in self._entries.values() if e.tier == tier)
+                for tier in (TIER_DEVICE, TIER_CPU, TIER_DISK)
+            }
+        stats["bytes_by_tier"] = self.tier_bytes()
+        promotions = stats["promotions_from_cpu"] + stats["promotions_from_disk"]
+        stats["avg_promote_ms"] = stats["total_promote_ms"] / promotions if promotions else 0.0
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Tier management (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _lru(self, tier: str):
+        return sorted((e for e in self._entries.values() if e.tier == tier), key=lambda e: e.last_used)
+
+    def _enforce_budgets(self):
+        totals = self.tier_bytes()
+
+        for entry in self._lru(TIER_DEVICE):
+            if totals[TIER_DEVICE] <= self.device_budget_bytes:
+                break
+            self._move_to_cpu(entry)
+            totals[TIER_DEVICE] -= entry.nbytes
+            totals[TIER_CPU] += entry.nbytes
+
+        for entry in self._lru(TIER_CPU):
+            if totals[TIER_CPU] <= self.cpu_budget_bytes:
+                break
+            totals[TIER_CPU] -= entry.nbytes
+            if self.disk_budget_bytes > 0 and entry.nbytes <= self.disk_budget_bytes:
+                self._spill_to_disk(entry)
+                totals[TIER_DISK] += entry.nbytes
+            else:
+                self._evict(entry)
+
+        for entry in self._lru(TIER_DISK):
+            if totals[TIER_DISK] <= self.disk_budget_bytes:
+                break
+            totals[TIER_DISK] -= entry.nbytes
+            self._evict(entry)
+
+    def _move_to_cpu(self, entry: SessionKVEntry):
+        if self.device.type != "cpu":
+            layers = move_cache(entry.layers, "cpu")
+            if self._pin_memory:
+                layers = [(k.pin_memory(), v.pin_memory()) for k, v in layers]
+            entry.layers = layers
+        entry.tier = TIER_CPU
+        self.stats["offloads_to_cpu"] += 1
+
+    def _spill_to_disk(self, entry: SessionKVEntry):
+        digest = hashlib.sha1(entry.session_id.encode("utf-8")).hexdigest()
+        path = os.path.join(self.disk_dir, f"{digest}.kv.pt")
+        torch.save({
+            "keys": [k.contiguous() for k, _ in entry.layers],
+            "values": [v.contiguous() for _, v in entry.layers],
+        }, path)
+        entry.layers = None
+        entry.disk_path = path
+        entry.tier = TIER_DISK
+        self.stats["spills_to_disk"] += 1
+
+    def _load_from_disk(self, entry: SessionKVEntry) -> LayerTensors:
+        state = torch.load(entry.disk_path, map_location="cpu", mmap=True, weights_only=True)
+        layers = list(zip(state["keys"], state["values"]))
+        if self.device.type == "cpu":
+            # Detach from the mapping before the file goes away
+            layers = [(k.clone(), v.clone()) for k, v in layers]
+        else:
+            layers = move_cache(layers, self.device)
+        self._delete_disk_file(entry)
+        return layers
+
+    def _delete_disk_file(self, entry: SessionKVEntry):
+        if entry.disk_path:
+            try:
+                os.unlink(entry.disk_path)
+            except OSError:
+                pass
+            entry.disk_path = None
+
+    def _evict(self, entry: SessionKVEntry):
+        self._entries.pop(entry.session_id, None)
+        self._delete_disk_file(entry)
+        self.stats["evictions"] += 1
+        session_kv_logger.debug(f"💾 Evicted session {entry.session_id} ({entry.nbytes / 1024:.1f} KB)")
@@ -0,0 +1,290 @@
+"""
+Draft-and-verify speculative decoding for greedy generation
+A small draft LLM proposes a few tokens; the Voxtral LLM checks all of them in one forward
+pass and keeps the longest prefix that matches its own greedy choice, plus one token of its
+own. The output is the target's greedy output - the draft only changes how many target
+forward passes it takes to produce it.
+"""
+
+import inspect
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import torch
+
+from src.models.kv_cache_utils import crop_cache
+
+try:
+    from transformers import DynamicCache, NoRepeatNGramLogitsProcessor, RepetitionPenaltyLogitsProcessor
+except ImportError:
+    DynamicCache = NoRepeatNGramLogitsProcessor = RepetitionPenaltyLogitsProcessor = None
+
+# Setup logging
+speculative_logger = logging.getLogger("speculative_decoding")
+
+# generate() options that change the chosen tokens or the return value and that the verification
+# loop does not reproduce; any of them at a non-neutral value sends the call to generate()
+NEUTRAL_GENERATION_KWARGS = {
+    "num_beams": (1,),
+    "num_return_sequences": (1,),
+    "min_length": (0,),
+    "encoder_repetition_penalty": (1.0,),
+    "encoder_no_repeat_ngram_size": (0,),
+    "bad_words_ids": (),
+    "suppress_tokens": (),
+    "begin_suppress_tokens": (),
+    "sequence_bias": (),
+    "forced_bos_token_id": (),
+    "forced_eos_token_id": (),
+    "exponential_decay_length_penalty": (),
+    "prefix_allowed_tokens_fn": (),
+    "logits_processor": (),
+    "guidance_scale": (1.0,),
+    "return_dict_in_generate": (False,),
+    "output_scores": (False,),
+    "output_logits": (False,),
+    "output_attentions": (False,),
+    "output_hidden_states": (False,),
+    "assistant_model": (),
+}
+
+
+class SpeculativeDecoder:
+    """
+    Greedy speculative decoding with a separate draft model
+
+    Args:
+        target_model: The model whose greedy output is reproduced (Voxtral)
+        draft_model: Small causal LM sharing the target's tokenizer
+        num_draft_tokens: Tokens proposed per round (k)
+        draft_context_tokens: Prompt tokens the draft sees (the most recent ones)
+        skip_token_ids: Prompt tokens hidden from the draft (audio placeholders it cannot read)
+    """
+
+    def __init__(self,
+                 target_model: Any,
+                 draft_model: Any,
+                 num_draft_tokens: int = 4,
+                 draft_context_tokens: int = 512,
+                 skip_token_ids: Iterable[int] = ()):
+        self.target_model = target_model
+        self.draft_model = draft_model
+        self.num_draft_tokens = max(1, int(num_draft_tokens))
+        self.draft_context_tokens = draft_context_tokens
+        self.skip_token_ids = set(int(token_id) for token_id in skip_token_ids)
+        self._logits_to_keep = {}
+
+        self.stats = {
+            "calls": 0,
+            "generated_tokens": 0,
+            "drafted_tokens": 0,
+            "accepted_tokens": 0,
+            "target_forwards": 0,
+            "draft_forwards": 0,
+            "total_time_s": 0.0,
+        }
+
+    def can_generate(self, generation_kwargs: Dict[str, Any]) -> bool:
+        """
+        Whether a generate() call is greedy decoding of one sequence that the verification loop
+        reproduces token for token: no sampling, and no logits processor or output option other
+        than min_new_tokens, no_repeat_ngram_size and repetition_penalty
+        """
+        input_ids = generation_kwargs.get("input_ids")
+        if input_ids is None or input_ids.shape[0] != 1 or self._option(generation_kwargs, "do_sample"):
+            return False
+        return all(self._is_neutral(self._option(generation_kwargs, name), neutral)
+                   for name, neutral in NEUTRAL_GENERATION_KWARGS.items())
+
+    @torch.no_grad()
+    def generate(self,
+                 input_ids: torch.Tensor,
+                 past_key_values: Optional[Any] = None,
+                 max_new_tokens: int = 100,
+                 min_new_tokens: int = 0,
+                 streamer: Optional[Any] = None,
+                 eos_token_id: Optional[Any] = None,
+                 stopping_criteria: Optional[Any] = None,
+                 input_features: Optional[torch.Tensor] = None,
+                 inputs_embeds: Optional[torch.Tensor] = None,
+                 **generation_kwargs) -> torch.Tensor:
+        """
+        Drop-in for `model.generate(do_sample=False)` on a single sequence
+
+        A passed `past_key_values` holding the first positions of `input_ids` is used and
+        extended in place, like generate() does. `stopping_criteria` are checked after every
+        verification round. `no_repeat_ngram_size` and `repetition_penalty` are applied to the
+        target's logits (and the draft's, to keep its proposals acceptable); other options are
+        only valid when `can_generate()` accepts them. Returns prompt + generated ids [1, T].
+        """
+        start_time = time.time()
+        eos_ids = self._eos_ids(eos_token_id)
+        processors = self._logits_processors(generation_kwargs)
+        device = input_ids.device
+        prompt_len = input_ids.shape[1]
+        if streamer is not None:
+            streamer.put(input_ids.cpu())
+
+        # Prefill the target (audio included) from wherever its cache ends
+        cache = past_key_values if past_key_values is not None else DynamicCache()
+        past_len = min(cache.get_seq_length(), prompt_len - 1)
+        crop_cache(cache, past_len)
+        prefill = {"input_features": input_features} if input_features is not None else {}
+        if inputs_embeds is not None:
+            prefill["inputs_embeds"] = inputs_embeds[:, past_len:]
+        else:
+            prefill["input_ids"] = input_ids[:, past_len:]
+        logits = self._forward(self.target_model, cache, prefill, keep=1)
+        self.stats["target_forwards"] += 1
+
+        prompt_ids = input_ids[0].tolist()
+        generated = [self._pick(logits[0, -1], prompt_ids, min_new_tokens, eos_ids, processors)]
+        if streamer is not None:
+            streamer.put(torch.tensor(generated[-1:]))
+
+        draft_context = [t for t in prompt_ids if t not in self.skip_token_ids]
+        draft_context = draft_context[-self.draft_context_tokens:] if self.draft_context_tokens else draft_context
+        draft_cache = DynamicCache()
+
+        while (generated[-1] not in eos_ids and len(generated) < max_new_tokens
+               and not self._should_stop(stopping_criteria, input_ids, generated)):
+            # Draft proposes up to k tokens after everything generated so far
+            context = draft_context + generated
+            k = min(self.num_draft_tokens, max_new_tokens - len(generated) - 1)
+            proposals = self._propose(draft_cache, context, k, device, processors)
+
+            # Target scores the last token + all proposals in one pass
+            verify_ids = torch.tensor([generated[-1:] + proposals], device=device)
+            logits = self._forward(self.target_model, cache, {"input_ids": verify_ids}, keep=verify_ids.shape[1])
+            self.stats["target_forwards"] += 1
+
+            # Keep target tokens while they agree with the draft; the first disagreement (or the
+            # token after the last proposal) is the target's own and ends the round
+            new_tokens, accepted = [], 0
+            for index in range(len(proposals) + 1):
+                token = self._pick(logits[0, index], prompt_ids + generated + new_tokens, min_new_tokens, eos_ids,
+                                   processors, generated_count=len(generated) + len(new_tokens))
+                new_tokens.append(token)
+                if index < len(proposals) and token == proposals[index]:
+                    accepted += 1
+                else:
+                    break
+                if token in eos_ids or len(generated) + len(new_tokens) >= max_new_tokens:
+                    break
+
+            self.stats["drafted_tokens"] += len(proposals)
+            self.stats["accepted_tokens"] += accepted
+            generated.extend(new_tokens)
+
+            # Forget rejected proposals: the target keeps everything but the newest token,
+            # the draft keeps the context it shares with the accepted sequence
+            crop_cache(cache, prompt_len + len(generated) - 1)
+            crop_cache(draft_cache, len(context) + accepted)
+            if streamer is not None:
+                streamer.put(torch.tensor(new_tokens))
+
+        if streamer is not None:
+            streamer.end()
+
+        self.stats["calls"] += 1
+        self.stats["generated_tokens"] += len(generated)
+        self.stats["total_time_s"] += time.time() - start_time
+        return torch.cat([input_ids, torch.tensor([generated], device=device, dtype=input_ids.dtype)], dim=1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["num_draft_tokens"] = self.num_draft_tokens
+        stats["acceptance_rate"] = stats["accepted_tokens"] / stats["drafted_tokens"] if stats["drafted_tokens"] else 0.0
+        stats["tokens_per_second"] = stats["generated_tokens"] / stats["total_time_s"] if stats["total_time_s"] else 0.0
+        stats["tokens_per_target_forward"] = (
+            stats["generated_tokens"] / stats["target_forwards"] if stats["target_forwards"] else 0.0
+        )
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _propose(self, draft_cache: Any, context: List[int], k: int, device: Any,
+                 processors: Optional[List[Any]] = None) -> List[int]:
+        """Greedy draft tokens continuing `context`; the draft cache is extended in place"""
+        proposals = []
+        feed = context[draft_cache.get_seq_length():]
+        for _ in range(k):
+            logits = self._forward(self.draft_model, draft_cache, {"input_ids": torch.tensor([feed], device=device)}, keep=1)
+            self.stats["draft_forwards"] += 1
+            token = self._pick(logits[0, -1], context + proposals, 0, set(), processors)
+            proposals.append(token)
+            feed = [token]
+        return proposals
+
+    def _forward(self, model: Any, cache: Any, inputs: Dict[str, torch.Tensor], keep: int) -> torch.Tensor:
+        kwargs = dict(inputs, past_key_values=cache, use_cache=True)
+        if self._supports_logits_to_keep(model):
+            # Prompt-length logits over a 131k vocabulary are large; only the scored rows are needed
+            kwargs["logits_to_keep"] = keep
+        return model(**kwargs).logits[:, -keep:]
+
+    def _supports_logits_to_keep(self, model: Any) -> bool:
+        key = id(model)
+        if key not in self._logits_to_keep:
+            self._logits_to_keep[key] = "logits_to_keep" in inspect.signature(model.forward).parameters
+        return self._logits_to_keep[key]
+
+    @staticmethod
+    def _should_stop(stopping_criteria: Optional[Any], input_ids: torch.Tensor, generated: List[int]) -> bool:
+        if not stopping_criteria:
+            return False
+        sequence = torch.cat([input_ids, input_ids.new_tensor([generated])], dim=1)
+        return any(bool(criterion(sequence, None).all()) for criterion in stopping_criteria)
+
+    def _eos_ids(self, eos_token_id: Optional[Any]) -> set:
+        if eos_token_id is None:
+            eos_token_id = getattr(getattr(self.target_model, "generation_config", None), "eos_token_id", None)
+        if eos_token_id is None:
+            return set()
+        if isinstance(eos_token_id, (list, tuple, set)):
+            return set(int(token_id) for token_id in eos_token_id)
+        return {int(eos_token_id)}
+
+    def _option(self, generation_kwargs: Dict[str, Any], name: str) -> Any:
+        """A generate() option as generate() resolves it: the call's value, else the model's default"""
+        if generation_kwargs.get(name) is not None:
+            return generation_kwargs[name]
+        return getattr(getattr(self.target_model, "generation_config", None), name, None)
+
+    @staticmethod
+    def _is_neutral(value: Any, neutral: tuple) -> bool:
+        if value is None or (isinstance(value, (list, tuple, dict)) and not value):
+            return True
+        return not isinstance(value, (list, tuple, dict)) and value in neutral
+
+    def _logits_processors(self, generation_kwargs: Dict[str, Any]) -> List[Any]:
+        """The processors generate() would apply for these options, in generate()'s order"""
+        processors = []
+        repetition_penalty = self._option(generation_kwargs, "repetition_penalty")
+        if repetition_penalty is not None and repetition_penalty != 1.0:
+            processors.append(RepetitionPenaltyLogitsProcessor(penalty=repetition_penalty))
+        no_repeat_ngram_size = self._option(generation_kwargs, "no_repeat_ngram_size")
+        if no_repeat_ngram_size:
+            processors.append(NoRepeatNGramLogitsProcessor(no_repeat_ngram_size))
+        return processors
+
+    @staticmethod
+    def _pick(logits: torch.Tensor, sequence: List[int], min_new_tokens: int, eos_ids: set,
+              processors: Optional[List[Any]] = None, generated_count: int = 0) -> int:
+        """
+        Greedy choice after `sequence` (prompt + tokens so far), with the logits processors
+        applied and EOS suppressed until min_new_tokens, like generate() does
+        """
+        logits = logits.float().clone()
+        if processors:
+            sequence_ids = torch.tensor([sequence], device=logits.device)
+            scores = logits.unsqueeze(0)
+            for processor in processors:
+                scores = processor(sequence_ids, scores)
+            logits = scores[0]
+        if generated_count < min_new_tokens and eos_ids:
+            logits[list(eos_ids)] = float("-inf")
+        return int(logits.argmax(-1))
@@ -0,0 +1,280 @@
+"""
+Incremental audio encoding for utterances streamed in small frames
+Frames are buffered per utterance while the user is still speaking; the audio encoder runs on
+fixed windows as they fill, and the open window is re-encoded speculatively whenever enough new
+audio has arrived. At endpoint time only windows that changed since their last encode remain.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+# Setup logging
+streaming_encoder_logger = logging.getLogger("streaming_audio_encoder")
+
+
+class StreamingUtterance:
+    """
+    Audio of one in-progress utterance plus the encoder output of each window
+
+    Window i covers samples [i * window_samples, (i + 1) * window_samples). An encoded window
+    remembers how many samples it saw, so it is stale as soon as more audio lands in it.
+    """
+
+    def __init__(self, utterance_id: str, window_samples: int, max_samples: int = 0):
+        self.utterance_id = utterance_id
+        self.window_samples = int(window_samples)
+        self.max_samples = int(max_samples)
+        self.num_samples = 0
+        self.dropped_samples = 0
+        self.created_at = time.time()
+        self.window_embeds: Dict[int, Tuple[int, torch.Tensor]] = {}  # index -> (samples seen, embeds)
+        self.encoded_samples = 0
+        self.encode_task: Optional[asyncio.Task] = None
+        self.waiting_for_pause = False
+        self.on_encoded: Optional[Callable[["StreamingUtterance", torch.Tensor], Awaitable[None]]] = None
+        self.last_interim_at = 0.0
+        self.stable_words: List[str] = []
+        self._last_hypothesis: List[str] = []
+        self._frames: List[np.ndarray] = []
+        self._audio: Optional[np.ndarray] = None
+
+    def append(self, samples: np.ndarray) -> int:
+        """Buffer a frame; returns how many samples were accepted (frames past max_samples are dropped)"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if self.max_samples:
+            room = max(0, self.max_samples - self.num_samples)
+            if room < len(samples):
+                self.dropped_samples += len(samples) - room
+                samples = samples[:room]
+        if len(samples):
+            self._frames.append(samples)
+            self.num_samples += len(samples)
+            self._audio = None
+        return len(samples)
+
+    def audio(self) -> np.ndarray:
+        """All buffered samples as one float32 array"""
+        if self._audio is None or len(self._audio) != self.num_samples:
+            self._audio = np.concatenate(self._frames) if self._frames else np.zeros(0, dtype=np.float32)
+            self._frames = [self._audio] if self.num_samples else []
+        return self._audio
+
+    @property
+    def num_windows(self) -> int:
+        return max(1, -(-self.num_samples // self.window_samples))
+
+    def window_audio(self, index: int) -> np.ndarray:
+        start = index * self.window_samples
+        return self.audio()[start:start + self.window_samples]
+
+    def window_length(self, index: int) -> int:
+        return max(0, min(self.window_samples, self.num_samples - index * self.window_samples))
+
+    def stale_windows(self) -> List[int]:
+        """Windows with no encoder output yet, or with audio added since it was computed"""
+        return [
+            index for index in range(self.num_windows)
+            if self.window_embeds.get(index, (-1, None))[0] != self.window_length(index)
+        ]
+
+    def has_complete_stale_window(self) -> bool:
+        return any(self.window_length(index) == self.window_samples for index in self.stale_windows())
+
+    def embeds(self) -> Optional[torch.Tensor]:
+        """Encoder output of the whole utterance, or None while any window is stale"""
+        if self.num_samples == 0 or self.stale_windows():
+            return None
+        return torch.cat([self.window_embeds[index][1] for index in range(self.num_windows)], dim=0)
+
+    def update_hypothesis(self, text: str) -> Tuple[str, str]:
+        """
+        Record an interim transcript; return (stable, unstable) text
+
+        Words become stable once two consecutive hypotheses agree on them (local agreement).
+        The stable prefix only ever grows, so the client never sees committed words change.
+        """
+        words = text.split()
+        agreed = 0
+        for previous, current in zip(self._last_hypothesis, words):
+            if previous != current:
+                break
+            agreed += 1
+        if agreed > len(self.stable_words) and words[:len(self.stable_words)] == self.stable_words:
+            self.stable_words = words[:agreed]
+        self._last_hypothesis = words
+
+        return " ".join(self.stable_words), " ".join(words[len(self.stable_words):])
+
+
+class StreamingAudioEncoder:
+    """
+    Runs the audio encoder window by window while an utterance is still being streamed
+
+    Args:
+        featurize_fn: mono float32 window -> model input features (runs in a worker thread)
+        encode_fn: input features -> audio embeddings [tokens, hidden] (runs on the inference executor)
+        executor: InferenceExecutor shared with generation, so encoding never races a decode
+        window_samples: Samples per encoder window (30 s for Voxtral)
+        sample_rate: Audio sample rate
+        encode_interval_s: New audio needed before the open window is re-encoded speculatively
+        pause_encode_s: Gap between frames after which leftover audio is encoded anyway (the
+            client holds back trailing silence, so a pause is usually the end of the utterance)
+        max_utterance_s: Audio kept per utterance; later frames are dropped (0 = unlimited)
+    """
+
+    def __init__(self,
+                 featurize_fn: Callable[[np.ndarray], Any],
+                 encode_fn: Callable[[Any], torch.Tensor],
+                 executor,
+                 window_samples: int = 480000,
+                 sample_rate: int = 16000,
+                 encode_interval_s: float = 0.5,
+                 pause_encode_s: float = 0.3,
+                 max_utterance_s: float = 30.0):
+        self.featurize_fn = featurize_fn
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.window_samples = int(window_samples)
+        self.sample_rate = sample_rate
+        self.encode_interval_samples = int(encode_interval_s * sample_rate)
+        self.pause_encode_s = pause_encode_s
+        self.max_samples = int(max_utterance_s * sample_rate) if max_utterance_s else 0
+
+        self.stats = {
+            "utterances": 0,
+            "frames": 0,
+            "dropped_samples": 0,
+            "background_encodes": 0,
+            "pause_encodes": 0,
+            "background_encode_failures": 0,
+            "endpoint_encodes": 0,
+            "windows_reused_at_endpoint": 0,
+            "endpoints": 0,
+            "endpoints_fully_encoded": 0,
+            "total_encode_ms": 0.0,
+            "total_endpoint_ms": 0.0,
+        }
+
+    def start(self, utterance_id: str) -> StreamingUtterance:
+        """Begin buffering a new utterance"""
+        self.stats["utterances"] += 1
+        return StreamingUtterance(utterance_id, self.window_samples, self.max_samples)
+
+    def push(self, utterance: StreamingUtterance, samples: np.ndarray) -> int:
+        """
+        Buffer a frame and kick off a background encode when a window filled up or enough
+        new audio arrived; at most one encode per utterance is in flight
+        """
+        accepted = utterance.append(samples)
+        self.stats["frames"] += 1
+        if accepted < len(samples):
+            self.stats["dropped_samples"] += len(samples) - accepted
+
+        task = utterance.encode_task
+        if task is not None and not task.done() and utterance.waiting_for_pause and self._should_encode(utterance):
+            # Frames are still coming: stop watching for a pause and encode right away
+            task.cancel()
+            utterance.waiting_for_pause = False
+            task = None
+        if (task is None or task.done()) and (self._should_encode(utterance) or self.pause_encode_s):
+            utterance.encode_task = asyncio.ensure_future(self._encode_in_background(utterance))
+        return accepted
+
+    async def finalize(self, utterance: StreamingUtterance) -> Optional[torch.Tensor]:
+        """Endpoint: wait for the in-flight encode, encode what is still stale, return all embeddings"""
+        start_time = time.time()
+        utterance.on_encoded = None  # No new interim transcripts once the user has stopped
+        if utterance.encode_task is not None:
+            if utterance.waiting_for_pause:
+                # Nothing is being encoded, the task is only watching for a pause
+                utterance.encode_task.cancel()
+            try:
+                await utterance.encode_task
+            except asyncio.CancelledError:
+                pass
+            utterance.encode_task = None
+
+        stale = utterance.stale_windows()
+        self.stats["endpoints"] += 1
+        self.stats["windows_reused_at_endpoint"] += utterance.num_windows - len(stale)
+        if not stale:
+            self.stats["endpoints_fully_encoded"] += 1
+        await self._encode_windows(utterance, stale)
+        self.stats["endpoint_encodes"] += len(stale)
+
+        endpoint_ms = (time.time() - start_time) * 1000
+        self.stats["total_endpoint_ms"] += endpoint_ms
+        streaming_encoder_logger.debug(
+            f"🎙️ Utterance {utterance.utterance_id}: {utterance.num_windows} window(s), "
+            f"{len(stale)} encoded at endpoint in {endpoint_ms:.1f}ms"
+        )
+        return utterance.embeds()
+
+    def discard(self, utterance: StreamingUtterance):
+        """Abandon an utterance (client reset or disconnect)"""
+        if utterance.encode_task is not None and not utterance.encode_task.done():
+            utterance.encode_task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        encodes = stats["background_encodes"] + stats["endpoint_encodes"]
+        stats["avg_encode_ms"] = stats["total_encode_ms"] / encodes if encodes else 0.0
+        stats["avg_endpoint_ms"] = stats["total_endpoint_ms"] / stats["endpoints"] if stats["endpoints"] else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _should_encode(self, utterance: StreamingUtterance) -> bool:
+        if utterance.has_complete_stale_window():
+            return True
+        return utterance.num_samples - utterance.encoded_samples >= self.encode_interval_samples
+
+    async def _encode_in_background(self, utterance: StreamingUtterance):
+        try:
+            # Keep going while frames arrive faster than windows are encoded
+            while True:
+                if not self._should_encode(utterance):
+                    if not self.pause_encode_s or not utterance.stale_windows():
+                        break
+                    # Leftover audio below the interval: encode it once the frames pause
+                    seen_samples = utterance.num_samples
+                    utterance.waiting_for_pause = True
+                    try:
+                        await asyncio.sleep(self.pause_encode_s)
+                    finally:
+                        utterance.waiting_for_pause = False
+                    if utterance.num_samples != seen_samples:
+                        continue
+                    self.stats["pause_encodes"] += 1
+
+                stale = utterance.stale_windows()
+                await self._encode_windows(utterance, stale)
+                self.stats["background_encodes"] += len(stale)
+
+                embeds = utterance.embeds()
+                if embeds is not None and utterance.on_encoded is not None:
+                    await utterance.on_encoded(utterance, embeds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The endpoint encodes whatever is still stale, so a failure here only costs latency
+            self.stats["background_encode_failures"] += 1
+            streaming_encoder_logger.warning(f"⚠️ Background encode failed for {utterance.utterance_id}: {e}")
+
+    async def _encode_windows(self, utterance: StreamingUtterance, indices: List[int]):
+        for index in indices:
+            # Snapshot the window: frames may keep arriving while it is being encoded
+            window = utterance.window_audio(index).copy()
+            start_time = time.time()
+            features = await asyncio.to_thread(self.featurize_fn, window)
+            embeds = await self.executor.run(self.encode_fn, features)
+            self.stats["total_encode_ms"] += (time.time() - start_time) * 1000
+            utterance.window_embeds[index] = (len(window), embeds)
+            utterance.encoded_samples = max(utterance.encoded_samples, index * self.window_samples + len(window))
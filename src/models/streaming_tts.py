@@ -0,0 +1,243 @@
+"""
+Sentence-level streaming TTS, pipelined with LLM decoding
+Synthesizing the whole reply after generation makes time-to-first-audio the full generation
+time plus the full synthesis time. Here the word stream is cut at sentence (and, for long
+sentences, phrase) boundaries, and each segment is synthesized while decoding carries on.
+Audio goes out in segment order as soon as each segment is ready, so the first audio arrives
+after the first sentence is generated and synthesized. The same pipeline streams /ws/tts
+requests as numbered audio frames.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.models.cancellation import CancellationToken
+from src.models.incremental_detokenizer import PHRASE_END_CHARS, SENTENCE_END_CHARS
+
+# Setup logging
+streaming_tts_logger = logging.getLogger("streaming_tts")
+
+# Closing quotes/brackets after the punctuation still end the sentence ('"Yes."', '(maybe).')
+_TRAILING_CLOSERS = "\"')]}”’"
+
+# Progressive audio frames: little-endian uint32 sequence number and uint32 flags, then the
+# encoded audio (8 bytes keep 16-bit samples aligned). The final frame has no audio.
+STREAM_FRAME_HEADER = struct.Struct("<II")
+FRAME_FINAL = 0x1
+
+
+def pack_stream_frame(sequence: int, payload: bytes, final: bool = False) -> bytes:
+    return STREAM_FRAME_HEADER.pack(sequence, FRAME_FINAL if final else 0) + payload
+
+
+def unpack_stream_frame(frame: bytes) -> tuple:
+    """(sequence, is_final, payload) of one progressive audio frame"""
+    sequence, flags = STREAM_FRAME_HEADER.unpack_from(frame)
+    return sequence, bool(flags & FRAME_FINAL), frame[STREAM_FRAME_HEADER.size:]
+
+
+class SegmentChunker:
+    """
+    Cut a stream of words into TTS segments
+
+    A segment ends at a sentence end, at a phrase end (, ; :) once it has `min_words` words,
+    or at `max_words` words. The first segment of a reply may end at a phrase after
+    `first_min_words`, so the first audio is not held back by a long opening sentence;
+    `first_max_words` (default: `max_words`) caps its length outright.
+    When disabled, nothing is cut and `flush()` returns the whole reply.
+    """
+
+    def __init__(self, min_words: int = 4, max_words: int = 24, first_min_words: int = 2,
+                 enabled: bool = True, first_max_words: Optional[int] = None):
+        self.min_words = max(1, int(min_words))
+        self.max_words = max(self.min_words, int(max_words))
+        self.first_min_words = max(1, min(int(first_min_words), self.min_words))
+        self.first_max_words = max(self.first_min_words, int(first_max_words or self.max_words))
+        self.enabled = enabled
+        self.segments_cut = 0
+        self._words: List[str] = []
+
+    def push(self, word: str) -> Optional[str]:
+        """Add one word; returns the segment it completes, if any"""
+        word = word.strip()
+        if not word:
+            return None
+        self._words.append(word)
+        if not self.enabled:
+            return None
+        end_char = word.rstrip(_TRAILING_CLOSERS)[-1:]
+        first = self.segments_cut == 0
+        min_words = self.first_min_words if first else self.min_words
+        max_words = self.first_max_words if first else self.max_words
+        if (end_char in SENTENCE_END_CHARS
+                or (end_char in PHRASE_END_CHARS and len(self._words) >= min_words)
+                or len(self._words) >= max_words):
+            return self._cut()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """The words left at the end of the reply, as the last segment"""
+        return self._cut() if self._words else None
+
+    def _cut(self) -> str:
+        segment = " ".join(self._words)
+        self._words = []
+        self.segments_cut += 1
+        return segment
+
+
+class StreamingTTSPipeline:
+    """
+    Synthesize a reply segment by segment while it is still being generated
+
+    `push_word()` is called from the turn's word loop and never waits; completed segments are
+    queued for one synthesis task, which synthesizes them in order and hands each segment's
+    audio to `send_audio` as soon as it is ready. `finish()` queues the last words and waits
+    until all audio has been sent; `cancel()` stops the task (barge-in, disconnect).
+
+    Args:
+        tts_manager: Anything with `synthesize(text, language, emotion, cancel_token)`
+        send_audio: Coroutine function that delivers one segment's audio bytes
+        language: Language code passed to the TTS manager
+        emotion_for: Optional callable mapping the reply text so far to an emotion
+        cancel_token: The turn's cancellation; a cancelled turn synthesizes nothing more
+        chunker: Segment boundaries (default: a SegmentChunker with default limits)
+        voice: Voice profile ID passed to the TTS manager (default: the manager's voice)
+    """
+
+    def __init__(self, tts_manager: Any, send_audio: Callable[[bytes], Awaitable[None]],
+                 language: str = "en", emotion_for: Optional[Callable[[str], str]] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 chunker: Optional[SegmentChunker] = None, voice: Optional[str] = None):
+        self.tts_manager = tts_manager
+        self.voice_kwargs = {"voice": voice} if voice else {}
+        self.send_audio = send_audio
+        self.language = language
+        self.emotion_for = emotion_for
+        self.cancel_token = cancel_token
+        self.chunker = chunker or SegmentChunker()
+        self.started_at = time.time()
+        self.first_audio_ms: Optional[float] = None
+        self.stats = {"segments": 0, "sent_segments": 0, "failed_segments": 0,
+                      "audio_bytes": 0, "synthesis_ms": 0.0}
+        self._reply_words: List[str] = []
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._finished = False
+
+    def push_word(self, word: str):
+        """Add one generated word; a completed segment starts synthesizing in the background"""
+        if self._finished:
+            return
+        self._reply_words.append(word)
+        segment = self.chunker.push(word)
+        if segment is not None:
+            self._enqueue(segment)
+
+    async def finish(self) -> Dict[str, Any]:
+        """The reply is complete: synthesize what is left and wait for all audio to be sent"""
+        if not self._finished:
+            self._finished = True
+            segment = self.chunker.flush()
+            if segment is not None:
+                self._enqueue(segment)
+            if self._task is not None:
+                self._queue.put_nowait(None)
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self.get_stats()
+
+    def cancel(self):
+        """Stop synthesizing; queued segments are dropped"""
+        self._finished = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["first_audio_ms"] = self.first_audio_ms
+        return stats
+
+    def _enqueue(self, segment: str):
+        self.stats["segments"] += 1
+        self._queue.put_nowait(segment)
+        if self._task is None:
+            self._task = asyncio.create_task(self._synthesize_segments())
+
+    async def _synthesize_segments(self):
+        while True:
+            segment = await self._queue.get()
+            if segment is None or (self.cancel_token is not None and self.cancel_token.is_cancelled):
+                return
+            index = self.stats["sent_segments"] + self.stats["failed_segments"]
+            emotion = "neutral"
+            if self.emotion_for is not None:
+                try:
+                    emotion = self.emotion_for(" ".join(self._reply_words))
+                except Exception as e:
+                    streaming_tts_logger.debug(f"Emotion detection skipped for segment {index}: {e}")
+            synthesis_start = time.time()
+            try:
+                audio_bytes = await self.tts_manager.synthesize(segment, language=self.language, emotion=emotion,
+                                                                cancel_token=self.cancel_token, **self.voice_kwargs)
+            except Exception as e:
+                streaming_tts_logger.warning(f"⚠️ TTS failed for segment {index} ('{segment[:30]}'): {e}")
+                audio_bytes = None
+            self.stats["synthesis_ms"] += (time.time() - synthesis_start) * 1000
+            if self.cancel_token is not None and self.cancel_token.is_cancelled:
+                return
+            if not audio_bytes:
+                self.stats["failed_segments"] += 1
+                continue
+            await self.send_audio(audio_bytes)
+            if self.first_audio_ms is None:
+                self.first_audio_ms = (time.time() - self.started_at) * 1000
+            self.stats["sent_segments"] += 1
+            self.stats["audio_bytes"] += len(audio_bytes)
+            streaming_tts_logger.debug(f"🎵 Segment {index} sent: {len(audio_bytes)} bytes for '{segment[:30]}'")
+
+
+async def stream_tts_frames(tts_manager: Any, text: str, send_frame: Callable[[bytes], Awaitable[None]],
+                            encode_frames: Callable[[bytes], Awaitable[List[bytes]]],
+                            language: str = "en", emotion: str = "neutral",
+                            cancel_token: Optional[CancellationToken] = None,
+                            chunker: Optional[SegmentChunker] = None, voice: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Synthesize `text` as a stream of small, numbered audio frames
+
+    The text goes through a StreamingTTSPipeline, so each segment is sent as soon as it is
+    synthesized; `encode_frames` cuts a segment's audio into frames. The first audio therefore
+    waits only for the first (short) segment, however long the text is. A frame flagged final
+    ends the stream unless the request was cancelled.
+    """
+    sequence = 0
+    first_frame_ms: Optional[float] = None
+    started_at = time.time()
+
+    async def send_segment(audio_bytes: bytes):
+        nonlocal sequence, first_frame_ms
+        for payload in await encode_frames(audio_bytes):
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return
+            await send_frame(pack_stream_frame(sequence, payload))
+            if first_frame_ms is None:
+                first_frame_ms = (time.time() - started_at) * 1000
+            sequence += 1
+
+    pipeline = StreamingTTSPipeline(tts_manager, send_segment, language=language,
+                                    emotion_for=lambda _reply: emotion, cancel_token=cancel_token,
+                                    chunker=chunker, voice=voice)
+    try:
+        for word in text.split():
+            pipeline.push_word(word)
+        stats = await pipeline.finish()
+    finally:
+        pipeline.cancel()
+    cancelled = cancel_token is not None and cancel_token.is_cancelled
+    if not cancelled:
+        await send_frame(pack_stream_frame(sequence, b"", final=True))
+    stats.update({"frames": sequence, "first_frame_ms": first_frame_ms, "cancelled": cancelled})
+    return stats
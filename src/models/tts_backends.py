@@ -0,0 +1,233 @@
+"""
+Lazily loaded, memory-budgeted TTS backends
+LANGUAGE_MODELS routes languages to Chatterbox, Dia-TTS and Indic-TTS, but only Chatterbox
+was ever loaded, so the other languages silently got Chatterbox. The registry loads a backend
+the first time one of its languages is requested, keeps recently used backends resident
+within a memory budget (and enough free VRAM for the next load), and evicts the least
+recently used idle backend when it has to.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import torch
+
+# Setup logging
+tts_backends_logger = logging.getLogger("tts_backends")
+
+
+def module_bytes(model: Any) -> int:
+    """Bytes held by a torch module's parameters and buffers (0 for anything else)"""
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def free_vram_bytes() -> Optional[int]:
+    """Free memory on the current CUDA device, or None without CUDA"""
+    if not torch.cuda.is_available():
+        return None
+    try:
+        free, _total = torch.cuda.mem_get_info()
+        return int(free)
+    except Exception:
+        return None
+
+
+@dataclass
+class TTSBackend:
+    """One loaded TTS model and its processor"""
+    name: str
+    model: Any
+    processor: Any
+    memory_bytes: int = 0
+    load_ms: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    in_use: int = 0
+
+
+class TTSBackendRegistry:
+    """
+    Load TTS backends on first use and keep the hot ones resident
+
+    `acquire(name)` returns the resident backend or loads it (on a thread, once even when
+    several sessions ask at the same time); `release(name)` must follow when the synthesis is
+    done. After a load, least recently used backends that are neither pinned nor in use are
+    evicted until the resident total fits `memory_budget_bytes`; before a load, the same
+    happens while free VRAM is below `min_free_vram_bytes`.
+
+    Args:
+        loaders: Backend name -> callable returning (model, processor)
+        memory_budget_bytes: Resident backends' combined size (0 = no budget)
+        min_free_vram_bytes: Free VRAM wanted before loading another backend (0 = no check)
+        pinned: Backends never evicted (the default language's backend)
+        memory_of: Size of a loaded model in bytes
+        load_retry_s: After a failed load, requests within this time fall back without retrying
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[], Tuple[Any, Any]]], memory_budget_bytes: int = 0,
+                 min_free_vram_bytes: int = 0, pinned: Iterable[str] = (),
+                 memory_of: Callable[[Any], int] = module_bytes, load_retry_s: float = 300.0):
+        self.loaders = dict(loaders)
+        self.memory_budget_bytes = max(0, int(memory_budget_bytes))
+        self.min_free_vram_bytes = max(0, int(min_free_vram_bytes))
+        self.pinned = set(pinned)
+        self.memory_of = memory_of
+        self.load_retry_s = max(0.0, float(load_retry_s))
+        self._failed_at: Dict[str, float] = {}
+        self._resident: "OrderedDict[str, TTSBackend]" = OrderedDict()  # Least recently used first
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self.loaders}
+        self._backend_stats: Dict[str, Dict[str, Any]] = {
+            name: {"loads": 0, "load_failures": 0, "evictions": 0, "uses": 0, "total_load_ms": 0.0,
+                   "last_load_ms": None}
+            for name in self.loaders
+        }
+
+    def register_loaded(self, name: str, model: Any, processor: Any, load_ms: float = 0.0) -> TTSBackend:
+        """Add a backend that was loaded elsewhere (e.g. eagerly at startup)"""
+        backend = TTSBackend(name, model, processor, self.memory_of(model), load_ms)
+        with self._lock:
+            self._resident[name] = backend
+            self._resident.move_to_end(name)
+            stats = self._backend_stats.setdefault(name, {"loads": 0, "load_failures": 0, "evictions": 0,
+                                                          "uses": 0, "total_load_ms": 0.0, "last_load_ms": None})
+            stats["loads"] += 1
+            stats["total_load_ms"] += load_ms
+            stats["last_load_ms"] = load_ms
+        return backend
+
+    def is_resident(self, name: str) -> bool:
+        with self._lock:
+            return name in self._resident
+
+    async def acquire(self, name: str) -> Optional[TTSBackend]:
+        """The backend for `name`, loaded if needed; None if it cannot be loaded"""
+        backend = self._use_resident(name)
+        if backend is not None:
+            return backend
+        if name not in self.loaders:
+            return None
+        return await asyncio.to_thread(self.acquire_blocking, name)
+
+    def acquire_blocking(self, name: str) -> Optional[TTSBackend]:
+        """acquire() for code already running on a worker thread"""
+        backend = self._use_resident(name)
+        if backend is not None or name not in self.loaders or self._recently_failed(name):
+            return backend
+        with self._load_locks[name]:
+            # Whoever held the lock may just have loaded it
+            backend = self._use_resident(name)
+            if backend is not None or self._recently_failed(name):
+                return backend
+            self._make_room_for_load(name)
+            start = time.time()
+            try:
+                model, processor = self.loaders[name]()
+            except Exception as e:
+                with self._lock:
+                    self._backend_stats[name]["load_failures"] += 1
+                    self._failed_at[name] = time.time()
+                tts_backends_logger.error(f"❌ TTS backend {name} failed to load: {e}")
+                return None
+            load_ms = (time.time() - start) * 1000
+            backend = self.register_loaded(name, model, processor, load_ms)
+            tts_backends_logger.info(f"📥 TTS backend {name} loaded in {load_ms:.0f}ms "
+                                     f"({backend.memory_bytes / 1024 ** 2:.0f}MB)")
+            backend = self._use_resident(name)
+            self._evict_over_budget()
+            return backend
+
+    def release(self, name: str):
+        """The synthesis that acquired `name` is done"""
+        with self._lock:
+            backend = self._resident.get(name)
+            if backend is not None and backend.in_use > 0:
+                backend.in_use -= 1
+
+    def evict(self, name: str) -> bool:
+        """Unload an idle, unpinned backend"""
+        with self._lock:
+            backend = self._resident.get(name)
+            if backend is None or backend.in_use > 0 or name in self.pinned:
+                return False
+            del self._resident[name]
+            self._backend_stats[name]["evictions"] += 1
+        resident_s = time.time() - backend.loaded_at
+        backend.model = backend.processor = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        tts_backends_logger.info(f"📤 TTS backend {name} evicted after {resident_s:.0f}s resident "
+                                 f"({backend.memory_bytes / 1024 ** 2:.0f}MB freed)")
+        return True
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(backend.memory_bytes for backend in self._resident.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            backends = {}
+            for name, stats in self._backend_stats.items():
+                backend = self._resident.get(name)
+                entry = dict(stats)
+                entry["resident"] = backend is not None
+                entry["pinned"] = name in self.pinned
+                entry["memory_mb"] = backend.memory_bytes / 1024 ** 2 if backend is not None else 0.0
+                entry["resident_s"] = now - backend.loaded_at if backend is not None else 0.0
+                entry["in_use"] = backend.in_use if backend is not None else 0
+                entry["avg_load_ms"] = stats["total_load_ms"] / stats["loads"] if stats["loads"] else 0.0
+                backends[name] = entry
+            resident = list(self._resident)
+        return {
+            "backends": backends,
+            "resident": resident,
+            "resident_mb": self.resident_bytes() / 1024 ** 2,
+            "memory_budget_mb": self.memory_budget_bytes / 1024 ** 2,
+        }
+
+    def _use_resident(self, name: str) -> Optional[TTSBackend]:
+        with self._lock:
+            backend = self._resident.get(name)
+            if backend is None:
+                return None
+            self._resident.move_to_end(name)
+            backend.in_use += 1
+            backend.last_used = time.time()
+            self._backend_stats[name]["uses"] += 1
+            return backend
+
+    def _recently_failed(self, name: str) -> bool:
+        with self._lock:
+            failed_at = self._failed_at.get(name)
+        return failed_at is not None and time.time() - failed_at < self.load_retry_s
+
+    def _eviction_candidates(self, keep: str) -> list:
+        with self._lock:
+            return [name for name, backend in self._resident.items()
+                    if name != keep and name not in self.pinned and backend.in_use == 0]
+
+    def _make_room_for_load(self, name: str):
+        if not self.min_free_vram_bytes:
+            return
+        for candidate in self._eviction_candidates(name):
+            free = free_vram_bytes()
+            if free is None or free >= self.min_free_vram_bytes:
+                return
+            self.evict(candidate)
+
+    def _evict_over_budget(self):
+        if not self.memory_budget_bytes:
+            return
+        for candidate in self._eviction_candidates(keep=""):
+            if self.resident_bytes() <= self.memory_budget_bytes:
+                return
+            self.evict(candidate)
@@ -0,0 +1,270 @@
+"""
+Cross-session TTS micro-batching
+Every synthesis used to be a single-item generate(), so when several sessions finished their
+LLM turns together their segments were synthesized one after another. The scheduler collects
+the segments pending from all sessions for at most a few milliseconds, synthesizes them as one
+padded batch and hands every caller its own audio. A lone request waits at most `max_wait_ms`.
+"""
+
+import asyncio
+import io
+import logging
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# Setup logging
+tts_batcher_logger = logging.getLogger("tts_batcher")
+
+# (text, language, emotion) of one segment
+BatchItem = Tuple[str, str, str]
+
+
+def wav_duration_s(audio_bytes: bytes) -> float:
+    """Length of a WAV payload in seconds (0.0 if it cannot be parsed)"""
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except Exception:
+        return 0.0
+
+
+class BatchCancellation:
+    """Cancellation of a whole batch: set once every request in it is cancelled"""
+
+    def __init__(self, tokens: List[Optional[Any]]):
+        self.tokens = tokens
+        self.turn_id = ",".join(str(getattr(token, "turn_id", "")) for token in tokens if token is not None)
+
+    @property
+    def is_cancelled(self) -> bool:
+        return all(token is not None and token.is_cancelled for token in self.tokens)
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        cancelled = False
+        for token in self.tokens:
+            if token is not None:
+                cancelled = token.cancel(reason) or cancelled
+        return cancelled
+
+
+@dataclass
+class TTSRequest:
+    """One segment waiting for a batch"""
+    text: str
+    language: str
+    emotion: str
+    cancel_token: Optional[Any]
+    future: asyncio.Future
+    submitted_at: float = field(default_factory=time.time)
+    voice: Optional[str] = None
+
+    @property
+    def live(self) -> bool:
+        return not self.future.done() and not (self.cancel_token is not None and self.cancel_token.is_cancelled)
+
+
+class TTSBatchScheduler:
+    """
+    Gather TTS segments from all sessions into padded batches
+
+    `synthesize()` queues a segment and waits for its audio. One scheduler task takes the
+    oldest pending segment, waits until `max_batch_size` segments of the same language and
+    voice are pending or the oldest one has waited `max_wait_ms`, and runs them through `run_batch` in
+    one call; results go back to each caller in the order of the batch. Segments that arrive
+    while batches run form the next one. Cancelled segments are dropped before batching.
+
+    Args:
+        run_batch: Coroutine function `(items, cancel_token, voice) -> list of audio bytes (or None)`
+        max_batch_size: Most segments per batch (1 = no batching)
+        max_wait_ms: Longest a segment waits for others before its batch starts
+        max_concurrent_batches: Batches in flight at once (e.g. one per TTS worker process)
+        audio_seconds: Duration of one result, for throughput reporting
+    """
+
+    def __init__(self, run_batch: Callable[[List[BatchItem], Any, Optional[str]], Awaitable[List[Optional[bytes]]]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, max_concurrent_batches: int = 1,
+                 audio_seconds: Callable[[bytes], float] = wav_duration_s):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.audio_seconds = audio_seconds
+        self.closed = False
+        self._pending: Deque[TTSRequest] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._first_request_at: Optional[float] = None
+        self._last_batch_end: Optional[float] = None
+        self._by_size: Dict[int, Dict[str, float]] = {}
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "dropped_cancelled": 0,
+            "failed_batches": 0,
+            "max_batch_size_seen": 0,
+            "total_wait_ms": 0.0,
+            "audio_s": 0.0,
+            "run_s": 0.0,
+        }
+
+    async def synthesize(self, text: str, language: str = "en", emotion: str = "neutral",
+                         cancel_token: Optional[Any] = None, voice: Optional[str] = None) -> Optional[bytes]:
+        """Queue one segment for the next batch and wait for its audio"""
+        if self.closed or (cancel_token is not None and cancel_token.is_cancelled):
+            return None
+        self._ensure_running()
+        now = time.time()
+        if self._first_request_at is None:
+            self._first_request_at = now
+        request = TTSRequest(text, language, emotion, cancel_token, self._loop.create_future(), now, voice)
+        self.stats["requests"] += 1
+        self._pending.append(request)
+        self._wakeup.set()
+        return await request.future  # A caller that is cancelled leaves a done future: skipped
+
+    def close(self):
+        """Stop batching; pending callers get None"""
+        self.closed = True
+        for request in self._pending:
+            if not request.future.done():
+                request.future.set_result(None)
+        self._pending.clear()
+        for task in [self._task, *self._running]:
+            if task is not None and not task.done():
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["pending"] = len(self._pending)
+        segments = sum(size * entry["batches"] for size, entry in self._by_size.items())
+        stats["avg_batch_size"] = segments / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["requests"] if stats["requests"] else 0.0
+        # Synthesized audio seconds per second of synthesis, for each batch size (concurrency)
+        stats["throughput_by_batch_size"] = {
+            size: {"batches": int(entry["batches"]), "audio_s_per_s": entry["audio_s"] / entry["run_s"]
+                   if entry["run_s"] else 0.0}
+            for size, entry in sorted(self._by_size.items())
+        }
+        wall_s = (self._last_batch_end or 0.0) - (self._first_request_at or 0.0)
+        stats["audio_s_per_wall_s"] = stats["audio_s"] / wall_s if wall_s > 0 else 0.0
+        return stats
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # First use, or a new event loop (the old task and its waiters died with that loop)
+            if self._loop is not loop:
+                self._pending.clear()
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._running = set()
+            self._task = loop.create_task(self._schedule())
+
+    async def _schedule(self):
+        while not self.closed:
+            self._drop_dead()
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # Segments keep arriving while every batch slot is busy: they batch up meanwhile
+            await self._slots.acquire()
+            batch = await self._gather_batch()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._batch_done)
+
+    async def _gather_batch(self) -> List[TTSRequest]:
+        self._drop_dead()
+        if not self._pending:
+            return []
+        first = self._pending[0]
+        deadline = first.submitted_at + self.max_wait_s
+        while self._compatible_count(first) < self.max_batch_size and time.time() < deadline:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, deadline - time.time()))
+            except asyncio.TimeoutError:
+                break
+        return self._take_batch(first)
+
+    def _batch_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._slots.release()
+
+    def _drop_dead(self):
+        while self._pending and not self._pending[0].live:
+            request = self._pending.popleft()
+            if not request.future.done():
+                request.future.set_result(None)
+            self.stats["dropped_cancelled"] += 1
+
+    @staticmethod
+    def _compatible(request: TTSRequest, first: TTSRequest) -> bool:
+        return request.language == first.language and request.voice == first.voice
+
+    def _compatible_count(self, first: TTSRequest) -> int:
+        return sum(1 for request in self._pending if self._compatible(request, first) and request.live)
+
+    def _take_batch(self, first: TTSRequest) -> List[TTSRequest]:
+        """Up to max_batch_size live requests of one language and voice, oldest first; others keep their place"""
+        batch: List[TTSRequest] = []
+        remaining: Deque[TTSRequest] = deque()
+        for request in self._pending:
+            if not request.live:
+                if not request.future.done():
+                    request.future.set_result(None)
+                self.stats["dropped_cancelled"] += 1
+            elif self._compatible(request, first) and len(batch) < self.max_batch_size:
+                batch.append(request)
+            else:
+                remaining.append(request)
+        self._pending = remaining
+        return batch
+
+    async def _execute(self, batch: List[TTSRequest]):
+        started_at = time.time()
+        for request in batch:
+            self.stats["total_wait_ms"] += (started_at - request.submitted_at) * 1000
+        items = [(request.text, request.language, request.emotion) for request in batch]
+        batch_token = BatchCancellation([request.cancel_token for request in batch])
+        try:
+            results = list(await self.run_batch(items, batch_token, batch[0].voice))
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} results for {len(batch)} segments")
+        except Exception as e:
+            tts_batcher_logger.error(f"❌ TTS batch of {len(batch)} failed: {e}")
+            self.stats["failed_batches"] += 1
+            results = [None] * len(batch)
+        run_s = time.time() - started_at
+        self._last_batch_end = time.time()
+
+        audio_s = sum(self.audio_seconds(audio) for audio in results if audio)
+        size = len(batch)
+        entry = self._by_size.setdefault(size, {"batches": 0, "audio_s": 0.0, "run_s": 0.0})
+        entry["batches"] += 1
+        entry["audio_s"] += audio_s
+        entry["run_s"] += run_s
+        self.stats["batches"] += 1
+        self.stats["batched_requests"] += size if size > 1 else 0
+        self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], size)
+        self.stats["audio_s"] += audio_s
+        self.stats["run_s"] += run_s
+        tts_batcher_logger.debug(f"🎵 TTS batch of {size} ({batch[0].language}): {audio_s:.2f}s audio in "
+                                 f"{run_s * 1000:.0f}ms")
+
+        for request, audio in zip(batch, results):
+            if not request.future.done():
+                cancelled = request.cancel_token is not None and request.cancel_token.is_cancelled
+                request.future.set_result(None if cancelled else audio)
@@ -0,0 +1,256 @@
+"""
+Two-tier cache of synthesized TTS audio
+Short replies ("Sure!", greetings, the fixed error text) come back again and again, and each
+one used to cost a full Chatterbox synthesis. Audio is cached under a key derived from the
+normalized text, language, emotion, voice and model version: a byte-bounded LRU in memory,
+backed by content-addressed files on disk that are read through mmap and survive restarts.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Setup logging
+tts_cache_logger = logging.getLogger("tts_cache")
+
+# Bump when the cached audio format changes; old files then simply stop matching
+TTS_CACHE_VERSION = 2
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Text as far as the TTS is concerned: NFKC, single spaces, no surrounding whitespace"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(text: str, language: str, emotion: str, voice: str, model_version: str) -> str:
+    """Content address of one synthesis"""
+    material = "\x1f".join([str(TTS_CACHE_VERSION), model_version, voice, language, emotion, normalize_text(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Memory LRU + on-disk store of synthesized audio bytes
+
+    `get()` looks in memory first, then on disk (a disk hit is promoted to memory); `put()`
+    stores in both tiers. Each tier is evicted least-recently-used first under its byte
+    budget. Disk files are named by key, so restarts and other processes sharing the
+    directory find the same entries. A disk budget of 0 keeps the cache in memory only.
+    """
+
+    def __init__(self, memory_budget_bytes: int = 64 * 1024 ** 2, disk_budget_bytes: int = 0,
+                 disk_dir: Optional[str] = None, max_chars: int = 200):
+        self.memory_budget_bytes = int(memory_budget_bytes)
+        self.disk_budget_bytes = int(disk_budget_bytes) if disk_dir else 0
+        self.disk_dir = disk_dir
+        self.max_chars = max_chars
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, oldest use first
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped_too_long": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "disk_errors": 0,
+        }
+
+        if self.disk_budget_bytes > 0:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._scan_disk()
+
+        tts_cache_logger.info(
+            f"💾 TTS audio cache ready (memory {self.memory_budget_bytes / 1024 ** 2:.0f}MB, "
+            f"disk {self.disk_budget_bytes / 1024 ** 2:.0f}MB, {len(self._disk)} entries on disk)"
+        )
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["TTSAudioCache"]:
+        """The cache described by the `tts` config section, or None if it is disabled"""
+        tts_config = getattr(config, 'tts', None)
+        if not getattr(tts_config, 'cache_enabled', True):
+            return None
+        mb = 1024 ** 2
+        disk_dir = getattr(tts_config, 'cache_dir', '') or os.path.join(config.model.cache_dir, "tts_cache")
+        return cls(
+            memory_budget_bytes=getattr(tts_config, 'cache_memory_budget_mb', 64) * mb,
+            disk_budget_bytes=getattr(tts_config, 'cache_disk_budget_mb', 512) * mb,
+            disk_dir=disk_dir,
+            max_chars=getattr(tts_config, 'cache_max_chars', 200),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def cacheable(self, text: str) -> bool:
+        """Long one-off replies are not worth the space"""
+        return bool(text and text.strip()) and (not self.max_chars or len(normalize_text(text)) <= self.max_chars)
+
+    def get(self, text: str, language: str = "en", emotion: str = "neutral", voice: str = "default",
+            model_version: str = "") -> Optional[bytes]:
+        """Cached audio for this synthesis, or None"""
+        if not self.cacheable(text):
+            return None
+        key = cache_key(text, language, emotion, voice, model_version)
+        with self._lock:
+            audio_bytes = self._memory.get(key)
+            if audio_bytes is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return audio_bytes
+            if key in self._disk:
+                audio_bytes = self._read_disk(key)
+                if audio_bytes is not None:
+                    self._disk.move_to_end(key)
+                    self.stats["disk_hits"] += 1
+                    self._store_memory(key, audio_bytes)
+                    return audio_bytes
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, text: str, audio_bytes: bytes, language: str = "en", emotion: str = "neutral",
+            voice: str = "default", model_version: str = ""):
+        """Store a synthesis in both tiers"""
+        if not audio_bytes or not self.cacheable(text):
+            if audio_bytes:
+                self.stats["skipped_too_long"] += 1
+            return
+        key = cache_key(text, language, emotion, voice, model_version)
+        with self._lock:
+            self.stats["stores"] += 1
+            self._store_memory(key, audio_bytes)
+            if self.disk_budget_bytes > 0 and key not in self._disk and len(audio_bytes) <= self.disk_budget_bytes:
+                self._write_disk(key, audio_bytes)
+
+    def clear(self):
+        """Drop every entry, in memory and on disk"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in list(self._disk):
+                self._delete_disk(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_entries"] = len(self._disk)
+            stats["disk_bytes"] = self._disk_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Tiers (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _store_memory(self, key: str, audio_bytes: bytes):
+        if len(audio_bytes) > self.memory_budget_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio_bytes
+        self._memory_bytes += len(audio_bytes)
+        while self._memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.audio")
+
+    def _scan_disk(self):
+        """Index the files already on disk, oldest use first, and trim them to the budget"""
+        found = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    # Left behind by an interrupted write
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                    continue
+                if not name.endswith(".audio"):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._enforce_disk_budget()
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as audio_file:
+                with mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    audio_bytes = mapped[:]
+            os.utime(path)  # Recency survives restarts
+        except (OSError, ValueError) as e:
+            tts_cache_logger.debug(f"💾 Dropping unreadable TTS cache entry {key[:12]}: {e}")
+            self.stats["disk_errors"] += 1
+            self._delete_disk(key)
+            return None
+        if len(audio_bytes) != self._disk[key]:
+            self.stats["disk_errors"] += 1
+            self._delete_disk(key)
+            return None
+        return audio_bytes
+
+    def _write_disk(self, key: str, audio_bytes: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as audio_file:
+                audio_file.write(audio_bytes)
+            os.replace(tmp_path, path)  # Readers never see a partial file
+        except OSError as e:
+            tts_cache_logger.warning(f"⚠️ Could not write TTS cache entry {key[:12]}: {e}")
+            self.stats["disk_errors"] += 1
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._disk[key] = len(audio_bytes)
+        self._disk_bytes += len(audio_bytes)
+        self._enforce_disk_budget()
+
+    def _enforce_disk_budget(self):
+        while self._disk_bytes > self.disk_budget_bytes and self._disk:
+            key = next(iter(self._disk))
+            self._delete_disk(key)
+            self.stats["disk_evictions"] += 1
+
+    def _delete_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
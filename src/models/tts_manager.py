@@ -5,9 +5,21 @@ Converts text responses to audio for voice output
 
 import torch
 import numpy as np
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import asyncio
+import functools
 import logging
-import io
+
+from src.models.cancellation import CancellationToken, cancellation_stopping_criteria
+from src.models.model_snapshot import default_snapshot_dir, load_component, load_manifest
+from src.models.tts_backends import TTSBackendRegistry
+from src.models.tts_batcher import BatchItem, TTSBatchScheduler
+from src.models.tts_cache import TTSAudioCache
+from src.models.tts_worker import TTSWorkerPool
+from src.models.voice_profiles import DEFAULT_VOICE, VoiceConditioningCache, VoiceProfile, load_voice_profiles
+from src.utils.audio_io import encode_wav_bytes
+from src.utils.audio_output import resample
+from src.utils.config import config
 
 # Setup logging
 tts_logger = logging.getLogger("tts_manager")
@@ -34,11 +46,20 @@ LANGUAGE_MODELS = {
     "bn": "indic-tts",       # Bengali
 }
 
+# Used when neither the model nor its processor declares its output rate
+DEFAULT_SAMPLE_RATE = 22050
+
 # PHASE 5: Supported languages by model
 CHATTERBOX_LANGUAGES = ["en", "hi", "es", "fr", "de", "it", "pt", "ja", "ko", "zh"]
 DIA_TTS_LANGUAGES = ["ms"]
 INDIC_TTS_LANGUAGES = ["ta", "te", "mr", "kn", "ml", "bn"]
 
+# Checkpoints of the backends loaded on first use (tts.backend_models overrides)
+DEFAULT_BACKEND_MODELS = {
+    "dia-tts": "nari-labs/Dia-1.6B-0626",
+    "indic-tts": "ai4bharat/indic-parler-tts",
+}
+
 
 class TTSManager:
     """
@@ -51,31 +72,74 @@ class TTSManager:
     - Generates audio bytes for streaming
     """
     
-    def __init__(self, model_name: str = "chatterbox", device: str = "cuda"):
+    def __init__(self, model_name: str = "chatterbox", device: str = "cuda",
+                 worker_processes: Optional[int] = None, use_audio_cache: bool = True,
+                 batch_max_size: Optional[int] = None, voice: Optional[str] = None):
         """
         Initialize TTSManager
         
         Args:
             model_name: TTS model to use (default: "chatterbox")
             device: Device to run model on ("cuda" or "cpu")
+            worker_processes: Synthesize in this many worker processes, each with its own model
+                (default: tts.worker_processes; 0 loads the model and synthesizes in-process)
+            use_audio_cache: Serve repeated phrases from the TTS audio cache
+            batch_max_size: Batch segments of concurrent sessions up to this size
+                (default: tts.batch_max_size; 1 synthesizes every segment on its own)
+            voice: Voice profile used when a synthesis names none (default: tts.voice_profile)
         """
         self.model_name = model_name
+        self.requested_device = device
         self.device = device if torch.cuda.is_available() else "cpu"
         self.model = None
         self.processor = None
         self.is_initialized = False
+        self.model_version = model_name  # Part of the audio cache key; refined once weights are loaded
+        self.audio_cache = TTSAudioCache.from_config(config) if use_audio_cache else None
+        tts_config = getattr(config, 'tts', None)
+        # Named voices; their speaker conditioning is computed once and reused by every synthesis
+        self.voice_profiles: Dict[str, VoiceProfile] = load_voice_profiles(getattr(tts_config, 'voice_profiles', {}))
+        self.voice_cache = VoiceConditioningCache.from_config(config)
+        self.voice = DEFAULT_VOICE  # What an unknown configured voice falls back to
+        self.voice = self._resolve_voice(voice or getattr(tts_config, 'voice_profile', '') or DEFAULT_VOICE)
+        if worker_processes is None:
+            worker_processes = getattr(getattr(config, 'tts', None), 'worker_processes', 0)
+        self.worker_processes = max(0, int(worker_processes))
+        self.worker_pool: Optional[TTSWorkerPool] = None
+        if batch_max_size is None:
+            batch_max_size = getattr(tts_config, 'batch_max_size', 1)
+        self.batch_scheduler: Optional[TTSBatchScheduler] = None
+        if batch_max_size > 1:
+            self.batch_scheduler = TTSBatchScheduler(
+                self._run_batch, max_batch_size=batch_max_size,
+                max_wait_ms=getattr(tts_config, 'batch_max_wait_ms', 10.0),
+                max_concurrent_batches=max(1, self.worker_processes))
+        # Dia-TTS and Indic-TTS load on first use of one of their languages; Chatterbox is pinned
+        backend_models = getattr(tts_config, 'backend_models', DEFAULT_BACKEND_MODELS)
+        self.backends = TTSBackendRegistry(
+            {name: functools.partial(self._load_backend, name, repo) for name, repo in backend_models.items()},
+            memory_budget_bytes=getattr(tts_config, 'backend_memory_budget_mb', 0) * 1024 ** 2,
+            min_free_vram_bytes=getattr(tts_config, 'backend_min_free_vram_mb', 1024) * 1024 ** 2,
+            pinned=("chatterbox",))
         
-        tts_logger.info(f"🎵 Initializing TTSManager (model={model_name}, device={self.device})")
+        tts_logger.info(f"🎵 Initializing TTSManager (model={model_name}, device={self.device}, "
+                        f"worker_processes={self.worker_processes})")
         self.initialize()
     
     def initialize(self) -> None:
         """Initialize TTS model"""
+        if self.worker_processes > 0:
+            self._start_worker_pool()
+            return
         try:
             if self.model_name == "chatterbox":
                 # Try to import and initialize Chatterbox TTS
                 try:
                     from transformers import AutoModel, AutoProcessor
-                    
+
+                    if self._load_from_snapshot(AutoModel, AutoProcessor):
+                        return
+
                     tts_logger.info("📥 Loading Chatterbox TTS processor...")
                     self.processor = AutoProcessor.from_pretrained(
                         "resemble-ai/chatterbox",
@@ -89,6 +153,8 @@ class TTSManager:
                     ).to(self.device)
                     
                     self.model.eval()
+                    self.model_version = f"resemble-ai/chatterbox:{getattr(self.model, 'dtype', '')}"
+                    self.backends.register_loaded("chatterbox", self.model, self.processor)
                     self.is_initialized = True
                     tts_logger.info("✅ Chatterbox TTS initialized successfully")
                     
@@ -105,8 +171,74 @@ class TTSManager:
             tts_logger.error(f"❌ TTS initialization failed: {e}")
             self.is_initialized = False
     
+    def _start_worker_pool(self) -> None:
+        """Load the model in worker processes instead of here; synthesis then never blocks this process"""
+        tts_config = getattr(config, 'tts', None)
+        self.worker_pool = TTSWorkerPool(
+            functools.partial(TTSManager, self.model_name, self.requested_device,
+                              worker_processes=0, use_audio_cache=False, batch_max_size=1, voice=self.voice),
+            num_workers=self.worker_processes,
+            buffer_bytes=getattr(tts_config, 'worker_buffer_mb', 16) * 1024 ** 2,
+            start_timeout_s=getattr(tts_config, 'worker_start_timeout_s', 300.0),
+            request_timeout_s=getattr(tts_config, 'worker_request_timeout_s', 120.0),
+        )
+        try:
+            self.is_initialized = self.worker_pool.start()
+        except Exception as e:
+            tts_logger.error(f"❌ TTS worker processes failed to start: {e}")
+            self.is_initialized = False
+        if self.is_initialized:
+            self.model_version = self.worker_pool.model_version or self.model_version
+            tts_logger.info(f"✅ Chatterbox TTS running in {self.worker_processes} worker process(es)")
+        else:
+            self.worker_pool.close()
+
+    def close(self) -> None:
+        """Stop batching and the TTS worker processes"""
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.close()
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+    def _load_from_snapshot(self, model_cls, processor_cls) -> bool:
+        """Load the TTS model from the local model snapshot if it has one (no network)"""
+        if not getattr(config.model, 'snapshot_enabled', True):
+            return False
+        snapshot_dir = getattr(config.model, 'snapshot_dir', '') or default_snapshot_dir(
+            config.model.cache_dir, config.model.name)
+        manifest = load_manifest(snapshot_dir, config.model.name)
+        if manifest is None or "tts" not in manifest["components"]:
+            return False
+        try:
+            model, self.processor = load_component(snapshot_dir, "tts", model_cls, processor_cls,
+                                                   trust_remote_code=True)
+        except Exception as e:
+            tts_logger.warning(f"⚠️ TTS snapshot load failed ({e}) - loading from the hub")
+            return False
+        self.model = model.to(self.device)
+        self.model.eval()
+        self.backends.register_loaded("chatterbox", self.model, self.processor)
+        component = manifest["components"]["tts"]
+        self.model_version = (f"snapshot:{manifest.get('created_at', 0):.0f}:{component.get('dtype', '')}:"
+                              f"{component.get('quantization', '')}")
+        self.is_initialized = True
+        tts_logger.info(f"✅ Chatterbox TTS loaded from snapshot {snapshot_dir}")
+        return True
+
+    def _load_backend(self, name: str, repo: str):
+        """Registry loader of a language backend (runs on a thread on its first use)"""
+        from transformers import AutoModel, AutoProcessor
+
+        tts_logger.info(f"📥 Loading {name} TTS backend from {repo}...")
+        processor = AutoProcessor.from_pretrained(repo, trust_remote_code=True)
+        model = AutoModel.from_pretrained(repo, trust_remote_code=True).to(self.device)
+        model.eval()
+        return model, processor
+
     async def synthesize(self, text: str, language: str = "en",
-                        emotion: str = "neutral") -> Optional[bytes]:
+                        emotion: str = "neutral",
+                        cancel_token: Optional[CancellationToken] = None,
+                        voice: Optional[str] = None) -> Optional[bytes]:
         """
         Synthesize text to speech with language support
 
@@ -114,15 +246,19 @@ class TTSManager:
             text: Text to synthesize
             language: Language code (e.g., "en", "hi")
             emotion: Emotion/style (e.g., "neutral", "happy", "sad")
+            cancel_token: Turn cancellation; a cancelled turn gets no audio
+            voice: Voice profile ID (default: the manager's voice)
 
         Returns:
-            Audio bytes in WAV format, or None if synthesis fails
+            Audio bytes in WAV format, or None if synthesis fails or the turn was cancelled
         """
         # PHASE 5: Use language-aware synthesis with fallback
-        return await self.synthesize_with_fallback(text, language, emotion)
+        return await self.synthesize_with_fallback(text, language, emotion, cancel_token=cancel_token, voice=voice)
 
     async def synthesize_with_fallback(self, text: str, language: str = "en",
-                                       emotion: str = "neutral") -> Optional[bytes]:
+                                       emotion: str = "neutral",
+                                       cancel_token: Optional[CancellationToken] = None,
+                                       voice: Optional[str] = None) -> Optional[bytes]:
         """
         PHASE 5: Synthesize with language-specific TTS and fallback support
 
@@ -130,6 +266,8 @@ class TTSManager:
             text: Text to synthesize
             language: Language code (e.g., "en", "hi", "ms", "ta")
             emotion: Emotion/style (e.g., "neutral", "happy", "sad")
+            cancel_token: Turn cancellation; checked before and during synthesis
+            voice: Voice profile ID (default: the manager's voice)
 
         Returns:
             Audio bytes in WAV format, or None if synthesis fails
@@ -142,28 +280,134 @@ class TTSManager:
             tts_logger.warning("⚠️ TTS not initialized, returning None")
             return None
 
+        if cancel_token is not None and cancel_token.is_cancelled:
+            tts_logger.debug(f"🛑 Skipping synthesis for cancelled turn {cancel_token.turn_id}")
+            return None
+
         try:
-            # PHASE 5: Get model for language with fallback
-            model_name = LANGUAGE_MODELS.get(language, "chatterbox")
-            tts_logger.info(f"🌍 [PHASE 5] Synthesizing '{text[:30]}...' (lang={language}, model={model_name})")
-
-            # Route to appropriate synthesis method
-            if model_name == "chatterbox":
-                return await self._synthesize_chatterbox(text, language, emotion)
-            elif model_name == "dia-tts":
-                return await self._synthesize_dia(text, language, emotion)
-            elif model_name == "indic-tts":
-                return await self._synthesize_indic(text, language, emotion)
+            voice = self._resolve_voice(voice)
+            # Repeated phrases cost a lookup instead of a synthesis
+            if self.audio_cache is not None:
+                audio_bytes = self.audio_cache.get(text, language, emotion, voice, self.model_version)
+                if audio_bytes is not None:
+                    tts_logger.debug(f"💾 TTS cache hit for '{text[:30]}' ({len(audio_bytes)} bytes)")
+                    return audio_bytes
+
+            if self.batch_scheduler is not None:
+                # Batched with the segments other sessions are waiting on
+                audio_bytes = await self.batch_scheduler.synthesize(text, language, emotion, cancel_token, voice)
+            elif self.worker_pool is not None:
+                # Synthesized in a worker process; this coroutine only waits for the audio
+                audio_bytes = await self.worker_pool.synthesize(text, language, emotion, cancel_token, voice)
             else:
-                tts_logger.warning(f"⚠️ Unknown model: {model_name}, falling back to Chatterbox")
-                return await self._synthesize_chatterbox(text, language, emotion)
+                audio_bytes = await self._synthesize_routed(text, language, emotion, cancel_token, voice)
+
+            if audio_bytes and self.audio_cache is not None:
+                self.audio_cache.put(text, audio_bytes, language, emotion, voice, self.model_version)
+            return audio_bytes
 
         except Exception as e:
             tts_logger.error(f"❌ Synthesis with fallback failed: {e}")
             return None
 
+    async def synthesize_batch(self, items: List[BatchItem], cancel_token: Optional[Any] = None,
+                               voice: Optional[str] = None) -> List[Optional[bytes]]:
+        """
+        Synthesize several segments in one padded Chatterbox generate() call
+
+        Used for the batch scheduler's batches, in-process or inside a worker process. Batches of
+        one, mixed languages and languages not served by Chatterbox are synthesized one by one.
+
+        Args:
+            items: (text, language, emotion) per segment
+            cancel_token: Cancellation of the whole batch
+            voice: Voice profile ID of every segment (default: the manager's voice)
+
+        Returns:
+            WAV bytes (or None) per segment, in the order of `items`
+        """
+        voice = self._resolve_voice(voice)
+        language = items[0][1] if items else "en"
+        if (len(items) > 1 and self.model is not None and LANGUAGE_MODELS.get(language, "chatterbox") == "chatterbox"
+                and all(item_language == language for _, item_language, _ in items)):
+            return await asyncio.to_thread(self._generate_chatterbox_batch, [text for text, _, _ in items],
+                                           language, cancel_token, voice)
+        return [await self._synthesize_routed(text, item_language, emotion, cancel_token, voice)
+                for text, item_language, emotion in items]
+
+    async def _run_batch(self, items: List[BatchItem], cancel_token: Optional[Any],
+                         voice: Optional[str]) -> List[Optional[bytes]]:
+        """Batch scheduler backend: one worker request per batch, or in-process synthesis"""
+        if self.worker_pool is not None:
+            return await self.worker_pool.synthesize_batch(items, cancel_token, voice)
+        return await self.synthesize_batch(items, cancel_token, voice)
+
+    async def _synthesize_routed(self, text: str, language: str, emotion: str,
+                                 cancel_token: Optional[CancellationToken],
+                                 voice: str = DEFAULT_VOICE) -> Optional[bytes]:
+        """One segment through the model serving its language"""
+        # PHASE 5: Get model for language with fallback
+        model_name = LANGUAGE_MODELS.get(language, "chatterbox")
+        tts_logger.info(f"🌍 [PHASE 5] Synthesizing '{text[:30]}...' (lang={language}, model={model_name})")
+
+        # Route to appropriate synthesis method
+        if model_name == "chatterbox":
+            return await self._synthesize_chatterbox(text, language, emotion, cancel_token, voice)
+        elif model_name == "dia-tts":
+            return await self._synthesize_dia(text, language, emotion, cancel_token)
+        elif model_name == "indic-tts":
+            return await self._synthesize_indic(text, language, emotion, cancel_token)
+        tts_logger.warning(f"⚠️ Unknown model: {model_name}, falling back to Chatterbox")
+        return await self._synthesize_chatterbox(text, language, emotion, cancel_token, voice)
+
+    def _generate_chatterbox_batch(self, texts: List[str], language: str, cancel_token: Optional[Any],
+                                   voice: str = DEFAULT_VOICE) -> List[Optional[bytes]]:
+        """Padded batch generate(); runs on a thread so the event loop keeps serving sessions"""
+        try:
+            conditioning = self._voice_conditioning(voice)
+            if conditioning is None:
+                return [None] * len(texts)
+            # The cached tensors are per speaker (batch of 1): every row of the batch shares them
+            conditioning = {name: tensor.expand(len(texts), *tensor.shape[1:]) if tensor.dim() and tensor.shape[0] == 1
+                            else tensor for name, tensor in conditioning.items()}
+            with torch.no_grad():
+                inputs = self.processor(
+                    text=texts,
+                    language=language,
+                    padding=True,
+                    return_tensors="pt"
+                ).to(self.device)
+
+                generate_kwargs = {}
+                if cancel_token is not None and hasattr(self.model, "generation_config"):
+                    generate_kwargs["stopping_criteria"] = cancellation_stopping_criteria(cancel_token)
+                outputs = self.model.generate(**inputs, **conditioning, **generate_kwargs)
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return [None] * len(texts)
+            tts_logger.debug(f"✅ [PHASE 5] Chatterbox synthesized a batch of {len(texts)}")
+            return [self._convert_to_audio_bytes(item) for item in self._split_batch_outputs(outputs, len(texts))]
+        except Exception as e:
+            tts_logger.error(f"❌ [PHASE 5] Chatterbox batch synthesis failed: {e}")
+            return [None] * len(texts)
+
+    @staticmethod
+    def _split_batch_outputs(outputs, batch_size: int) -> list:
+        """Per-item audio of a batched generate(), trimmed to each item's length when reported"""
+        lengths = None
+        if isinstance(outputs, dict):
+            lengths = outputs.get("audio_lengths", outputs.get("lengths"))
+            outputs = outputs.get("audio")
+        if outputs is None:
+            return [None] * batch_size
+        items = list(outputs) if isinstance(outputs, (list, tuple)) else [outputs[i] for i in range(batch_size)]
+        if lengths is not None:
+            items = [item[..., :int(length)] for item, length in zip(items, lengths)]
+        return items
+
     async def _synthesize_chatterbox(self, text: str, language: str = "en",
-                                     emotion: str = "neutral") -> Optional[bytes]:
+                                     emotion: str = "neutral",
+                                     cancel_token: Optional[CancellationToken] = None,
+                                     voice: str = DEFAULT_VOICE) -> Optional[bytes]:
         """
         PHASE 5: Synthesize using Chatterbox TTS
         PHASE 7: Support emotion parameter for emotional expressiveness
@@ -172,41 +416,40 @@ class TTSManager:
             text: Text to synthesize
             language: Language code
             emotion: Emotion/style
+            cancel_token: Turn cancellation; stops generation and drops the audio
+            voice: Voice profile ID; its cached speaker conditioning is passed to generate()
 
         Returns:
             Audio bytes in WAV format
         """
         try:
             # PHASE 7: Log emotion being used
-            tts_logger.debug(f"🎵 [PHASE 5] Chatterbox synthesis: '{text[:50]}...' (lang={language}, emotion={emotion})")
-
-            with torch.no_grad():
-                # Prepare inputs
-                inputs = self.processor(
-                    text=text,
-                    language=language,
-                    return_tensors="pt"
-                ).to(self.device)
-
-                # Generate audio
-                outputs = self.model.generate(**inputs)
+            tts_logger.debug(f"🎵 [PHASE 5] Chatterbox synthesis: '{text[:50]}...' (lang={language}, emotion={emotion}, voice={voice})")
 
-                # Convert to audio bytes
-                audio_bytes = self._convert_to_audio_bytes(outputs)
+            # Off the event loop: a first use of a voice runs its speaker encoder, then generate()
+            conditioning = await asyncio.to_thread(self._voice_conditioning, voice)
+            if conditioning is None:
+                return None
+            audio_bytes = await asyncio.to_thread(self._generate_wav, self.model, self.processor, text,
+                                                  cancel_token, conditioning, language=language)
+            if cancel_token is not None and cancel_token.is_cancelled:
+                tts_logger.debug(f"🛑 [PHASE 5] Discarding audio of cancelled turn {cancel_token.turn_id}")
+                return None
 
-                if audio_bytes:
-                    tts_logger.debug(f"✅ [PHASE 5] Chatterbox synthesized {len(audio_bytes)} bytes")
-                    return audio_bytes
-                else:
-                    tts_logger.warning("⚠️ [PHASE 5] Chatterbox audio conversion returned empty bytes")
-                    return None
+            if audio_bytes:
+                tts_logger.debug(f"✅ [PHASE 5] Chatterbox synthesized {len(audio_bytes)} bytes")
+                return audio_bytes
+            else:
+                tts_logger.warning("⚠️ [PHASE 5] Chatterbox audio conversion returned empty bytes")
+                return None
 
         except Exception as e:
             tts_logger.error(f"❌ [PHASE 5] Chatterbox synthesis failed: {e}")
             return None
 
     async def _synthesize_dia(self, text: str, language: str = "ms",
-                              emotion: str = "neutral") -> Optional[bytes]:
+                              emotion: str = "neutral",
+                              cancel_token: Optional[CancellationToken] = None) -> Optional[bytes]:
         """
         PHASE 5: Synthesize using Dia-TTS (Malaysian support)
 
@@ -214,23 +457,22 @@ class TTSManager:
             text: Text to synthesize
             language: Language code (e.g., "ms")
             emotion: Emotion/style
+            cancel_token: Turn cancellation
 
         Returns:
             Audio bytes in WAV format
         """
         try:
             tts_logger.info(f"🎵 [PHASE 5] Dia-TTS synthesis: '{text[:50]}...' (lang={language})")
-            # Dia-TTS implementation would go here
-            # For now, fallback to Chatterbox
-            tts_logger.warning(f"⚠️ [PHASE 5] Dia-TTS not fully implemented, using Chatterbox fallback")
-            return await self._synthesize_chatterbox(text, "en", emotion)
+            return await self._synthesize_on_backend("dia-tts", text, language, emotion, cancel_token)
 
         except Exception as e:
             tts_logger.error(f"❌ [PHASE 5] Dia-TTS synthesis failed: {e}")
             return None
 
     async def _synthesize_indic(self, text: str, language: str = "ta",
-                                emotion: str = "neutral") -> Optional[bytes]:
+                                emotion: str = "neutral",
+                                cancel_token: Optional[CancellationToken] = None) -> Optional[bytes]:
         """
         PHASE 5: Synthesize using Indic-TTS (Indian languages support)
 
@@ -238,35 +480,112 @@ class TTSManager:
             text: Text to synthesize
             language: Language code (e.g., "ta", "te", "mr")
             emotion: Emotion/style
+            cancel_token: Turn cancellation
 
         Returns:
             Audio bytes in WAV format
         """
         try:
             tts_logger.info(f"🎵 [PHASE 5] Indic-TTS synthesis: '{text[:50]}...' (lang={language})")
-            # Indic-TTS implementation would go here
-            # For now, fallback to Chatterbox
-            tts_logger.warning(f"⚠️ [PHASE 5] Indic-TTS not fully implemented, using Chatterbox fallback")
-            return await self._synthesize_chatterbox(text, "en", emotion)
+            return await self._synthesize_on_backend("indic-tts", text, language, emotion, cancel_token)
 
         except Exception as e:
             tts_logger.error(f"❌ [PHASE 5] Indic-TTS synthesis failed: {e}")
             return None
     
-    def _convert_to_audio_bytes(self, outputs) -> Optional[bytes]:
+    async def _synthesize_on_backend(self, backend_name: str, text: str, language: str, emotion: str,
+                                     cancel_token: Optional[CancellationToken]) -> Optional[bytes]:
+        """Synthesize on a lazily loaded backend; Chatterbox stands in while it cannot be loaded"""
+        backend = await self.backends.acquire(backend_name)
+        if backend is None:
+            tts_logger.warning(f"⚠️ [PHASE 5] {backend_name} unavailable, using Chatterbox fallback")
+            return await self._synthesize_chatterbox(text, "en", emotion, cancel_token)
+        try:
+            return await asyncio.to_thread(self._generate_wav, backend.model, backend.processor, text, cancel_token)
+        finally:
+            self.backends.release(backend_name)
+
+    def _generate_wav(self, model, processor, text, cancel_token: Optional[CancellationToken],
+                      conditioning: Optional[Dict[str, torch.Tensor]] = None, **processor_kwargs) -> Optional[bytes]:
+        """One generate() call on a TTS model; None for a cancelled turn"""
+        with torch.no_grad():
+            inputs = processor(text=text, return_tensors="pt", **processor_kwargs).to(self.device)
+
+            # Generate audio (a cancelled turn stops at the next generation step)
+            generate_kwargs = {}
+            if cancel_token is not None and hasattr(model, "generation_config"):
+                generate_kwargs["stopping_criteria"] = cancellation_stopping_criteria(cancel_token)
+            outputs = model.generate(**inputs, **(conditioning or {}), **generate_kwargs)
+        if cancel_token is not None and cancel_token.is_cancelled:
+            return None
+        return self._convert_to_audio_bytes(outputs, self._output_sample_rate(model, processor))
+
+    def _resolve_voice(self, voice: Optional[str]) -> str:
+        """A known voice profile ID; unknown voices get the manager's voice"""
+        voice = voice or self.voice
+        if voice != DEFAULT_VOICE and voice not in self.voice_profiles:
+            tts_logger.warning(f"⚠️ Unknown voice '{voice}', using '{self.voice}'")
+            return self.voice
+        return voice
+
+    def _voice_conditioning(self, voice: str) -> Optional[Dict[str, torch.Tensor]]:
+        """Speaker conditioning for generate(): {} for the model's own voice, None if it cannot be computed"""
+        if voice == DEFAULT_VOICE:
+            return {}
+        conditioning = self.voice_cache.get(self.voice_profiles[voice], self.model_version,
+                                            self._compute_voice_conditioning, self.device)
+        if conditioning is None:
+            tts_logger.warning(f"⚠️ [PHASE 5] No conditioning for voice '{voice}', not synthesizing")
+        return conditioning
+
+    def _compute_voice_conditioning(self, profile: VoiceProfile) -> Dict[str, torch.Tensor]:
+        """The speaker-encoder pass over a profile's reference audio (once per voice and model version)"""
+        import soundfile as sf
+
+        audio, sample_rate = sf.read(profile.reference_audio, dtype="float32", always_2d=True)
+        audio = np.ascontiguousarray(audio.mean(axis=1), dtype=np.float32)
+        feature_extractor = getattr(self.processor, "feature_extractor", None)
+        target_rate = getattr(feature_extractor, "sampling_rate", None) or sample_rate
+        audio = resample(audio, sample_rate, target_rate)
+        with torch.no_grad():
+            features = self.processor(audio=audio, sampling_rate=target_rate, return_tensors="pt").to(self.device)
+            conditioning = {name: value for name, value in features.items()
+                            if name not in ("input_ids", "attention_mask") and isinstance(value, torch.Tensor)}
+            encode_speaker = getattr(self.model, "get_speaker_embedding", None)
+            if callable(encode_speaker):
+                conditioning = {"speaker_embedding": encode_speaker(**conditioning)}
+        return conditioning
+
+    def _output_sample_rate(self, model=None, processor=None) -> int:
+        """Sample rate of the generated audio, as declared by the model or its processor"""
+        model = model if model is not None else self.model
+        processor = processor if processor is not None else self.processor
+        for source in (getattr(model, "config", None), getattr(processor, "feature_extractor", None),
+                       processor):
+            sample_rate = getattr(source, "sampling_rate", None)
+            if isinstance(sample_rate, int) and sample_rate > 0:
+                return sample_rate
+        return DEFAULT_SAMPLE_RATE
+
+    def _convert_to_audio_bytes(self, outputs, sample_rate: Optional[int] = None) -> Optional[bytes]:
         """
         Convert model outputs to audio bytes
         
         Args:
             outputs: Model output tensor
+            sample_rate: Rate of the audio (default: the Chatterbox model's)
         
         Returns:
             Audio bytes in WAV format
         """
         try:
             # Handle different output formats
+            if outputs is None:
+                return None
             if isinstance(outputs, torch.Tensor):
-                audio_data = outputs.cpu().numpy()
+                audio_data = outputs.float().cpu().numpy()
+            elif isinstance(outputs, np.ndarray):
+                audio_data = outputs
             elif isinstance(outputs, dict):
                 # Some models return dict with 'audio' key
                 if 'audio' in outputs:
@@ -280,20 +599,18 @@ class TTSManager:
                 tts_logger.warning(f"⚠️ Unknown output type: {type(outputs)}")
                 return None
             
-            # Ensure audio is float32
-            if audio_data.dtype != np.float32:
-                audio_data = audio_data.astype(np.float32)
-            
-            # Normalize audio to [-1, 1] range
-            max_val = np.max(np.abs(audio_data))
-            if max_val > 0:
+            # Ensure audio is float32 mono
+            audio_data = np.asarray(audio_data, dtype=np.float32).reshape(-1)
+
+            # Only scale down audio that would clip: per-segment peak normalization made the
+            # loudness jump between the sentences of a streamed reply
+            max_val = np.max(np.abs(audio_data)) if audio_data.size else 0.0
+            if max_val > 1.0:
                 audio_data = audio_data / max_val * 0.95
-            
-            # Convert to WAV bytes
-            import soundfile as sf
-            wav_buffer = io.BytesIO()
-            sf.write(wav_buffer, audio_data, 22050, format='WAV')
-            wav_bytes = wav_buffer.getvalue()
+
+            # Canonical 16-bit WAV at the model's rate; each client's output format is encoded
+            # from it at send time (src/utils/audio_output.py)
+            wav_bytes = encode_wav_bytes(audio_data, sample_rate or self._output_sample_rate())
             
             tts_logger.debug(f"✅ Converted to WAV: {len(wav_bytes)} bytes")
             return wav_bytes
@@ -339,6 +656,37 @@ class TTSManager:
     def get_supported_emotions(self) -> list:
         """Get list of supported emotions/styles"""
         return ["neutral", "happy", "sad", "angry", "calm", "excited"]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Audio cache hits, misses and evictions per tier"""
+        if self.audio_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.audio_cache.get_stats()}
+
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """TTS worker process queueing, synthesis and transfer times"""
+        if self.worker_pool is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.worker_pool.get_stats()}
+
+    def get_batch_stats(self) -> Dict[str, Any]:
+        """Batch sizes, queueing and synthesized audio seconds per second by batch size"""
+        if self.batch_scheduler is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batch_scheduler.get_stats()}
+
+    def get_voice_stats(self) -> Dict[str, Any]:
+        """Voice profiles and how often their conditioning was reused instead of recomputed"""
+        stats = {"voice": self.voice, "profiles": sorted(self.voice_profiles)}
+        if self.worker_pool is not None:
+            return stats  # Each worker process computes through the shared on-disk cache
+        return {**stats, **self.voice_cache.get_stats()}
+
+    def get_backend_stats(self) -> Dict[str, Any]:
+        """Load time, residency and evictions of the per-language TTS backends"""
+        if self.worker_pool is not None:
+            return {"enabled": False}  # Each worker process keeps its own backends
+        return {"enabled": True, **self.backends.get_stats()}
     
     def __repr__(self) -> str:
         """String representation"""
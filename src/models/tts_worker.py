@@ -0,0 +1,363 @@
+"""
+TTS synthesis in dedicated worker processes
+Chatterbox generate() and the WAV encoding are blocking calls; run inside the server they
+froze the event loop for the whole synthesis and competed for the GIL with the Voxtral decode
+thread. Here each worker process owns its own TTS model. Requests go out over a per-worker
+queue, audio comes back through a shared-memory buffer owned by the server, and callers just
+await the result, so token streaming and synthesis overlap. A request may carry a whole batch
+of segments (see tts_batcher.py); their audio is packed back to back in the buffer.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional
+
+# Setup logging
+tts_worker_logger = logging.getLogger("tts_worker")
+
+# Response kinds sent back by a worker
+_READY = "ready"
+_SHARED = "shm"
+_INLINE = "bytes"
+_EMPTY = "empty"
+
+_POLL_S = 0.02  # How often a waiting request checks for cancellation and worker death
+
+
+class SharedCancellation:
+    """
+    CancellationToken look-alike backed by a flag shared with the server process
+
+    The synthesis code only reads `is_cancelled` (and `turn_id` for logging), so it stops at
+    the next generation step when the server cancels the turn.
+    """
+
+    def __init__(self, flag: Any, turn_id: str = ""):
+        self.flag = flag
+        self.turn_id = turn_id
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        return bool(self.flag.value)
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        if self.flag.value:
+            return False
+        self.flag.value = 1
+        self.reason = reason
+        self.cancelled_at = time.time()
+        return True
+
+
+async def _synthesize_items(manager: Any, items: List[tuple], cancel_token: SharedCancellation,
+                            voice: Optional[str] = None) -> List[Optional[bytes]]:
+    voice_kwargs = {"voice": voice} if voice is not None else {}  # None: the manager's own voice
+    if hasattr(manager, "synthesize_batch"):
+        return list(await manager.synthesize_batch(items, cancel_token=cancel_token, **voice_kwargs))
+    return [await manager.synthesize(text, language=language, emotion=emotion, cancel_token=cancel_token,
+                                     **voice_kwargs)
+            for text, language, emotion in items]
+
+
+def _worker_main(index: int, manager_factory: Callable[[], Any], requests: Any, responses: Any,
+                 cancel_flag: Any, buffer_name: str):
+    """Worker process: build the TTS manager, then synthesize requests (batches) one at a time"""
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    loop = asyncio.new_event_loop()
+    try:
+        manager = manager_factory()
+        responses.put((None, _READY, {"initialized": bool(getattr(manager, "is_initialized", False)),
+                                      "model_version": getattr(manager, "model_version", "")}))
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            request_id, items, voice = request
+            cancel_token = SharedCancellation(cancel_flag, turn_id=str(request_id))
+            try:
+                results = loop.run_until_complete(_synthesize_items(manager, items, cancel_token, voice))
+            except Exception as e:
+                tts_worker_logger.error(f"❌ TTS worker {index} failed on request {request_id}: {e}")
+                results = [None] * len(items)
+            lengths = [len(audio) if audio else 0 for audio in results]
+            if not any(lengths) or cancel_token.is_cancelled:
+                responses.put((request_id, _EMPTY, 0))
+            elif sum(lengths) <= buffer.size:
+                offset = 0
+                for audio, length in zip(results, lengths):
+                    buffer.buf[offset:offset + length] = audio or b""
+                    offset += length
+                responses.put((request_id, _SHARED, lengths))
+            else:
+                # Longer than the shared buffer: pickle it through the queue instead
+                responses.put((request_id, _INLINE, [audio or None for audio in results]))
+    finally:
+        loop.close()
+        buffer.close()
+
+
+class _Worker:
+    """Server-side handle of one worker process"""
+
+    def __init__(self, index: int, context: Any, manager_factory: Callable[[], Any], buffer_bytes: int):
+        self.index = index
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.cancel_flag = context.Value("b", 0, lock=False)
+        self.buffer = shared_memory.SharedMemory(create=True, size=max(1, int(buffer_bytes)))
+        self.ready = False
+        self.model_version = ""
+        self.process = context.Process(
+            target=_worker_main,
+            args=(index, manager_factory, self.requests, self.responses, self.cancel_flag, self.buffer.name),
+            name=f"tts-worker-{index}",
+            daemon=True,
+        )
+        self.process.start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                _, kind, info = self.responses.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    return False
+                continue
+            self.ready = kind == _READY and info["initialized"]
+            self.model_version = info["model_version"] if kind == _READY else ""
+            return self.ready
+        return False
+
+    def stop(self, timeout: float = 5.0):
+        if self.process.is_alive():
+            try:
+                self.requests.put(None)
+            except Exception:
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+        self.buffer.close()
+        try:
+            self.buffer.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class TTSWorkerPool:
+    """
+    Pool of TTS worker processes behind an async `synthesize()`
+
+    Each request is handed to an idle worker (callers wait for one when all are busy). A helper
+    thread waits for the worker's answer, forwards a cancelled turn to the worker's shared flag
+    and copies the audio out of the shared buffer before the worker gets its next request.
+    A worker that dies is replaced; its request returns None.
+
+    Args:
+        manager_factory: Picklable callable that builds the TTS manager inside a worker
+        num_workers: Worker processes (each loads its own TTS model)
+        buffer_bytes: Shared-memory output buffer per worker (larger audio goes through the queue)
+        start_timeout_s: Time allowed for a worker to load its model
+        request_timeout_s: Time allowed for one synthesis before the worker is replaced
+    """
+
+    def __init__(self, manager_factory: Callable[[], Any], num_workers: int = 1,
+                 buffer_bytes: int = 16 * 1024 ** 2, start_timeout_s: float = 300.0,
+                 request_timeout_s: float = 120.0):
+        self.manager_factory = manager_factory
+        self.num_workers = max(1, int(num_workers))
+        self.buffer_bytes = int(buffer_bytes)
+        self.start_timeout_s = start_timeout_s
+        self.request_timeout_s = request_timeout_s
+        self._context = multiprocessing.get_context("spawn")  # CUDA cannot be forked
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._io = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="tts-io")
+        self._lock = threading.Lock()
+        self._next_request_id = 0
+        self.closed = False
+        self.stats = {
+            "requests": 0,
+            "segments": 0,
+            "completed": 0,
+            "empty": 0,
+            "cancelled": 0,
+            "inline_transfers": 0,
+            "worker_restarts": 0,
+            "total_wait_ms": 0.0,
+            "total_synthesis_ms": 0.0,
+            "total_transfer_ms": 0.0,
+        }
+
+    @property
+    def is_ready(self) -> bool:
+        return any(worker.ready for worker in self._workers)
+
+    @property
+    def model_version(self) -> str:
+        """Model version reported by the workers (they all load the same model)"""
+        return next((worker.model_version for worker in self._workers if worker.ready), "")
+
+    def start(self) -> bool:
+        """Start the workers and wait for their models to load; True if at least one is ready"""
+        start_time = time.time()
+        atexit.register(self.close)  # Release the shared buffers even if nobody calls close()
+        for index in range(self.num_workers):
+            self._workers.append(_Worker(index, self._context, self.manager_factory, self.buffer_bytes))
+        for worker in self._workers:
+            if worker.wait_ready(self.start_timeout_s):
+                self._idle.put(worker)
+            else:
+                tts_worker_logger.error(f"❌ TTS worker {worker.index} did not become ready")
+        ready = sum(worker.ready for worker in self._workers)
+        tts_worker_logger.info(f"🎵 {ready}/{self.num_workers} TTS worker processes ready "
+                               f"in {time.time() - start_time:.1f}s")
+        return ready > 0
+
+    async def synthesize(self, text: str, language: str = "en", emotion: str = "neutral",
+                         cancel_token: Optional[Any] = None, voice: Optional[str] = None) -> Optional[bytes]:
+        """Synthesize on an idle worker; None if synthesis failed or the turn was cancelled"""
+        return (await self.synthesize_batch([(text, language, emotion)], cancel_token, voice))[0]
+
+    async def synthesize_batch(self, items: List[tuple], cancel_token: Optional[Any] = None,
+                               voice: Optional[str] = None) -> List[Optional[bytes]]:
+        """Synthesize several (text, language, emotion) segments of one voice in one worker request"""
+        if self.closed or not self.is_ready or not items:
+            return [None] * len(items)
+        with self._lock:
+            self._next_request_id += 1
+            request_id = self._next_request_id
+            self.stats["requests"] += 1
+            self.stats["segments"] += len(items)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._io, self._run_request, request_id, list(items),
+                                      voice, cancel_token, time.time())
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The caller is gone (barge-in, disconnect): the helper thread stops the worker
+            if cancel_token is not None:
+                cancel_token.cancel("cancelled")
+            raise
+
+    def close(self):
+        """Stop every worker and release the shared buffers"""
+        if self.closed:
+            return
+        self.closed = True
+        for worker in self._workers:
+            worker.stop()
+        self._io.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["workers"] = self.num_workers
+        stats["ready_workers"] = sum(worker.ready for worker in self._workers)
+        stats["idle_workers"] = self._idle.qsize()
+        completed = stats["completed"]
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["requests"] if stats["requests"] else 0.0
+        stats["avg_synthesis_ms"] = stats["total_synthesis_ms"] / completed if completed else 0.0
+        stats["avg_transfer_ms"] = stats["total_transfer_ms"] / completed if completed else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Helper threads
+    # ------------------------------------------------------------------
+
+    def _run_request(self, request_id: int, items: List[tuple], voice: Optional[str], cancel_token: Optional[Any],
+                     queued_at: float) -> List[Optional[bytes]]:
+        empty = [None] * len(items)
+        worker = self._acquire()
+        if worker is None:
+            return empty
+        dispatched_at = time.time()
+        self._record("total_wait_ms", (dispatched_at - queued_at) * 1000)
+        replace = False
+        try:
+            if self.closed or (cancel_token is not None and cancel_token.is_cancelled):
+                self._record("cancelled", 1)
+                return empty
+            worker.cancel_flag.value = 0
+            worker.requests.put((request_id, items, voice))
+            response = self._wait_response(worker, request_id, cancel_token, dispatched_at)
+            if response is None:
+                replace = not self.closed
+                return empty
+            _, kind, payload = response
+            received_at = time.time()
+            if kind == _SHARED:
+                results, offset = [], 0
+                for length in payload:
+                    results.append(bytes(worker.buffer.buf[offset:offset + length]) if length else None)
+                    offset += length
+            elif kind == _INLINE:
+                results = payload
+                self._record("inline_transfers", 1)
+            else:
+                self._record("cancelled" if worker.cancel_flag.value else "empty", 1)
+                return empty
+            self._record("completed", 1)
+            self._record("total_synthesis_ms", (received_at - dispatched_at) * 1000)
+            self._record("total_transfer_ms", (time.time() - received_at) * 1000)
+            return results
+        finally:
+            if replace:
+                worker = self._replace(worker)
+            if worker is not None and not self.closed:
+                self._idle.put(worker)
+
+    def _acquire(self) -> Optional[_Worker]:
+        """Next idle worker; None once the pool is closed or has no live worker left"""
+        while True:
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                if self.closed or not self.is_ready:
+                    return None
+
+    def _wait_response(self, worker: _Worker, request_id: int, cancel_token: Optional[Any],
+                       dispatched_at: float) -> Optional[tuple]:
+        while True:
+            try:
+                response = worker.responses.get(timeout=_POLL_S)
+            except queue.Empty:
+                if cancel_token is not None and cancel_token.is_cancelled and not worker.cancel_flag.value:
+                    worker.cancel_flag.value = 1
+                if not worker.process.is_alive():
+                    tts_worker_logger.error(f"❌ TTS worker {worker.index} died during request {request_id}")
+                    return None
+                if time.time() - dispatched_at > self.request_timeout_s:
+                    tts_worker_logger.error(f"❌ TTS worker {worker.index} timed out on request {request_id}")
+                    return None
+                continue
+            if response[0] == request_id:
+                return response
+            # Answer to an older request whose caller already gave up: drop it
+
+    def _replace(self, worker: _Worker) -> Optional[_Worker]:
+        """Start a fresh worker in place of one that died or hung"""
+        worker.ready = False
+        worker.stop(timeout=1.0)
+        self._record("worker_restarts", 1)
+        replacement = _Worker(worker.index, self._context, self.manager_factory, self.buffer_bytes)
+        self._workers[self._workers.index(worker)] = replacement
+        if replacement.wait_ready(self.start_timeout_s):
+            return replacement
+        tts_worker_logger.error(f"❌ Replacement TTS worker {worker.index} did not become ready")
+        return None
+
+    def _record(self, name: str, value: float):
+        with self._lock:
+            self.stats[name] += value
@@ -13,7 +13,11 @@ import torch
 import gc
 import numpy as np
 # Import model classes
-from src.models.voxtral_model_realtime import VoxtralModel
+from src.models.voxtral_model_realtime import VoxtralModel, create_model_engine
+from src.models.warmup_planner import WarmupShape
+from src.models.replica_pool import ModelReplicaPool
+from src.models.cpu_backend import physical_core_count, resolve_device
+from src.utils.config import config
 from src.utils.gpu_memory_manager import GPUMemoryManager, InsufficientVRAMError
 
 # Setup logging
@@ -32,6 +36,7 @@ class UnifiedModelManager:
 
     def __init__(self):
         self.voxtral_model = None
+        self.replica_pool = None
         self.gpu_memory_manager = None
         self.initialization_lock = Lock()
         self.is_initialized = False
@@ -112,43 +117,34 @@ class UnifiedModelManager:
             if not warmup_success:
                 unified_logger.warning("⚠️ Ultra-fast mode setup had issues but continuing...")
             
-            # Warmup Voxtral with progressively smaller inputs
-            # CRITICAL: Increased iterations to allow GPU to warm up properly
-            # More iterations = better GPU utilization and faster subsequent inferences
-            warmup_audio_lengths = [8000, 4000, 2000, 1000, 16000, 16000, 16000]  # 7 iterations
-            for i, length in enumerate(warmup_audio_lengths):
-                dummy_audio = torch.randn(length, device=self.gpu_memory_manager.device, dtype=torch.float16) * 0.1
-                start_time = time.time()
-                # Use the existing process_realtime_chunk method
-                result = await self.voxtral_model.process_realtime_chunk(
-                    dummy_audio,
-                    chunk_id=f"warmup_{i}",
-                    mode="conversation"
-                )
-                warmup_time = (time.time() - start_time) * 1000
-                unified_logger.info(f"🔥 Warmup {i+1}/7: {length} samples -> {warmup_time:.1f}ms")
-
-                # Don't break early - let GPU fully warm up
-                # Early breaking prevents proper GPU optimization
-            
-            # Final warmup with typical speech
-            typical_audio = torch.randn(16000, device=self.gpu_memory_manager.device, dtype=torch.float16) * 0.05  # 1 second, normal volume
-            start_time = time.time()
-            result = await self.voxtral_model.process_realtime_chunk(
-                typical_audio,
-                chunk_id="warmup_final",
-                mode="conversation"  
-            )
-            final_warmup_time = (time.time() - start_time) * 1000
-            unified_logger.info(f"🎯 FINAL warmup: 1s audio -> {final_warmup_time:.1f}ms")
-            
-            if final_warmup_time < 500:
-                unified_logger.info("✅ ULTRA-FAST mode ready - <500ms target achieved!")
-                return True
-            else:
-                unified_logger.warning(f"⚠️ Still {final_warmup_time:.1f}ms - may need further optimization")
-                return True
-                
+            # Replay the turn shapes real traffic produced last time (histogram saved next to
+            # the model cache); short fixed-length decodes are enough to compile each shape
+            planner = self.voxtral_model.get_warmup_planner()
+            plan = planner.plan() if planner is not None else [WarmupShape("conversation", 2.0, 0, False)]
+            decode_tokens = self.voxtral_model.warmup_decode_tokens
+            if planner is not None:
+                unified_logger.info(f"📈 Warmup plan ({planner.stats['plan_source']}): "
+                                    f"{', '.join(shape.key for shape in plan)}")
+
+            warmup_start = time.time()
+            models = self.replica_pool.models() if self.replica_pool is not None else [self.voxtral_model]
+            for replica_id, model in enumerate(models):
+                for i, shape in enumerate(plan):
+                    warmup_time = await model.warmup_turn(shape, max_new_tokens=decode_tokens)
+                    unified_logger.info(f"🔥 Warmup {i+1}/{len(plan)} (replica {replica_id}): {shape.mode} "
+                                        f"{shape.audio_s:g}s audio, {shape.context_chars} context chars"
+                                        f"{' (streamed)' if shape.streamed else ''} -> {warmup_time:.1f}ms")
+            warmup_total = (time.time() - warmup_start) * 1000
+
+            self.initialization_times["warmup"] = warmup_total / 1000
+            cold_start = self.initialization_times.get("total", 0.0) + warmup_total / 1000
+            self.initialization_times["cold_start"] = cold_start
+            if planner is not None:
+                planner.record_warmup(len(plan), warmup_total, cold_start * 1000)
+            unified_logger.info(f"✅ Warmup done: {len(plan)} runs in {warmup_total:.1f}ms, "
+                                f"cold start {cold_start:.2f}s")
+            return True
+
         except Exception as e:
             unified_logger.error(f"❌ Model warmup failed: {e}")
             return False
@@ -225,12 +221,22 @@ class UnifiedModelManager:
             unified_logger.info("🎙️ Initializing Voxtral model...")
             start_time = time.time()
             
-            # Import and create Voxtral model
-            self.voxtral_model = VoxtralModel()
-            
-            # Initialize with memory optimization
-            await self.voxtral_model.initialize()
-            
+            # One replica per device behind the router; replica 0 doubles as self.voxtral_model
+            devices = self._replica_devices()
+            self.replica_pool = ModelReplicaPool(
+                devices,
+                self._create_replica_model,
+                affinity_slack_tokens=getattr(config.inference, 'replica_affinity_slack_tokens', 512),
+                max_failures=getattr(config.inference, 'replica_max_failures', 3)
+            )
+            await self.replica_pool.initialize()
+            self.voxtral_model = self.replica_pool.primary
+            # One traffic histogram for the whole pool
+            for model in self.replica_pool.models()[1:]:
+                model.warmup_planner = self.voxtral_model.get_warmup_planner()
+            if len(devices) > 1:
+                unified_logger.info(f"🧩 {len(devices)} model replicas: {', '.join(devices)}")
+
             # Track memory usage
             if self.gpu_memory_manager.device == "cuda":
                 voxtral_memory = torch.cuda.memory_allocated() / (1024**3)
@@ -248,6 +254,35 @@ class UnifiedModelManager:
             raise ModelInitializationError(f"Voxtral initialization failed: {e}")
     
 
+    def _replica_devices(self):
+        """Configured replica devices, or `replicas` copies spread over the visible GPUs (cpu without CUDA)"""
+        inference_config = config.inference
+        devices = list(getattr(inference_config, 'replica_devices', []) or [])
+        count = max(1, getattr(inference_config, 'replicas', 1))
+        if not devices:
+            device = resolve_device(config.model.device)
+            if count == 1:
+                devices = [device]
+            elif device.startswith("cuda"):
+                devices = [f"cuda:{i % torch.cuda.device_count()}" for i in range(count)]
+            else:
+                devices = ["cpu"] * count
+        return devices
+
+    def _create_replica_model(self, device: str) -> VoxtralModel:
+        model = create_model_engine(device=device)
+        cpu_replicas = sum(1 for replica_device in self._replica_devices() if replica_device == "cpu")
+        if device == "cpu" and cpu_replicas > 1 and not getattr(model, 'cpu_threads', 0):
+            # CPU replicas decode concurrently: split the physical cores between them
+            model.cpu_threads = max(1, physical_core_count() // cpu_replicas)
+        return model
+
+    def get_replica_status(self) -> Dict[str, Any]:
+        """Health and load of every model replica (for /api/status)"""
+        if self.replica_pool is None:
+            return {"replicas": [], "router": {}}
+        return self.replica_pool.get_status()
+
     async def _post_initialization_optimization(self):
         """Perform post-initialization memory optimization"""
         try:
@@ -322,6 +357,7 @@ class UnifiedModelManager:
             if self.voxtral_model:
                 # Voxtral model doesn't have async cleanup, but we can clear references
                 self.voxtral_model = None
+                self.replica_pool = None
                 self.voxtral_initialized = False
 
             if self.gpu_memory_manager:
@@ -406,6 +442,8 @@ class UnifiedModelManager:
             # Add Voxtral model info
             if self.voxtral_model:
                 info["voxtral"] = self.voxtral_model.get_model_info()
+            if self.replica_pool is not None:
+                info["replica_pool"] = self.replica_pool.get_status()
 
             # Add memory manager info
             if self.gpu_memory_manager:
@@ -497,7 +535,11 @@ class UnifiedModelManager:
 
             # Cleanup Voxtral model (no async cleanup available)
             if self.voxtral_model:
+                if self.voxtral_model.warmup_planner is not None:
+                    # Persist this run's traffic shapes for the next startup's warmup
+                    self.voxtral_model.warmup_planner.save()
                 self.voxtral_model = None
+                self.replica_pool = None
                 self.voxtral_initialized = False
 
             # Final memory cleanup
@@ -0,0 +1,202 @@
+"""
+Named TTS voice profiles with cached speaker conditioning
+A voice was only a string, and conditioning the TTS model on a speaker's reference audio would
+have meant running the speaker encoder on every synthesis. A profile names a reference
+recording; its conditioning tensors are computed once per (voice, model version), kept in an
+in-memory LRU and saved to disk, so every later synthesis - in any worker process and after a
+restart - reuses them.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional
+
+import torch
+
+# Setup logging
+voice_profiles_logger = logging.getLogger("voice_profiles")
+
+# Bump when the stored conditioning format changes; old files then simply stop matching
+VOICE_CONDITIONING_VERSION = 1
+
+# Voice of the model itself: no reference audio, no conditioning
+DEFAULT_VOICE = "default"
+
+Conditioning = Dict[str, torch.Tensor]
+
+
+@dataclass
+class VoiceProfile:
+    """A named voice: the reference recording its speaker conditioning is computed from"""
+    voice_id: str
+    reference_audio: str = ""  # Path of a WAV/FLAC of the speaker
+    description: str = ""
+
+    def reference_digest(self) -> str:
+        """Content hash of the reference audio, so a re-recorded voice is not served stale"""
+        digest = hashlib.sha256()
+        with open(self.reference_audio, "rb") as reference:
+            for block in iter(lambda: reference.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+def load_voice_profiles(profiles: Mapping[str, Mapping[str, Any]]) -> Dict[str, VoiceProfile]:
+    """Profiles from the `tts.voice_profiles` config section (voice ID -> settings)"""
+    return {
+        voice_id: VoiceProfile(voice_id=voice_id, reference_audio=str(settings.get("reference_audio", "")),
+                               description=str(settings.get("description", "")))
+        for voice_id, settings in (profiles or {}).items()
+    }
+
+
+def conditioning_key(profile: VoiceProfile, reference_digest: str, model_version: str) -> str:
+    """Address of one profile's conditioning for one model version"""
+    material = "\x1f".join([str(VOICE_CONDITIONING_VERSION), model_version, profile.voice_id, reference_digest])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class VoiceConditioningCache:
+    """
+    Speaker conditioning per (voice ID, model version): memory LRU + files on disk
+
+    `get(profile, model_version, compute)` returns the cached tensors or calls
+    `compute(profile)` once (concurrent callers of the same voice wait for that one call) and
+    stores the result in both tiers. Disk files are named by key, so worker processes sharing
+    the directory compute each voice once between them. An empty `disk_dir` keeps the cache
+    in memory only.
+    """
+
+    def __init__(self, disk_dir: Optional[str] = None, memory_entries: int = 32):
+        self.disk_dir = disk_dir or None
+        self.memory_entries = max(1, int(memory_entries))
+        self._memory: "OrderedDict[str, Conditioning]" = OrderedDict()
+        self._digests: Dict[tuple, str] = {}  # (path, mtime, size) -> reference content hash
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "computed": 0,
+            "compute_errors": 0,
+            "disk_errors": 0,
+            "total_compute_ms": 0.0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "VoiceConditioningCache":
+        """The cache described by the `tts` config section"""
+        tts_config = getattr(config, 'tts', None)
+        disk_dir = getattr(tts_config, 'voice_cache_dir', '') or os.path.join(config.model.cache_dir,
+                                                                              "voice_conditioning")
+        return cls(disk_dir=disk_dir, memory_entries=getattr(tts_config, 'voice_cache_memory_entries', 32))
+
+    def get(self, profile: VoiceProfile, model_version: str, compute: Callable[[VoiceProfile], Conditioning],
+            device: str = "cpu") -> Optional[Conditioning]:
+        """Conditioning tensors of `profile` on `device`, or None if they cannot be computed"""
+        try:
+            key = conditioning_key(profile, self._reference_digest(profile), model_version)
+        except OSError as e:
+            self.stats["compute_errors"] += 1
+            voice_profiles_logger.error(f"❌ Voice '{profile.voice_id}' reference audio unreadable: {e}")
+            return None
+        conditioning = self._memory_get(key)
+        if conditioning is not None:
+            return conditioning
+        with self._key_lock(key):
+            conditioning = self._memory_get(key)
+            if conditioning is not None:
+                return conditioning
+            conditioning = self._disk_get(key, device)
+            if conditioning is None:
+                conditioning = self._compute(profile, compute)
+                if conditioning is None:
+                    return None
+                self._disk_put(key, conditioning)
+            self._memory_put(key, conditioning)
+            return conditioning
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["memory_entries"] = len(self._memory)
+        stats["avg_compute_ms"] = stats["total_compute_ms"] / stats["computed"] if stats["computed"] else 0.0
+        return stats
+
+    def _reference_digest(self, profile: VoiceProfile) -> str:
+        info = os.stat(profile.reference_audio)
+        source = (os.path.abspath(profile.reference_audio), info.st_mtime_ns, info.st_size)
+        with self._lock:
+            digest = self._digests.get(source)
+        if digest is None:
+            digest = profile.reference_digest()
+            with self._lock:
+                self._digests[source] = digest
+        return digest
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _compute(self, profile: VoiceProfile, compute: Callable[[VoiceProfile], Conditioning]) -> Optional[Conditioning]:
+        start = time.time()
+        try:
+            conditioning = dict(compute(profile))
+        except Exception as e:
+            self.stats["compute_errors"] += 1
+            voice_profiles_logger.error(f"❌ Conditioning of voice '{profile.voice_id}' failed: {e}")
+            return None
+        compute_ms = (time.time() - start) * 1000
+        self.stats["computed"] += 1
+        self.stats["total_compute_ms"] += compute_ms
+        voice_profiles_logger.info(f"🎙️ Conditioning of voice '{profile.voice_id}' computed in {compute_ms:.0f}ms")
+        return conditioning
+
+    def _memory_get(self, key: str) -> Optional[Conditioning]:
+        with self._lock:
+            conditioning = self._memory.get(key)
+            if conditioning is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return conditioning
+
+    def _memory_put(self, key: str, conditioning: Conditioning):
+        with self._lock:
+            self._memory[key] = conditioning
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pt")
+
+    def _disk_get(self, key: str, device: str) -> Optional[Conditioning]:
+        if not self.disk_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            conditioning = torch.load(self._path(key), map_location=device, weights_only=True)
+        except Exception as e:
+            self.stats["disk_errors"] += 1
+            voice_profiles_logger.warning(f"⚠️ Unreadable voice conditioning {key[:12]}: {e}")
+            return None
+        self.stats["disk_hits"] += 1
+        return conditioning
+
+    def _disk_put(self, key: str, conditioning: Conditioning):
+        if not self.disk_dir:
+            return
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            torch.save({name: tensor.detach().cpu() for name, tensor in conditioning.items()}, tmp_path)
+            os.replace(tmp_path, self._path(key))  # Atomic: other processes never read half a file
+        except Exception as e:
+            self.stats["disk_errors"] += 1
+            voice_profiles_logger.warning(f"⚠️ Could not store voice conditioning {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -5,9 +5,11 @@ FIXED: FlashAttention2 detection, VAD implementation, silence handling
 import torch
 import asyncio
 import time
-from typing import Optional, List, Dict, Any, Union, AsyncGenerator
+from typing import Optional, List, Dict, Any, Union, AsyncGenerator, Callable
 # ADD these imports at the top
 import gc
+import functools
+import inspect
 from contextlib import contextmanager
 # Import with compatibility layer
 try:
@@ -25,14 +27,6 @@ from threading import Lock
 import threading
 import base64
 
-# PHASE 3: Import TTS Manager for streaming audio pipeline
-try:
-    from src.models.tts_manager import TTSManager
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
-    TTSManager = None
-
 # PHASE 7: Import Emotion Detector for emotional expressiveness
 try:
     from src.utils.emotion_detector import EmotionDetector
@@ -59,7 +53,7 @@ import tempfile
 import soundfile as sf
 import numpy as np
 import os
-from collections import deque
+from collections import deque, OrderedDict
 import sys
 
 # Add current directory to Python path if not already there
@@ -75,18 +69,54 @@ except ImportError:
     from src.utils.compatibility import get_config
     config = get_config()
 
+from src.utils.audio_io import encode_audio_base64
+from src.models.inference_executor import InferenceExecutor
+from src.models.prefix_cache import PromptPrefixCache
+from src.models.prompt_template_cache import PromptTemplateCache
+from src.models.session_kv_cache import SessionKVCache
+from src.models.streaming_audio_encoder import StreamingAudioEncoder, StreamingUtterance
+from src.models.kv_cache_utils import cache_to_tensors, tensors_to_cache
+from src.models.speculative_decoding import SpeculativeDecoder
+from src.models.cancellation import CancellationToken, cancellation_stopping_criteria
+from src.models.incremental_detokenizer import WordEventStream
+from src.models.warmup_planner import WarmupPlanner, WarmupShape
+from src.models.model_snapshot import default_snapshot_dir, load_component, load_manifest
+from src.models.cpu_backend import configure_cpu_threads, prepare_cpu_model, resolve_cpu_dtype, resolve_device
+
 # Enhanced logging for real-time streaming
 realtime_logger = logging.getLogger("voxtral_realtime")
 realtime_logger.setLevel(logging.DEBUG)
 
+# Fixed instruction prompts. They come first in the user turn so their KV states can be
+# reused across turns; bump PROMPT_TEMPLATE_VERSION whenever wording or layout changes.
+PROMPT_TEMPLATE_VERSION = "2"
+# CRITICAL FIX: Strengthened conversational prompt to prevent transcription fallback
+CONVERSATION_INSTRUCTION = "You are a helpful conversational AI. Listen to what the user said and respond to them conversationally. Do NOT repeat or transcribe what they said. Instead, respond naturally to their message."
+TRANSCRIBE_INSTRUCTION = "Transcribe exactly what you heard. Be precise with proper nouns and technical terms."
+
 class VoxtralModel:
     """PRODUCTION-READY Voxtral model for conversational real-time streaming with VAD"""
     
-    def __init__(self):
-        """Initialize VoxtralModel with ULTRA-FAST + chunked streaming"""
+    def __init__(self, device: Optional[str] = None):
+        """Initialize VoxtralModel with ULTRA-FAST + chunked streaming
+
+        Args:
+            device: Device for this instance (replicas); defaults to model.device from the config
+        """
         self.is_initialized = False
-        self.device = config.model.device
+        self.device = resolve_device(device or config.model.device)
         self.torch_dtype = getattr(torch, config.model.torch_dtype)
+
+        # CPU backend: dtype the CPU accelerates, int8 dynamic quantization, pinned thread pools
+        self.cpu_quantization = getattr(config.model, 'cpu_quantization', 'int8')
+        self.cpu_threads = getattr(config.model, 'cpu_threads', 0)
+        self.cpu_interop_threads = getattr(config.model, 'cpu_interop_threads', 1)
+        self.cpu_backend_info = None
+        if self.device == "cpu":
+            self.compute_dtype = resolve_cpu_dtype(getattr(config.model, 'cpu_dtype', 'auto'), self.cpu_quantization)
+            self.torch_dtype = self.compute_dtype
+        else:
+            self.compute_dtype = torch.float16  # FORCE float16 for maximum speed
         
         # FIXED: Safe VAD configuration access
         vad_config = getattr(config, 'vad', None)
@@ -124,7 +154,76 @@ class VoxtralModel:
         self.processing_history = deque(maxlen=50)  # Reduced memory usage
         self.model_lock = Lock()
         self.audio_processor = None
-        
+
+        # Audio handoff to the processor: "memory" skips the temp WAV round-trip
+        inference_config = getattr(config, 'inference', None)
+        self.audio_handoff = getattr(inference_config, 'audio_handoff', 'memory')
+
+        # Continuous batching: concurrent turns share decode steps (created lazily)
+        self.continuous_batching = getattr(inference_config, 'continuous_batching', False)
+        self.max_batch_size = getattr(inference_config, 'max_batch_size', 8)
+        self.inference_scheduler = None
+
+        # Prompt prefix KV cache: fixed instructions are prefilled once per (mode, language, version)
+        self.prefix_cache_enabled = getattr(inference_config, 'prefix_cache', True)
+        self.prefix_cache_max_entries = getattr(inference_config, 'prefix_cache_max_entries', 16)
+        self.prefix_cache = None
+        self._prefix_token_ids = {}
+        self._generate_resumes_cache = None
+
+        # Pre-tokenized prompt templates: turns splice audio/context tokens instead of re-rendering
+        self.prompt_template_cache_enabled = getattr(inference_config, 'prompt_template_cache', True)
+        self.prompt_template_cache = None
+
+        # Per-session KV carry-over: later turns only prefill their own audio + instruction
+        self.session_cache_enabled = getattr(inference_config, 'session_kv_cache', True)
+        self.session_cache = None
+
+        # Streamed utterances: audio encoded window by window while the user is still speaking
+        self.streaming_encode_interval_s = getattr(inference_config, 'streaming_encode_interval_s', 0.5)
+        self.streaming_pause_encode_s = getattr(inference_config, 'streaming_pause_encode_s', 0.3)
+        self.streaming_max_utterance_s = getattr(inference_config, 'streaming_max_utterance_s', 30.0)
+        self.streaming_interim_transcripts = getattr(inference_config, 'streaming_interim_transcripts', False)
+        self.streaming_interim_interval_s = getattr(inference_config, 'streaming_interim_interval_s', 1.0)
+        self.streaming_interim_max_tokens = getattr(inference_config, 'streaming_interim_max_tokens', 32)
+        self.streaming_encoder = None
+        self._streaming_prompt_ids = OrderedDict()
+
+        # Speculative decoding: a small draft LLM proposes tokens, Voxtral verifies them in one pass
+        self.speculative_decoding = getattr(inference_config, 'speculative_decoding', False)
+        self.speculative_draft_model = getattr(inference_config, 'speculative_draft_model', '')
+        self.speculative_num_draft_tokens = getattr(inference_config, 'speculative_num_draft_tokens', 4)
+        self.speculative_decoder = None
+
+        # Pre-quantized local snapshot (offline-first loading)
+        self.snapshot_enabled = getattr(config.model, 'snapshot_enabled', True)
+        self.snapshot_dir = getattr(config.model, 'snapshot_dir', '') or default_snapshot_dir(
+            config.model.cache_dir, config.model.name)
+        self.offline_only = getattr(config.model, 'offline_only', False)
+        self.snapshot_manifest = None
+
+        # Traffic-derived warmup: turn shapes are recorded and replayed at the next start
+        self.warmup_plan_enabled = getattr(inference_config, 'warmup_plan', True)
+        self.warmup_plan_path = getattr(inference_config, 'warmup_plan_path', '') or os.path.join(
+            config.model.cache_dir, "warmup_plan.json")
+        self.warmup_max_runs = getattr(inference_config, 'warmup_max_runs', 6)
+        self.warmup_coverage = getattr(inference_config, 'warmup_coverage', 0.95)
+        self.warmup_decode_tokens = getattr(inference_config, 'warmup_decode_tokens', 4)
+        self.warmup_planner = None
+
+        # Turn cancellation (barge-in, disconnect, explicit cancel)
+        self.cancellation_stats = {
+            "cancelled_turns": 0,
+            "stopped_generations": 0,
+            "total_stop_latency_ms": 0.0,
+        }
+
+        # Bounded executor owning GPU access: generate() never runs on the event loop
+        self.inference_executor = InferenceExecutor(
+            max_workers=getattr(inference_config, 'executor_workers', 1),
+            lock=self.model_lock
+        )
+
         # ADDED: Advanced VAD parameters
         self.spectral_rolloff_threshold = 0.85  # For speech quality detection
         self.zero_crossing_rate_threshold = 0.1  # For voiced/unvoiced detection
@@ -132,9 +231,6 @@ class VoxtralModel:
         # Performance optimization flags
         self.use_torch_compile = False  # Disabled by default for stability
 
-        # PHASE 3: TTS Manager for streaming audio pipeline
-        self.tts_manager = None
-
         # PHASE 7: Emotion Detector for emotional expressiveness
         self.emotion_detector = None
 
@@ -164,16 +260,320 @@ class VoxtralModel:
             realtime_logger.info("Audio processor lazy-loaded into Voxtral model")
         return self.audio_processor
 
-    def get_tts_manager(self):
-        """Lazy initialization of TTS manager for streaming audio pipeline (PHASE 3)"""
-        if self.tts_manager is None and TTS_AVAILABLE:
+    def get_inference_scheduler(self):
+        """Lazy-load the continuous batching scheduler"""
+        if self.inference_scheduler is None:
+            from src.models.inference_scheduler import ContinuousBatchingScheduler
+            self.inference_scheduler = ContinuousBatchingScheduler(
+                self.model,
+                eos_token_id=self.processor.tokenizer.eos_token_id,
+                max_batch_size=self.max_batch_size,
+                lock=self.model_lock,
+                prefix_cache=self.get_prefix_cache()
+            )
+        return self.inference_scheduler
+
+    def get_session_cache(self):
+        """Lazy-load the tiered per-session KV cache (None when disabled)"""
+        if self.session_cache is None and self.session_cache_enabled:
+            inference_config = getattr(config, 'inference', None)
+            mb = 1024 * 1024
+            self.session_cache = SessionKVCache(
+                device=self.device,
+                device_budget_bytes=getattr(inference_config, 'session_cache_device_budget_mb', 1024) * mb,
+                cpu_budget_bytes=getattr(inference_config, 'session_cache_cpu_budget_mb', 4096) * mb,
+                disk_budget_bytes=getattr(inference_config, 'session_cache_disk_budget_mb', 0) * mb,
+                disk_dir=os.path.join(config.model.cache_dir, "session_kv"),
+                idle_offload_s=getattr(inference_config, 'session_cache_idle_offload_s', 5.0),
+                max_tokens=getattr(inference_config, 'session_cache_max_tokens', 4096)
+            )
+        return self.session_cache
+
+    def end_session(self, session_id: str):
+        """Release a session's carried-over KV cache (call on disconnect)"""
+        if self.session_cache is not None:
+            self.session_cache.drop(session_id)
+
+    def get_prefix_cache(self):
+        """Lazy-load the prompt prefix KV cache (None when disabled or the model is not loaded)"""
+        if self.prefix_cache is None and self.prefix_cache_enabled and self.model is not None:
+            self.prefix_cache = PromptPrefixCache(self.model, max_entries=self.prefix_cache_max_entries)
+        return self.prefix_cache
+
+    def get_prompt_template_cache(self):
+        """Lazy-load the pre-tokenized prompt templates (None when disabled or the processor cannot featurize)"""
+        if self.prompt_template_cache is None and self.prompt_template_cache_enabled and self.processor is not None:
+            feature_extractor = getattr(self.processor, "feature_extractor", None)
+            audio_token_id = getattr(getattr(self.model, "config", None), "audio_token_id", None)
+            if feature_extractor is None or audio_token_id is None:
+                return None
+            self.prompt_template_cache = PromptTemplateCache(
+                lambda instruction, context_text, num_samples: self._prepare_inputs(
+                    np.zeros(num_samples, dtype=np.float32), instruction, "template_probe", context_text
+                )["input_ids"],
+                self._encode_text,
+                audio_token_id=audio_token_id,
+                window_samples=getattr(feature_extractor, "n_samples", 30 * config.audio.sample_rate)
+            )
+        return self.prompt_template_cache
+
+    def get_warmup_planner(self):
+        """Lazy-load the warmup histogram saved by the previous run (None when disabled)"""
+        if self.warmup_planner is None and self.warmup_plan_enabled:
+            self.warmup_planner = WarmupPlanner(
+                self.warmup_plan_path,
+                max_runs=self.warmup_max_runs,
+                coverage=self.warmup_coverage
+            )
+            self.warmup_planner.load()
+        return self.warmup_planner
+
+    def _record_turn_shape(self, mode: str, audio_samples: int, context_text: str, streamed: bool, inputs):
+        """Feed a real turn's shape into the warmup histogram"""
+        planner = self.get_warmup_planner()
+        if planner is not None:
+            planner.record(mode, audio_samples / config.audio.sample_rate, len(context_text), streamed,
+                           prompt_tokens=int(inputs["input_ids"].shape[1]))
+
+    async def warmup_turn(self, shape: WarmupShape, max_new_tokens: int = 4) -> float:
+        """
+        Run one bounded turn of the given shape through the real input path; returns ms
+
+        Builds inputs exactly like a live turn (template splice or streamed windows, prompt
+        prefix cache) and decodes `max_new_tokens` tokens, which is enough to compile/tune
+        the prefill and decode kernels for that shape.
+        """
+        start_time = time.time()
+        sample_rate = config.audio.sample_rate
+        audio = (np.random.default_rng(0).standard_normal(int(shape.audio_s * sample_rate)) * 0.05).astype(np.float32)
+        filler = "User: hello there\nAI: hi, how can I help you today?\n"
+        conversation_context = (filler * (shape.context_chars // len(filler) + 1))[:shape.context_chars]
+        prompt_text, context_text = self._build_prompt(shape.mode, conversation_context)
+
+        audio_embeds = None
+        if shape.streamed and self.get_streaming_encoder() is not None:
+            utterance = self.start_streaming_utterance(f"warmup_{shape.key}")
+            self.push_streaming_audio(utterance, audio)
+            audio_embeds = await self.streaming_encoder.finalize(utterance)
+        with torch.no_grad():
+            if audio_embeds is not None:
+                inputs = self._streaming_inputs(audio_embeds, utterance.num_windows, prompt_text, context_text,
+                                                mode=shape.mode)
+            else:
+                inputs = self._turn_inputs(audio, shape.mode, "en", prompt_text, f"warmup_{shape.key}", context_text)
+        prefix = self._prompt_prefix(shape.mode, "en", prompt_text)
+        await self.inference_executor.run(
+            self._generate_with_cache, prefix, **inputs,
+            max_new_tokens=max_new_tokens,
+            min_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=self.processor.tokenizer.eos_token_id
+        )
+        return (time.time() - start_time) * 1000
+
+    def get_streaming_encoder(self):
+        """Lazy-load the incremental audio encoder (None when the processor/model cannot run it)"""
+        if self.streaming_encoder is None and self.model is not None and self.processor is not None:
+            feature_extractor = getattr(self.processor, "feature_extractor", None)
+            can_encode = hasattr(self.model, "get_audio_features") or hasattr(self.model, "get_audio_embeds")
+            if feature_extractor is None or not can_encode:
+                return None
+            self.streaming_encoder = StreamingAudioEncoder(
+                self._featurize_audio_window,
+                self._encode_audio_features,
+                self.inference_executor,
+                window_samples=getattr(feature_extractor, "n_samples", 30 * config.audio.sample_rate),
+                sample_rate=config.audio.sample_rate,
+                encode_interval_s=self.streaming_encode_interval_s,
+                pause_encode_s=self.streaming_pause_encode_s,
+                max_utterance_s=self.streaming_max_utterance_s
+            )
+            realtime_logger.info(f"🎙️ Streaming audio encoder ready ({self.streaming_encoder.window_samples} samples per window)")
+        return self.streaming_encoder
+
+    def get_speculative_decoder(self):
+        """Lazy-load the draft model for speculative decoding (None when disabled or incompatible)"""
+        if self.speculative_decoder is None and self.speculative_decoding and self.model is not None:
+            if not self.speculative_draft_model:
+                realtime_logger.warning("⚠️ Speculative decoding enabled without a draft model - disabled")
+                self.speculative_decoding = False
+                return None
             try:
-                self.tts_manager = TTSManager(model_name="chatterbox", device=self.device)
-                realtime_logger.info("🎵 TTS manager lazy-loaded into Voxtral model")
+                from transformers import AutoModelForCausalLM
+                draft_model = AutoModelForCausalLM.from_pretrained(
+                    self.speculative_draft_model,
+                    cache_dir=config.model.cache_dir,
+                    torch_dtype=self.torch_dtype
+                ).to(self.device).eval()
+                self.set_draft_model(draft_model)
             except Exception as e:
-                realtime_logger.warning(f"⚠️ TTS manager initialization failed: {e}")
-                self.tts_manager = None
-        return self.tts_manager
+                realtime_logger.warning(f"⚠️ Draft model {self.speculative_draft_model} failed to load: {e}")
+                self.speculative_decoding = False
+        return self.speculative_decoder
+
+    def set_draft_model(self, draft_model):
+        """Use `draft_model` for speculative decoding; it must share Voxtral's tokenizer vocabulary"""
+        text_config = getattr(self.model.config, "text_config", self.model.config)
+        if draft_model.config.vocab_size != text_config.vocab_size:
+            realtime_logger.warning(f"⚠️ Draft vocabulary ({draft_model.config.vocab_size}) does not match "
+                                    f"Voxtral ({text_config.vocab_size}) - speculative decoding disabled")
+            self.speculative_decoding = False
+            return None
+        audio_token_id = getattr(self.model.config, "audio_token_id", None)
+        self.speculative_decoder = SpeculativeDecoder(
+            self.model,
+            draft_model,
+            num_draft_tokens=self.speculative_num_draft_tokens,
+            skip_token_ids=[audio_token_id] if audio_token_id is not None else []
+        )
+        self.speculative_decoding = True
+        realtime_logger.info(f"🎯 Speculative decoding ready: {self.speculative_num_draft_tokens} draft tokens per step")
+        return self.speculative_decoder
+
+    def _run_generate(self, **generation_kwargs):
+        """model.generate(), or the draft-and-verify loop when it yields the same greedy tokens"""
+        decoder = self.get_speculative_decoder() if self.speculative_decoding else None
+        if decoder is not None and decoder.can_generate(generation_kwargs):
+            return decoder.generate(**generation_kwargs)
+        return self.model.generate(**generation_kwargs)
+
+    def start_streaming_utterance(self, utterance_id: str, language: str = "en", on_interim=None):
+        """
+        Begin an utterance whose audio arrives in frames
+
+        Args:
+            utterance_id: Client-side utterance identifier
+            language: Language code for the interim transcription prompt
+            on_interim: async callback(dict) receiving interim transcripts (only when enabled in config)
+        """
+        encoder = self.get_streaming_encoder()
+        if encoder is None:
+            # Frames are still buffered; the endpoint falls back to encoding the whole utterance
+            sample_rate = config.audio.sample_rate
+            return StreamingUtterance(utterance_id, 30 * sample_rate, int(self.streaming_max_utterance_s * sample_rate))
+        utterance = encoder.start(utterance_id)
+        if on_interim is not None and self.streaming_interim_transcripts:
+            utterance.on_encoded = functools.partial(self._interim_transcript, language=language, on_interim=on_interim)
+        return utterance
+
+    def push_streaming_audio(self, utterance, samples: np.ndarray) -> int:
+        """Buffer a frame of a streamed utterance; windows are encoded in the background"""
+        encoder = self.get_streaming_encoder()
+        if encoder is None:
+            return utterance.append(samples)
+        return encoder.push(utterance, samples)
+
+    def discard_streaming_utterance(self, utterance):
+        """Abandon a streamed utterance (client reset or disconnect)"""
+        if self.streaming_encoder is not None:
+            self.streaming_encoder.discard(utterance)
+
+    def _featurize_audio_window(self, audio_window: np.ndarray) -> torch.Tensor:
+        """Mel features of one encoder window, padded like the processor pads whole utterances"""
+        feature_extractor = self.processor.feature_extractor
+        window_samples = getattr(feature_extractor, "n_samples", 30 * config.audio.sample_rate)
+        features = feature_extractor(
+            audio_window,
+            sampling_rate=config.audio.sample_rate,
+            padding=True,
+            truncation=False,
+            pad_to_multiple_of=window_samples,
+            return_tensors="pt"
+        )
+        return features["input_features"]
+
+    def _featurize_audio(self, audio_numpy: np.ndarray) -> torch.Tensor:
+        """Mel features of a whole utterance split into windows [windows, mel, frames], like the processor"""
+        feature_extractor = self.processor.feature_extractor
+        features = self._featurize_audio_window(audio_numpy)
+        frames = getattr(feature_extractor, "nb_max_frames", 3000)
+        return features.reshape(feature_extractor.feature_size, -1, frames).transpose(0, 1)
+
+    def _encode_text(self, text: str) -> List[int]:
+        """Token ids of a text chunk without special tokens"""
+        tokenizer = self.processor.tokenizer
+        try:
+            return tokenizer.encode(text, add_special_tokens=False)
+        except TypeError:
+            return tokenizer.encode(text)
+
+    def _encode_audio_features(self, input_features: torch.Tensor) -> torch.Tensor:
+        """Audio encoder + projector for one window -> [audio tokens, hidden]; runs on the executor"""
+        input_features = input_features.to(self.device, dtype=self.model.dtype)
+        if hasattr(self.model, "get_audio_features"):
+            outputs = self.model.get_audio_features(input_features)
+            return getattr(outputs, "pooler_output", outputs)
+        return self.model.get_audio_embeds(input_features)
+
+    def _streaming_prompt_inputs(self, prompt_text: str, context_text: str, num_windows: int,
+                                 mode: str = "conversation", language: str = "en"):
+        """Prompt token ids for an utterance of `num_windows` encoder windows"""
+        template = self._prompt_template(mode, language, prompt_text, context_text)
+        if template is not None:
+            context_ids = self.prompt_template_cache.encode_context(context_text) if template.has_context else None
+            input_ids = template.input_ids(num_windows, context_ids).to(self.device)
+            return input_ids, torch.ones_like(input_ids)
+
+        # Fallback: memoized processor probe per prompt
+        key = (prompt_text, context_text, num_windows)
+        cached = self._streaming_prompt_ids.get(key)
+        if cached is None:
+            # Token layout depends only on the window count, so silent probe audio gives the same ids
+            window_samples = self.streaming_encoder.window_samples if self.streaming_encoder else 30 * config.audio.sample_rate
+            probe_audio = np.zeros(num_windows * window_samples, dtype=np.float32)
+            inputs = self._prepare_inputs(probe_audio, prompt_text, "stream_probe", context_text)
+            input_ids = inputs["input_ids"]
+            attention_mask = inputs.get("attention_mask")
+            cached = (input_ids, attention_mask if attention_mask is not None else torch.ones_like(input_ids))
+            self._streaming_prompt_ids[key] = cached
+            while len(self._streaming_prompt_ids) > 32:
+                self._streaming_prompt_ids.popitem(last=False)
+        else:
+            self._streaming_prompt_ids.move_to_end(key)
+        return cached
+
+    def _streaming_inputs(self, audio_embeds: torch.Tensor, num_windows: int, prompt_text: str, context_text: str = "",
+                          mode: str = "conversation", language: str = "en"):
+        """Generation inputs with pre-encoded audio placed at the audio token positions"""
+        input_ids, attention_mask = self._streaming_prompt_inputs(prompt_text, context_text, num_windows, mode, language)
+        inputs_embeds = self.model.get_input_embeddings()(input_ids)
+        audio_mask = input_ids == self.model.config.audio_token_id
+        if int(audio_mask.sum()) != audio_embeds.shape[0]:
+            raise ValueError(f"Audio tokens ({int(audio_mask.sum())}) do not match encoded audio ({audio_embeds.shape[0]})")
+        inputs_embeds = inputs_embeds.masked_scatter(
+            audio_mask.unsqueeze(-1).expand_as(inputs_embeds),
+            audio_embeds.to(inputs_embeds.device, inputs_embeds.dtype)
+        )
+        return {"input_ids": input_ids, "attention_mask": attention_mask, "inputs_embeds": inputs_embeds}
+
+    async def _interim_transcript(self, utterance, audio_embeds: torch.Tensor, language: str = "en", on_interim=None):
+        """Transcribe the audio encoded so far and report the stable / unstable split"""
+        now = time.time()
+        if now - utterance.last_interim_at < self.streaming_interim_interval_s:
+            return
+        utterance.last_interim_at = now
+
+        with torch.no_grad():
+            inputs = self._streaming_inputs(audio_embeds, utterance.num_windows, TRANSCRIBE_INSTRUCTION,
+                                            mode="transcribe", language=language)
+        prefix = self._prompt_prefix("transcribe", language, TRANSCRIBE_INSTRUCTION)
+        outputs = await self.inference_executor.run(
+            self._generate_with_cache, prefix, **inputs,
+            max_new_tokens=self.streaming_interim_max_tokens,
+            do_sample=False,
+            pad_token_id=self.processor.tokenizer.eos_token_id
+        )
+        text = self.processor.tokenizer.decode(outputs[0, inputs["input_ids"].shape[1]:], skip_special_tokens=True).strip()
+        stable_text, unstable_text = utterance.update_hypothesis(text)
+        realtime_logger.debug(f"🎙️ Interim [{utterance.utterance_id}]: '{stable_text}' + '{unstable_text}'")
+        await on_interim({
+            "utterance_id": utterance.utterance_id,
+            "text": text,
+            "stable_text": stable_text,
+            "unstable_text": unstable_text,
+            "audio_ms": int(utterance.num_samples * 1000 / config.audio.sample_rate),
+            "latency_ms": int((time.time() - now) * 1000)
+        })
 
     def get_emotion_detector(self):
         """PHASE 7: Lazy initialization of emotion detector for emotional expressiveness"""
@@ -188,14 +588,17 @@ class VoxtralModel:
 
     def _check_flash_attention_availability(self):
         """ENHANCED: Detect and optimize FlashAttention2"""
+        if self.device == "cpu":
+            # PyTorch SDPA has fused CPU kernels; flash-attn is CUDA only
+            return "sdpa"
         try:
             import flash_attn
             from flash_attn import flash_attn_func
-            if self.device == "cuda" and torch.cuda.is_available():
+            if self.device.startswith("cuda") and torch.cuda.is_available():
                 # Get GPU info
-                gpu_capability = torch.cuda.get_device_capability()
+                gpu_capability = torch.cuda.get_device_capability(self.device)
                 major, minor = gpu_capability
-                gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1e9
+                gpu_memory = torch.cuda.get_device_properties(self.device).total_memory / 1e9
                 
                 # Enhanced FlashAttention support detection
                 if major >= 8:  # Ampere and newer
@@ -264,6 +667,318 @@ class VoxtralModel:
                 "Examples: 'Hello!' 'Sure!' 'Great!' 'I see.' 'Nice!' "
                 "Never explain or elaborate unless specifically asked.")
     
+    @contextmanager
+    def _audio_content_block(self, audio_numpy: np.ndarray, chunk_id: str):
+        """Yield the chat-template audio block for an utterance, removing any temp file on exit"""
+        if self.audio_handoff == "tempfile":
+            # LEGACY: Temp WAV on disk - always unlinked, even when the processor raises
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
+                    tmp_path = tmp_file.name
+                sf.write(tmp_path, audio_numpy, config.audio.sample_rate)
+                realtime_logger.debug(f"📁 Written chunk {chunk_id} to temporary file {tmp_path}")
+                yield {"type": "audio", "path": tmp_path}
+            finally:
+                if tmp_path is not None:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+        else:
+            # OPTIMIZED: Encode once in memory - no disk write, no re-read/re-encode by the processor
+            yield {"type": "audio", "base64": encode_audio_base64(audio_numpy, config.audio.sample_rate)}
+
+    def _build_prompt(self, mode: str, conversation_context: str = "") -> tuple:
+        """
+        Return (instruction, context_text) for a turn
+
+        The instruction is fixed per mode so it forms a cacheable prompt prefix; the
+        conversation context is per-turn and goes after it.
+        """
+        # CRITICAL: Use mode parameter to determine prompt
+        # mode="conversation" -> Generate conversational responses
+        # mode="transcribe" -> Transcribe audio only
+        if mode != "conversation":
+            return TRANSCRIBE_INSTRUCTION, ""
+        if conversation_context.strip():
+            # PHASE 1: Include conversation context for context-aware responses
+            return CONVERSATION_INSTRUCTION, (
+                f"Previous conversation:\n{conversation_context}\n\n"
+                "Take the previous conversation into account when you respond."
+            )
+        return CONVERSATION_INSTRUCTION, ""
+
+    def _prepare_inputs(self, audio_numpy: np.ndarray, prompt_text: str, chunk_id: str, context_text: str = ""):
+        """Build processor inputs for one utterance and move them to the model device"""
+        with self._audio_content_block(audio_numpy, chunk_id) as audio_block:
+            # Fixed instruction first (cacheable prefix), then per-turn context, then audio
+            content = [{"type": "text", "text": prompt_text}]
+            if context_text:
+                content.append({"type": "text", "text": context_text})
+            content.append(audio_block)
+            conversation = [
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ]
+            realtime_logger.debug(f"🔍 [CHUNK {chunk_id}] Audio handoff: {self.audio_handoff}")
+            inputs = self.processor.apply_chat_template(conversation, return_tensors="pt")
+        return inputs.to(self.device, dtype=self.compute_dtype)
+
+    def _prompt_template(self, mode: str, language: str, prompt_text: str, context_text: str = ""):
+        """Pre-tokenized template for this prompt shape, or None when turns must use the processor"""
+        template_cache = self.get_prompt_template_cache()
+        if template_cache is None:
+            return None
+        has_context = bool(context_text)
+        return template_cache.get((mode, language, has_context, PROMPT_TEMPLATE_VERSION), prompt_text, has_context)
+
+    def _turn_inputs(self, audio_numpy: np.ndarray, mode: str, language: str, prompt_text: str, chunk_id: str,
+                     context_text: str = ""):
+        """
+        Model inputs for one utterance
+
+        With a pre-tokenized template only the audio features are computed per turn; the
+        input_ids are spliced together. Otherwise the processor renders the chat template.
+        """
+        template = self._prompt_template(mode, language, prompt_text, context_text)
+        if template is None:
+            return self._prepare_inputs(audio_numpy, prompt_text, chunk_id, context_text)
+        input_ids = self.prompt_template_cache.input_ids(template, len(audio_numpy), context_text).to(self.device)
+        input_features = self._featurize_audio(audio_numpy)
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "input_features": input_features.to(self.device, dtype=self.compute_dtype)
+        }
+
+    def _context_free_inputs(self, inputs, audio_numpy: np.ndarray, audio_embeds: Optional[torch.Tensor],
+                             streaming_audio, mode: str, language: str, prompt_text: str, chunk_id: str):
+        """This turn's inputs without the text context, sharing its audio features / embeddings"""
+        if audio_embeds is not None:
+            with torch.no_grad():
+                return self._streaming_inputs(audio_embeds, streaming_audio.num_windows, prompt_text,
+                                              mode=mode, language=language)
+        template = self._prompt_template(mode, language, prompt_text)
+        if template is None:
+            return dict(self._prepare_inputs(audio_numpy, prompt_text, chunk_id))
+        input_ids = self.prompt_template_cache.input_ids(template, len(audio_numpy)).to(self.device)
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids),
+                "input_features": inputs["input_features"]}
+
+    def _prompt_prefix(self, mode: str, language: str, instruction: str):
+        """
+        Return (key, token ids) of the fixed prompt prefix for a mode/language, or None
+
+        The prefix is the longest common token prefix of two probe prompts that differ only
+        after the instruction, so it never depends on how the template wraps audio or context.
+        """
+        if self.get_prefix_cache() is None:
+            return None
+        key = (mode, language, PROMPT_TEMPLATE_VERSION)
+        if key not in self._prefix_token_ids:
+            try:
+                probe_audio = np.zeros(config.audio.sample_rate // 2, dtype=np.float32)
+                plain = self._prepare_inputs(probe_audio, instruction, "prefix_probe")["input_ids"][0]
+                with_context = self._prepare_inputs(probe_audio, instruction, "prefix_probe", "Previous conversation:")["input_ids"][0]
+                common = min(len(plain), len(with_context))
+                mismatch = (plain[:common] != with_context[:common]).nonzero()
+                prefix_len = int(mismatch[0]) if len(mismatch) else common
+                self._prefix_token_ids[key] = plain[:prefix_len].clone() if prefix_len > 0 else None
+                realtime_logger.info(f"🧠 Prompt prefix for {key}: {prefix_len} tokens")
+            except Exception as e:
+                realtime_logger.warning(f"⚠️ Prompt prefix probe failed for {key}: {e}")
+                self._prefix_token_ids[key] = None
+        prefix_ids = self._prefix_token_ids[key]
+        return None if prefix_ids is None else (key, prefix_ids)
+
+    def _can_resume_generation(self) -> bool:
+        """Whether generate() can continue an audio prompt from a pre-filled KV cache"""
+        if self._generate_resumes_cache is None:
+            # Older releases only forward input_features when generation starts at position 0
+            prepare_fn = getattr(self.model, "prepare_inputs_for_generation", None)
+            self._generate_resumes_cache = (
+                prepare_fn is not None and "is_first_iteration" in inspect.signature(prepare_fn).parameters
+            )
+            if not self._generate_resumes_cache:
+                realtime_logger.warning("⚠️ generate() cannot resume audio prompts from a KV cache here; "
+                                        "prefix and session caches are limited to the batching scheduler")
+        return self._generate_resumes_cache
+
+    def _generate_with_cache(self, prefix, session_id: Optional[str] = None,
+                             discard_if: Optional[Callable[[], bool]] = None,
+                             session_inputs: Optional[Dict[str, Any]] = None, **generation_kwargs):
+        """
+        Run model.generate() starting from reusable KV state
+
+        Runs on the inference executor with the model lock held. A turn of a session with a
+        carried-over cache appends only its own tokens to that conversation; otherwise the
+        cached prompt prefix is used. Whether the cache holds the history is only known here,
+        at checkout (a cancelled turn may still have held it when this turn was submitted, or it
+        may have been evicted since): `generation_kwargs` carry the history as text context and
+        `session_inputs` are the same turn without it, used when the cache is found. Afterwards
+        the session's extended cache is checked in, unless `discard_if()` says the turn never
+        happened (an abandoned speculative turn) or generation failed: then the session keeps
+        the cache it had before.
+        """
+        if (prefix is None and session_id is None) or not self._can_resume_generation():
+            return self._run_generate(**generation_kwargs)
+
+        session_cache = self.get_session_cache() if session_id is not None else None
+        session_entry = session_cache.checkout(session_id) if session_cache is not None else None
+        past_key_values = None
+
+        if session_entry is not None:
+            if session_inputs is not None:
+                # The history is in the cache: the text context would repeat it
+                generation_kwargs.update(session_inputs)
+            # Continue the conversation: history + this turn without its BOS
+            turn_ids = generation_kwargs["input_ids"]
+            bos_token_id = getattr(self.processor.tokenizer, "bos_token_id", None)
+            if bos_token_id is not None and int(turn_ids[0, 0]) == bos_token_id:
+                turn_ids = turn_ids[:, 1:]
+            history_ids = session_entry.token_ids.to(turn_ids.device).unsqueeze(0)
+            input_ids = torch.cat([history_ids, turn_ids], dim=1)
+            if "inputs_embeds" in generation_kwargs:
+                # Pre-encoded audio: the history's embeddings are looked up, this turn's are kept
+                turn_embeds = generation_kwargs["inputs_embeds"][:, -turn_ids.shape[1]:]
+                history_embeds = self.model.get_input_embeddings()(history_ids)
+                generation_kwargs["inputs_embeds"] = torch.cat([history_embeds.to(turn_embeds.dtype), turn_embeds], dim=1)
+            generation_kwargs["input_ids"] = input_ids
+            generation_kwargs["attention_mask"] = torch.ones_like(input_ids)
+            past_key_values = tensors_to_cache(session_entry.layers)
+            realtime_logger.debug(f"💾 Session {session_id}: reusing {session_entry.cached_tokens} cached tokens, "
+                                  f"prefilling {input_ids.shape[1] - session_entry.cached_tokens}")
+        elif prefix is not None and self.get_prefix_cache() is not None:
+            prefix_key, prefix_ids = prefix
+            past_key_values, _ = self.prefix_cache.prepare(prefix_key, prefix_ids, generation_kwargs["input_ids"])
+
+        if past_key_values is None and session_cache is not None:
+            # Empty cache object so this turn's KV states can be kept for the next one
+            past_key_values = tensors_to_cache([])
+        if past_key_values is not None:
+            generation_kwargs["past_key_values"] = past_key_values
+
+        try:
+            outputs = self._run_generate(**generation_kwargs)
+        except Exception:
+            if session_cache is not None and session_entry is not None:
+                # Failed turn (OOM, streamer timeout): the session keeps its conversation
+                session_cache.checkin(session_id, session_entry.token_ids, session_entry.layers)
+            raise
+
+        if session_cache is not None and discard_if is not None and discard_if():
+            if session_entry is not None:
+                session_cache.checkin(session_id, session_entry.token_ids, session_entry.layers)
+            realtime_logger.debug(f"💾 Session {session_id}: discarded the KV states of an abandoned turn")
+        elif session_cache is not None:
+            sequence = outputs.sequences[0] if hasattr(outputs, "sequences") else outputs[0]
+            eos_token_id = self.processor.tokenizer.eos_token_id
+            if eos_token_id is not None and int(sequence[-1]) != eos_token_id:
+                # Close the assistant turn so the next [INST] follows the chat format
+                sequence = torch.cat([sequence, sequence.new_tensor([eos_token_id])])
+            session_cache.checkin(session_id, sequence, cache_to_tensors(past_key_values))
+            session_cache.offload_idle()
+        return outputs
+
+    async def _scheduled_word_stream(self, sequence):
+        """Word/phrase events from a scheduler sequence, detokenized incrementally"""
+        events = WordEventStream(self.processor.tokenizer, skip_special_tokens=True)
+        async for token_id in sequence:
+            for event in events.add_tokens([token_id]):
+                yield event
+        for event in events.finish():
+            yield event
+
+    def _model_load_kwargs(self, attn_implementation: str) -> Dict[str, Any]:
+        """from_pretrained kwargs shared by the hub and snapshot loaders"""
+        if self.device == "cpu":
+            return {
+                "torch_dtype": self.compute_dtype,
+                "low_cpu_mem_usage": True,
+                "trust_remote_code": True,
+                "attn_implementation": attn_implementation,
+            }
+        if ":" in self.device:
+            # Replica pinned to one GPU: keep every layer on it
+            return {
+                "torch_dtype": self.compute_dtype,
+                "device_map": {"": self.device},
+                "low_cpu_mem_usage": True,
+                "trust_remote_code": True,
+                "attn_implementation": attn_implementation,
+            }
+        return {
+            "torch_dtype": self.compute_dtype,
+            "device_map": "auto",
+            "low_cpu_mem_usage": True,
+            "trust_remote_code": True,
+            "attn_implementation": attn_implementation,
+            "max_memory": {0: "16GB"},  # INCREASED: Use available VRAM (you have 19.70 GB)
+            "offload_folder": None,    # Keep everything on GPU
+        }
+
+    def _load_from_snapshot(self, attn_implementation: str):
+        """(processor, model) from the local pre-quantized snapshot, or None if there is no usable one"""
+        manifest = load_manifest(self.snapshot_dir, config.model.name)
+        if manifest is None:
+            realtime_logger.info(f"💡 No model snapshot at {self.snapshot_dir} - loading from the hub "
+                                 f"(create one with: python -m src.models.model_snapshot)")
+            return None
+        try:
+            load_start = time.time()
+            model, processor = load_component(self.snapshot_dir, "model", VoxtralForConditionalGeneration,
+                                              AutoProcessor, **self._model_load_kwargs(attn_implementation))
+        except Exception as e:
+            realtime_logger.warning(f"⚠️ Snapshot load failed ({e}) - falling back to the hub")
+            return None
+        self.snapshot_manifest = manifest
+        realtime_logger.info(f"⚡ Loaded {manifest['components']['model']['quantization']} snapshot from "
+                             f"{self.snapshot_dir} in {time.time() - load_start:.2f}s (offline)")
+        return processor, model
+
+    def _load_from_hub(self, attn_implementation: str):
+        """(processor, model) from the hub cache, quantizing at load time"""
+        # Load processor (keep existing)
+        realtime_logger.info(f"📥 Loading AutoProcessor from {config.model.name}")
+        processor = AutoProcessor.from_pretrained(
+            config.model.name,
+            cache_dir=config.model.cache_dir
+        )
+
+        # ULTRA-OPTIMIZED model loading with quantization
+        realtime_logger.info(f"📥 Loading QUANTIZED Voxtral model for <500ms target")
+
+        model_kwargs = {"cache_dir": config.model.cache_dir, **self._model_load_kwargs(attn_implementation)}
+
+        # Try quantization if available (BitsAndBytes needs CUDA; the CPU backend quantizes after loading)
+        try:
+            if self.device == "cpu":
+                raise ImportError("BitsAndBytes requires CUDA")
+            from transformers import BitsAndBytesConfig
+            # CRITICAL FIX: Enable 8-bit quantization for better speed
+            # 8-bit quantization reduces memory bandwidth requirements
+            # This actually IMPROVES performance despite smaller model size
+            bnb_config = BitsAndBytesConfig(
+                load_in_4bit=False,  # Keep 4-bit disabled (too aggressive)
+                load_in_8bit=True,   # ENABLE 8-bit quantization for speed
+                bnb_4bit_use_double_quant=False,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=torch.float16
+            )
+            realtime_logger.info("✅ 8-bit quantization ENABLED for optimal speed")
+            model_kwargs["quantization_config"] = bnb_config  # ENABLE quantization
+        except ImportError:
+            realtime_logger.info("💡 BitsAndBytesConfig not available - using standard loading")
+
+        model = VoxtralForConditionalGeneration.from_pretrained(
+            config.model.name,
+            **model_kwargs
+        )
+        return processor, model
+
     async def initialize(self):
         """Initialize with AGGRESSIVE quantization for <500ms latency"""
         try:
@@ -280,59 +995,28 @@ class VoxtralModel:
                 except Exception as e:
                     realtime_logger.warning(f"⚠️ Flash Attention 2 backend setup failed: {e}")
 
-            # Load processor (keep existing)
-            realtime_logger.info(f"📥 Loading AutoProcessor from {config.model.name}")
-            self.processor = AutoProcessor.from_pretrained(
-                config.model.name,
-                cache_dir=config.model.cache_dir
-            )
-
             # CRITICAL: Check FlashAttention2
             attn_implementation = self._check_flash_attention_availability()
-            
-            # ULTRA-OPTIMIZED model loading with quantization
-            realtime_logger.info(f"📥 Loading QUANTIZED Voxtral model for <500ms target")
-            
-            model_kwargs = {
-                "cache_dir": config.model.cache_dir,
-                "torch_dtype": torch.float16,  # FORCE float16 for maximum speed
-                "device_map": "auto",
-                "low_cpu_mem_usage": True,
-                "trust_remote_code": True,
-                "attn_implementation": attn_implementation,
-                # REMOVED: Invalid parameters that cause errors
-                # "use_flash_attention_2": True,  # REMOVED - not supported
-                # "torch_compile": False,         # REMOVED - not needed
-                "max_memory": {0: "16GB"},  # INCREASED: Use available VRAM (you have 19.70 GB)
-                "offload_folder": None,    # Keep everything on GPU
-            }
-            
-            # Try quantization if available
-            try:
-                from transformers import BitsAndBytesConfig
-                # CRITICAL FIX: Enable 8-bit quantization for better speed
-                # 8-bit quantization reduces memory bandwidth requirements
-                # This actually IMPROVES performance despite smaller model size
-                bnb_config = BitsAndBytesConfig(
-                    load_in_4bit=False,  # Keep 4-bit disabled (too aggressive)
-                    load_in_8bit=True,   # ENABLE 8-bit quantization for speed
-                    bnb_4bit_use_double_quant=False,
-                    bnb_4bit_quant_type="nf4",
-                    bnb_4bit_compute_dtype=torch.float16
-                )
-                realtime_logger.info("✅ 8-bit quantization ENABLED for optimal speed")
-                model_kwargs["quantization_config"] = bnb_config  # ENABLE quantization
-            except ImportError:
-                realtime_logger.info("💡 BitsAndBytesConfig not available - using standard loading")
-            
-            # Load model
-            self.model = VoxtralForConditionalGeneration.from_pretrained(
-                config.model.name,
-                **model_kwargs
-            )
-            
+
+            # Pre-quantized local snapshot first (no network, no re-quantization), hub otherwise
+            loaded = self._load_from_snapshot(attn_implementation) if self.snapshot_enabled else None
+            if loaded is None:
+                if self.offline_only:
+                    raise RuntimeError(f"No usable model snapshot at {self.snapshot_dir} and model.offline_only is set "
+                                       f"(create one with: python -m src.models.model_snapshot)")
+                loaded = self._load_from_hub(attn_implementation)
+            self.processor, self.model = loaded
+
             # ULTRA-OPTIMIZED model preparation
             self.model.eval()
+            if self.device == "cpu":
+                threads = configure_cpu_threads(self.cpu_threads, self.cpu_interop_threads)
+                self.cpu_backend_info = {
+                    "dtype": str(self.compute_dtype).replace("torch.", ""),
+                    **threads,
+                    **prepare_cpu_model(self.model, self.cpu_quantization)
+                }
+                realtime_logger.info(f"🖥️ CPU backend: {self.cpu_backend_info}")
 
             # PHASE 3 OPTIMIZATION: torch.compile DISABLED
             # CRITICAL: torch.compile causes graph breaks with Flash Attention 2
@@ -364,6 +1048,16 @@ class VoxtralModel:
             else:
                 realtime_logger.info(f"💡 Using {attn_implementation} attention (FlashAttention2 not available)")
             
+            # Load the draft model up front so the first turn does not pay for it
+            if self.speculative_decoding:
+                self.get_speculative_decoder()
+
+            # Tokenize the fixed prompt templates now rather than on the first turns
+            if self.get_prompt_template_cache() is not None:
+                for mode, has_context in (("conversation", False), ("conversation", True), ("transcribe", False)):
+                    prompt_text, context_text = self._build_prompt(mode, "warmup" if has_context else "")
+                    self._prompt_template(mode, "en", prompt_text, context_text)
+
             self.is_initialized = True
             init_time = time.time() - start_time
             realtime_logger.info(f"🎉 ULTRA-LOW LATENCY Voxtral ready in {init_time:.2f}s - Target: <500ms")
@@ -403,78 +1097,43 @@ class VoxtralModel:
 
             realtime_logger.debug(f"🔊 Audio stats for chunk {chunk_id}: length={len(audio_numpy)}, max_val={np.max(np.abs(audio_numpy)):.4f}")
 
-            # OPTIMIZED: Write to temporary file with minimal overhead
-            import tempfile
-            import soundfile as sf
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-            sf.write(tmp_path, audio_numpy, config.audio.sample_rate)
-            realtime_logger.debug(f"📁 Written chunk {chunk_id} to temporary file {tmp_path}")
-
             realtime_logger.debug(f"🔊 Starting inference for chunk {chunk_id}")
             inference_start = time.time()
 
-            # CRITICAL: Use mode parameter to determine prompt
-            # mode="conversation" -> Generate conversational responses
-            # mode="transcribe" -> Transcribe audio only
-            if mode == "conversation":
-                # CRITICAL FIX: Strengthen the conversational prompt to prevent transcription fallback
-                # The model must understand it should respond, not transcribe
-                prompt_text = "You are a helpful conversational AI. Listen to what the user said and respond to them conversationally. Do NOT repeat or transcribe what they said. Instead, respond naturally to their message."
-            else:
-                prompt_text = "Transcribe exactly what you heard. Be precise with proper nouns and technical terms."
+            prompt_text, _ = self._build_prompt(mode)
 
             # CRITICAL FIX: Log the prompt being used to verify it's set correctly
             realtime_logger.info(f"🎯 [CHUNK {chunk_id}] Mode: {mode}, Prompt: '{prompt_text}'")
 
-            conversation = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "audio",
-                            "path": tmp_path
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt_text
-                        }
-                    ]
-                }
-            ]
-
-            # CRITICAL FIX: Verify conversation structure
-            realtime_logger.debug(f"🔍 [CHUNK {chunk_id}] Conversation structure: {conversation}")
-
-            # Apply chat template
-            inputs = self.processor.apply_chat_template(conversation, return_tensors="pt")
-            inputs = inputs.to(self.device, dtype=torch.float16)
-
-            # CRITICAL FIX: Log input tokens to verify prompt is encoded
-            realtime_logger.debug(f"📊 [CHUNK {chunk_id}] Input shape: {inputs['input_ids'].shape}, tokens: {inputs['input_ids'].tolist()[:20]}...")
+            # Pre-tokenized prompt + audio features (chat template only on a template miss)
+            inputs = self._turn_inputs(audio_numpy, mode, "en", prompt_text, chunk_id)
+            prefix = self._prompt_prefix(mode, "en", prompt_text)
+            realtime_logger.debug(f"📊 [CHUNK {chunk_id}] Input shape: {tuple(inputs['input_ids'].shape)}")
+            self._record_turn_shape(mode, len(audio_numpy), "", False, inputs)
 
             # OPTIMIZED generation parameters for accuracy
             realtime_logger.debug(f"🔧 [CHUNK {chunk_id}] Starting generation with use_cache=True")
 
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=100,        # Allow longer transcriptions for accuracy
-                    min_new_tokens=1,
-                    do_sample=False,           # Deterministic
-                    num_beams=1,               # Single beam
-                    use_cache=True,            # REVERTED: Re-enable KV cache (was causing regression when disabled)
-                    pad_token_id=self.processor.tokenizer.eos_token_id,
-                    temperature=1.0,
-                    top_p=0.95,                # Slightly higher for better accuracy
-                    top_k=50,                  # Increased for better word selection
-                    repetition_penalty=1.0,
-                    length_penalty=1.0,        # Neutral length penalty
-                    no_repeat_ngram_size=3,
-                    output_scores=False,
-                    return_dict_in_generate=False,
-                    synced_gpus=False
-                )
+            outputs = await self.inference_executor.run(
+                self._generate_with_cache,
+                prefix,
+                **inputs,
+                max_new_tokens=100,        # Allow longer transcriptions for accuracy
+                min_new_tokens=1,
+                do_sample=False,           # Deterministic
+                num_beams=1,               # Single beam
+                use_cache=True,            # REVERTED: Re-enable KV cache (was causing regression when disabled)
+                pad_token_id=self.processor.tokenizer.eos_token_id,
+                temperature=1.0,
+                top_p=0.95,                # Slightly higher for better accuracy
+                top_k=50,                  # Increased for better word selection
+                repetition_penalty=1.0,
+                length_penalty=1.0,        # Neutral length penalty
+                no_repeat_ngram_size=3,
+                output_scores=False,
+                return_dict_in_generate=False,
+                synced_gpus=False
+            )
 
             inference_time = (time.time() - inference_start) * 1000
             realtime_logger.debug(f"⚡ Inference completed for chunk {chunk_id} in {inference_time:.1f}ms")
@@ -498,15 +1157,10 @@ class VoxtralModel:
                 else:
                     realtime_logger.debug(f"✅ [CHUNK {chunk_id}] Response looks conversational ({len(response_text)} chars)")
 
-            # Clean up temp file
-            try:
-                import os
-                os.unlink(tmp_path)
-            except:
-                pass
-
             total_time = (time.time() - chunk_start_time) * 1000
             realtime_logger.info(f"✅ Chunk {chunk_id} processed in {total_time:.1f}ms: '{response_text[:50]}...'")
+            if self.warmup_planner is not None:
+                self.warmup_planner.record_first_request(total_time)
 
             return {
                 'success': True,
@@ -576,7 +1230,7 @@ class VoxtralModel:
             realtime_logger.error(f"Error transcribing from URL: {e}")
             raise
 
-    async def process_realtime_chunk_streaming(self, audio_data: Union[torch.Tensor, np.ndarray], chunk_id: str, mode: str = "conversation", conversation_context: str = "", language: str = "en") -> AsyncGenerator[Dict[str, Any], None]:
+    async def process_realtime_chunk_streaming(self, audio_data: Union[torch.Tensor, np.ndarray], chunk_id: str, mode: str = "conversation", conversation_context: str = "", language: str = "en", session_id: Optional[str] = None, streaming_audio: Optional[StreamingUtterance] = None, cancel_token: Optional[CancellationToken] = None, speculative: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
         """Process real-time audio with CHUNKED STREAMING response
 
         Args:
@@ -585,13 +1239,21 @@ class VoxtralModel:
             mode: "conversation" or "transcribe"
             conversation_context: Previous conversation context for context-aware responses (PHASE 1)
             language: Language code for TTS synthesis (PHASE 5)
+            session_id: Conversation session whose KV cache is carried over between turns
+            streaming_audio: Utterance streamed in frames; its already-encoded windows are reused
+            cancel_token: Turn cancellation; generation stops at the next decode step once cancelled.
+                Closing or cancelling this generator cancels it too.
+            speculative: Started before the endpoint was confirmed; if it is cancelled, the
+                session's KV cache is left as it was before the turn
         """
         if not self.is_initialized:
             raise RuntimeError("VoxtralModel not initialized")
         
         chunk_start_time = time.time()
         realtime_logger.debug(f"🎵 Starting CHUNKED STREAMING for chunk {chunk_id}")
-        
+        cancel_token = cancel_token if cancel_token is not None else CancellationToken(str(chunk_id))
+        word_stream = None
+
         try:
             # Convert audio data
             if isinstance(audio_data, torch.Tensor):
@@ -614,73 +1276,61 @@ class VoxtralModel:
                 }
                 return
             
-            # Write temp file
-            import tempfile
-            import soundfile as sf
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-            sf.write(tmp_path, audio_numpy, config.audio.sample_rate)
-            
             realtime_logger.debug(f"🔊 Starting CHUNKED inference for chunk {chunk_id}")
             inference_start = time.time()
 
-            # CRITICAL: Use mode parameter to determine prompt
-            # mode="conversation" -> Generate conversational responses
-            # mode="transcribe" -> Transcribe audio only
-            if mode == "conversation":
-                # PHASE 1: Include conversation context for context-aware responses
-                if conversation_context.strip():
-                    prompt_text = f"""You are a helpful conversational AI.
+            # Session KV carry-over: a turn whose history is in the cache drops the text context
+            # (decided at checkout, see _generate_with_cache)
+            session_cache = self.get_session_cache() if (session_id and mode == "conversation" and not self.continuous_batching) else None
+            if session_cache is None:
+                session_id = None
 
-Previous conversation:
-{conversation_context}
-
-Listen to what the user just said and respond to them conversationally. Do NOT repeat or transcribe what they said. Instead, respond naturally to their message, taking into account the previous conversation context."""
-                    realtime_logger.info(f"📝 [PHASE 1] Using context-aware prompt with {len(conversation_context)} chars of context")
-                else:
-                    # CRITICAL FIX: Strengthen the conversational prompt to prevent transcription fallback
-                    # The model must understand it should respond, not transcribe
-                    prompt_text = "You are a helpful conversational AI. Listen to what the user said and respond to them conversationally. Do NOT repeat or transcribe what they said. Instead, respond naturally to their message."
-                    realtime_logger.info(f"📝 [PHASE 1] Using standard prompt (no context available)")
-            else:
-                prompt_text = "Transcribe exactly what you heard. Be precise with proper nouns and technical terms."
+            prompt_text, context_text = self._build_prompt(mode, conversation_context)
+            if context_text:
+                realtime_logger.info(f"📝 [PHASE 1] Using context-aware prompt with {len(conversation_context)} chars of context")
+            elif mode == "conversation":
+                realtime_logger.info(f"📝 [PHASE 1] Using standard prompt (no context available)")
 
             # CRITICAL FIX: Log the prompt being used to verify it's set correctly
             realtime_logger.info(f"🎯 [CHUNK {chunk_id}] Mode: {mode}, Prompt length: {len(prompt_text)}")
 
-            # Create conversation with appropriate prompt
-            conversation = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "audio", "path": tmp_path},
-                        {"type": "text", "text": prompt_text}
-                    ]
-                }
-            ]
-
-            # CRITICAL FIX: Verify conversation structure
-            realtime_logger.debug(f"🔍 [CHUNK {chunk_id}] Conversation structure: {conversation}")
-
-            inputs = self.processor.apply_chat_template(conversation, return_tensors="pt")
-            inputs = inputs.to(self.device, dtype=torch.float16)
-
-            # CRITICAL FIX: Log input tokens to verify prompt is encoded
-            realtime_logger.debug(f"📊 [CHUNK {chunk_id}] Input shape: {inputs['input_ids'].shape}, tokens: {inputs['input_ids'].tolist()[:20]}...")
+            audio_embeds = None
+            if streaming_audio is not None and self.get_streaming_encoder() is not None:
+                # Audio was encoded while the user spoke; only stale windows are left to encode
+                audio_embeds = await self.streaming_encoder.finalize(streaming_audio)
+                realtime_logger.info(f"🎙️ [CHUNK {chunk_id}] Streamed utterance ready "
+                                     f"{(time.time() - inference_start) * 1000:.1f}ms after endpoint")
+
+            if audio_embeds is not None:
+                with torch.no_grad():
+                    inputs = self._streaming_inputs(audio_embeds, streaming_audio.num_windows, prompt_text, context_text,
+                                                    mode=mode, language=language)
+            else:
+                # Pre-tokenized prompt + audio features (chat template only on a template miss)
+                inputs = self._turn_inputs(audio_numpy, mode, language, prompt_text, chunk_id, context_text)
+            session_inputs = None
+            if session_id is not None and context_text:
+                session_inputs = self._context_free_inputs(inputs, audio_numpy, audio_embeds, streaming_audio,
+                                                           mode, language, prompt_text, chunk_id)
+            prefix = self._prompt_prefix(mode, language, prompt_text)
+            realtime_logger.debug(f"📊 [CHUNK {chunk_id}] Input shape: {tuple(inputs['input_ids'].shape)}")
+            self._record_turn_shape(mode, len(audio_numpy), context_text, audio_embeds is not None, inputs)
 
             # OPTIMIZED CHUNKED GENERATION with streaming
             chunk_index = 0
             generated_text = ""
 
-            with torch.no_grad():
-                # Generate with streaming enabled
-                streamer = TextIteratorStreamer(
-                    self.processor.tokenizer,
-                    timeout=60.0,
-                    skip_prompt=True,
-                    skip_special_tokens=True
+            if self.continuous_batching:
+                # Token-level scheduler: this turn shares decode steps with concurrent turns
+                sequence = self.get_inference_scheduler().submit(
+                    dict(inputs),
+                    max_new_tokens=100,
+                    request_id=chunk_id,
+                    prefix=prefix,
+                    cancel_token=cancel_token
                 )
-
+                word_stream = self._scheduled_word_stream(sequence)
+            else:
                 generation_kwargs = {
                     **inputs,
                     "max_new_tokens": 100,    # Allow longer transcriptions
@@ -688,91 +1338,81 @@ Listen to what the user just said and respond to them conversationally. Do NOT r
                     "temperature": 1.0,
                     "top_p": 0.95,             # Slightly higher for accuracy
                     "top_k": 50,               # Increased for better word selection
-                    "streamer": streamer,
                     "pad_token_id": self.processor.tokenizer.eos_token_id,
                     "use_cache": True,         # REVERTED: Re-enable KV cache (was causing regression when disabled)
                     "output_scores": False,
                     "return_dict_in_generate": False,
-                    "synced_gpus": False
+                    "synced_gpus": False,
+                    "stopping_criteria": cancellation_stopping_criteria(cancel_token, self._on_generation_cancelled)
                 }
 
                 realtime_logger.debug(f"🔧 [CHUNK {chunk_id}] Generation kwargs: use_cache={generation_kwargs['use_cache']}, max_new_tokens={generation_kwargs['max_new_tokens']}")
 
-                # Start generation in background thread
-                import threading
-                generation_thread = threading.Thread(
-                    target=self.model.generate,
-                    kwargs=generation_kwargs
+                # Generate on the inference executor; words arrive on an asyncio queue
+                word_stream = self.inference_executor.stream_words(
+                    functools.partial(self._generate_with_cache, prefix, session_id,
+                                      (lambda: cancel_token.is_cancelled) if speculative else None,
+                                      session_inputs),
+                    generation_kwargs,
+                    self.processor.tokenizer,
+                    timeout=60.0,
+                    skip_special_tokens=True,
+                    cancel_token=cancel_token  # Still waiting for the model when cancelled: skipped
                 )
-                generation_thread.start()
-
-                # Stream chunks as they're generated
-                word_buffer = []
-                first_token_time = None
-                first_chunk_received = False
-
-                # PHASE 3: Get TTS manager for streaming audio pipeline
-                tts_manager = self.get_tts_manager()
-                tts_enabled = tts_manager is not None and tts_manager.is_initialized
-
-                for new_text in streamer:
-                    if new_text:
-                        words = new_text.split()
-                        word_buffer.extend(words)
-
-                        # Track first token latency (PHASE 0 FIX)
-                        if first_token_time is None:
-                            first_token_time = time.time() - chunk_start_time
-                            realtime_logger.info(f"⚡ [PHASE 0] TTFT: {first_token_time*1000:.1f}ms for chunk {chunk_id}")
-
-                        # CRITICAL FIX: Log first chunk to detect transcription-only responses
-                        if not first_chunk_received:
-                            first_chunk_received = True
-                            realtime_logger.info(f"📝 [CHUNK {chunk_id}] First generated text: '{new_text}' (mode={mode})")
-
-                        # PHASE 0 FIX: Send 1-word chunks immediately instead of waiting for 6 words
-                        # This reduces TTFT from 300-500ms to 50-100ms
-                        # OPTIMIZATION: Batch TTS calls to reduce latency (don't call TTS for every word)
-                        while len(word_buffer) >= 1:
-                            chunk_text = " ".join(word_buffer[:1])
-                            word_buffer = word_buffer[1:]
-                            generated_text += chunk_text + " "
-
-                            realtime_logger.debug(f"🎯 [PHASE 0] Streaming 1-word chunk {chunk_index}: '{chunk_text}'")
-
-                            # OPTIMIZATION: Skip TTS for individual words to reduce latency
-                            # TTS will be called after full response is generated
-                            audio_bytes = None
-
-                            yield {
-                                'success': True,
-                                'text': chunk_text.strip(),
-                                'audio': audio_bytes,  # PHASE 3: Include audio bytes (None for now)
-                                'is_final': False,
-                                'chunk_index': chunk_index,
-                                'first_token_latency_ms': int(first_token_time*1000) if first_token_time else None,
-                                'processing_time_ms': (time.time() - chunk_start_time) * 1000
-                            }
-                            chunk_index += 1
-
-                # Send remaining words
-                if word_buffer:
-                    final_text = " ".join(word_buffer)
-                    generated_text += final_text
-
-                    # OPTIMIZATION: Skip TTS for individual words to reduce latency
-                    # TTS will be called after full response is generated
-                    audio_bytes = None
-
-                    yield {
-                        'success': True,
-                        'text': final_text.strip(),
-                        'audio': audio_bytes,  # PHASE 3: Include audio bytes (None for now)
-                        'is_final': True,
-                        'chunk_index': chunk_index,
-                        'processing_time_ms': (time.time() - chunk_start_time) * 1000
-                    }
-            
+
+            # Stream chunks as they're generated
+            response_words = []
+            first_token_time = None
+            first_chunk_received = False
+
+            async for event in word_stream:
+                if cancel_token.is_cancelled:
+                    # Barge-in / cancel: nothing more goes out for this turn
+                    break
+                if event.kind != "word":
+                    continue
+
+                # Track first token latency (PHASE 0 FIX)
+                if first_token_time is None:
+                    first_token_time = time.time() - chunk_start_time
+                    realtime_logger.info(f"⚡ [PHASE 0] TTFT: {first_token_time*1000:.1f}ms for chunk {chunk_id}")
+                    if self.warmup_planner is not None:
+                        self.warmup_planner.record_first_request(first_token_time * 1000)
+
+                # CRITICAL FIX: Log first chunk to detect transcription-only responses
+                if not first_chunk_received:
+                    first_chunk_received = True
+                    realtime_logger.info(f"📝 [CHUNK {chunk_id}] First generated text: '{event.text}' (mode={mode})")
+
+                # PHASE 0 FIX: Send 1-word chunks immediately instead of waiting for 6 words
+                # This reduces TTFT from 300-500ms to 50-100ms
+                # The streamer detokenizes incrementally and emits each word once it is complete
+                chunk_text = event.text
+                response_words.append(chunk_text)
+
+                realtime_logger.debug(f"🎯 [PHASE 0] Streaming 1-word chunk {chunk_index}: '{chunk_text}'")
+
+                # Speech is synthesized by the server's TTS pipeline from the streamed words
+                audio_bytes = None
+
+                yield {
+                    'success': True,
+                    'text': chunk_text,
+                    'audio': audio_bytes,  # PHASE 3: Include audio bytes (None for now)
+                    'is_final': False,
+                    'chunk_index': chunk_index,
+                    'first_token_latency_ms': int(first_token_time*1000) if first_token_time else None,
+                    'processing_time_ms': (time.time() - chunk_start_time) * 1000
+                }
+                chunk_index += 1
+
+            generated_text = " ".join(response_words)
+
+            if cancel_token.is_cancelled:
+                realtime_logger.info(f"🛑 [CHUNK {chunk_id}] Turn cancelled ({cancel_token.reason}) after "
+                                     f"{len(generated_text.split())} words")
+                return
+
             # CRITICAL FIX: Detect and prevent transcription-only responses in conversation mode
             if mode == "conversation" and generated_text:
                 if len(generated_text) < 10:
@@ -780,16 +1420,13 @@ Listen to what the user just said and respond to them conversationally. Do NOT r
                 else:
                     realtime_logger.debug(f"✅ [CHUNK {chunk_id}] Streaming response looks conversational ({len(generated_text)} chars)")
 
-            # Cleanup
-            try:
-                import os
-                os.unlink(tmp_path)
-            except:
-                pass
-
             total_time = (time.time() - chunk_start_time) * 1000
             realtime_logger.info(f"✅ CHUNKED STREAMING completed for {chunk_id} in {total_time:.1f}ms: '{generated_text[:50]}...'")
 
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer went away mid-turn: stop decoding for nobody
+            cancel_token.cancel("abandoned")
+            raise
         except Exception as e:
             realtime_logger.error(f"❌ CHUNKED STREAMING error for {chunk_id}: {e}")
             yield {
@@ -799,6 +1436,18 @@ Listen to what the user just said and respond to them conversationally. Do NOT r
                 'chunk_index': 0,
                 'error': str(e)
             }
+        finally:
+            if cancel_token.is_cancelled:
+                self.cancellation_stats["cancelled_turns"] += 1
+                executor_future = getattr(word_stream, "future", None)
+                if executor_future is not None:
+                    executor_future.cancel()  # Not started yet: the job leaves the executor queue
+
+    def _on_generation_cancelled(self, cancel_token: CancellationToken):
+        """Stopping-criteria callback (decode thread): generation noticed a cancelled turn"""
+        self.cancellation_stats["stopped_generations"] += 1
+        if cancel_token.cancelled_at is not None:
+            self.cancellation_stats["total_stop_latency_ms"] += (time.time() - cancel_token.cancelled_at) * 1000
     
     def _create_ultra_short_streaming_prompt(self) -> str:
         """Create prompt optimized for streaming responses"""
@@ -866,6 +1515,9 @@ Listen to what the user just said and respond to them conversationally. Do NOT r
             "mode": "conversational_optimized",
             "flash_attention_available": self.flash_attention_available,
             "torch_compile_enabled": self.use_torch_compile,
+            "continuous_batching": self.continuous_batching,
+            "model_source": "snapshot" if self.snapshot_manifest is not None else "hub",
+            "cpu_backend": self.cpu_backend_info,
             "vad_settings": {
                 "silence_threshold": self.silence_threshold,
                 "min_speech_duration": self.min_speech_duration,
@@ -892,11 +1544,38 @@ Listen to what the user just said and respond to them conversationally. Do NOT r
                         "performance_history_size": len(self.processing_history)
                     }
                 })
+
+        base_info["executor_stats"] = self.inference_executor.get_stats()
+        if self.prompt_template_cache is not None:
+            base_info["prompt_template_stats"] = self.prompt_template_cache.get_stats()
+        if self.prefix_cache is not None:
+            base_info["prefix_cache_stats"] = self.prefix_cache.get_stats()
+        if self.session_cache is not None:
+            base_info["session_cache_stats"] = self.session_cache.get_stats()
+        if self.inference_scheduler is not None:
+            base_info["scheduler_stats"] = self.inference_scheduler.get_stats()
+        if self.streaming_encoder is not None:
+            base_info["streaming_encoder_stats"] = self.streaming_encoder.get_stats()
+        if self.warmup_planner is not None:
+            base_info["warmup_stats"] = self.warmup_planner.get_stats()
+        if self.speculative_decoder is not None:
+            base_info["speculative_stats"] = self.speculative_decoder.get_stats()
+        cancellation_stats = dict(self.cancellation_stats)
+        stopped = cancellation_stats["stopped_generations"]
+        cancellation_stats["avg_stop_latency_ms"] = cancellation_stats["total_stop_latency_ms"] / stopped if stopped else 0.0
+        base_info["cancellation_stats"] = cancellation_stats
         
         return base_info
 
+def create_model_engine(device: Optional[str] = None):
+    """VoxtralModel, or the deterministic stand-in engine when model.engine is "stub" """
+    if getattr(config.model, 'engine', 'voxtral') == "stub":
+        from src.utils.compatibility import FallbackVoxtralModel
+        return FallbackVoxtralModel.from_config(config, device=device)
+    return VoxtralModel(device=device)
+
 # Global model instance for real-time streaming
-voxtral_model = VoxtralModel()
+voxtral_model = create_model_engine()
 
 # FIXED: Add proper main execution block for testing
 if __name__ == "__main__":
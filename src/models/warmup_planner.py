@@ -0,0 +1,191 @@
+"""
+Traffic-derived warmup plan
+Records the shapes real turns produce (mode, audio length, conversation-context length,
+streamed or not) as a bucketed histogram, persists it next to the model cache, and on the
+next start warms only the buckets that cover most of that traffic - with short, bounded
+decodes instead of full generations on noise.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+# Setup logging
+warmup_logger = logging.getLogger("warmup_planner")
+
+PLAN_FILE_VERSION = 1
+
+# Bucket upper edges; a turn falls into the first bucket whose edge it does not exceed
+AUDIO_BUCKETS_S = (1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+CONTEXT_BUCKETS_CHARS = (0, 256, 1024, 4096, 16384)
+
+
+@dataclass
+class WarmupShape:
+    """One histogram bucket, replayed by warming a turn of its upper-edge size"""
+    mode: str
+    audio_s: float
+    context_chars: int
+    streamed: bool
+    count: float = 0.0
+    max_prompt_tokens: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.mode}|{self.audio_s:g}|{self.context_chars}|{int(self.streamed)}"
+
+
+def _bucket(value: float, edges: tuple) -> float:
+    for edge in edges:
+        if value <= edge:
+            return edge
+    return edges[-1]
+
+
+class WarmupPlanner:
+    """
+    Histogram of turn shapes and the warmup plan derived from it
+
+    Args:
+        path: JSON file the histogram is persisted to
+        max_runs: Most buckets warmed at startup
+        coverage: Stop adding buckets once this share of recorded traffic is covered
+        save_every: Persist after this many new turns (also saved on shutdown)
+        decay: Factor applied to loaded counts so recent traffic outweighs old traffic
+    """
+
+    def __init__(self, path: str, max_runs: int = 6, coverage: float = 0.95, save_every: int = 20,
+                 decay: float = 0.5):
+        self.path = path
+        self.max_runs = max(1, int(max_runs))
+        self.coverage = coverage
+        self.save_every = max(1, int(save_every))
+        self.decay = decay
+        self.buckets: Dict[str, WarmupShape] = {}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.stats = {
+            "recorded_turns": 0,
+            "loaded_turns": 0.0,
+            "plan_source": "default",
+            "warmup_runs": 0,
+            "warmup_ms": None,
+            "cold_start_ms": None,
+            "first_request_ms": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, mode: str, audio_s: float, context_chars: int = 0, streamed: bool = False,
+               prompt_tokens: int = 0):
+        """Count one real turn; persists every `save_every` turns"""
+        shape = WarmupShape(mode, _bucket(audio_s, AUDIO_BUCKETS_S),
+                            int(_bucket(context_chars, CONTEXT_BUCKETS_CHARS)), bool(streamed))
+        with self._lock:
+            bucket = self.buckets.setdefault(shape.key, shape)
+            bucket.count += 1
+            bucket.max_prompt_tokens = max(bucket.max_prompt_tokens, int(prompt_tokens))
+            self.stats["recorded_turns"] += 1
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def record_first_request(self, latency_ms: float):
+        """Latency of the first real turn after startup (kept once)"""
+        with self._lock:
+            if self.stats["first_request_ms"] is None:
+                self.stats["first_request_ms"] = latency_ms
+                warmup_logger.info(f"⏱️ First real request after startup: {latency_ms:.1f}ms")
+
+    def record_warmup(self, runs: int, warmup_ms: float, cold_start_ms: Optional[float] = None):
+        with self._lock:
+            self.stats["warmup_runs"] = runs
+            self.stats["warmup_ms"] = warmup_ms
+            if cold_start_ms is not None:
+                self.stats["cold_start_ms"] = cold_start_ms
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+
+    def plan(self) -> List[WarmupShape]:
+        """Most frequent buckets until `coverage` of traffic (at most `max_runs`)"""
+        with self._lock:
+            buckets = sorted(self.buckets.values(), key=lambda shape: shape.count, reverse=True)
+        total = sum(shape.count for shape in buckets)
+        if total <= 0:
+            # No traffic seen yet: one typical short conversational turn
+            return [WarmupShape("conversation", 2.0, 0, False)]
+
+        plan, covered = [], 0.0
+        for shape in buckets:
+            if len(plan) >= self.max_runs or covered >= self.coverage * total:
+                break
+            plan.append(shape)
+            covered += shape.count
+        return plan
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["buckets"] = len(self.buckets)
+        stats["plan"] = [dict(asdict(shape), count=round(shape.count, 2)) for shape in self.plan()]
+        return stats
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Load the histogram saved by the previous run; False when there is none"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as plan_file:
+                data = json.load(plan_file)
+            if data.get("version") != PLAN_FILE_VERSION:
+                warmup_logger.warning(f"⚠️ Ignoring warmup plan {self.path} (version {data.get('version')})")
+                return False
+            buckets = {}
+            for entry in data.get("buckets", []):
+                shape = WarmupShape(**entry)
+                shape.count *= self.decay
+                if shape.count >= 0.01:
+                    buckets[shape.key] = shape
+        except (OSError, ValueError, TypeError) as e:
+            warmup_logger.warning(f"⚠️ Could not read warmup plan {self.path}: {e}")
+            return False
+
+        with self._lock:
+            self.buckets = buckets
+            self.stats["loaded_turns"] = round(sum(shape.count for shape in buckets.values()), 2)
+            self.stats["plan_source"] = "history" if buckets else "default"
+        warmup_logger.info(f"📈 Loaded warmup histogram: {len(buckets)} buckets from {self.path}")
+        return True
+
+    def save(self):
+        """Write the histogram atomically (temp file + rename)"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "version": PLAN_FILE_VERSION,
+                "updated_at": time.time(),
+                "buckets": [asdict(shape) for shape in self.buckets.values()],
+            }
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as plan_file:
+                json.dump(data, plan_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            warmup_logger.warning(f"⚠️ Could not save warmup plan {self.path}: {e}")
@@ -0,0 +1,63 @@
+"""
+In-memory audio encoding helpers
+Hands audio buffers to the Voxtral processor without touching the filesystem
+"""
+
+import base64
+import io
+import logging
+
+import numpy as np
+import soundfile as sf
+
+# Setup logging
+audio_io_logger = logging.getLogger("audio_io")
+
+
+def encode_wav_bytes(audio_data: np.ndarray, sample_rate: int, subtype: str = "PCM_16") -> bytes:
+    """
+    Encode a mono float32 buffer as WAV bytes entirely in memory
+
+    Args:
+        audio_data: Mono audio samples in [-1, 1]
+        sample_rate: Sample rate of the audio in Hz
+        subtype: soundfile subtype (PCM_16 matches what `sf.write` produced for the old temp files)
+
+    Returns:
+        Complete WAV file as bytes
+    """
+    wav_buffer = io.BytesIO()
+    sf.write(wav_buffer, np.asarray(audio_data, dtype=np.float32), sample_rate, format="WAV", subtype=subtype)
+    return wav_buffer.getvalue()
+
+
+def encode_audio_base64(audio_data: np.ndarray, sample_rate: int) -> str:
+    """
+    Encode a mono float32 buffer as a base64 WAV string
+
+    This is the representation the Voxtral processor forwards to mistral-common for
+    `{"type": "audio", "base64": ...}` content blocks, so no temp file or re-encode is needed.
+
+    Args:
+        audio_data: Mono audio samples in [-1, 1]
+        sample_rate: Sample rate of the audio in Hz
+
+    Returns:
+        Base64-encoded WAV payload
+    """
+    return base64.b64encode(encode_wav_bytes(audio_data, sample_rate)).decode("ascii")
+
+
+def decode_audio_base64(audio_b64: str) -> tuple:
+    """
+    Decode a base64 WAV payload back into a float32 buffer
+
+    Args:
+        audio_b64: Base64-encoded WAV payload
+
+    Returns:
+        Tuple of (audio_data, sample_rate)
+    """
+    with io.BytesIO(base64.b64decode(audio_b64)) as wav_buffer:
+        audio_data, sample_rate = sf.read(wav_buffer, dtype="float32")
+    return audio_data, sample_rate
@@ -0,0 +1,240 @@
+"""
+Per-client audio output formats
+TTS audio is produced and cached once as WAV at the model's rate. Each client picks the format
+it wants on the wire when it connects (WAV, raw PCM16, G.711 mu-law, or Opus in Ogg/WebM) and
+its playback rate; audio is resampled with a cached resampler and encoded per client, so the
+payload shrinks and the browser can play it without resampling or, for PCM, decoding.
+"""
+
+import asyncio
+import functools
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import soundfile as sf
+
+from src.utils.audio_io import encode_wav_bytes
+
+# Setup logging
+audio_output_logger = logging.getLogger("audio_output")
+
+FORMAT_WAV = "wav"
+FORMAT_PCM16 = "pcm16"
+FORMAT_MULAW = "mulaw"
+FORMAT_OPUS_OGG = "opus-ogg"
+FORMAT_OPUS_WEBM = "opus-webm"
+AUDIO_FORMATS = (FORMAT_WAV, FORMAT_PCM16, FORMAT_MULAW, FORMAT_OPUS_OGG, FORMAT_OPUS_WEBM)
+# Played as bare samples by the client: anything else in these bytes is heard as noise
+RAW_FORMATS = (FORMAT_PCM16, FORMAT_MULAW)
+
+MIME_TYPES = {
+    FORMAT_WAV: "audio/wav",
+    FORMAT_PCM16: "audio/L16",
+    FORMAT_MULAW: "audio/PCMU",
+    FORMAT_OPUS_OGG: "audio/ogg; codecs=opus",
+    FORMAT_OPUS_WEBM: "audio/webm; codecs=opus",
+}
+
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+
+
+@dataclass
+class OutputFormat:
+    """What one client receives: codec and sample rate (mono)"""
+    codec: str = FORMAT_WAV
+    sample_rate: int = 0  # 0 = the TTS model's own rate
+    opus_bitrate: int = 32000
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.codec]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Announced to the client in its connection message"""
+        return {"codec": self.codec, "sample_rate": self.sample_rate or None, "channels": 1,
+                "mime_type": self.mime_type}
+
+
+def negotiate_output_format(params: Mapping[str, str], allowed: Sequence[str] = AUDIO_FORMATS,
+                            default_codec: str = FORMAT_WAV, opus_bitrate: int = 32000) -> OutputFormat:
+    """
+    Pick the output format from the client's connect parameters
+
+    `audio_format` is a comma-separated preference list; the first codec the server allows
+    wins (the default codec when none does). `sample_rate` is the client's playback rate,
+    clamped to 8-48 kHz and, for Opus, raised to the next rate Opus supports.
+    """
+    requested = [codec.strip().lower() for codec in str(params.get("audio_format", "")).split(",") if codec.strip()]
+    codec = next((codec for codec in requested if codec in AUDIO_FORMATS and codec in allowed), default_codec)
+    try:
+        sample_rate = int(params.get("sample_rate", 0) or 0)
+    except (TypeError, ValueError):
+        sample_rate = 0
+    if sample_rate:
+        sample_rate = min(max(sample_rate, MIN_SAMPLE_RATE), MAX_SAMPLE_RATE)
+    if codec in (FORMAT_OPUS_OGG, FORMAT_OPUS_WEBM):
+        sample_rate = next((rate for rate in OPUS_SAMPLE_RATES if rate >= sample_rate), 48000) if sample_rate else 48000
+    elif codec == FORMAT_MULAW and not sample_rate:
+        sample_rate = 8000  # G.711 telephony rate
+    return OutputFormat(codec=codec, sample_rate=sample_rate, opus_bitrate=opus_bitrate)
+
+
+@functools.lru_cache(maxsize=16)
+def get_resampler(orig_rate: int, new_rate: int):
+    """Resampler for one rate pair; its filter kernel is built once and reused"""
+    import torchaudio
+    return torchaudio.transforms.Resample(orig_freq=orig_rate, new_freq=new_rate)
+
+
+def resample(audio: np.ndarray, orig_rate: int, new_rate: int) -> np.ndarray:
+    if not new_rate or orig_rate == new_rate or len(audio) == 0:
+        return audio
+    import torch
+    with torch.no_grad():
+        return get_resampler(int(orig_rate), int(new_rate))(torch.from_numpy(audio)).numpy()
+
+
+def resample_linear(audio: np.ndarray, orig_rate: int, new_rate: int) -> np.ndarray:
+    """Linear-interpolation resampling: lower quality, but needs nothing beyond numpy"""
+    if not new_rate or orig_rate == new_rate or len(audio) == 0:
+        return audio
+    positions = np.arange(int(round(len(audio) * new_rate / orig_rate))) * (orig_rate / new_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def to_pcm16(audio: np.ndarray) -> np.ndarray:
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2")
+
+
+def encode_mulaw(pcm16: np.ndarray) -> bytes:
+    """G.711 mu-law bytes for 16-bit samples"""
+    samples = pcm16.astype(np.int32)
+    sign = (samples < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(samples), _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def decode_mulaw(data: bytes) -> np.ndarray:
+    """16-bit samples back from G.711 mu-law bytes"""
+    codes = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = (((codes & 0x0F) << 3) + _MULAW_BIAS) << exponent
+    samples = magnitude - _MULAW_BIAS
+    return np.where(codes & 0x80, -samples, samples).astype(np.int16)
+
+
+def encode_opus(pcm16: np.ndarray, sample_rate: int, container: str, bitrate: int) -> bytes:
+    """Opus packets muxed into an Ogg or WebM stream (PyAV / libopus)"""
+    import av
+    output = io.BytesIO()
+    with av.open(output, mode="w", format=container) as muxer:
+        stream = muxer.add_stream("libopus", rate=sample_rate)
+        stream.bit_rate = bitrate
+        stream.codec_context.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(pcm16.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            muxer.mux(packet)
+        for packet in stream.encode(None):
+            muxer.mux(packet)
+    return output.getvalue()
+
+
+class AudioOutputEncoder:
+    """
+    Turns the TTS manager's WAV bytes into one client's output format
+
+    `encode()` is CPU work (resampling, Opus); `encode_async()` runs it off the event loop.
+    `encode_frames()` cuts the audio into short, separately playable frames for progressive
+    streaming. Bytes in and out are counted so the saving per format is visible.
+
+    Output is always in the negotiated codec and rate: without torchaudio the audio is
+    resampled linearly. If it cannot be encoded at all, WAV and Opus clients get the original
+    WAV (the browser decoder sniffs the container), PCM16/mu-law clients get nothing (empty
+    bytes) rather than a RIFF header and samples at the wrong rate played as noise.
+    """
+
+    def __init__(self, output_format: Optional[OutputFormat] = None):
+        self.output_format = output_format or OutputFormat()
+        self.stats = {"segments": 0, "frames": 0, "input_bytes": 0, "output_bytes": 0, "encode_errors": 0,
+                      "resample_fallbacks": 0}
+
+    def encode(self, wav_bytes: bytes) -> bytes:
+        """The audio as one payload; empty if it cannot be sent in a raw format"""
+        fmt = self.output_format
+        if fmt.codec == FORMAT_WAV and not fmt.sample_rate:
+            self._count(wav_bytes, [wav_bytes])
+            return wav_bytes
+        frames = self.encode_frames(wav_bytes, 0)
+        return frames[0] if frames else b""
+
+    def encode_frames(self, wav_bytes: bytes, frame_ms: float) -> List[bytes]:
+        """The audio cut into frames of `frame_ms` (0 = one frame), each playable on its own"""
+        fmt = self.output_format
+        try:
+            with io.BytesIO(wav_bytes) as wav_buffer:
+                audio, source_rate = sf.read(wav_buffer, dtype="float32", always_2d=True)
+            audio = np.ascontiguousarray(audio.mean(axis=1), dtype=np.float32)
+            sample_rate = fmt.sample_rate or source_rate
+            audio = self._resample(audio, source_rate, sample_rate)
+            frame_len = max(1, int(sample_rate * frame_ms / 1000) if frame_ms > 0 else len(audio))
+            frames = [self._encode_samples(audio[start:start + frame_len], sample_rate)
+                      for start in range(0, max(1, len(audio)), frame_len)]
+        except Exception as e:
+            self.stats["encode_errors"] += 1
+            if fmt.codec in RAW_FORMATS:
+                audio_output_logger.error(f"❌ {fmt.codec} encoding failed, segment not sent: {e}")
+                frames = []
+            else:
+                audio_output_logger.warning(f"⚠️ {fmt.codec} encoding failed, sending WAV: {e}")
+                frames = [wav_bytes]
+        self._count(wav_bytes, frames)
+        return frames
+
+    async def encode_async(self, wav_bytes: bytes) -> bytes:
+        return await asyncio.to_thread(self.encode, wav_bytes)
+
+    async def encode_frames_async(self, wav_bytes: bytes, frame_ms: float) -> List[bytes]:
+        return await asyncio.to_thread(self.encode_frames, wav_bytes, frame_ms)
+
+    def _resample(self, audio: np.ndarray, orig_rate: int, new_rate: int) -> np.ndarray:
+        try:
+            return resample(audio, orig_rate, new_rate)
+        except Exception as e:
+            if not self.stats["resample_fallbacks"]:
+                audio_output_logger.warning(f"⚠️ Resampling unavailable ({e}), using linear interpolation")
+            self.stats["resample_fallbacks"] += 1
+            return resample_linear(audio, orig_rate, new_rate)
+
+    def _encode_samples(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        fmt = self.output_format
+        if fmt.codec == FORMAT_WAV:
+            return encode_wav_bytes(audio, sample_rate)
+        if fmt.codec == FORMAT_PCM16:
+            return to_pcm16(audio).tobytes()
+        if fmt.codec == FORMAT_MULAW:
+            return encode_mulaw(to_pcm16(audio))
+        container = "ogg" if fmt.codec == FORMAT_OPUS_OGG else "webm"
+        return encode_opus(to_pcm16(audio), sample_rate, container, fmt.opus_bitrate)
+
+    def _count(self, wav_bytes: bytes, frames: List[bytes]):
+        self.stats["segments"] += 1
+        self.stats["frames"] += len(frames)
+        self.stats["input_bytes"] += len(wav_bytes)
+        self.stats["output_bytes"] += sum(len(frame) for frame in frames)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["format"] = self.output_format.to_dict()
+        stats["compression_ratio"] = stats["input_bytes"] / stats["output_bytes"] if stats["output_bytes"] else 0.0
+        return stats
@@ -4,10 +4,22 @@ Provides fallback implementations and graceful degradation when packages are mis
 """
 
 import sys
+import io
+import time
+import wave
+import zlib
+import random
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional, Dict, List
 import warnings
 
+import numpy as np
+
+from src.models.tts_batcher import TTSBatchScheduler
+from src.models.tts_cache import TTSAudioCache
+
 # Setup logging
 compat_logger = logging.getLogger("compatibility")
 compat_logger.setLevel(logging.INFO)
@@ -75,23 +87,403 @@ def check_vllm():
     return compat_manager.check_package("vllm")
 
 # Fallback implementations
+STUB_VOCABULARY = (
+    "sure", "that", "sounds", "good", "let", "me", "check", "the", "details", "for", "you", "right",
+    "now", "it", "looks", "like", "everything", "is", "on", "track", "and", "we", "can", "move",
+    "ahead", "with", "your", "request", "today", "thanks", "asking", "here", "what", "I", "found",
+)
+
+
+def _stub_rng(seed: int, key: Any) -> random.Random:
+    """Per-turn RNG: the same (seed, chunk id / text) always draws the same jitter and words"""
+    return random.Random(zlib.crc32(f"{seed}:{key}".encode("utf-8")))
+
+
+def _jittered_ms(rng: random.Random, base_ms: float, jitter_ms: float) -> float:
+    return max(0.0, base_ms + (rng.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0.0))
+
+
 class FallbackVoxtralModel:
-    """Fallback implementation when Voxtral is not available"""
-    
-    def __init__(self):
-        self.model_name = "mistralai/Voxtral-Mini-3B-2507"
+    """
+    Deterministic stand-in for VoxtralModel (model.engine: "stub", or Voxtral not installed)
+
+    Implements the turn API the transports and the replica pool use - process_realtime_chunk,
+    process_realtime_chunk_streaming, streamed utterances, sessions and warmup - without a GPU
+    or model weights. A turn costs `prefill_base_ms + prefill_ms_per_audio_s * audio seconds`,
+    then `decode_ms_per_token` per word, each +/- `jitter_ms` drawn from an RNG seeded with
+    (seed, chunk_id), so the same load replays with the same latencies and text. The delays
+    are slept on `workers` inference threads, so concurrent turns queue like they do on one GPU.
+    """
+
+    def __init__(self, device: Optional[str] = None, prefill_base_ms: float = 30.0,
+                 prefill_ms_per_audio_s: float = 20.0, decode_ms_per_token: float = 25.0,
+                 jitter_ms: float = 0.0, output_words: int = 20, transcribe_words_per_audio_s: float = 2.5,
+                 workers: int = 1, seed: int = 0, sample_rate: int = 16000, silence_threshold: float = 0.005):
+        self.model_name = "stub"
+        self.device = device or "cpu"
+        self.prefill_base_ms = prefill_base_ms
+        self.prefill_ms_per_audio_s = prefill_ms_per_audio_s
+        self.decode_ms_per_token = decode_ms_per_token
+        self.jitter_ms = jitter_ms
+        self.output_words = max(1, int(output_words))
+        self.transcribe_words_per_audio_s = transcribe_words_per_audio_s
+        self.workers = max(1, int(workers))
+        self.seed = seed
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
         self.is_initialized = False
-        compat_logger.warning("Using fallback Voxtral model - limited functionality")
-    
+        self.inference_executor = None
+        self.cpu_threads = 0
+        self.warmup_planner = None
+        self.warmup_decode_tokens = 4
+        self.sessions = set()
+        self.stats = {"turns": 0, "cancelled_turns": 0, "decoded_tokens": 0, "simulated_ms": 0.0}
+        compat_logger.info(f"🧪 Stub inference engine (prefill {prefill_base_ms:g}ms + {prefill_ms_per_audio_s:g}ms/audio-s, "
+                           f"decode {decode_ms_per_token:g}ms/token, jitter ±{jitter_ms:g}ms, seed {seed})")
+
+    @classmethod
+    def from_config(cls, config: Any, device: Optional[str] = None) -> "FallbackVoxtralModel":
+        """Build the stub engine from the `stub_engine` config section"""
+        stub_config = getattr(config, 'stub_engine', None)
+        return cls(
+            device=device,
+            prefill_base_ms=getattr(stub_config, 'prefill_base_ms', 30.0),
+            prefill_ms_per_audio_s=getattr(stub_config, 'prefill_ms_per_audio_s', 20.0),
+            decode_ms_per_token=getattr(stub_config, 'decode_ms_per_token', 25.0),
+            jitter_ms=getattr(stub_config, 'jitter_ms', 0.0),
+            output_words=getattr(stub_config, 'output_words', 20),
+            transcribe_words_per_audio_s=getattr(stub_config, 'transcribe_words_per_audio_s', 2.5),
+            workers=getattr(getattr(config, 'inference', None), 'executor_workers', 1),
+            seed=getattr(stub_config, 'seed', 0),
+            sample_rate=getattr(getattr(config, 'audio', None), 'sample_rate', 16000),
+            silence_threshold=getattr(getattr(config, 'vad', None), 'threshold', 0.005),
+        )
+
+    async def initialize(self):
+        from src.models.inference_executor import InferenceExecutor
+        if self.inference_executor is None:
+            self.inference_executor = InferenceExecutor(self.workers, name="stub-inference")
+        self.is_initialized = True
+
     def get_model_info(self):
+        if not self.is_initialized:
+            return {
+                "status": "fallback_mode",
+                "model_name": self.model_name,
+                "message": "Voxtral not available - install transformers>=4.56.0 or from source"
+            }
         return {
-            "status": "fallback_mode",
+            "status": "initialized",
             "model_name": self.model_name,
-            "message": "Voxtral not available - install transformers>=4.56.0 or from source"
+            "engine": "stub",
+            "device": self.device,
+            "latency_model": {
+                "prefill_base_ms": self.prefill_base_ms,
+                "prefill_ms_per_audio_s": self.prefill_ms_per_audio_s,
+                "decode_ms_per_token": self.decode_ms_per_token,
+                "jitter_ms": self.jitter_ms,
+                "output_words": self.output_words,
+                "seed": self.seed,
+            },
+            "stub_stats": dict(self.stats),
+            "executor_stats": self.inference_executor.get_stats() if self.inference_executor is not None else {},
         }
-    
-    async def process_realtime_chunk(self, audio_data, chunk_id):
-        raise MissingPackageError("Voxtral not available - please install transformers>=4.56.0")
+
+    def plan_turn(self, audio_samples: int, chunk_id: Any, mode: str = "conversation") -> Dict[str, Any]:
+        """The turn's deterministic words and delays: {"words", "prefill_ms", "token_ms"}"""
+        rng = _stub_rng(self.seed, chunk_id)
+        audio_s = audio_samples / self.sample_rate
+        if mode == "transcribe":
+            num_words = max(1, round(audio_s * self.transcribe_words_per_audio_s))
+        else:
+            num_words = self.output_words
+        return {
+            "words": [rng.choice(STUB_VOCABULARY) for _ in range(num_words)],
+            "prefill_ms": _jittered_ms(rng, self.prefill_base_ms + self.prefill_ms_per_audio_s * audio_s, self.jitter_ms),
+            "token_ms": [_jittered_ms(rng, self.decode_ms_per_token, self.jitter_ms) for _ in range(num_words)],
+        }
+
+    def _simulate_turn(self, plan: Dict[str, Any], emit=None, cancel_token=None) -> List[str]:
+        """Inference thread: sleep through prefill and decode, handing each word to `emit`"""
+        time.sleep(plan["prefill_ms"] / 1000)
+        self.stats["simulated_ms"] += plan["prefill_ms"]
+        words = []
+        for word, token_ms in zip(plan["words"], plan["token_ms"]):
+            if cancel_token is not None and cancel_token.is_cancelled:
+                break
+            time.sleep(token_ms / 1000)
+            self.stats["simulated_ms"] += token_ms
+            self.stats["decoded_tokens"] += 1
+            words.append(word)
+            if emit is not None:
+                emit(word)
+        return words
+
+    def _is_silent(self, audio_numpy) -> bool:
+        return len(audio_numpy) == 0 or float(np.sqrt(np.mean(audio_numpy ** 2))) < self.silence_threshold
+
+    @staticmethod
+    def _to_numpy(audio_data):
+        if hasattr(audio_data, "cpu"):
+            audio_data = audio_data.cpu().numpy()
+        return np.asarray(audio_data, dtype=np.float32).reshape(-1)
+
+    async def process_realtime_chunk(self, audio_data, chunk_id, mode: str = "conversation") -> Dict[str, Any]:
+        if not self.is_initialized:
+            raise RuntimeError("Stub engine not initialized")
+        chunk_start_time = time.time()
+        audio_numpy = self._to_numpy(audio_data)
+        if self._is_silent(audio_numpy):
+            return {
+                'success': False,
+                'text': '',
+                'processing_time_ms': (time.time() - chunk_start_time) * 1000,
+                'error': 'No speech detected'
+            }
+        self.stats["turns"] += 1
+        inference_start = time.time()
+        words = await self.inference_executor.run(self._simulate_turn, self.plan_turn(len(audio_numpy), chunk_id, mode))
+        total_time = (time.time() - chunk_start_time) * 1000
+        return {
+            'success': True,
+            'text': " ".join(words),
+            'processing_time_ms': total_time,
+            'inference_time_ms': (time.time() - inference_start) * 1000
+        }
+
+    async def process_realtime_chunk_streaming(self, audio_data, chunk_id, mode: str = "conversation",
+                                               conversation_context: str = "", language: str = "en",
+                                               session_id: Optional[str] = None, streaming_audio=None,
+                                               cancel_token=None, speculative: bool = False):
+        """Same chunk dicts as VoxtralModel.process_realtime_chunk_streaming, one word per chunk"""
+        if not self.is_initialized:
+            raise RuntimeError("Stub engine not initialized")
+        from src.models.cancellation import CancellationToken
+        chunk_start_time = time.time()
+        cancel_token = cancel_token if cancel_token is not None else CancellationToken(str(chunk_id))
+        audio_numpy = self._to_numpy(audio_data)
+        if streaming_audio is not None and streaming_audio.num_samples:
+            audio_numpy = streaming_audio.audio()
+        if self._is_silent(audio_numpy):
+            yield {'success': False, 'text': '', 'is_final': True, 'chunk_index': 0, 'error': 'No speech detected'}
+            return
+        if session_id:
+            self.sessions.add(session_id)
+        self.stats["turns"] += 1
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        plan = self.plan_turn(len(audio_numpy), chunk_id, mode)
+        job = asyncio.ensure_future(self.inference_executor.run(
+            self._simulate_turn, plan, lambda word: loop.call_soon_threadsafe(queue.put_nowait, word), cancel_token
+        ))
+        job.add_done_callback(lambda _: queue.put_nowait(None))
+        first_token_time = None
+        chunk_index = 0
+        try:
+            while True:
+                word = await queue.get()
+                if word is None or cancel_token.is_cancelled:
+                    break
+                if first_token_time is None:
+                    first_token_time = time.time() - chunk_start_time
+                yield {
+                    'success': True,
+                    'text': word,
+                    'audio': None,
+                    'is_final': False,
+                    'chunk_index': chunk_index,
+                    'first_token_latency_ms': int(first_token_time * 1000),
+                    'processing_time_ms': (time.time() - chunk_start_time) * 1000
+                }
+                chunk_index += 1
+            await job
+        except (asyncio.CancelledError, GeneratorExit):
+            cancel_token.cancel("abandoned")
+            raise
+        finally:
+            if cancel_token.is_cancelled:
+                self.stats["cancelled_turns"] += 1
+
+    async def transcribe_audio(self, audio_data) -> str:
+        return (await self.process_realtime_chunk(audio_data, chunk_id=int(time.time() * 1000)))['text']
+
+    async def understand_audio(self, audio_data, question: str = "") -> str:
+        return await self.transcribe_audio(audio_data)
+
+    async def process_audio_stream(self, audio_data, prompt: str = "") -> str:
+        return await self.transcribe_audio(audio_data)
+
+    def start_streaming_utterance(self, utterance_id: str, language: str = "en", on_interim=None):
+        """Frames are only buffered: the stub charges audio at prefill like an unstreamed turn"""
+        from src.models.streaming_audio_encoder import StreamingUtterance
+        return StreamingUtterance(utterance_id, 30 * self.sample_rate, 30 * self.sample_rate)
+
+    def push_streaming_audio(self, utterance, samples) -> int:
+        return utterance.append(samples)
+
+    def discard_streaming_utterance(self, utterance):
+        pass
+
+    def end_session(self, session_id: str):
+        self.sessions.discard(session_id)
+
+    def get_warmup_planner(self):
+        return None
+
+    async def warmup_turn(self, shape, max_new_tokens: int = 4) -> float:
+        start_time = time.time()
+        plan = self.plan_turn(int(shape.audio_s * self.sample_rate), f"warmup_{shape.key}", shape.mode)
+        plan["words"], plan["token_ms"] = plan["words"][:max_new_tokens], plan["token_ms"][:max_new_tokens]
+        await self.inference_executor.run(self._simulate_turn, plan)
+        return (time.time() - start_time) * 1000
+
+    def get_emotion_detector(self):
+        return None
+
+
+class FallbackTTSManager:
+    """
+    Deterministic stand-in for TTSManager.synthesize (model.engine: "stub")
+
+    Synthesis takes `base_ms + ms_per_char * len(text)` (+/- `jitter_ms`, seeded by the text)
+    on one synthesis thread and returns a quiet tone lasting `audio_ms_per_char` per character,
+    as 16-bit WAV bytes like the real manager. A batch costs what its longest text costs, like
+    a padded generate(); with `batch_max_size` > 1 segments go through a TTSBatchScheduler.
+    """
+
+    def __init__(self, base_ms: float = 40.0, ms_per_char: float = 2.0, jitter_ms: float = 0.0,
+                 audio_ms_per_char: float = 65.0, seed: int = 0, sample_rate: int = 22050,
+                 audio_cache=None, batch_max_size: int = 1, batch_max_wait_ms: float = 10.0):
+        self.model_name = "stub"
+        self.model_version = f"stub:{audio_ms_per_char}:{sample_rate}"
+        self.voice = "default"
+        self.audio_cache = audio_cache  # Same TTSAudioCache the real manager consults
+        self.device = "cpu"
+        self.base_ms = base_ms
+        self.ms_per_char = ms_per_char
+        self.jitter_ms = jitter_ms
+        self.audio_ms_per_char = audio_ms_per_char
+        self.seed = seed
+        self.sample_rate = sample_rate
+        self.is_initialized = True
+        self.stats = {"syntheses": 0, "batches": 0, "cancelled": 0, "audio_ms": 0.0, "simulated_ms": 0.0}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stub-tts")
+        self.batch_scheduler = None
+        if batch_max_size > 1:
+            self.batch_scheduler = TTSBatchScheduler(self.synthesize_batch, max_batch_size=batch_max_size,
+                                                     max_wait_ms=batch_max_wait_ms)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "FallbackTTSManager":
+        stub_config = getattr(config, 'stub_engine', None)
+        return cls(
+            base_ms=getattr(stub_config, 'tts_base_ms', 40.0),
+            ms_per_char=getattr(stub_config, 'tts_ms_per_char', 2.0),
+            jitter_ms=getattr(stub_config, 'jitter_ms', 0.0),
+            audio_ms_per_char=getattr(stub_config, 'tts_audio_ms_per_char', 65.0),
+            seed=getattr(stub_config, 'seed', 0),
+            audio_cache=TTSAudioCache.from_config(config),
+            batch_max_size=getattr(getattr(config, 'tts', None), 'batch_max_size', 1),
+            batch_max_wait_ms=getattr(getattr(config, 'tts', None), 'batch_max_wait_ms', 10.0),
+        )
+
+    def initialize(self) -> None:
+        self.is_initialized = True
+
+    def _render(self, text: str, delay_ms: float) -> bytes:
+        time.sleep(delay_ms / 1000)
+        return self._tone_wav(text)
+
+    def _render_batch(self, texts: list, delay_ms: float) -> list:
+        time.sleep(delay_ms / 1000)
+        return [self._tone_wav(text) for text in texts]
+
+    def _tone_wav(self, text: str) -> bytes:
+        num_samples = int(self.sample_rate * self.audio_ms_per_char * len(text) / 1000)
+        frequency = 180.0 + zlib.crc32(text.encode("utf-8")) % 120
+        tone = 0.1 * np.sin(2 * np.pi * frequency * np.arange(num_samples) / self.sample_rate)
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes((tone * 32767).astype("<i2").tobytes())
+        return wav_buffer.getvalue()
+
+    async def synthesize(self, text: str, language: str = "en", emotion: str = "neutral",
+                         cancel_token=None, voice: Optional[str] = None) -> Optional[bytes]:
+        if not text or not text.strip() or (cancel_token is not None and cancel_token.is_cancelled):
+            return None
+        voice = voice or self.voice  # Every voice sounds the same here; it only keys the cache
+        if self.audio_cache is not None:
+            audio_bytes = self.audio_cache.get(text, language, emotion, voice, self.model_version)
+            if audio_bytes is not None:
+                return audio_bytes
+        if self.batch_scheduler is not None:
+            audio_bytes = await self.batch_scheduler.synthesize(text, language, emotion, cancel_token, voice)
+            if audio_bytes is None:
+                return None
+        else:
+            delay_ms = _jittered_ms(_stub_rng(self.seed, text), self.base_ms + self.ms_per_char * len(text),
+                                    self.jitter_ms)
+            audio_bytes = await asyncio.get_running_loop().run_in_executor(self._executor, self._render, text, delay_ms)
+            if cancel_token is not None and cancel_token.is_cancelled:
+                self.stats["cancelled"] += 1
+                return None
+            self.stats["syntheses"] += 1
+            self.stats["simulated_ms"] += delay_ms
+            self.stats["audio_ms"] += self.audio_ms_per_char * len(text)
+        if self.audio_cache is not None:
+            self.audio_cache.put(text, audio_bytes, language, emotion, voice, self.model_version)
+        return audio_bytes
+
+    async def synthesize_with_fallback(self, text: str, language: str = "en", emotion: str = "neutral",
+                                       cancel_token=None, voice: Optional[str] = None) -> Optional[bytes]:
+        return await self.synthesize(text, language, emotion, cancel_token=cancel_token, voice=voice)
+
+    async def synthesize_batch(self, items: list, cancel_token=None, voice: Optional[str] = None) -> list:
+        """One padded batch: costs what its longest text costs"""
+        if not items or (cancel_token is not None and cancel_token.is_cancelled):
+            return [None] * len(items)
+        texts = [text for text, _, _ in items]
+        longest = max(texts, key=len)
+        delay_ms = _jittered_ms(_stub_rng(self.seed, longest), self.base_ms + self.ms_per_char * len(longest),
+                                self.jitter_ms)
+        results = await asyncio.get_running_loop().run_in_executor(self._executor, self._render_batch, texts, delay_ms)
+        if cancel_token is not None and cancel_token.is_cancelled:
+            self.stats["cancelled"] += len(items)
+            return [None] * len(items)
+        self.stats["syntheses"] += len(items)
+        self.stats["batches"] += 1
+        self.stats["simulated_ms"] += delay_ms
+        self.stats["audio_ms"] += self.audio_ms_per_char * sum(len(text) for text in texts)
+        return results
+
+    def get_supported_emotions(self) -> list:
+        return ["neutral", "happy", "sad", "angry", "calm", "excited"]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        if self.audio_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.audio_cache.get_stats()}
+
+    def get_worker_stats(self) -> Dict[str, Any]:
+        return {"enabled": False}  # Stub synthesis sleeps on its own thread, never on the event loop
+
+    def get_batch_stats(self) -> Dict[str, Any]:
+        if self.batch_scheduler is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batch_scheduler.get_stats()}
+
+    def get_backend_stats(self) -> Dict[str, Any]:
+        return {"enabled": False}  # One simulated voice for every language, nothing to load
+
+    def get_voice_stats(self) -> Dict[str, Any]:
+        return {"voice": self.voice, "profiles": []}
+
+    def __repr__(self) -> str:
+        return f"FallbackTTSManager(base_ms={self.base_ms}, ms_per_char={self.ms_per_char}, seed={self.seed})"
 
 class FallbackConfig:
     """Fallback configuration when pydantic-settings is not available"""
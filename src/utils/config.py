@@ -6,7 +6,7 @@ import yaml
 import os
 from pathlib import Path
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Import pydantic_settings with fallback
 try:
@@ -37,6 +37,14 @@ class ModelConfig(BaseModel):
     max_memory_per_gpu: str = "8GB"
     ultra_fast_mode: bool = True
     warmup_enabled: bool = True
+    snapshot_enabled: bool = True  # Load the pre-quantized local snapshot when one exists
+    snapshot_dir: str = ""  # Default: <cache_dir>/snapshots/<org>--<model>
+    offline_only: bool = False  # Fail instead of falling back to the hub when there is no snapshot
+    cpu_dtype: str = "auto"  # device: cpu - "auto" (bf16 where supported), "bf16" or "fp32"
+    cpu_quantization: str = "int8"  # device: cpu - "int8" (dynamic, linear layers) or "none"
+    cpu_threads: int = 0  # device: cpu - intra-op threads (0 = physical cores)
+    cpu_interop_threads: int = 1  # device: cpu - inter-op threads
+    engine: str = "voxtral"  # "voxtral", or "stub" = deterministic stand-in engine (no GPU, no weights)
 
 class AudioConfig(BaseModel):
     sample_rate: int = 16000
@@ -83,6 +91,93 @@ class PerformanceConfig(BaseModel):
     }
     optimization_level: str = "balanced"  # "performance", "balanced", "memory_efficient"
 
+class InferenceConfig(BaseModel):
+    """Inference pipeline configuration"""
+    audio_handoff: str = "memory"  # "memory" (in-RAM WAV) or "tempfile" (legacy temp WAV on disk)
+    continuous_batching: bool = False  # Share decode steps across concurrent turns
+    max_batch_size: int = 8  # Max sequences decoded together by the batching scheduler
+    executor_workers: int = 1  # Inference threads owning the GPU; extra requests queue
+    prefix_cache: bool = True  # Reuse KV states of the fixed instruction prompts across turns
+    prefix_cache_max_entries: int = 16  # (mode, language, template version) prefixes kept
+    prompt_template_cache: bool = True  # Splice per-turn tokens into pre-tokenized prompt templates
+    warmup_plan: bool = True  # Warm up the turn shapes recorded from real traffic
+    warmup_plan_path: str = ""  # Histogram file (default: <model.cache_dir>/warmup_plan.json)
+    warmup_max_runs: int = 6  # Most shapes warmed at startup
+    warmup_coverage: float = 0.95  # Share of recorded traffic the plan should cover
+    warmup_decode_tokens: int = 4  # Tokens decoded per warmup run
+    replicas: int = 1  # Model replicas behind the session-aware router
+    replica_devices: List[str] = []  # One device per replica (default: spread over GPUs, else cpu)
+    replica_affinity_slack_tokens: int = 512  # Keep a session on its replica unless this much busier
+    replica_max_failures: int = 3  # Failed turns in a row before a replica leaves rotation
+    session_kv_cache: bool = True  # Carry each session's KV cache over between turns
+    session_cache_device_budget_mb: int = 1024  # Session caches kept on the model device
+    session_cache_cpu_budget_mb: int = 4096  # Idle session caches offloaded to CPU RAM
+    session_cache_disk_budget_mb: int = 0  # Memory-mapped spill files under model_cache/session_kv (0 = off)
+    session_cache_idle_offload_s: float = 5.0  # Idle time before a session cache leaves the device
+    session_cache_max_tokens: int = 4096  # Longer conversations fall back to the text context
+    streaming_audio_input: bool = True  # Browser streams frames; audio is encoded while the user speaks
+    streaming_encode_interval_s: float = 0.5  # New audio before the open window is re-encoded
+    streaming_pause_encode_s: float = 0.3  # Frame gap after which leftover audio is encoded anyway
+    streaming_max_utterance_s: float = 30.0  # Frames past this length are dropped
+    streaming_interim_transcripts: bool = False  # Send interim transcripts with a stable prefix
+    streaming_interim_interval_s: float = 1.0  # Minimum time between interim transcripts
+    streaming_interim_max_tokens: int = 32
+    predictive_endpointing: bool = True  # Start streamed turns at a short pause, hold output until the endpoint
+    predictive_pause_ms: int = 300  # Trailing silence that starts a speculative turn (endpoint stays at the client's)
+    predictive_max_per_utterance: int = 3  # Speculative turns per utterance at most (caps wasted compute)
+    speculative_decoding: bool = False  # Draft model proposes tokens, Voxtral verifies them (greedy only)
+    speculative_draft_model: str = ""  # Small causal LM sharing Voxtral's tokenizer
+    speculative_num_draft_tokens: int = 4  # Tokens proposed per verification pass
+
+class StubEngineConfig(BaseModel):
+    """Latency model of the stub engine (model.engine: "stub") for GPU-free load tests"""
+    prefill_base_ms: float = 30.0  # Fixed cost of every turn
+    prefill_ms_per_audio_s: float = 20.0  # Audio encoder + prefill cost per second of audio
+    decode_ms_per_token: float = 25.0  # Per generated word
+    jitter_ms: float = 0.0  # Uniform +/- noise on every delay (seeded per turn)
+    output_words: int = 20  # Reply length in conversation mode
+    transcribe_words_per_audio_s: float = 2.5  # Transcript length in transcribe mode
+    tts_base_ms: float = 40.0  # Fixed cost of every synthesis
+    tts_ms_per_char: float = 2.0  # Synthesis cost per character
+    tts_audio_ms_per_char: float = 65.0  # Audio produced per character
+    seed: int = 0  # Same seed + same chunk ids -> same text and latencies
+
+class TTSConfig(BaseModel):
+    """Text-to-speech output of conversation turns"""
+    streaming_segments: bool = True  # Synthesize each sentence while the rest of the reply is decoded
+    segment_min_words: int = 4  # Words before a phrase break (, ; :) may end a segment
+    segment_max_words: int = 24  # Longest segment without any break
+    first_segment_min_words: int = 2  # Phrase-break threshold of the first segment (earlier first audio)
+    cache_enabled: bool = True  # Reuse audio of repeated (text, language, emotion, voice, model) syntheses
+    cache_memory_budget_mb: int = 64  # In-memory LRU of audio bytes
+    cache_disk_budget_mb: int = 512  # Content-addressed files read through mmap (0 = memory only)
+    cache_dir: str = ""  # Default: <model.cache_dir>/tts_cache
+    cache_max_chars: int = 200  # Longer texts are synthesized without caching
+    worker_processes: int = 1  # Synthesize in worker processes, each with its own model (0 = in the server)
+    worker_buffer_mb: int = 16  # Shared-memory audio buffer per worker (longer audio goes through the queue)
+    worker_start_timeout_s: float = 300.0  # Model load time allowed per worker
+    worker_request_timeout_s: float = 120.0  # A synthesis taking longer replaces its worker
+    output_formats: List[str] = ["opus-ogg", "opus-webm", "pcm16", "mulaw", "wav"]  # Codecs clients may ask for
+    default_output_format: str = "wav"  # Sent to clients that ask for nothing (or nothing allowed)
+    opus_bitrate: int = 32000  # Bits per second of Opus output
+    stream_frame_ms: int = 200  # /ws/tts streaming mode: audio per frame
+    stream_first_segment_max_words: int = 8  # Caps the first segment, so first audio does not grow with the text
+    batch_max_size: int = 8  # Segments of concurrent sessions synthesized in one padded batch (1 = off)
+    batch_max_wait_ms: float = 10.0  # Longest a segment waits for others to join its batch
+    backend_models: Dict[str, str] = {"dia-tts": "nari-labs/Dia-1.6B-0626",
+                                      "indic-tts": "ai4bharat/indic-parler-tts"}  # Loaded on first use
+    backend_memory_budget_mb: int = 0  # Resident language backends beyond it are evicted LRU-first (0 = no budget)
+    backend_min_free_vram_mb: int = 1024  # Idle backends are evicted before a load leaves less free VRAM
+    voice_profile: str = ""  # Voice used when a synthesis names none ("" = the model's own voice)
+    voice_profiles: Dict[str, Dict[str, str]] = {}  # Voice ID -> {reference_audio, description}
+    voice_cache_dir: str = ""  # Speaker conditioning on disk; default: <model.cache_dir>/voice_conditioning
+    voice_cache_memory_entries: int = 32  # Voices whose conditioning stays in memory
+    filler_enabled: bool = True  # Start slow turns with a pre-synthesized acknowledgement
+    filler_phrases: Optional[Dict[str, List[str]]] = None  # Language -> phrases (None = built-in set)
+    filler_earcon: bool = True  # Thinking tone for languages and voices without phrases
+    filler_threshold_ms: float = 700.0  # Predicted time to first audio above which a filler plays
+    filler_delay_ms: float = 0.0  # Wait before sending the filler; reply audio ready by then drops it
+
 class LoggingConfig(BaseModel):
     level: str = "INFO"
     format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -116,6 +211,9 @@ class Config(BaseSettings):
     streaming: StreamingConfig = StreamingConfig()
     logging: LoggingConfig = LoggingConfig()
     performance: PerformanceConfig = PerformanceConfig()
+    inference: InferenceConfig = InferenceConfig()
+    stub_engine: StubEngineConfig = StubEngineConfig()
+    tts: TTSConfig = TTSConfig()
     
     # Pydantic v2 settings configuration with fallback
     if PYDANTIC_SETTINGS_AVAILABLE and SettingsConfigDict is not None:
@@ -167,6 +265,9 @@ if os.getenv("VOXTRAL_HEALTH_PORT"):
 if os.getenv("VOXTRAL_MODEL_NAME"):
     config.model.name = os.getenv("VOXTRAL_MODEL_NAME")
     
+if os.getenv("VOXTRAL_ENGINE"):
+    config.model.engine = os.getenv("VOXTRAL_ENGINE")
+
 if os.getenv("CUDA_VISIBLE_DEVICES"):
     if os.getenv("CUDA_VISIBLE_DEVICES") == "-1":
         config.model.device = "cpu"
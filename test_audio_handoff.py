@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Audio Handoff Test Suite
+Tests the in-memory audio path to the Voxtral processor and temp-file cleanup on failure
+"""
+
+import logging
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("AUDIO_HANDOFF_TEST")
+
+from src.utils.audio_io import encode_audio_base64, decode_audio_base64
+from src.models.voxtral_model_realtime import VoxtralModel
+
+
+class RecordingProcessor:
+    """Stand-in processor that records the conversation it receives"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.conversations = []
+        self.seen_paths = []
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        self.conversations.append(conversation)
+        audio_block = next(block for block in conversation[0]["content"] if block["type"] == "audio")
+        if "path" in audio_block:
+            self.seen_paths.append(audio_block["path"])
+            assert os.path.exists(audio_block["path"]), "Temp file should exist while the processor runs"
+        if self.fail:
+            raise RuntimeError("processor failure")
+        return RecordingInputs()
+
+
+class RecordingInputs(dict):
+    """Mimics BatchFeature.to()"""
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+def test_base64_roundtrip():
+    """In-memory encoding should round-trip at PCM16 precision"""
+    logger.info("\n[TEST 1] Base64 WAV round-trip...")
+    audio = (np.sin(np.linspace(0, 200, 16000)) * 0.5).astype(np.float32)
+
+    decoded, sample_rate = decode_audio_base64(encode_audio_base64(audio, 16000))
+
+    assert sample_rate == 16000, f"Expected 16000 Hz, got {sample_rate}"
+    assert decoded.shape == audio.shape, f"Shape mismatch: {decoded.shape} vs {audio.shape}"
+    assert np.max(np.abs(decoded - audio)) < 1.0 / 32768 * 2, "Round-trip error exceeds PCM16 quantization"
+    logger.info("✅ Round-trip matches within PCM16 quantization")
+    return True
+
+
+def test_memory_handoff_uses_no_file():
+    """Memory mode should pass a base64 block and never a path"""
+    logger.info("\n[TEST 2] Memory handoff...")
+    model = VoxtralModel()
+    model.audio_handoff = "memory"
+    model.processor = RecordingProcessor()
+
+    audio = (np.random.randn(8000) * 0.1).astype(np.float32)
+    model._prepare_inputs(audio, "Transcribe.", "test_memory")
+
+    audio_block = next(block for block in model.processor.conversations[0][0]["content"] if block["type"] == "audio")
+    assert "base64" in audio_block, "Memory handoff should send a base64 block"
+    assert "path" not in audio_block, "Memory handoff should not write a temp file"
+    logger.info("✅ Audio handed over in memory")
+    return True
+
+
+def test_tempfile_cleanup_on_failure():
+    """Legacy tempfile mode must unlink the WAV even when the processor raises"""
+    logger.info("\n[TEST 3] Temp file cleanup on processor failure...")
+    model = VoxtralModel()
+    model.audio_handoff = "tempfile"
+    model.processor = RecordingProcessor(fail=True)
+
+    audio = (np.random.randn(8000) * 0.1).astype(np.float32)
+    try:
+        model._prepare_inputs(audio, "Transcribe.", "test_tempfile")
+        raise AssertionError("Processor failure should propagate")
+    except RuntimeError:
+        pass
+
+    assert len(model.processor.seen_paths) == 1, "Processor should have seen one temp file"
+    assert not os.path.exists(model.processor.seen_paths[0]), "Temp file leaked after failure"
+    logger.info("✅ Temp file removed after failure")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "roundtrip": test_base64_roundtrip(),
+        "memory_handoff": test_memory_handoff_uses_no_file(),
+        "tempfile_cleanup": test_tempfile_cleanup_on_failure(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Audio Output Format Test Suite
+Tests per-client output negotiation (preference order, allowed codecs, Opus rates), mu-law
+round trips, resampling to the client's playback rate with a cached resampler, and the size
+of Opus in Ogg/WebM against the WAV the TTS manager produces, and raw-PCM clients never
+receiving WAV bytes when resampling or encoding fails
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("AUDIO_OUTPUT_TEST")
+
+import src.utils.audio_output as audio_output
+from src.utils.audio_io import encode_wav_bytes
+from src.utils.audio_output import (AudioOutputEncoder, OutputFormat, decode_mulaw, encode_mulaw,
+                                    get_resampler, negotiate_output_format)
+
+
+def make_speechlike_wav(seconds: float = 1.0, sample_rate: int = 22050) -> bytes:
+    """Two modulated tones at the TTS manager's default rate"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)) + 0.1 * np.sin(2 * np.pi * 660 * t)
+    return encode_wav_bytes(audio.astype(np.float32), sample_rate)
+
+
+def test_negotiation():
+    """The first allowed codec in the client's list wins; rates are clamped and snapped for Opus"""
+    logger.info("\n[TEST 1] Negotiation...")
+    fmt = negotiate_output_format({"audio_format": "opus-ogg,pcm16", "sample_rate": "44100"})
+    assert (fmt.codec, fmt.sample_rate) == ("opus-ogg", 48000)
+    fmt = negotiate_output_format({"audio_format": "opus-ogg,pcm16", "sample_rate": "16000"}, allowed=["pcm16", "wav"])
+    assert (fmt.codec, fmt.sample_rate) == ("pcm16", 16000)
+    fmt = negotiate_output_format({"audio_format": "flac", "sample_rate": "96000"})
+    assert (fmt.codec, fmt.sample_rate) == ("wav", 48000)
+    assert negotiate_output_format({}).sample_rate == 0, "No request: WAV at the model's own rate"
+    assert negotiate_output_format({"audio_format": "mulaw"}).sample_rate == 8000
+    assert negotiate_output_format({"audio_format": "opus-webm", "sample_rate": "11025"}).sample_rate == 12000
+    assert negotiate_output_format({"audio_format": "pcm16", "sample_rate": "abc"}).sample_rate == 0
+    logger.info("✅ Formats negotiated")
+    return True
+
+
+def test_mulaw_round_trip():
+    """Mu-law is one byte per sample and stays within G.711 quantization error"""
+    logger.info("\n[TEST 2] Mu-law...")
+    pcm16 = np.linspace(-32768, 32767, 4096).astype(np.int16)
+    encoded = encode_mulaw(pcm16)
+    decoded = decode_mulaw(encoded)
+    assert len(encoded) == len(pcm16)
+    error = np.abs(decoded.astype(np.int32) - pcm16.astype(np.int32))
+    assert np.all(error <= np.abs(pcm16.astype(np.int32)) // 16 + 16), int(error.max())
+    assert decode_mulaw(encode_mulaw(np.zeros(4, dtype=np.int16))).tolist() == [0, 0, 0, 0]
+    logger.info(f"✅ Max mu-law error {int(error.max())} on full-scale input")
+    return True
+
+
+def test_pcm_at_playback_rate():
+    """PCM16 and mu-law come out at the client's rate; the resampler is built once per rate pair"""
+    logger.info("\n[TEST 3] Resampled PCM...")
+    wav = make_speechlike_wav(1.0)
+    get_resampler.cache_clear()
+    pcm = AudioOutputEncoder(OutputFormat("pcm16", 48000))
+    for _ in range(3):
+        pcm16_bytes = pcm.encode(wav)
+    assert abs(len(pcm16_bytes) // 2 - 48000) <= 2
+    assert get_resampler.cache_info().misses == 1 and get_resampler.cache_info().hits == 2
+
+    mulaw = AudioOutputEncoder(OutputFormat("mulaw", 8000))
+    mulaw_bytes = mulaw.encode(wav)
+    assert abs(len(mulaw_bytes) - 8000) <= 2
+    stats = mulaw.get_stats()
+    assert stats["compression_ratio"] > 5.0 and stats["encode_errors"] == 0
+    assert AudioOutputEncoder().encode(wav) is wav, "Default format passes the WAV through"
+    logger.info(f"✅ mu-law @ 8 kHz is {stats['compression_ratio']:.1f}x smaller than the WAV")
+    return True
+
+
+def test_opus_containers():
+    """Opus in Ogg and WebM: valid container headers and several times fewer bytes than WAV"""
+    logger.info("\n[TEST 4] Opus...")
+    wav = make_speechlike_wav(2.0)
+    ogg = AudioOutputEncoder(OutputFormat("opus-ogg", 48000, opus_bitrate=32000))
+    webm = AudioOutputEncoder(OutputFormat("opus-webm", 48000, opus_bitrate=32000))
+    ogg_bytes, webm_bytes = ogg.encode(wav), webm.encode(wav)
+    assert ogg_bytes.startswith(b"OggS") and b"OpusHead" in ogg_bytes
+    assert webm_bytes.startswith(b"\x1a\x45\xdf\xa3")
+    for encoder in (ogg, webm):
+        stats = encoder.get_stats()
+        assert stats["encode_errors"] == 0 and stats["compression_ratio"] > 5.0, stats
+    logger.info(f"✅ Ogg {ogg.get_stats()['compression_ratio']:.1f}x, WebM "
+                f"{webm.get_stats()['compression_ratio']:.1f}x smaller than WAV")
+    return True
+
+
+def test_raw_formats_without_resampler():
+    """With resampling broken, PCM16 stays PCM16 at the client's rate; undecodable audio is not sent"""
+    logger.info("\n[TEST 5] Resampler failure...")
+    wav = make_speechlike_wav(1.0)
+    expected = np.frombuffer(AudioOutputEncoder(OutputFormat("pcm16", 48000)).encode(wav), dtype="<i2")
+
+    def broken_resample(*args):
+        raise ImportError("No module named 'torchaudio'")
+
+    original_resample = audio_output.resample
+    audio_output.resample = broken_resample
+    try:
+        pcm = AudioOutputEncoder(OutputFormat("pcm16", 48000))
+        pcm16_bytes = pcm.encode(wav)
+        frames = pcm.encode_frames(wav, 100)
+    finally:
+        audio_output.resample = original_resample
+    samples = np.frombuffer(pcm16_bytes, dtype="<i2")
+    assert not pcm16_bytes.startswith(b"RIFF") and abs(len(samples) - 48000) <= 2
+    # Linear interpolation is close to the proper resampler on speech-band audio
+    error = np.abs(samples[100:-100].astype(np.float64) - expected[100:len(samples) - 100]).mean() / 32768
+    assert error < 0.01, error
+    assert len(frames) == 10 and not any(frame.startswith(b"RIFF") for frame in frames)
+    stats = pcm.get_stats()
+    assert stats["resample_fallbacks"] == 2 and stats["encode_errors"] == 0, stats
+
+    garbage = b"not audio at all"
+    assert AudioOutputEncoder(OutputFormat("pcm16", 48000)).encode(garbage) == b""
+    assert AudioOutputEncoder(OutputFormat("mulaw", 8000)).encode_frames(garbage, 100) == []
+    assert AudioOutputEncoder(OutputFormat("opus-ogg", 48000)).encode(garbage) == garbage, "Sniffed by the browser"
+    logger.info(f"✅ PCM16 at 48 kHz via linear fallback (mean error {error:.4f}); nothing sent when undecodable")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "negotiation": test_negotiation(),
+        "mulaw_round_trip": test_mulaw_round_trip(),
+        "pcm_at_playback_rate": test_pcm_at_playback_rate(),
+        "opus_containers": test_opus_containers(),
+        "raw_formats_without_resampler": test_raw_formats_without_resampler(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
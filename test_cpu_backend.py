@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+CPU Backend Test Suite
+Tests dtype and device resolution, thread-pool configuration, int8 dynamic quantization of a
+Voxtral model (output projection kept in float, generation still agrees with fp32), and turns
+through VoxtralModel on the quantized CPU model
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("CPU_BACKEND_TEST")
+
+from src.models.cpu_backend import (bf16_supported, configure_cpu_threads, physical_core_count, prepare_cpu_model,
+                                    resolve_cpu_dtype, resolve_device)
+from src.models.warmup_planner import WarmupShape
+
+import test_turn_cancellation as tiny_voxtral
+
+
+def test_dtype_device_and_threads():
+    """int8 implies fp32 compute, bf16 only where supported, CUDA falls back to cpu, threads pinned"""
+    logger.info("\n[TEST 1] dtype, device and threads...")
+    assert resolve_cpu_dtype("bf16", "int8") == torch.float32
+    assert resolve_cpu_dtype("fp32", "none") == torch.float32
+    assert resolve_cpu_dtype("auto", "none") == (torch.bfloat16 if bf16_supported() else torch.float32)
+    assert resolve_device("cpu") == "cpu"
+    if not torch.cuda.is_available():
+        assert resolve_device("cuda") == "cpu"
+
+    previous = torch.get_num_threads()
+    try:
+        threads = configure_cpu_threads(1)
+        assert threads["intra_op_threads"] == 1
+        assert configure_cpu_threads(0)["intra_op_threads"] == physical_core_count()
+    finally:
+        torch.set_num_threads(previous)
+    logger.info(f"✅ bf16 supported: {bf16_supported()}, physical cores: {physical_core_count()}")
+    return True
+
+
+def test_int8_quantized_voxtral():
+    """Linear layers become int8 (lm_head stays float); greedy output stays close to fp32"""
+    logger.info("\n[TEST 2] int8 dynamic quantization...")
+    reference = tiny_voxtral.build_streaming_voxtral().model
+    quantized = tiny_voxtral.build_streaming_voxtral().model  # Same seed -> same weights
+    linear_layers = sum(isinstance(module, torch.nn.Linear) for module in quantized.modules())
+
+    summary = prepare_cpu_model(quantized, "int8")
+    assert summary["quantized_linear_layers"] == linear_layers - 1
+    assert isinstance(quantized.lm_head, torch.nn.Linear)
+    assert not any(type(module) is torch.nn.Linear for name, module in quantized.named_modules() if name != "lm_head")
+
+    input_ids = torch.tensor([[1, 5, 9, 13, 17, 21, 2]])
+    with torch.no_grad():
+        reference_logits = reference(input_ids=input_ids).logits
+        quantized_logits = quantized(input_ids=input_ids).logits
+        similarity = torch.nn.functional.cosine_similarity(reference_logits.flatten(), quantized_logits.flatten(), dim=0)
+        output = quantized.generate(input_ids, max_new_tokens=5, do_sample=False)
+    assert similarity > 0.97, f"int8 logits drifted: cosine {similarity:.4f}"
+    assert output.shape[1] == input_ids.shape[1] + 5
+    logger.info(f"✅ {summary['quantized_linear_layers']} layers int8, logits cosine {similarity:.4f}")
+    return True
+
+
+def test_turns_on_cpu_backend():
+    """Streamed and whole-utterance turns run end to end on the quantized model with fp32 features"""
+    logger.info("\n[TEST 3] VoxtralModel turns on the CPU backend...")
+    voxtral = tiny_voxtral.build_streaming_voxtral()
+    voxtral.compute_dtype = resolve_cpu_dtype("auto", "int8")
+    prepare_cpu_model(voxtral.model, "int8")
+    voxtral.warmup_plan_enabled = False
+    try:
+        elapsed = asyncio.run(voxtral.warmup_turn(WarmupShape("transcribe", 2.0, 0, True), max_new_tokens=3))
+    finally:
+        voxtral.inference_executor.shutdown(wait=True)
+    assert elapsed > 0
+
+    # Whole-utterance path: processor features go straight into generate()
+    input_ids = voxtral.processor.apply_chat_template([{"content": [{"base64": "AAAA"}]}])["input_ids"]
+    features = torch.randn(1, 128, 3000).to(voxtral.compute_dtype)
+    with torch.no_grad():
+        output = voxtral.model.generate(input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                                        input_features=features, max_new_tokens=3, do_sample=False)
+    assert output.shape[1] == input_ids.shape[1] + 3
+    logger.info(f"✅ Streamed turn in {elapsed:.1f}ms and a whole-utterance turn decode on the int8 CPU model")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "dtype_device_and_threads": test_dtype_device_and_threads(),
+        "int8_quantized_voxtral": test_int8_quantized_voxtral(),
+        "turns_on_cpu_backend": test_turns_on_cpu_backend(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
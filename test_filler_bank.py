@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Filler Phrase Bank Test Suite
+Tests pre-synthesized fillers: the bank built once per language and voice through the TTS
+manager, phrase rotation with the thinking tone as fallback, one encoding per client format,
+the latency-threshold policy cutting the silence before a slow turn's first audio without any
+synthesis per turn, and a filler dropped when the reply's audio is ready first
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("FILLER_BANK_TEST")
+
+from src.models.filler_bank import EARCON_TEXT, FillerBank, FillerPolicy
+from src.utils.audio_output import OutputFormat
+from src.utils.compatibility import FallbackTTSManager
+
+PHRASES = {"en": ["Mm-hm.", "Let me check.", "One moment."], "fr": ["Un instant."]}
+
+
+def build_bank(tts=None, voices=(None,)):
+    tts = tts or FallbackTTSManager(base_ms=5.0, ms_per_char=0.0)
+    bank = FillerBank(PHRASES)
+    asyncio.run(bank.build(tts, voices=voices))
+    return bank, tts
+
+
+def test_build_and_pick():
+    """Every phrase is synthesized once per voice; picks rotate and fall back to the tone"""
+    logger.info("\n[TEST 1] Build and pick...")
+    tts = FallbackTTSManager(base_ms=40.0, ms_per_char=0.0, batch_max_size=8, batch_max_wait_ms=10.0)
+    bank, _ = build_bank(tts, voices=(None, "support_en"))
+    stats = bank.get_stats()
+    assert stats["phrases"] == 8 and stats["failed_phrases"] == 0 and stats["languages"] == ["en", "fr"]
+    assert tts.get_batch_stats()["batches"] < 8, "Startup synthesis goes through the batch scheduler"
+
+    picks = [bank.pick("en").text for _ in range(4)]
+    assert picks == ["Mm-hm.", "Let me check.", "One moment.", "Mm-hm."], picks
+    assert bank.pick("en", "support_en").voice == "support_en"
+    assert bank.pick("ja").text == EARCON_TEXT and bank.pick("fr", "unknown_voice").is_earcon
+    logger.info(f"✅ {stats['phrases']} fillers built in {stats['build_ms']:.0f}ms")
+    return True
+
+
+def test_encoded_once_per_format():
+    """A client's format is encoded once per filler; later turns reuse the bytes"""
+    logger.info("\n[TEST 2] Encoding...")
+    bank, _ = build_bank()
+    pcm = OutputFormat("pcm16", 16000)
+    filler = bank.pick("en")
+    asyncio.run(bank.prepare(pcm))
+    assert bank.get_stats()["encoded_payloads"] == 5, "4 phrases of this voice plus the tone"
+    payload = bank.encode(filler, pcm)
+    assert bank.encode(filler, pcm) is payload and len(payload) % 2 == 0
+    assert bank.encode(bank.earcon, OutputFormat()) == bank.earcon.wav_bytes, "Default format: the WAV itself"
+    logger.info(f"✅ {bank.get_stats()['encoded_payloads']} payloads encoded, reused afterwards")
+    return True
+
+
+def test_policy_cuts_silence():
+    """A turn predicted to be slow hears a filler almost at once; fast turns hear none"""
+    logger.info("\n[TEST 3] Policy...")
+    bank, tts = build_bank()
+    syntheses_after_build = tts.stats["syntheses"]
+    policy = FillerPolicy(threshold_ms=300.0)
+
+    async def turn(reply_ms):
+        sent = []
+        started = time.perf_counter()
+
+        async def send(filler, payload):
+            sent.append((filler.text, (time.perf_counter() - started) * 1000))
+
+        filler_turn = policy.start_turn(bank, "en", None, OutputFormat(), send)
+        await asyncio.sleep(reply_ms / 1000)  # Prefill, decode and the first segment's synthesis
+        if filler_turn is not None:
+            await filler_turn.real_audio()
+        policy.observe(reply_ms)
+        return sent
+
+    async def run():
+        return [await turn(reply_ms) for reply_ms in (500, 500, 100, 100, 100, 100)]
+
+    turns = asyncio.run(run())
+    assert turns[0] == [], "Nothing is predicted before the first turn"
+    assert len(turns[1]) == 1 and turns[1][0][1] < 50.0, turns[1]
+    assert turns[2] and turns[3] and not turns[5], "The prediction follows the faster turns down"
+    assert tts.stats["syntheses"] == syntheses_after_build, "No synthesis per turn"
+    stats = policy.get_stats()
+    assert stats["played"] == len([sent for sent in turns if sent]) and stats["turns"] == 6
+    logger.info(f"✅ First filler audio at {turns[1][0][1]:.1f}ms instead of 500ms of silence")
+    return True
+
+
+def test_real_audio_first_drops_filler():
+    """Reply audio ready before the filler goes out drops it; a filler being sent is finished first"""
+    logger.info("\n[TEST 4] Real audio first...")
+    bank, _ = build_bank()
+    policy = FillerPolicy(threshold_ms=100.0, delay_ms=50.0)
+    policy.observe(400.0)
+    order = []
+
+    async def slow_send(filler, payload):
+        order.append("filler_start")
+        await asyncio.sleep(0.03)
+        order.append("filler_end")
+
+    async def run():
+        early = policy.start_turn(bank, "en", None, OutputFormat(), slow_send)
+        await asyncio.sleep(0.01)
+        await early.real_audio()  # Within the 50ms delay: dropped
+        order.append("reply_1")
+        await asyncio.sleep(0.08)
+
+        late = policy.start_turn(bank, "en", None, OutputFormat(), slow_send)
+        await asyncio.sleep(0.06)  # Filler is being sent
+        await late.real_audio()
+        order.append("reply_2")
+
+    asyncio.run(run())
+    assert order == ["reply_1", "filler_start", "filler_end", "reply_2"], order
+    stats = policy.get_stats()
+    assert stats["dropped"] == 1 and stats["played"] == 1
+    logger.info("✅ Filler dropped when the reply was first, never cut off mid-send")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "build_and_pick": test_build_and_pick(),
+        "encoded_once_per_format": test_encoded_once_per_format(),
+        "policy_cuts_silence": test_policy_cuts_silence(),
+        "real_audio_first_drops_filler": test_real_audio_first_drops_filler(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
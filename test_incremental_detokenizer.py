@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Incremental Detokenizer Test Suite
+Tests that token-by-token decoding reproduces a full decode (sentencepiece spaces, byte-fallback
+multi-byte characters, special tokens), that word/phrase events cover the text exactly, that the
+work per token stays flat as replies grow, and the async streamer through the inference executor
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("INCREMENTAL_DETOKENIZER_TEST")
+
+from tokenizers import Tokenizer, decoders, models, normalizers, trainers
+from transformers import PreTrainedTokenizerFast
+
+from src.models.incremental_detokenizer import IncrementalDetokenizer, WordEventStream
+from src.models.inference_executor import InferenceExecutor
+
+CORPUS = [
+    "Hello there, how are you doing today? I'm fine, thanks for asking!",
+    "Café naïve résumé, déjà vu. Straße und Größe.",
+    "नमस्ते, आप कैसे हैं? मैं ठीक हूँ।",
+    "Emoji test 🙂👍 okay. Numbers 12345 and symbols #@%.",
+]
+SAMPLES = [
+    "Hello there, how are you doing today?",
+    "Café naïve résumé: déjà vu!",
+    "नमस्ते, आप कैसे हैं?",
+    "Zebra ✓ 🦓 — rare characters fall back to bytes.",
+    "  Leading spaces and   repeated   gaps stay intact.",
+]
+
+
+def build_sentencepiece_style_tokenizer() -> PreTrainedTokenizerFast:
+    """Small BPE with Llama/Mistral-style '▁' spaces and byte fallback for unseen characters"""
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>", byte_fallback=True))
+    tokenizer.normalizer = normalizers.Sequence([normalizers.Prepend("▁"), normalizers.Replace(" ", "▁")])
+    tokenizer.decoder = decoders.Sequence([decoders.Replace("▁", " "), decoders.ByteFallback(),
+                                           decoders.Fuse(), decoders.Strip(" ", 1, 0)])
+    tokenizer.train_from_iterator(CORPUS * 20, trainers.BpeTrainer(vocab_size=300, special_tokens=["<unk>", "<s>", "</s>"]))
+    spec = json.loads(tokenizer.to_str())
+    for byte in range(256):
+        spec["model"]["vocab"].setdefault(f"<0x{byte:02X}>", len(spec["model"]["vocab"]))
+    return PreTrainedTokenizerFast(tokenizer_object=Tokenizer.from_str(json.dumps(spec)),
+                                   bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+
+class CountingTokenizer:
+    """Counts how many token ids decode() is asked to process"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.decoded_ids = 0
+
+    def decode(self, token_ids, **kwargs):
+        self.decoded_ids += len(token_ids)
+        return self.tokenizer.decode(token_ids, **kwargs)
+
+
+def test_matches_full_decode():
+    """Concatenated deltas equal tokenizer.decode(all ids); no partial characters leak out"""
+    logger.info("\n[TEST 1] Incremental vs full decode...")
+    tokenizer = build_sentencepiece_style_tokenizer()
+    for text in SAMPLES:
+        token_ids = tokenizer.encode(text, add_special_tokens=False) + [tokenizer.eos_token_id]
+        detokenizer = IncrementalDetokenizer(tokenizer)
+        deltas = [detokenizer.add(token_id) for token_id in token_ids] + [detokenizer.flush()]
+        assert "".join(deltas) == tokenizer.decode(token_ids, skip_special_tokens=True), (text, deltas)
+        assert not any("�" in delta for delta in deltas), f"Partial character emitted: {deltas}"
+    logger.info(f"✅ {len(SAMPLES)} samples decode identically, byte-fallback characters held until complete")
+    return True
+
+
+def test_word_and_phrase_events():
+    """Word events are exactly the reply's words; phrases split at punctuation"""
+    logger.info("\n[TEST 2] Word and phrase events...")
+    tokenizer = build_sentencepiece_style_tokenizer()
+    text = "Sure, I can help. What time works for you? Café at 🙂 noon!"
+    stream = WordEventStream(tokenizer)
+    events = []
+    for token_id in tokenizer.encode(text, add_special_tokens=False):
+        events += stream.add_tokens([token_id])
+    events += stream.finish()
+
+    words = [event.text for event in events if event.kind == "word"]
+    phrases = [event for event in events if event.kind == "phrase"]
+    assert words == text.split(), words
+    assert [event.index for event in events if event.kind == "word"] == list(range(len(words)))
+    assert [phrase.text for phrase in phrases] == ["Sure,", "I can help.", "What time works for you?", "Café at 🙂 noon!"]
+    assert [phrase.sentence_end for phrase in phrases] == [False, True, True, True]
+    assert stream.text == text
+    # A phrase event follows the word that closes it
+    assert events[events.index(phrases[1]) - 1].text == "help."
+    logger.info(f"✅ {len(words)} words, {len(phrases)} phrases")
+    return True
+
+
+def test_constant_work_per_token():
+    """Tokens decoded per step stay bounded however long the reply is"""
+    logger.info("\n[TEST 3] Work per token...")
+    tokenizer = build_sentencepiece_style_tokenizer()
+    token_ids = tokenizer.encode(" ".join(CORPUS * 40), add_special_tokens=False)
+    counting = CountingTokenizer(tokenizer)
+    stream = WordEventStream(counting)
+
+    per_segment = []
+    segment = len(token_ids) // 4
+    for start in range(0, segment * 4, segment):
+        before = counting.decoded_ids
+        stream.add_tokens(token_ids[start:start + segment])
+        per_segment.append((counting.decoded_ids - before) / segment)
+    stream.add_tokens(token_ids[segment * 4:])
+    stream.finish()
+
+    assert stream.text == " ".join(CORPUS * 40)
+    assert max(per_segment) < 12, f"Too many ids decoded per token: {per_segment}"
+    assert per_segment[-1] <= per_segment[0] * 1.5, f"Work per token grows with length: {per_segment}"
+    logger.info(f"✅ {len(token_ids)} tokens, ids decoded per token by quarter: "
+                f"{', '.join(f'{value:.1f}' for value in per_segment)}")
+    return True
+
+
+class SlowModel:
+    """generate() stand-in streaming fixed ids (several per put, like speculative decoding)"""
+
+    def __init__(self, token_ids, per_put: int = 1, fail_after: int = None):
+        self.token_ids = token_ids
+        self.per_put = per_put
+        self.fail_after = fail_after
+
+    def generate(self, input_ids, streamer=None, **kwargs):
+        streamer.put(input_ids)
+        for start in range(0, len(self.token_ids), self.per_put):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise RuntimeError("generation failed")
+            streamer.put(torch.tensor(self.token_ids[start:start + self.per_put]))
+            time.sleep(0.001)
+        streamer.end()
+        return torch.cat([input_ids, torch.tensor([self.token_ids])], dim=1)
+
+
+def test_async_streamer_through_executor():
+    """stream_words() delivers events to the event loop and surfaces generation errors"""
+    logger.info("\n[TEST 4] Async word streamer...")
+    tokenizer = build_sentencepiece_style_tokenizer()
+    text = "Hello there, how are you doing today? Café 🙂 okay."
+    token_ids = tokenizer.encode(text, add_special_tokens=False) + [tokenizer.eos_token_id]
+    executor = InferenceExecutor(max_workers=1, lock=threading.Lock())
+
+    async def run(model):
+        streamer = executor.stream_words(model.generate, {"input_ids": torch.tensor([[1, 5]])}, tokenizer, timeout=5.0)
+        events = []
+        try:
+            async for event in streamer:
+                events.append(event)
+        except RuntimeError as e:
+            return events, str(e)
+        await streamer.future
+        return events, None
+
+    try:
+        for per_put in (1, 4):
+            events, error = asyncio.run(run(SlowModel(token_ids, per_put=per_put)))
+            assert error is None
+            assert [event.text for event in events if event.kind == "word"] == text.split(), events
+        events, error = asyncio.run(run(SlowModel(token_ids, fail_after=5)))
+        assert error == "generation failed", error
+    finally:
+        executor.shutdown()
+    logger.info("✅ Events stream through the executor; errors reach the consumer")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "matches_full_decode": test_matches_full_decode(),
+        "word_and_phrase_events": test_word_and_phrase_events(),
+        "constant_work_per_token": test_constant_work_per_token(),
+        "async_streamer": test_async_streamer_through_executor(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
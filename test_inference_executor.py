@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Inference Executor Test Suite
+Tests that generation runs off the event loop, on a bounded pool, under the model lock, and
+that a turn cancelled while queued never reaches the model
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("INFERENCE_EXECUTOR_TEST")
+
+from src.models.cancellation import CancellationToken
+from src.models.inference_executor import InferenceExecutor
+from src.models.voxtral_model_realtime import VoxtralModel
+
+
+class WordTokenizer:
+    """Decodes ids to space-separated words"""
+    eos_token_id = 0
+
+    def decode(self, token_ids, skip_special_tokens=True, **kwargs):
+        return "".join(f"w{token} " for token in token_ids)
+
+
+class SlowModel:
+    """Blocking generate() that streams one token every `delay_s` seconds"""
+
+    def __init__(self, tokens=5, delay_s=0.02, lock=None, fail=False):
+        self.tokens = tokens
+        self.delay_s = delay_s
+        self.lock = lock
+        self.fail = fail
+        self.active = 0
+        self.peak_active = 0
+        self.counter_lock = threading.Lock()
+
+    def generate(self, input_ids=None, streamer=None, **kwargs):
+        if self.lock is not None:
+            assert self.lock.locked(), "generate() must run while holding the model lock"
+        with self.counter_lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            if self.fail:
+                raise RuntimeError("generation failed")
+            streamer.put(input_ids)
+            for token in range(1, self.tokens + 1):
+                time.sleep(self.delay_s)
+                streamer.put(torch.tensor([token]))
+            streamer.end()
+        finally:
+            with self.counter_lock:
+                self.active -= 1
+
+
+async def consume_while_ticking(stream_factory):
+    """Collect streamed text while a ticker measures event-loop responsiveness"""
+    ticks = 0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal ticks
+        while not done.is_set():
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    try:
+        pieces = [piece async for piece in stream_factory()]
+    finally:
+        done.set()
+        await ticker_task
+    return pieces, ticks
+
+
+def test_event_loop_stays_responsive():
+    """Other coroutines keep running while a generation streams"""
+    logger.info("\n[TEST 1] Event loop responsiveness during generation...")
+    executor = InferenceExecutor(max_workers=1)
+    model = SlowModel(tokens=10, delay_s=0.02)
+
+    async def run():
+        return await consume_while_ticking(lambda: executor.stream_generate(
+            model.generate, {"input_ids": torch.tensor([[7, 8]])}, WordTokenizer(), timeout=5.0
+        ))
+
+    try:
+        pieces, ticks = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert "".join(pieces).split() == [f"w{i}" for i in range(1, 11)], f"Unexpected text: {pieces}"
+    # ~200ms of generation at a 5ms tick; a blocked loop would manage almost none
+    assert ticks >= 10, f"Event loop was blocked during generation ({ticks} ticks)"
+    logger.info(f"✅ Loop ticked {ticks} times while streaming {len(pieces)} pieces")
+    return True
+
+
+def test_bounded_pool_and_queue_metrics():
+    """Concurrent requests queue behind the fixed pool and report wait time"""
+    logger.info("\n[TEST 2] Bounded pool with queue metrics...")
+    lock = threading.Lock()
+    executor = InferenceExecutor(max_workers=2, lock=lock)
+    model = SlowModel(tokens=3, delay_s=0.02, lock=lock)
+
+    async def run():
+        async def one():
+            streamer = executor.stream_generate(
+                model.generate, {"input_ids": torch.tensor([[1]])}, WordTokenizer(), timeout=5.0
+            )
+            return "".join([piece async for piece in streamer])
+        return await asyncio.gather(*[one() for _ in range(4)])
+
+    try:
+        outputs = asyncio.run(run())
+        stats = executor.get_stats()
+    finally:
+        executor.shutdown()
+
+    assert all(output.split() == ["w1", "w2", "w3"] for output in outputs), f"Unexpected outputs: {outputs}"
+    assert model.peak_active == 1, f"Model lock allowed {model.peak_active} concurrent generations"
+    assert stats["completed"] == 4 and stats["failed"] == 0, f"Unexpected counts: {stats}"
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
+    assert stats["peak_queue_depth"] >= 3, f"Requests should have queued (peak {stats['peak_queue_depth']})"
+    assert stats["max_wait_ms"] >= 40, f"Queued requests should report wait time ({stats['max_wait_ms']:.1f}ms)"
+    logger.info(f"✅ peak depth {stats['peak_queue_depth']}, max wait {stats['max_wait_ms']:.1f}ms")
+    return True
+
+
+def test_generation_error_reaches_consumer():
+    """A failing generate() must raise in the consumer instead of hanging it"""
+    logger.info("\n[TEST 3] Generation errors propagate...")
+    executor = InferenceExecutor(max_workers=1)
+    model = SlowModel(fail=True)
+
+    async def run():
+        streamer = executor.stream_generate(
+            model.generate, {"input_ids": torch.tensor([[1]])}, WordTokenizer(), timeout=5.0
+        )
+        try:
+            async for _ in streamer:
+                pass
+        except RuntimeError as e:
+            return str(e)
+        return None
+
+    try:
+        error = asyncio.run(run())
+        stats = executor.get_stats()
+    finally:
+        executor.shutdown()
+
+    assert error == "generation failed", f"Expected generation error, got {error!r}"
+    assert stats["failed"] == 1
+    logger.info("✅ Error surfaced to the async consumer")
+    return True
+
+
+class FakeInputs(dict):
+    """Mimics BatchFeature.to()"""
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+class FakeProcessor:
+    tokenizer = WordTokenizer()
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        return FakeInputs(input_ids=torch.tensor([[1, 2, 3]]))
+
+
+def test_streaming_turn_does_not_block_loop():
+    """process_realtime_chunk_streaming yields words while the loop keeps serving others"""
+    logger.info("\n[TEST 4] Streaming turn end-to-end...")
+    voxtral = VoxtralModel()
+    voxtral.is_initialized = True
+    voxtral.processor = FakeProcessor()
+    voxtral.model = SlowModel(tokens=8, delay_s=0.02, lock=voxtral.model_lock)
+    audio = (np.random.default_rng(0).standard_normal(16000) * 0.1).astype(np.float32)
+
+    async def run():
+        async def words():
+            async for chunk in voxtral.process_realtime_chunk_streaming(audio, "executor_turn"):
+                assert chunk["success"], f"Streaming failed: {chunk}"
+                yield chunk["text"]
+        return await consume_while_ticking(words)
+
+    try:
+        words, ticks = asyncio.run(run())
+    finally:
+        voxtral.inference_executor.shutdown()
+
+    assert words == [f"w{i}" for i in range(1, 9)], f"Unexpected words: {words}"
+    assert ticks >= 8, f"Event loop was blocked during the turn ({ticks} ticks)"
+    assert voxtral.get_model_info()["executor_stats"]["completed"] == 1
+    logger.info(f"✅ {len(words)} words streamed, loop ticked {ticks} times")
+    return True
+
+def test_cancelled_queued_jobs_are_skipped():
+    """A turn cancelled before it gets the model runs no prefill; a cancelled future leaves the queue"""
+    logger.info("\n[TEST 5] Cancelled queued jobs...")
+    lock = threading.Lock()
+    executor = InferenceExecutor(max_workers=2, lock=lock)
+    model = SlowModel(tokens=3, delay_s=0.01, lock=lock)
+
+    async def run():
+        lock.acquire()  # A running turn holds the model
+        token = CancellationToken("queued")
+        waiting = executor.stream_words(model.generate, {"input_ids": torch.tensor([[1]])}, WordTokenizer(),
+                                        timeout=5.0, cancel_token=token)
+        await asyncio.sleep(0.02)  # Picked up by a worker, blocked on the lock
+        token.cancel("barge_in")
+        lock.release()
+        events = [event async for event in waiting]
+
+        # Both workers busy: the third job never leaves the executor queue before it is cancelled
+        lock.acquire()
+        busy = [executor.stream_words(model.generate, {"input_ids": torch.tensor([[1]])}, WordTokenizer(),
+                                      timeout=5.0) for _ in range(2)]
+        never_started = executor.stream_words(model.generate, {"input_ids": torch.tensor([[1]])},
+                                              WordTokenizer(), timeout=5.0)
+        await asyncio.sleep(0.02)
+        never_started.future.cancel()
+        lock.release()
+        outputs = [[event.text async for event in streamer if event.kind == "word"] for streamer in busy]
+        return events, outputs
+
+    try:
+        events, outputs = asyncio.run(run())
+        stats = executor.get_stats()
+    finally:
+        executor.shutdown()
+
+    assert events == [], f"Cancelled turn streamed {events}"
+    assert all(len(output) == 3 for output in outputs), f"Unexpected outputs: {outputs}"
+    assert model.peak_active == 1 and stats["completed"] == 2, f"Cancelled jobs reached the model: {stats}"
+    assert stats["skipped_cancelled"] == 2, stats
+    assert stats["queue_depth"] == 0 and stats["running"] == 0, stats
+    logger.info(f"✅ {stats['skipped_cancelled']} cancelled jobs skipped without touching the model")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "event_loop_responsive": test_event_loop_stays_responsive(),
+        "bounded_pool": test_bounded_pool_and_queue_metrics(),
+        "error_propagation": test_generation_error_reaches_consumer(),
+        "streaming_turn": test_streaming_turn_does_not_block_loop(),
+        "cancelled_queued_jobs": test_cancelled_queued_jobs_are_skipped(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
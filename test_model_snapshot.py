@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Model Snapshot Test Suite
+Tests that a snapshot round-trips the model and processor exactly, loads with the network
+blocked, and that interrupted, truncated or mismatched snapshots are never loaded
+"""
+
+import logging
+import os
+import socket
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("MODEL_SNAPSHOT_TEST")
+
+from transformers import AutoProcessor, VoxtralConfig, VoxtralForConditionalGeneration, WhisperFeatureExtractor
+
+from src.models.model_snapshot import MANIFEST_NAME, create_snapshot, default_snapshot_dir, load_component, load_manifest
+
+MODEL_NAME = "mistralai/Voxtral-Mini-3B-2507"
+
+
+def build_tiny_voxtral() -> VoxtralForConditionalGeneration:
+    torch.manual_seed(0)
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16),
+        audio_token_id=24,
+    )).eval()
+
+
+@contextmanager
+def network_blocked():
+    """Any outgoing connection attempt fails the test"""
+    original_connect = socket.socket.connect
+
+    def refuse(*args, **kwargs):
+        raise AssertionError(f"Network access during offline load: {args[1:]}")
+
+    socket.socket.connect = refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect = original_connect
+
+
+def test_snapshot_round_trip_offline():
+    """Weights and processor load back identically from the snapshot with no network"""
+    logger.info("\n[TEST 1] Snapshot round trip...")
+    model = build_tiny_voxtral()
+    processor = WhisperFeatureExtractor(feature_size=128)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_dir = default_snapshot_dir(tmp_dir, MODEL_NAME)
+        assert snapshot_dir.endswith(os.path.join("snapshots", "mistralai--Voxtral-Mini-3B-2507"))
+        manifest = create_snapshot(snapshot_dir, MODEL_NAME, model, processor, checksum=True)
+        assert manifest["components"]["model"]["quantization"] == "none"
+        assert any(name.endswith(".safetensors") for name in manifest["files"])
+
+        with network_blocked():
+            assert load_manifest(snapshot_dir, MODEL_NAME, verify_checksums=True) is not None
+            loaded, loaded_processor = load_component(snapshot_dir, "model", VoxtralForConditionalGeneration,
+                                                      AutoProcessor)
+        input_ids = torch.tensor([[1, 5, 9, 13, 2]])
+        with torch.no_grad():
+            assert torch.equal(model(input_ids=input_ids).logits, loaded.eval()(input_ids=input_ids).logits)
+        assert loaded_processor.feature_size == 128
+    logger.info(f"✅ {len(manifest['files'])} files, identical logits, loaded with the network blocked")
+    return True
+
+
+def test_unusable_snapshots_ignored():
+    """No manifest (interrupted write), truncated weights, wrong model or version -> not loaded"""
+    logger.info("\n[TEST 2] Snapshot validation...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+        manifest = create_snapshot(snapshot_dir, MODEL_NAME, build_tiny_voxtral(), None)
+        assert load_manifest(snapshot_dir, "other/model") is None
+        assert load_manifest(os.path.join(tmp_dir, "missing")) is None
+
+        weights = next(name for name in manifest["files"] if name.endswith(".safetensors"))
+        with open(os.path.join(snapshot_dir, weights), "r+b") as weights_file:
+            weights_file.truncate(manifest["files"][weights]["size"] // 2)
+        assert load_manifest(snapshot_dir, MODEL_NAME) is None
+
+        # The manifest is written last, so an interrupted snapshot has none
+        os.remove(os.path.join(snapshot_dir, MANIFEST_NAME))
+        assert load_manifest(snapshot_dir, MODEL_NAME) is None
+    logger.info("✅ Incomplete and mismatched snapshots are rejected")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "snapshot_round_trip_offline": test_snapshot_round_trip_offline(),
+        "unusable_snapshots_ignored": test_unusable_snapshots_ignored(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -31,24 +31,24 @@ def verify_phase0_fix():
         # Check 1: Verify 1-word chunk logic
         logger.info("\n[CHECK 1] Verify 1-word chunk logic...")
         
-        # Look for the while loop with 1-word chunks
-        pattern1 = r"while len\(word_buffer\) >= 1:"
+        # Every word event from the streamer goes out as its own chunk
+        pattern1 = r'if event\.kind != "word":'
         if re.search(pattern1, content):
-            logger.info("✅ Found: while len(word_buffer) >= 1:")
+            logger.info('✅ Found: if event.kind != "word":')
             check1 = True
         else:
-            logger.error("❌ NOT FOUND: while len(word_buffer) >= 1:")
+            logger.error('❌ NOT FOUND: if event.kind != "word":')
             check1 = False
         
         # Check 2: Verify 1-word extraction
         logger.info("\n[CHECK 2] Verify 1-word extraction...")
         
-        pattern2 = r'chunk_text = " ".join\(word_buffer\[:1\]\)'
+        pattern2 = r"chunk_text = event\.text"
         if re.search(pattern2, content):
-            logger.info('✅ Found: chunk_text = " ".join(word_buffer[:1])')
+            logger.info("✅ Found: chunk_text = event.text")
             check2 = True
         else:
-            logger.error('❌ NOT FOUND: chunk_text = " ".join(word_buffer[:1])')
+            logger.error("❌ NOT FOUND: chunk_text = event.text")
             check2 = False
         
         # Check 3: Verify TTFT tracking
@@ -17,7 +17,7 @@ logger = logging.getLogger("PHASE3_VERIFICATION")
 
 
 def verify_voxtral_model_changes():
-    """Verify voxtral_model_realtime.py has TTS integration"""
+    """Verify voxtral_model_realtime.py streams chunks for the server's TTS pipeline"""
     logger.info("\n[CHECK 1] Verify voxtral_model_realtime.py changes...")
     
     model_file = Path("src/models/voxtral_model_realtime.py")
@@ -27,14 +27,9 @@ def verify_voxtral_model_changes():
     
     content = model_file.read_text(encoding='utf-8', errors='ignore')
     
+    # Speech is synthesized by the server's TTSManager (streaming pipeline); the model only
+    # streams text, so it holds no TTS manager of its own
     checks = [
-        ("from src.models.tts_manager import TTSManager", "TTSManager import"),
-        ("TTS_AVAILABLE = True", "TTS_AVAILABLE flag"),
-        ("self.tts_manager = None", "tts_manager attribute"),
-        ("def get_tts_manager", "get_tts_manager method"),
-        ("tts_manager = self.get_tts_manager()", "TTS manager initialization in streaming"),
-        ("tts_enabled = tts_manager is not None", "TTS enabled check"),
-        ("audio_bytes = await tts_manager.synthesize", "TTS synthesis call"),
         ("'audio': audio_bytes", "Audio in response dict"),
         ("PHASE 3", "PHASE 3 comments"),
     ]
@@ -62,7 +57,7 @@ def verify_ui_server_changes():
     
     checks = [
         ("has_audio", "has_audio field in JSON"),
-        ("await websocket.send_bytes(text_chunk['audio'])", "Audio bytes sending"),
+        ("await send_audio(text_chunk['audio'])", "Audio bytes sending (held for speculative turns, encoded per client)"),
         ("PHASE 3", "PHASE 3 comments"),
         ("if text_chunk.get('audio')", "Audio chunk handling"),
     ]
@@ -86,7 +81,7 @@ def verify_backward_compatibility():
     
     # Check that text-only responses still work
     checks = [
-        ("'text': chunk_text.strip()", "Text field still present"),
+        ("'text': chunk_text,", "Text field still present (one word event per chunk)"),
         ("'is_final': False", "is_final field still present"),
         ("'chunk_index': chunk_index", "chunk_index field still present"),
         ("'processing_time_ms'", "processing_time_ms field still present"),
@@ -215,8 +215,8 @@ class Phase5CodeVerification:
         
         # Check 7: Language parameter passed to streaming method
         self.check(
-            "Language passed to process_realtime_chunk_streaming",
-            "language=language" in content and "process_realtime_chunk_streaming" in content,
+            "Language passed to the streaming turn",
+            "language=language" in content and "stream_turn" in content,
             "Should pass language to streaming method"
         )
         
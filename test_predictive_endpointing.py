@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Predictive Endpointing Test Suite
+Tests speculative turns: output held until the endpoint is confirmed and released in order,
+abandoned turns never reach the client and leave the session KV cache untouched, the per-
+utterance limit, and the saved-latency / wasted-compute metrics on the stub engine
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("PREDICTIVE_ENDPOINTING_TEST")
+
+from src.managers.endpointing_manager import PredictiveEndpointer
+from src.models.cancellation import CancellationToken
+from src.models.replica_pool import ModelReplicaPool
+from src.models.voxtral_model_realtime import VoxtralModel
+from src.utils.compatibility import FallbackVoxtralModel
+
+import test_session_kv_cache as session_fixtures
+
+SPEECH = (np.random.default_rng(0).standard_normal(16000) * 0.1).astype(np.float32)
+
+
+def test_held_output_and_limits():
+    """Held messages go out in order on confirm; abandoned ones never do; attempts are capped"""
+    logger.info("\n[TEST 1] Holding, confirming and abandoning...")
+    endpointer = PredictiveEndpointer(enabled=True, pause_ms=250, max_per_utterance=2)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        turn = endpointer.start("u1", 16000, chunk_id=1)
+        turn.task = asyncio.ensure_future(asyncio.sleep(0))
+        await turn.send(send, {"type": "text_chunk", "text": "hello"})
+        await turn.send(send, b"audio")
+        assert sent == [] and turn.held_chunks == 1
+        assert not endpointer.can_confirm(turn, "u1", 16001), "Audio arrived after the pause"
+        assert endpointer.can_confirm(turn, "u1", 16000)
+        await endpointer.confirm(turn)
+        await turn.send(send, {"type": "conversation_complete"})
+
+        abandoned = endpointer.start("u2", 8000, chunk_id=2)
+        await abandoned.send(send, {"type": "text_chunk", "text": "never"})
+        endpointer.abandon(abandoned, "speech_resumed")
+        assert endpointer.start("u2", 9000, chunk_id=3) is not None
+        assert endpointer.start("u2", 9500, chunk_id=4) is None, "Third speculation on u2 is over the limit"
+        endpointer.end_utterance("u2")
+        assert endpointer.start("u2", 9500, chunk_id=5) is not None
+    asyncio.run(run())
+
+    assert sent == [{"type": "text_chunk", "text": "hello"}, b"audio", {"type": "conversation_complete"}]
+    stats = endpointer.get_stats()
+    assert stats["confirmed"] == 1 and stats["abandoned"] == 1 and stats["wasted_chunks"] == 1
+    assert stats["skipped_over_limit"] == 1 and stats["speculative_turns"] == 4
+    assert not PredictiveEndpointer(enabled=False).start("u", 16000, 1)
+    logger.info(f"✅ Endpointing stats: {stats}")
+    return True
+
+
+def test_abandoned_turn_keeps_session_cache():
+    """An abandoned speculative turn does not extend the session's carried-over KV cache"""
+    logger.info("\n[TEST 2] Session KV cache after an abandoned turn...")
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = session_fixtures.build_tiny_voxtral()
+    voxtral.processor = type("Processor", (), {"tokenizer": session_fixtures.SessionTokenizer()})()
+    generate = dict(max_new_tokens=4, min_new_tokens=4, do_sample=False)
+
+    with torch.no_grad():
+        voxtral._generate_with_cache(None, "session", **session_fixtures.turn_inputs(seed=0), **generate)
+        before = voxtral.session_cache._entries["session"].token_ids.clone()
+        voxtral._generate_with_cache(None, "session", lambda: True, **session_fixtures.turn_inputs(seed=1), **generate)
+        after_abandoned = voxtral.session_cache._entries["session"].token_ids
+        assert torch.equal(before, after_abandoned), "Abandoned turn must leave the history as it was"
+
+        confirmed = voxtral._generate_with_cache(None, "session", lambda: False,
+                                                 **session_fixtures.turn_inputs(seed=1), **generate)
+        # Same as if the abandoned turn had never run
+        reference = VoxtralModel()
+        reference.device = "cpu"
+        reference.model = voxtral.model
+        reference.processor = voxtral.processor
+        reference._generate_with_cache(None, "session", **session_fixtures.turn_inputs(seed=0), **generate)
+        expected = reference._generate_with_cache(None, "session", **session_fixtures.turn_inputs(seed=1), **generate)
+    assert confirmed[0, -4:].tolist() == expected[0, -4:].tolist()
+    assert voxtral.session_cache._entries["session"].cached_tokens > before.numel()
+    logger.info(f"✅ History kept at {before.numel()} tokens across the abandoned turn")
+    return True
+
+
+def test_speculative_turns_on_stub_engine():
+    """Confirmed speculation saves the head start; a resumed utterance wastes only the work done so far"""
+    logger.info("\n[TEST 3] Speculative turns on the stub engine...")
+    pool = ModelReplicaPool(["cpu"], model_factory=lambda device: FallbackVoxtralModel(
+        device, prefill_base_ms=20.0, prefill_ms_per_audio_s=20.0, decode_ms_per_token=10.0, output_words=5))
+    asyncio.run(pool.initialize())
+    endpointer = PredictiveEndpointer(enabled=True, pause_ms=300)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def speculate(utterance_id, chunk_id):
+        turn = endpointer.start(utterance_id, len(SPEECH), chunk_id)
+        token = CancellationToken(str(chunk_id))
+
+        async def run_turn():
+            async for chunk in pool.stream_turn("client", SPEECH, chunk_id, cancel_token=token, speculative=True):
+                if chunk["success"] and chunk["text"]:
+                    await turn.send(send, {"type": "text_chunk", "chunk_id": chunk_id, "text": chunk["text"]})
+            turn.mark_ready()
+            await turn.wait_confirmed()
+            await turn.send(send, {"type": "conversation_complete", "chunk_id": chunk_id})
+        turn.task = asyncio.ensure_future(run_turn())
+        return turn, token
+
+    async def run():
+        # The user keeps talking 30ms into the speculative turn
+        resumed, token = await speculate("u1", 1)
+        await asyncio.sleep(0.03)
+        wasted_ms = endpointer.abandon(resumed, "speech_resumed")
+        token.cancel("speech_resumed")
+        resumed.task.cancel()
+        await asyncio.gather(resumed.task, return_exceptions=True)
+
+        # The pause was the endpoint: the client confirms after its remaining silence
+        confirmed, _ = await speculate("u1", 2)
+        await asyncio.sleep(0.2)
+        assert sent == [], "Nothing is sent before the endpoint is confirmed"
+        assert endpointer.can_confirm(confirmed, "u1", len(SPEECH))
+        saved_ms = await endpointer.confirm(confirmed)
+        await confirmed.task
+        return wasted_ms, saved_ms
+
+    try:
+        wasted_ms, saved_ms = asyncio.run(run())
+    finally:
+        pool.primary.inference_executor.shutdown()
+
+    words = [message["text"] for message in sent if message["type"] == "text_chunk"]
+    assert words == pool.primary.plan_turn(len(SPEECH), 2)["words"]
+    assert all(message["chunk_id"] == 2 for message in sent) and sent[-1]["type"] == "conversation_complete"
+    assert 20.0 <= wasted_ms < 150.0 and saved_ms >= 80.0, (wasted_ms, saved_ms)
+    stats = endpointer.get_stats()
+    assert stats["hit_rate"] == 0.5 and stats["avg_saved_latency_ms"] == saved_ms
+    logger.info(f"✅ Saved {saved_ms:.0f}ms on the confirmed turn, wasted {wasted_ms:.0f}ms on the resumed one")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "held_output_and_limits": test_held_output_and_limits(),
+        "abandoned_turn_keeps_session_cache": test_abandoned_turn_keeps_session_cache(),
+        "speculative_turns_on_stub_engine": test_speculative_turns_on_stub_engine(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
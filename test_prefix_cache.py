@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Prompt Prefix Cache Test Suite
+Checks that turns started from a cached instruction prefix match a full prefill exactly
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("PREFIX_CACHE_TEST")
+
+from transformers import LlamaConfig, LlamaForCausalLM, VoxtralConfig, VoxtralForConditionalGeneration
+
+from src.models.prefix_cache import PromptPrefixCache
+from src.models.inference_scheduler import ContinuousBatchingScheduler
+from src.models.voxtral_model_realtime import VoxtralModel, PROMPT_TEMPLATE_VERSION
+
+AUDIO_TOKEN_ID = 24
+BEGIN_AUDIO_ID = 25
+
+
+def build_tiny_llama() -> LlamaForCausalLM:
+    torch.manual_seed(0)
+    return LlamaForCausalLM(LlamaConfig(
+        vocab_size=128, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256,
+        bos_token_id=None, eos_token_id=None,
+    )).eval()
+
+
+def build_tiny_voxtral() -> VoxtralForConditionalGeneration:
+    torch.manual_seed(0)
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16,
+                         max_position_embeddings=4096),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+
+
+def test_voxtral_logits_match_full_prefill():
+    """Audio prompt continued from the cached prefix must give the same next-token logits"""
+    logger.info("\n[TEST 1] Voxtral prefix reuse vs full prefill...")
+    model = build_tiny_voxtral()
+    input_features = torch.randn(1, 128, 3000)
+    instruction = [1, 3, 5, 6, 7, 8, 9, 10]
+    # 30s of mel frames map to 750 audio placeholder tokens
+    input_ids = torch.tensor([instruction + [BEGIN_AUDIO_ID] + [AUDIO_TOKEN_ID] * 750 + [4]])
+    attention_mask = torch.ones_like(input_ids)
+    prefix_cache = PromptPrefixCache(model)
+
+    with torch.no_grad():
+        full_logits = model(input_ids=input_ids, input_features=input_features,
+                            attention_mask=attention_mask).logits[0, -1]
+        for _ in range(2):
+            past_key_values, prefix_len = prefix_cache.prepare("conversation", torch.tensor(instruction), input_ids)
+            cached_logits = model(input_ids=input_ids[:, prefix_len:], input_features=input_features,
+                                  attention_mask=attention_mask, past_key_values=past_key_values).logits[0, -1]
+            assert prefix_len == len(instruction)
+            assert torch.allclose(full_logits, cached_logits, atol=1e-4), \
+                f"Logits differ by {(full_logits - cached_logits).abs().max():.2e}"
+
+    stats = prefix_cache.get_stats()
+    assert stats["misses"] == 1 and stats["hits"] == 1, f"Expected one build then one hit: {stats}"
+    logger.info("✅ Prefix-cached logits match the full prefill")
+    return True
+
+
+def test_generate_matches_and_entry_is_not_mutated():
+    """Greedy generate() from the prefix is identical, and repeated turns reuse a clean entry"""
+    logger.info("\n[TEST 2] generate() from cached prefix...")
+    model = build_tiny_llama()
+    prefix_ids = torch.arange(1, 21)
+    prefix_cache = PromptPrefixCache(model)
+
+    for turn in range(3):
+        tail = torch.randint(30, 128, (1, 6 + turn), generator=torch.Generator().manual_seed(turn))
+        input_ids = torch.cat([prefix_ids.unsqueeze(0), tail], dim=1)
+        expected = model.generate(input_ids, attention_mask=torch.ones_like(input_ids),
+                                  max_new_tokens=10, do_sample=False)
+        past_key_values, _ = prefix_cache.prepare(("conversation", "en", "1"), prefix_ids, input_ids)
+        got = model.generate(input_ids, attention_mask=torch.ones_like(input_ids),
+                             past_key_values=past_key_values, max_new_tokens=10, do_sample=False)
+        assert torch.equal(expected, got), f"Turn {turn} diverged: {got.tolist()} vs {expected.tolist()}"
+
+    stats = prefix_cache.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1, f"Unexpected stats: {stats}"
+    assert stats["tokens_reused"] == 3 * len(prefix_ids)
+    logger.info(f"✅ 3 turns identical, hit rate {stats['hit_rate']:.2f}")
+    return True
+
+
+def test_bypass_and_stale_rebuild():
+    """Prompts that do not start with the prefix bypass it; changed prefix tokens rebuild the entry"""
+    logger.info("\n[TEST 3] Bypass and stale rebuild...")
+    model = build_tiny_llama()
+    prefix_cache = PromptPrefixCache(model, max_entries=1)
+    key = ("transcribe", "en", "1")
+
+    past_key_values, prefix_len = prefix_cache.prepare(key, torch.tensor([1, 2, 3]), torch.tensor([[9, 9, 9, 9]]))
+    assert past_key_values is None and prefix_len == 0, "Mismatching prompt must not use the cache"
+
+    prefix_cache.prepare(key, torch.tensor([1, 2, 3]), torch.tensor([[1, 2, 3, 4]]))
+    prefix_cache.prepare(key, torch.tensor([1, 2, 5]), torch.tensor([[1, 2, 5, 4]]))
+    prefix_cache.prepare(("conversation", "en", "1"), torch.tensor([7, 8]), torch.tensor([[7, 8, 4]]))
+
+    stats = prefix_cache.get_stats()
+    assert stats["bypassed"] == 1, f"Expected one bypass: {stats}"
+    assert stats["stale_rebuilds"] == 1, f"Changed prefix tokens should rebuild: {stats}"
+    assert stats["evictions"] == 1 and stats["entries"] == 1, f"LRU bound not enforced: {stats}"
+    logger.info("✅ Bypass, rebuild and eviction behave")
+    return True
+
+
+class TemplateTokenizer:
+    eos_token_id = 2
+
+    def encode(self, text):
+        return [40 + (sum(map(ord, word)) % 80) for word in text.split()]
+
+
+class TemplateProcessor:
+    """Mimics the Voxtral chat template layout: <s>[INST] text chunks [BEGIN_AUDIO] audio [/INST]"""
+    tokenizer = TemplateTokenizer()
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        ids = [1, 3]
+        for block in conversation[0]["content"]:
+            if block["type"] == "text":
+                ids += self.tokenizer.encode(block["text"])
+            else:
+                ids += [BEGIN_AUDIO_ID] + [AUDIO_TOKEN_ID] * 5
+        ids.append(4)
+        return FakeInputs(input_ids=torch.tensor([ids]))
+
+
+class FakeInputs(dict):
+    def to(self, *args, **kwargs):
+        return self
+
+
+def test_prompt_prefix_probe():
+    """The probed prefix covers the instruction only, so context turns still hit it"""
+    logger.info("\n[TEST 4] Prompt prefix probe...")
+    voxtral = VoxtralModel()
+    voxtral.processor = TemplateProcessor()
+    voxtral.model = build_tiny_llama()
+    audio = np.zeros(8000, dtype=np.float32)
+
+    instruction, _ = voxtral._build_prompt("conversation")
+    key, prefix_ids = voxtral._prompt_prefix("conversation", "en", instruction)
+    expected = [1, 3] + TemplateTokenizer().encode(instruction)
+    assert key == ("conversation", "en", PROMPT_TEMPLATE_VERSION)
+    assert prefix_ids.tolist() == expected, f"Prefix should stop after the instruction: {prefix_ids.tolist()}"
+
+    instruction_ctx, context_text = voxtral._build_prompt("conversation", "User: hi\nAI: hello")
+    assert instruction_ctx == instruction and context_text, "Context must not change the cached instruction"
+    context_ids = voxtral._prepare_inputs(audio, instruction_ctx, "ctx", context_text)["input_ids"]
+    assert context_ids[0, :len(expected)].tolist() == expected, "Context turn must start with the cached prefix"
+
+    transcribe_key, _ = voxtral._prompt_prefix("transcribe", "en", voxtral._build_prompt("transcribe")[0])
+    assert transcribe_key != key, "Modes must have separate prefix entries"
+    logger.info(f"✅ {len(expected)}-token prefix shared by plain and context turns")
+    return True
+
+
+def test_scheduler_prefill_from_prefix():
+    """The batching scheduler starts admitted sequences from the prefix and stays exact"""
+    logger.info("\n[TEST 5] Scheduler prefill from prefix...")
+    model = build_tiny_llama()
+    prefix_ids = torch.arange(1, 17)
+    prompts = [torch.cat([prefix_ids, torch.randint(30, 128, (n,), generator=torch.Generator().manual_seed(n))]).unsqueeze(0)
+               for n in (3, 9, 5)]
+    expected = [model.generate(p, attention_mask=torch.ones_like(p), max_new_tokens=12, do_sample=False)[0, p.shape[1]:].tolist()
+                for p in prompts]
+
+    prefix_cache = PromptPrefixCache(model)
+    scheduler = ContinuousBatchingScheduler(model, max_batch_size=4, prefix_cache=prefix_cache)
+
+    async def run():
+        async def consume(prompt):
+            sequence = scheduler.submit({"input_ids": prompt}, max_new_tokens=12, prefix=("conversation", prefix_ids))
+            tokens = [token async for token in sequence]
+            return tokens, sequence.prefix_tokens_reused
+        return await asyncio.gather(*[consume(p) for p in prompts])
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        scheduler.shutdown()
+
+    for (tokens, reused), want in zip(results, expected):
+        assert tokens == want, f"Scheduler diverged with prefix cache: {tokens} vs {want}"
+        assert reused == len(prefix_ids)
+    logger.info("✅ Scheduler output identical with prefix reuse")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "voxtral_logits": test_voxtral_logits_match_full_prefill(),
+        "generate_matches": test_generate_matches_and_entry_is_not_mutated(),
+        "bypass_and_rebuild": test_bypass_and_stale_rebuild(),
+        "prompt_prefix_probe": test_prompt_prefix_probe(),
+        "scheduler_prefix": test_scheduler_prefill_from_prefix(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
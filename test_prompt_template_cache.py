@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Prompt Template Cache Test Suite
+Tests that spliced, pre-tokenized prompts reproduce the processor's chat-template output for
+every mode / context / audio length, and that templates the splice cannot express fall back
+"""
+
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("PROMPT_TEMPLATE_CACHE_TEST")
+
+from transformers import WhisperFeatureExtractor
+from transformers.models.voxtral.processing_voxtral import VoxtralProcessor
+
+from src.utils.audio_io import decode_audio_base64
+from src.models.voxtral_model_realtime import VoxtralModel, PROMPT_TEMPLATE_VERSION
+
+AUDIO_TOKEN_ID = 24
+BEGIN_AUDIO_ID = 25
+BOS_ID, INST_ID, END_INST_ID = 1, 3, 4
+AUDIO_TOKENS_PER_WINDOW = 375
+SAMPLE_RATE = 16000
+
+
+class WordTokenizer:
+    """Word-level stand-in for the Mistral tokenizer; text chunks are tokenized independently"""
+    bos_token_id = BOS_ID
+    eos_token_id = 2
+
+    def encode(self, text, add_special_tokens=True):
+        ids = [100 + sum(map(ord, word)) % 900 for word in text.replace("\n", " \n ").split(" ") if word]
+        return ([BOS_ID] if add_special_tokens else []) + ids
+
+
+class VoxtralLayoutProcessor:
+    """
+    Voxtral chat template layout: <s>[INST] chunks... [/INST], audio as [BEGIN_AUDIO] + 375 tokens
+    per started 30 s window; features come from VoxtralProcessor's own feature code
+
+    `merge_text=True` joins the text chunks before tokenizing, which a splice cannot reproduce.
+    """
+
+    def __init__(self, merge_text: bool = False):
+        self.feature_extractor = WhisperFeatureExtractor(feature_size=128)
+        self.tokenizer = WordTokenizer()
+        self.merge_text = merge_text
+        self.calls = 0
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        self.calls += 1
+        content = conversation[0]["content"]
+        texts = [block["text"] for block in content if block["type"] == "text"]
+        audio, _ = decode_audio_base64(next(block for block in content if block["type"] == "audio")["base64"])
+
+        ids = [BOS_ID, INST_ID]
+        for text in (["".join(texts)] if self.merge_text else texts):
+            ids += self.tokenizer.encode(text, add_special_tokens=False)
+        windows = max(1, math.ceil(len(audio) / self.feature_extractor.n_samples))
+        ids += [BEGIN_AUDIO_ID] + [AUDIO_TOKEN_ID] * AUDIO_TOKENS_PER_WINDOW * windows + [END_INST_ID]
+        input_ids = torch.tensor([ids])
+        input_features = VoxtralProcessor._retrieve_input_features(
+            self, [audio], 3000, sampling_rate=SAMPLE_RATE, padding=True, truncation=False,
+            pad_to_multiple_of=480000, return_tensors="pt"
+        )
+        return LayoutInputs(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), input_features=input_features)
+
+
+class LayoutInputs(dict):
+    """Mimics BatchFeature.to()"""
+
+    def to(self, device=None, dtype=None):
+        return LayoutInputs({key: value.to(dtype) if dtype is not None and value.is_floating_point() else value
+                             for key, value in self.items()})
+
+
+def build_voxtral(processor) -> VoxtralModel:
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = type("ModelStub", (), {"config": type("Config", (), {"audio_token_id": AUDIO_TOKEN_ID})()})()
+    voxtral.processor = processor
+    return voxtral
+
+
+def speech(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+
+def test_spliced_inputs_match_processor():
+    """input_ids identical and features equal up to PCM16 quantization, for all prompt shapes"""
+    logger.info("\n[TEST 1] Spliced prompts vs processor output...")
+    voxtral = build_voxtral(VoxtralLayoutProcessor())
+    context = "User: Can you book a table for two?\nAI: Sure, for what time?"
+
+    checked = 0
+    for mode in ("conversation", "transcribe"):
+        for conversation_context in ("", context):
+            prompt_text, context_text = voxtral._build_prompt(mode, conversation_context)
+            for seconds in (0.4, 12.0, 30.0, 47.5):
+                audio = speech(seconds, seed=checked)
+                expected = voxtral._prepare_inputs(audio, prompt_text, "expected", context_text)
+                actual = voxtral._turn_inputs(audio, mode, "en", prompt_text, "actual", context_text)
+                assert actual["input_ids"].tolist() == expected["input_ids"].tolist(), (mode, bool(context_text), seconds)
+                assert actual["input_features"].shape == expected["input_features"].shape
+                assert actual["input_features"].dtype == expected["input_features"].dtype
+                # The processor sees the PCM16 WAV round-trip, the template path the float samples
+                difference = (actual["input_features"].float() - expected["input_features"].float()).abs()
+                assert difference.max() < 0.05 and difference.mean() < 1e-4, f"Features differ for {seconds}s"
+                checked += 1
+
+    stats = voxtral.get_model_info()["prompt_template_stats"]
+    assert stats["templates"] == 3 and stats["unusable"] == 0, stats  # transcribe never carries context
+    assert stats["hits"] == checked and stats["fallbacks"] == 0, stats
+    logger.info(f"✅ {checked} turns identical to apply_chat_template ({stats['total_build_ms']:.0f}ms to build)")
+    return True
+
+
+def test_turns_skip_the_processor():
+    """After the template is built, turns and streamed prompts never call apply_chat_template"""
+    logger.info("\n[TEST 2] Per-turn cost...")
+    processor = VoxtralLayoutProcessor()
+    voxtral = build_voxtral(processor)
+    prompt_text, context_text = voxtral._build_prompt("conversation", "User: hi\nAI: hello")
+    audio = speech(3.0)
+
+    voxtral._turn_inputs(audio, "conversation", "en", prompt_text, "warm", context_text)
+    calls_after_build = processor.calls
+
+    for index in range(20):
+        voxtral._turn_inputs(audio, "conversation", "en", prompt_text, f"turn_{index}", context_text)
+    assert processor.calls == calls_after_build, "Template turns must not render the chat template"
+
+    # What is left of the prompt work per turn: splicing ids (features are computed either way)
+    template = voxtral._prompt_template("conversation", "en", prompt_text, context_text)
+    start = time.perf_counter()
+    for _ in range(100):
+        voxtral.prompt_template_cache.input_ids(template, len(audio), context_text)
+    splice_ms = (time.perf_counter() - start) * 1000 / 100
+
+    # Streamed utterances get their ids from the same template
+    input_ids, attention_mask = voxtral._streaming_prompt_inputs(prompt_text, context_text, 2)
+    expected = voxtral._prepare_inputs(speech(45.0), prompt_text, "expected", context_text)["input_ids"]
+    assert input_ids.tolist() == expected.tolist() and attention_mask.shape == input_ids.shape
+    assert processor.calls == calls_after_build + 1
+    logger.info(f"✅ No chat-template renders per turn; prompt ids spliced in {splice_ms:.3f}ms")
+    return True
+
+
+def test_unspliceable_template_falls_back():
+    """A template that tokenizes across chunk boundaries is rejected; turns use the processor"""
+    logger.info("\n[TEST 3] Validation fallback...")
+    voxtral = build_voxtral(VoxtralLayoutProcessor(merge_text=True))
+    prompt_text, context_text = voxtral._build_prompt("conversation", "User: hi\nAI: hello")
+    audio = speech(2.0)
+
+    # No context: a single text chunk, so the splice is exact
+    plain = voxtral._turn_inputs(audio, "conversation", "en", prompt_text, "plain")
+    assert plain["input_ids"].tolist() == voxtral._prepare_inputs(audio, prompt_text, "ref")["input_ids"].tolist()
+
+    # Context: text is merged before tokenizing -> validation fails -> processor output is used
+    actual = voxtral._turn_inputs(audio, "conversation", "en", prompt_text, "ctx", context_text)
+    expected = voxtral._prepare_inputs(audio, prompt_text, "ref", context_text)
+    assert actual["input_ids"].tolist() == expected["input_ids"].tolist()
+
+    stats = voxtral.prompt_template_cache.get_stats()
+    assert stats["templates"] == 1 and stats["unusable"] == 1 and stats["fallbacks"] == 1, stats
+    assert voxtral.prompt_template_cache._templates[("conversation", "en", True, PROMPT_TEMPLATE_VERSION)] is None
+    logger.info("✅ Unspliceable template rejected, turns fall back to the processor")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "spliced_inputs_match": test_spliced_inputs_match_processor(),
+        "turns_skip_processor": test_turns_skip_the_processor(),
+        "unspliceable_fallback": test_unspliceable_template_falls_back(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Replica Pool Test Suite
+Tests least-outstanding-tokens routing, soft session affinity (sticky within the slack, moved and
+cleaned up beyond it), health tracking with recovery, and concurrent streamed turns over two
+small CPU replicas
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("REPLICA_POOL_TEST")
+
+from src.models.replica_pool import ModelReplica, ModelReplicaPool, ReplicaRouter, estimate_turn_tokens
+
+import test_turn_cancellation as tiny_voxtral
+
+
+class FakeModel:
+    def __init__(self):
+        self.ended_sessions = []
+
+    def end_session(self, session_id):
+        self.ended_sessions.append(session_id)
+
+
+def test_least_outstanding_tokens_and_affinity():
+    """New sessions go to the idlest replica; sessions stay put until their replica is too busy"""
+    logger.info("\n[TEST 1] Routing and affinity...")
+    replicas = [ModelReplica(i, "cpu", FakeModel()) for i in range(3)]
+    moved = []
+    router = ReplicaRouter(replicas, affinity_slack_tokens=500,
+                           on_session_moved=lambda session_id, replica: moved.append((session_id, replica.replica_id)))
+
+    leases = [router.acquire(f"s{i}", 1000) for i in range(3)]
+    assert [lease.replica.replica_id for lease in leases] == [0, 1, 2], "One session per idle replica"
+    big = router.acquire("s3", 3000)
+    assert big.replica.replica_id == 0
+    for lease in leases:
+        lease.release()
+
+    # s0's replica now carries 3000 tokens more than the others: beyond the slack -> moved
+    lease = router.acquire("s0", 100)
+    assert lease.replica.replica_id == 1 and moved == [("s0", 0)]
+    lease.release()
+    # s1 stays on replica 1 (same load as the least-loaded replica)
+    assert router.acquire("s1", 100).replica.replica_id == 1
+    big.consume(2800)  # Most of s3's turn is done: replica 0 is within the slack again
+    assert router.route("s3").replica_id == 0
+    stats = router.get_stats()
+    assert stats["affinity_moves"] == 1 and stats["affinity_hits"] >= 2 and stats["new_sessions"] == 4
+    assert estimate_turn_tokens(16000 * 45, context_chars=400, max_new_tokens=100) == 2 * 375 + 100 + 100
+    logger.info(f"✅ Router stats: {stats}")
+    return True
+
+
+def test_health_and_recovery():
+    """Repeated failures take a replica out of rotation; it is retried after the recovery delay"""
+    logger.info("\n[TEST 2] Health...")
+    replicas = [ModelReplica(i, "cpu", FakeModel()) for i in range(2)]
+    router = ReplicaRouter(replicas, max_failures=2, recovery_s=0.0)
+    router.recovery_s = 3600
+    for _ in range(2):
+        lease = router.acquire(None, 10, replica=replicas[0])
+        lease.release(error="CUDA error: device-side assert")
+        lease.release(error="counted once")
+    assert not replicas[0].healthy and replicas[0].failed_turns == 2
+    assert all(router.route(f"s{i}").replica_id == 1 for i in range(3))
+
+    replicas[1].healthy = False
+    replicas[1].unhealthy_since = replicas[0].unhealthy_since
+    try:
+        router.route("s9")
+        raise AssertionError("Routing should fail with no healthy replica")
+    except RuntimeError:
+        pass
+
+    router.recovery_s = 0.0
+    assert router.route("s10").healthy
+    lease = router.acquire("s10", 10)
+    lease.release()
+    assert lease.replica.consecutive_failures == 0
+    assert all(replica.outstanding_tokens == 0 and replica.active_turns == 0 for replica in replicas)
+    logger.info("✅ Failing replica left rotation and came back after the recovery delay")
+    return True
+
+
+def test_concurrent_turns_on_cpu_replicas():
+    """Four sessions over two tiny CPU replicas: turns spread, streamed audio stays on its replica"""
+    logger.info("\n[TEST 3] Concurrent turns on two CPU replicas...")
+    pool = ModelReplicaPool(["cpu", "cpu"], model_factory=None)
+    for _ in range(2):
+        pool.add_replica("cpu", tiny_voxtral.build_streaming_voxtral())
+    audio = (np.random.default_rng(0).standard_normal(16000) * 0.1).astype(np.float32)
+
+    async def session_turn(session_id: str):
+        model = pool.route(session_id).model
+        utterance = model.start_streaming_utterance(f"{session_id}-u")
+        model.push_streaming_audio(utterance, audio)
+        await utterance.encode_task
+        chunks = [chunk async for chunk in pool.stream_turn(session_id, audio, f"{session_id}-t", mode="transcribe",
+                                                            streaming_audio=utterance)]
+        return model, chunks
+
+    async def run():
+        return await asyncio.gather(*(session_turn(f"s{i}") for i in range(4)))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        for model in pool.models():
+            model.inference_executor.shutdown(wait=True)
+
+    for model, chunks in results:
+        replica_ids = {chunk["replica_id"] for chunk in chunks}
+        assert chunks and all(chunk["success"] for chunk in chunks), chunks[:1]
+        assert replica_ids == {pool.models().index(model)}, "Turn answered by the replica that encoded its audio"
+    status = pool.get_status()
+    served = [replica["turns_served"] for replica in status["replicas"]]
+    assert served == [2, 2], served
+    assert all(replica["outstanding_tokens"] == 0 and replica["active_turns"] == 0 and replica["healthy"]
+               for replica in status["replicas"])
+
+    pool.end_session("s0")
+    assert pool.router.replica_for("s0") is None
+    logger.info(f"✅ Turns per replica: {served}, router: {status['router']}")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "least_outstanding_tokens_and_affinity": test_least_outstanding_tokens_and_affinity(),
+        "health_and_recovery": test_health_and_recovery(),
+        "concurrent_turns_on_cpu_replicas": test_concurrent_turns_on_cpu_replicas(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Session KV Cache Test Suite
+Tests tier movement (device -> CPU -> mmap file), budget eviction, multi-turn carry-over, and
+back-to-back turns of one session taking the history from the cache or the text context (never
+both, never neither) with the cache kept when generation fails
+"""
+
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("SESSION_KV_CACHE_TEST")
+
+from transformers import VoxtralConfig, VoxtralForConditionalGeneration
+
+from src.models.session_kv_cache import SessionKVCache, TIER_DEVICE, TIER_CPU, TIER_DISK
+from src.models.voxtral_model_realtime import VoxtralModel
+
+AUDIO_TOKEN_ID = 24
+BEGIN_AUDIO_ID = 25
+BOS_ID, EOS_ID = 1, 2
+
+
+def make_layers(tokens: int, seed: int, layers: int = 2) -> list:
+    """Fake KV tensors: 2 layers x [1, 2 heads, tokens, 8] float32 = 256 bytes per token"""
+    generator = torch.Generator().manual_seed(seed)
+    return [(torch.randn(1, 2, tokens, 8, generator=generator), torch.randn(1, 2, tokens, 8, generator=generator))
+            for _ in range(layers)]
+
+
+def test_tiering_and_budgets():
+    """Caches move device -> CPU -> disk under budget and come back intact"""
+    logger.info("\n[TEST 1] Tier movement under byte budgets...")
+    per_session = 100 * 256  # 100 tokens
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = SessionKVCache(
+            device="cpu",
+            device_budget_bytes=per_session,
+            cpu_budget_bytes=per_session,
+            disk_budget_bytes=per_session,
+            disk_dir=disk_dir,
+        )
+        originals = {}
+        for index in range(4):
+            session_id = f"session_{index}"
+            originals[session_id] = make_layers(100, seed=index)
+            cache.checkin(session_id, torch.arange(100), [(k.clone(), v.clone()) for k, v in originals[session_id]])
+
+        stats = cache.get_stats()
+        assert stats["sessions_by_tier"] == {TIER_DEVICE: 1, TIER_CPU: 1, TIER_DISK: 1}, stats["sessions_by_tier"]
+        assert stats["evictions"] == 1 and not cache.has("session_0"), "Oldest session should be evicted"
+        assert len(os.listdir(disk_dir)) == 1, "Exactly one session should be spilled to disk"
+
+        # Least recently used survivor is on disk; promote it back
+        entry = cache.checkout("session_1")
+        assert entry is not None and entry.tier == TIER_DEVICE
+        for (k, v), (k0, v0) in zip(entry.layers, originals["session_1"]):
+            assert torch.equal(k, k0) and torch.equal(v, v0), "Disk round-trip corrupted the cache"
+        assert os.listdir(disk_dir) == [], "Spill file should be removed after promotion"
+
+        stats = cache.get_stats()
+        assert stats["promotions_from_disk"] == 1 and stats["spills_to_disk"] == 2
+    logger.info("✅ device -> cpu -> disk -> device round-trip is lossless")
+    return True
+
+
+def test_idle_offload_and_drop():
+    """Idle sessions leave the device; dropped sessions are forgotten"""
+    logger.info("\n[TEST 2] Idle offload and drop...")
+    cache = SessionKVCache(device="cpu", idle_offload_s=5.0)
+    cache.checkin("idle", torch.arange(10), make_layers(10, seed=1))
+    cache.checkin("active", torch.arange(10), make_layers(10, seed=2))
+    cache._entries["idle"].last_used -= 10
+
+    cache.offload_idle()
+    assert cache._entries["idle"].tier == TIER_CPU, "Idle session should be offloaded"
+    assert cache._entries["active"].tier == TIER_DEVICE, "Active session should stay on the device"
+
+    cache.drop("idle")
+    assert not cache.has("idle") and cache.checkout("idle") is None
+    assert cache.get_stats()["misses"] == 1
+
+    cache_short = SessionKVCache(device="cpu", max_tokens=5)
+    cache_short.checkin("long", torch.arange(10), make_layers(10, seed=3))
+    assert not cache_short.has("long"), "Conversations past max_tokens should not be carried over"
+    logger.info("✅ Idle offload, drop and max_tokens reset behave")
+    return True
+
+
+class SessionTokenizer:
+    bos_token_id = BOS_ID
+    eos_token_id = EOS_ID
+
+
+def build_tiny_voxtral() -> VoxtralForConditionalGeneration:
+    torch.manual_seed(0)
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16,
+                         max_position_embeddings=8192, initializer_range=0.3),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+
+
+def turn_inputs(seed: int) -> dict:
+    """One user turn: <s>[INST] instruction [BEGIN_AUDIO] 750 audio tokens [/INST]"""
+    generator = torch.Generator().manual_seed(seed)
+    input_ids = torch.tensor([[BOS_ID, 3, 10, 11, 12, 13, BEGIN_AUDIO_ID] + [AUDIO_TOKEN_ID] * 750 + [4]])
+    return {
+        "input_ids": input_ids,
+        "attention_mask": torch.ones_like(input_ids),
+        "input_features": torch.randn(1, 128, 3000, generator=generator),
+    }
+
+
+def test_multi_turn_matches_full_history_prefill():
+    """Carried-over turns generate exactly what a full re-prefill of the history would"""
+    logger.info("\n[TEST 3] Multi-turn carry-over vs full history prefill...")
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = build_tiny_voxtral()
+    voxtral.processor = type("Processor", (), {"tokenizer": SessionTokenizer()})()
+    new_tokens = 6
+
+    history_ids = None
+    history_features = []
+    with torch.no_grad():
+        for turn in range(3):
+            inputs = turn_inputs(seed=turn)
+            outputs = voxtral._generate_with_cache(None, "session", **inputs, max_new_tokens=new_tokens,
+                                                   min_new_tokens=new_tokens, do_sample=False)
+            got = outputs[0, -new_tokens:].tolist()
+
+            # Reference: prefill the whole conversation from scratch
+            turn_ids = inputs["input_ids"] if history_ids is None else inputs["input_ids"][:, 1:]
+            full_ids = turn_ids if history_ids is None else torch.cat([history_ids, turn_ids], dim=1)
+            history_features.append(inputs["input_features"])
+            reference = voxtral.model.generate(
+                input_ids=full_ids, attention_mask=torch.ones_like(full_ids),
+                input_features=torch.cat(history_features), max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens, do_sample=False,
+            )
+            expected = reference[0, -new_tokens:].tolist()
+            assert got == expected, f"Turn {turn} diverged: {got} vs {expected}"
+            history_ids = torch.cat([reference, torch.tensor([[EOS_ID]])], dim=1)
+
+    stats = voxtral.get_session_cache().get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1, f"Unexpected session stats: {stats}"
+    entry = voxtral.session_cache._entries["session"]
+    assert entry.token_ids.tolist() == history_ids[0].tolist(), "Stored history should match the conversation"
+    voxtral.end_session("session")
+    assert not voxtral.session_cache.has("session")
+    logger.info("✅ 3 carried-over turns identical to full-history prefill")
+    return True
+
+
+def with_context(inputs: dict, context_ids: list) -> dict:
+    """The same turn with the text history ("Previous conversation: ...") after the instruction"""
+    input_ids = torch.cat([inputs["input_ids"][:, :6], torch.tensor([context_ids]), inputs["input_ids"][:, 6:]], dim=1)
+    return dict(inputs, input_ids=input_ids, attention_mask=torch.ones_like(input_ids))
+
+
+def test_back_to_back_turns_decide_at_checkout():
+    """A turn submitted while the previous one holds the cache uses it once it is back; evicted: the text"""
+    logger.info("\n[TEST 4] Back-to-back turns of one session...")
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = build_tiny_voxtral()
+    voxtral.processor = type("Processor", (), {"tokenizer": SessionTokenizer()})()
+    generate = dict(max_new_tokens=6, min_new_tokens=6, do_sample=False)
+    context_ids = [40, 41, 42, 43]
+
+    with torch.no_grad():
+        first = voxtral._generate_with_cache(None, "session", **turn_inputs(seed=0), **generate)
+        history = torch.cat([first, torch.tensor([[EOS_ID]])], dim=1)
+
+        # Cancelled turn still holds the cache when the next one is submitted; it is back by the time
+        # the next one runs, which then carries the history only once (cache, no text context)
+        held = voxtral.session_cache.checkout("session")
+        second_inputs = turn_inputs(seed=1)
+        voxtral.session_cache.checkin("session", held.token_ids, held.layers)
+        second = voxtral._generate_with_cache(None, "session", None, second_inputs,
+                                              **with_context(second_inputs, context_ids), **generate)
+        full_ids = torch.cat([history, second_inputs["input_ids"][:, 1:]], dim=1)
+        reference = voxtral.model.generate(
+            input_ids=full_ids, attention_mask=torch.ones_like(full_ids), **generate,
+            input_features=torch.cat([turn_inputs(seed=0)["input_features"], second_inputs["input_features"]]))
+        assert second[0, -6:].tolist() == reference[0, -6:].tolist(), "History carried twice"
+        stored = voxtral.session_cache._entries["session"].token_ids.tolist()
+        assert len(stored) == full_ids.shape[1] + 6 + 1, "The text context went into the conversation"
+
+        # Generation fails: the session keeps the conversation it had
+        def failing_generate(**kwargs):
+            raise RuntimeError("CUDA out of memory")
+        voxtral._run_generate = failing_generate
+        try:
+            voxtral._generate_with_cache(None, "session", **turn_inputs(seed=2), **generate)
+            assert False, "The failure should propagate"
+        except RuntimeError:
+            pass
+        del voxtral._run_generate
+        assert voxtral.session_cache._entries["session"].token_ids.tolist() == stored, "Cache lost on failure"
+
+        # Evicted between submit and checkout: the text context carries the history
+        voxtral.session_cache.drop("session")
+        third_inputs = turn_inputs(seed=3)
+        context_turn = with_context(third_inputs, context_ids)
+        third = voxtral._generate_with_cache(None, "session", None, third_inputs, **context_turn, **generate)
+        reference = voxtral.model.generate(**context_turn, **generate)
+        assert third.tolist() == reference.tolist(), "History dropped"
+    logger.info("✅ History from the cache or the text context, exactly once; cache kept on failure")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "tiering": test_tiering_and_budgets(),
+        "idle_offload": test_idle_offload_and_drop(),
+        "multi_turn": test_multi_turn_matches_full_history_prefill(),
+        "back_to_back_turns": test_back_to_back_turns_decide_at_checkout(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
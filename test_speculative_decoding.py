@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Speculative Decoding Test Suite
+Tests that draft-and-verify decoding reproduces greedy generate() token for token (text-only
+and audio prompts, with and without a pre-filled KV cache, with the n-gram and repetition
+logits processors) and streams the same text
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("SPECULATIVE_DECODING_TEST")
+
+from transformers import LlamaConfig, LlamaForCausalLM, VoxtralConfig, VoxtralForConditionalGeneration
+
+from src.models.speculative_decoding import SpeculativeDecoder
+from src.models.voxtral_model_realtime import VoxtralModel
+
+VOCAB_SIZE = 64
+AUDIO_TOKEN_ID = 24
+BEGIN_AUDIO_ID = 25
+BOS_ID, EOS_ID = 1, 2
+
+
+def build_llama(seed: int, layers: int = 2) -> LlamaForCausalLM:
+    torch.manual_seed(seed)
+    return LlamaForCausalLM(LlamaConfig(
+        vocab_size=VOCAB_SIZE, hidden_size=64, intermediate_size=128, num_hidden_layers=layers,
+        num_attention_heads=4, num_key_value_heads=2, initializer_range=0.3,
+        bos_token_id=BOS_ID, eos_token_id=EOS_ID, pad_token_id=EOS_ID,
+    )).eval()
+
+
+def build_voxtral() -> VoxtralForConditionalGeneration:
+    torch.manual_seed(0)
+    return VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=VOCAB_SIZE, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16,
+                         max_position_embeddings=4096, initializer_range=0.3),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+
+
+def audio_prompt():
+    """Voxtral token layout for one 30 s window, plus matching random mel features"""
+    input_ids = torch.tensor([[BOS_ID, 3, BEGIN_AUDIO_ID] + [AUDIO_TOKEN_ID] * 750 + [4, 7, 9]])
+    input_features = torch.randn(1, 128, 3000, generator=torch.Generator().manual_seed(0))
+    return input_ids, input_features
+
+
+def test_matches_greedy_text():
+    """Text prompts: identical tokens to generate(), including EOS stops and min_new_tokens"""
+    logger.info("\n[TEST 1] Speculative vs greedy on text prompts...")
+    target, draft = build_llama(0), build_llama(1, layers=1)
+    decoder = SpeculativeDecoder(target, draft, num_draft_tokens=3)
+    generator = torch.Generator().manual_seed(0)
+
+    with torch.no_grad():
+        for length in (1, 5, 17):
+            for max_new, min_new in ((12, 0), (7, 7), (1, 0)):
+                input_ids = torch.randint(3, VOCAB_SIZE, (1, length), generator=generator)
+                kwargs = dict(input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                              max_new_tokens=max_new, min_new_tokens=min_new, do_sample=False)
+                expected = target.generate(**kwargs)
+                actual = decoder.generate(**kwargs)
+                assert actual.tolist() == expected.tolist(), f"{actual.tolist()} != {expected.tolist()}"
+
+    stats = decoder.get_stats()
+    assert stats["calls"] == 9 and 0.0 <= stats["acceptance_rate"] <= 1.0
+    logger.info(f"✅ Identical output; acceptance {stats['acceptance_rate']:.0%}")
+    return True
+
+
+def test_perfect_draft_saves_target_passes():
+    """A draft that agrees with the target is always accepted: k+1 tokens per target pass"""
+    logger.info("\n[TEST 2] Perfect draft...")
+    target = build_llama(0)
+    decoder = SpeculativeDecoder(target, build_llama(0), num_draft_tokens=4)
+    input_ids = torch.tensor([[BOS_ID, 5, 6, 7]])
+
+    with torch.no_grad():
+        expected = target.generate(input_ids=input_ids, max_new_tokens=21, min_new_tokens=21, do_sample=False)
+        actual = decoder.generate(input_ids=input_ids, max_new_tokens=21, min_new_tokens=21)
+    assert actual.tolist() == expected.tolist()
+
+    stats = decoder.get_stats()
+    assert stats["acceptance_rate"] == 1.0, stats
+    # Prefill gives 1 token, then 4 rounds of 4 accepted + 1 target token
+    assert stats["target_forwards"] == 5, stats
+    logger.info(f"✅ {stats['generated_tokens']} tokens in {stats['target_forwards']} target passes")
+    return True
+
+
+def test_audio_prompt_with_cache():
+    """Audio prompts, with and without a pre-filled prefix cache, match input_features generate()"""
+    logger.info("\n[TEST 3] Voxtral audio prompt...")
+    from transformers import DynamicCache
+
+    target = build_voxtral()
+    decoder = SpeculativeDecoder(target, build_llama(2), num_draft_tokens=4, skip_token_ids=[AUDIO_TOKEN_ID])
+    input_ids, input_features = audio_prompt()
+    kwargs = dict(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), input_features=input_features,
+                  max_new_tokens=10, min_new_tokens=10, do_sample=False)
+
+    with torch.no_grad():
+        expected = target.generate(**kwargs)
+        assert decoder.generate(**kwargs).tolist() == expected.tolist()
+
+        # Prefix cache covering the instruction tokens before the audio
+        prefix_cache = DynamicCache()
+        target(input_ids=input_ids[:, :2], past_key_values=prefix_cache, use_cache=True)
+        assert decoder.generate(**kwargs, past_key_values=prefix_cache).tolist() == expected.tolist()
+        # The cache is left holding everything but the last token, like generate() leaves it
+        assert prefix_cache.get_seq_length() == expected.shape[1] - 1
+    logger.info("✅ Audio prompt output identical with and without a prefix cache")
+    return True
+
+
+def test_logits_processors_match_greedy():
+    """Conversation turns' no_repeat_ngram_size / repetition_penalty match generate(); other options fall back"""
+    logger.info("\n[TEST 4] Logits processors...")
+    target, draft = build_llama(0), build_llama(1, layers=1)
+    decoder = SpeculativeDecoder(target, draft, num_draft_tokens=3)
+    input_ids = torch.tensor([[BOS_ID] + [5, 6, 7, 8] * 6])  # Repeating prompt: trigrams to ban
+
+    with torch.no_grad():
+        for options in (dict(no_repeat_ngram_size=3), dict(no_repeat_ngram_size=3, repetition_penalty=1.3),
+                        dict(repetition_penalty=1.0, no_repeat_ngram_size=2)):
+            kwargs = dict(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), max_new_tokens=24,
+                          min_new_tokens=24, do_sample=False, **options)
+            assert decoder.can_generate(kwargs), options
+            expected = target.generate(**kwargs)
+            actual = decoder.generate(**kwargs)
+            assert actual.tolist() == expected.tolist(), f"{options}: {actual.tolist()} != {expected.tolist()}"
+            plain = target.generate(input_ids=input_ids, max_new_tokens=24, min_new_tokens=24, do_sample=False)
+            assert plain.tolist() != expected.tolist(), "The prompt must exercise the processor"
+
+    base = dict(input_ids=input_ids, do_sample=False, no_repeat_ngram_size=3, repetition_penalty=1.0,
+                output_scores=False, return_dict_in_generate=False, temperature=1.0, top_p=0.95, top_k=50)
+    assert decoder.can_generate(base)
+    for unsupported in (dict(bad_words_ids=[[9]]), dict(output_scores=True), dict(return_dict_in_generate=True),
+                        dict(min_length=5), dict(num_beams=2), dict(do_sample=True), dict(suppress_tokens=[9])):
+        assert not decoder.can_generate(dict(base, **unsupported)), unsupported
+    logger.info("✅ Identical output with no_repeat_ngram_size / repetition_penalty; other options use generate()")
+    return True
+
+
+class StubTokenizer:
+    bos_token_id = BOS_ID
+    eos_token_id = EOS_ID
+
+    def decode(self, token_ids, skip_special_tokens=True, **kwargs):
+        if isinstance(token_ids, torch.Tensor):
+            token_ids = token_ids.tolist()
+        return "".join(f"w{token_id} " for token_id in token_ids if token_id > 4)
+
+
+def test_streaming_session_turns():
+    """Streamed session turns through VoxtralModel produce the greedy text and report metrics"""
+    logger.info("\n[TEST 5] Streaming session turns...")
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = build_voxtral()
+    voxtral.processor = type("StubProcessor", (), {"tokenizer": StubTokenizer()})()
+    voxtral.session_cache_enabled = True
+    voxtral.speculative_num_draft_tokens = 3
+    assert voxtral.set_draft_model(build_llama(3)) is not None
+    reference_model = build_voxtral()
+    input_ids, input_features = audio_prompt()
+    history = torch.empty(0, dtype=torch.long)
+
+    async def stream_turn():
+        kwargs = dict(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), input_features=input_features,
+                      max_new_tokens=8, min_new_tokens=8, do_sample=False, pad_token_id=EOS_ID)
+        stream = voxtral.inference_executor.stream_generate(
+            lambda **generation_kwargs: voxtral._generate_with_cache(None, "s1", **generation_kwargs),
+            kwargs, voxtral.processor.tokenizer, timeout=30.0, skip_special_tokens=True
+        )
+        text = "".join([piece async for piece in stream])
+        return text, await stream.future
+
+    for turn in range(2):
+        text, outputs = asyncio.run(stream_turn())
+        # Reference: greedy generate() over the whole conversation (one audio window per turn)
+        turn_ids = input_ids if turn == 0 else input_ids[:, 1:]
+        full_ids = torch.cat([history.unsqueeze(0), turn_ids], dim=1)
+        with torch.no_grad():
+            expected = reference_model.generate(input_ids=full_ids, attention_mask=torch.ones_like(full_ids),
+                                                input_features=input_features.repeat(turn + 1, 1, 1),
+                                                max_new_tokens=8, min_new_tokens=8,
+                                                do_sample=False)
+        assert outputs.tolist() == expected.tolist(), f"Turn {turn} diverged"
+        assert text == StubTokenizer().decode(expected[0, full_ids.shape[1]:]), text
+        history = torch.cat([expected[0], torch.tensor([EOS_ID])])
+
+    stats = voxtral.get_model_info()["speculative_stats"]
+    assert stats["calls"] == 2 and stats["tokens_per_second"] > 0, stats
+    voxtral.inference_executor.shutdown()
+    logger.info(f"✅ Two streamed turns identical to greedy; {stats['tokens_per_target_forward']:.2f} tokens/pass")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "matches_greedy_text": test_matches_greedy_text(),
+        "perfect_draft": test_perfect_draft_saves_target_passes(),
+        "audio_prompt_with_cache": test_audio_prompt_with_cache(),
+        "logits_processors": test_logits_processors_match_greedy(),
+        "streaming_session_turns": test_streaming_session_turns(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Streaming Audio Encoder Test Suite
+Tests window bookkeeping for streamed frames, the stable interim prefix, and that pre-encoded
+windows generate exactly what the processor's input_features path generates
+"""
+
+import asyncio
+import logging
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("STREAMING_AUDIO_ENCODER_TEST")
+
+from transformers import VoxtralConfig, VoxtralForConditionalGeneration, WhisperFeatureExtractor
+
+from src.models.inference_executor import InferenceExecutor
+from src.models.streaming_audio_encoder import StreamingAudioEncoder, StreamingUtterance
+from src.models.voxtral_model_realtime import VoxtralModel
+from src.utils.audio_io import decode_audio_base64
+
+AUDIO_TOKEN_ID = 24
+BEGIN_AUDIO_ID = 25
+BOS_ID, EOS_ID = 1, 2
+AUDIO_TOKENS_PER_WINDOW = 750  # Tiny encoder: 3000 mel frames -> 1500 positions -> 750 projected tokens
+
+
+def test_window_bookkeeping():
+    """Full windows are encoded once; a pause before the endpoint leaves nothing to encode"""
+    logger.info("\n[TEST 1] Window bookkeeping for streamed frames...")
+    encoded = []
+
+    def featurize(window):
+        return window.copy()
+
+    def encode(features):
+        encoded.append(len(features))
+        return torch.full((2, 4), float(len(features)))
+
+    async def run():
+        executor = InferenceExecutor()
+        encoder = StreamingAudioEncoder(featurize, encode, executor, window_samples=1000, sample_rate=1000,
+                                        encode_interval_s=0.25, pause_encode_s=0.0, max_utterance_s=3.0)
+        utterance = encoder.start("u1")
+        for _ in range(26):
+            encoder.push(utterance, np.ones(100, dtype=np.float32))
+            if utterance.encode_task is not None:
+                await utterance.encode_task
+
+        assert utterance.num_windows == 3 and utterance.stale_windows() == []
+        assert encoded.count(1000) == 2, f"Each full window should be encoded exactly once: {encoded}"
+
+        # Pause before the endpoint: the speculative encode already covers everything
+        embeds = await encoder.finalize(utterance)
+        assert embeds.shape == (6, 4)
+        stats = encoder.get_stats()
+        assert stats["endpoint_encodes"] == 0 and stats["endpoints_fully_encoded"] == 1
+
+        # Audio after the last encode: only the open window is encoded at the endpoint
+        encoder.push(utterance, np.ones(100, dtype=np.float32))
+        assert utterance.encode_task is None, "Below the encode interval nothing runs in the background"
+        await encoder.finalize(utterance)
+        assert encoder.get_stats()["endpoint_encodes"] == 1
+        assert utterance.window_embeds[2][0] == 700 and utterance.stale_windows() == []
+
+        # Frames past max_utterance_s are dropped
+        encoder.push(utterance, np.ones(5000, dtype=np.float32))
+        assert utterance.num_samples == 3000 and encoder.get_stats()["dropped_samples"] == 4700
+        executor.shutdown()
+
+    asyncio.run(run())
+    logger.info("✅ Complete windows reused, endpoint encodes only the open window")
+    return True
+
+
+def test_pause_encodes_leftover_audio():
+    """Audio below the encode interval is encoded once frames pause, not at the endpoint"""
+    logger.info("\n[TEST 2] Encode on pause...")
+
+    async def run():
+        executor = InferenceExecutor()
+        encoder = StreamingAudioEncoder(lambda window: window.copy(), lambda features: torch.zeros(2, 4), executor,
+                                        window_samples=1000, sample_rate=1000, encode_interval_s=0.5,
+                                        pause_encode_s=0.05)
+        utterance = encoder.start("pause")
+        encoder.push(utterance, np.ones(100, dtype=np.float32))
+        await utterance.encode_task
+        assert utterance.stale_windows() == [] and encoder.get_stats()["pause_encodes"] == 1
+
+        # Endpoint right after a frame: the pause watcher is cancelled, the endpoint encodes
+        encoder.push(utterance, np.ones(100, dtype=np.float32))
+        assert utterance.waiting_for_pause is False
+        await asyncio.sleep(0)
+        assert utterance.waiting_for_pause is True
+        await encoder.finalize(utterance)
+        stats = encoder.get_stats()
+        assert stats["pause_encodes"] == 1 and stats["endpoint_encodes"] == 1
+        executor.shutdown()
+
+    asyncio.run(run())
+    logger.info("✅ Leftover audio encoded during the pause")
+    return True
+
+
+def test_stable_prefix():
+    """Words are committed once two consecutive hypotheses agree and never retract"""
+    logger.info("\n[TEST 3] Interim stable prefix...")
+    utterance = StreamingUtterance("u2", window_samples=16000)
+
+    assert utterance.update_hypothesis("hello") == ("", "hello")
+    assert utterance.update_hypothesis("hello there") == ("hello", "there")
+    assert utterance.update_hypothesis("hello there how") == ("hello there", "how")
+    # A hypothesis that disagrees with the committed words does not retract them
+    assert utterance.update_hypothesis("yellow there how are") == ("hello there", "how are")
+    assert utterance.update_hypothesis("hello there how are you") == ("hello there", "how are you")
+    assert utterance.update_hypothesis("hello there how are you") == ("hello there how are you", "")
+    logger.info("✅ Stable prefix grows monotonically by local agreement")
+    return True
+
+
+class WindowTokenizer:
+    bos_token_id = BOS_ID
+    eos_token_id = EOS_ID
+
+    def decode(self, token_ids, skip_special_tokens=True, **kwargs):
+        if isinstance(token_ids, torch.Tensor):
+            token_ids = token_ids.tolist()
+        return "".join(f"w{token_id} " for token_id in token_ids if token_id > 4)
+
+
+class WindowProcessor:
+    """Stand-in processor: Voxtral token layout with AUDIO_TOKENS_PER_WINDOW tokens per 30 s window"""
+
+    def __init__(self):
+        self.feature_extractor = WhisperFeatureExtractor(feature_size=128)
+        self.tokenizer = WindowTokenizer()
+        self.calls = 0
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        self.calls += 1
+        content = conversation[0]["content"]
+        texts = [block["text"] for block in content if block["type"] == "text"]
+        audio_block = next(block for block in content if block["type"] == "audio")
+        audio, _ = decode_audio_base64(audio_block["base64"])
+        windows = max(1, math.ceil(len(audio) / self.feature_extractor.n_samples))
+        text_ids = [5 + len(text) % 7 for text in texts]
+        input_ids = torch.tensor([[BOS_ID, 3, *text_ids, BEGIN_AUDIO_ID]
+                                  + [AUDIO_TOKEN_ID] * AUDIO_TOKENS_PER_WINDOW * windows + [4]])
+        return WindowInputs(input_ids=input_ids, attention_mask=torch.ones_like(input_ids))
+
+
+class WindowInputs(dict):
+    """Mimics BatchFeature.to()"""
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+def build_streaming_voxtral() -> VoxtralModel:
+    torch.manual_seed(0)
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16,
+                         max_position_embeddings=4096, initializer_range=0.3),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+    voxtral.processor = WindowProcessor()
+    voxtral.session_cache_enabled = False
+    return voxtral
+
+
+def test_streamed_embeds_match_features_path():
+    """Generation from windows encoded during speech equals generation from input_features"""
+    logger.info("\n[TEST 4] Streamed encoding vs processor features...")
+    voxtral = build_streaming_voxtral()
+    voxtral.streaming_interim_transcripts = True
+    voxtral.streaming_interim_interval_s = 0.0
+    audio = (np.random.default_rng(0).standard_normal(16000 * 2) * 0.1).astype(np.float32)
+    interims = []
+
+    async def on_interim(interim):
+        interims.append(interim)
+
+    async def run():
+        utterance = voxtral.start_streaming_utterance("u3", on_interim=on_interim)
+        for start in range(0, len(audio), 4096):
+            voxtral.push_streaming_audio(utterance, audio[start:start + 4096])
+            if utterance.encode_task is not None:
+                await utterance.encode_task
+        return utterance, await voxtral.get_streaming_encoder().finalize(utterance)
+
+    utterance, audio_embeds = asyncio.run(run())
+    assert audio_embeds.shape[0] == AUDIO_TOKENS_PER_WINDOW
+    assert interims and interims[-1]["utterance_id"] == "u3", "Interim transcripts should be emitted"
+
+    with torch.no_grad():
+        inputs = voxtral._streaming_inputs(audio_embeds, utterance.num_windows, "Transcribe.")
+        streamed = voxtral.model.generate(**inputs, max_new_tokens=8, min_new_tokens=8, do_sample=False)
+
+        features = voxtral._featurize_audio_window(audio)
+        reference = voxtral.model.generate(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                                           input_features=features, max_new_tokens=8, min_new_tokens=8, do_sample=False)
+    assert streamed[0, -8:].tolist() == reference[0, -8:].tolist(), \
+        f"Streamed path diverged: {streamed[0, -8:].tolist()} vs {reference[0, -8:].tolist()}"
+    logger.info(f"✅ Identical tokens; {len(interims)} interim transcript(s) emitted")
+    return True
+
+
+def test_streaming_turn_end_to_end():
+    """A streamed utterance runs through process_realtime_chunk_streaming without re-encoding"""
+    logger.info("\n[TEST 5] Streamed utterance through the streaming pipeline...")
+    voxtral = build_streaming_voxtral()
+    voxtral.is_initialized = True
+    voxtral.silence_threshold = 0.0
+    voxtral.tts_manager = type("NoTTS", (), {"is_initialized": False})()
+    audio = (np.random.default_rng(1).standard_normal(16000) * 0.1).astype(np.float32)
+
+    async def run():
+        utterance = voxtral.start_streaming_utterance("u4")
+        voxtral.push_streaming_audio(utterance, audio)
+        await utterance.encode_task
+        chunks = []
+        async for chunk in voxtral.process_realtime_chunk_streaming(
+            utterance.audio(), "u4", mode="transcribe", streaming_audio=utterance
+        ):
+            chunks.append(chunk)
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert chunks and all(chunk["success"] for chunk in chunks), chunks
+    stats = voxtral.get_model_info()["streaming_encoder_stats"]
+    assert stats["endpoint_encodes"] == 0 and stats["endpoints_fully_encoded"] == 1, stats
+    voxtral.inference_executor.shutdown()
+    logger.info(f"✅ {len(chunks)} chunks streamed, no encoder pass at the endpoint")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "window_bookkeeping": test_window_bookkeeping(),
+        "pause_encode": test_pause_encodes_leftover_audio(),
+        "stable_prefix": test_stable_prefix(),
+        "streamed_embeds": test_streamed_embeds_match_features_path(),
+        "end_to_end": test_streaming_turn_end_to_end(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Streaming TTS Test Suite
+Tests sentence-level TTS pipelined with decoding: segment boundaries, audio sent in segment
+order while words are still being generated, time-to-first-audio of the first sentence versus
+the whole-reply path, failed segments being skipped, cancellation mid-reply, and /ws/tts
+progressive frames whose first audio does not depend on the text length
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("STREAMING_TTS_TEST")
+
+from src.models.cancellation import CancellationToken
+from src.models.streaming_tts import SegmentChunker, StreamingTTSPipeline, stream_tts_frames, unpack_stream_frame
+from src.utils.compatibility import FallbackTTSManager
+
+REPLY = "Sure thing, I can help with that. The weather today is sunny and warm. Enjoy your afternoon walk!"
+WORD_MS = 20.0
+
+
+async def speak(pipeline: StreamingTTSPipeline, words, word_ms: float = WORD_MS, cancel_at: int = -1,
+                cancel_token: CancellationToken = None):
+    """Feed words at a fixed decode rate, like the turn's word loop does"""
+    for index, word in enumerate(words):
+        if index == cancel_at:
+            cancel_token.cancel("barge_in")
+            pipeline.cancel()
+            return
+        await asyncio.sleep(word_ms / 1000)
+        pipeline.push_word(word)
+
+
+async def run_reply(chunker: SegmentChunker, tts=None):
+    tts = tts or FallbackTTSManager(base_ms=40.0, ms_per_char=0.0)
+    sent = []
+    start = time.perf_counter()
+
+    async def send_audio(audio_bytes):
+        sent.append((audio_bytes, (time.perf_counter() - start) * 1000))
+
+    pipeline = StreamingTTSPipeline(tts, send_audio, chunker=chunker)
+    await speak(pipeline, REPLY.split())
+    generated_ms = (time.perf_counter() - start) * 1000
+    stats = await pipeline.finish()
+    return sent, stats, generated_ms
+
+
+def test_segment_boundaries():
+    """Sentences always end a segment; phrases only after min_words; max_words caps a segment"""
+    logger.info("\n[TEST 1] Segment boundaries...")
+    chunker = SegmentChunker(min_words=4, max_words=6, first_min_words=2)
+    words = 'Sure, I can help. He said "yes." then, after a very long pause without any break, left'.split()
+    segments = [segment for segment in (chunker.push(word) for word in words) if segment]
+    segments.append(chunker.flush())
+    assert segments == ["Sure, I can help.", 'He said "yes."', "then, after a very long pause",
+                        "without any break, left"], segments
+    assert chunker.flush() is None and chunker.push("  ") is None
+
+    disabled = SegmentChunker(enabled=False)
+    assert all(disabled.push(word) is None for word in REPLY.split())
+    assert disabled.flush() == REPLY
+    logger.info("✅ Segments cut at sentence, phrase and length boundaries")
+    return True
+
+
+def test_audio_pipelined_with_decoding():
+    """Each sentence is synthesized while later words are generated; audio arrives in order"""
+    logger.info("\n[TEST 2] Pipelined synthesis...")
+    sent, stats, generated_ms = asyncio.run(run_reply(SegmentChunker(min_words=4)))
+    whole, whole_stats, whole_generated_ms = asyncio.run(run_reply(SegmentChunker(enabled=False)))
+
+    segments = [audio for audio, _ in sent]
+    assert stats["segments"] == stats["sent_segments"] == 4 and stats["failed_segments"] == 0
+    assert len(set(segments)) == 4 and [ms for _, ms in sent] == sorted(ms for _, ms in sent)
+    # First audio: the first phrase (2 words) plus one synthesis, long before the reply ends
+    assert sent[0][1] < generated_ms / 2, (sent[0][1], generated_ms)
+    assert stats["first_audio_ms"] < whole_stats["first_audio_ms"] - 100.0, (stats, whole_stats)
+    assert len(whole) == 1 and whole[0][1] >= whole_generated_ms
+    logger.info(f"✅ First audio at {stats['first_audio_ms']:.0f}ms vs {whole_stats['first_audio_ms']:.0f}ms "
+                f"for the whole reply ({generated_ms:.0f}ms of generation)")
+    return True
+
+
+def test_failed_segment_skipped():
+    """A segment the TTS cannot synthesize is skipped; the rest still go out in order"""
+    logger.info("\n[TEST 3] Failed segments...")
+
+    class FlakyTTS(FallbackTTSManager):
+        async def synthesize(self, text, language="en", emotion="neutral", cancel_token=None):
+            if text.startswith("The weather"):
+                raise RuntimeError("synthesis failed")
+            return await super().synthesize(text, language, emotion, cancel_token=cancel_token)
+
+    sent, stats, _ = asyncio.run(run_reply(SegmentChunker(min_words=4), FlakyTTS(base_ms=5.0, ms_per_char=0.0)))
+    assert stats["failed_segments"] == 1 and stats["sent_segments"] == len(sent) == stats["segments"] - 1
+    logger.info("✅ Failed segment skipped")
+    return True
+
+
+def test_cancelled_reply_stops_audio():
+    """Barge-in mid-reply: no audio for the rest of the reply, the synthesis task ends"""
+    logger.info("\n[TEST 4] Cancellation...")
+
+    async def run():
+        tts = FallbackTTSManager(base_ms=40.0, ms_per_char=0.0)
+        cancel_token = CancellationToken("turn-1")
+        sent = []
+
+        async def send_audio(audio_bytes):
+            sent.append(audio_bytes)
+
+        pipeline = StreamingTTSPipeline(tts, send_audio, cancel_token=cancel_token, chunker=SegmentChunker())
+        await speak(pipeline, REPLY.split(), cancel_at=8, cancel_token=cancel_token)
+        sent_at_cancel = len(sent)
+        pipeline.push_word("ignored.")
+        await asyncio.sleep(0.1)
+        return sent, sent_at_cancel, pipeline, tts
+
+    sent, sent_at_cancel, pipeline, tts = asyncio.run(run())
+    assert len(sent) == sent_at_cancel <= 1, "Nothing is sent after the cancel"
+    assert pipeline._task.done() and pipeline.stats["segments"] == 2
+    logger.info(f"✅ {len(sent)} segment(s) before barge-in, none after")
+    return True
+
+
+def test_progressive_frames():
+    """Numbered frames end with a final marker; first audio is the same for short and long texts"""
+    logger.info("\n[TEST 5] Progressive frames...")
+    sentence = "the quick brown fox jumps over the lazy dog near the river bank today."
+
+    async def encode_frames(audio_bytes):
+        return [audio_bytes[start:start + 2000] for start in range(0, len(audio_bytes), 2000)]
+
+    async def stream(text, cancel_after=None):
+        tts = FallbackTTSManager(base_ms=20.0, ms_per_char=3.0)
+        cancel_token = CancellationToken("tts-1")
+        frames = []
+
+        async def send_frame(frame):
+            frames.append(unpack_stream_frame(frame))
+            if len(frames) == cancel_after:
+                cancel_token.cancel("disconnect")
+
+        stats = await stream_tts_frames(tts, text, send_frame, encode_frames, cancel_token=cancel_token,
+                                        chunker=SegmentChunker(first_max_words=4))
+        return frames, stats
+
+    short_frames, short_stats = asyncio.run(stream(sentence))
+    long_frames, long_stats = asyncio.run(stream(" ".join([sentence] * 8)))
+    for frames, stats in ((short_frames, short_stats), (long_frames, long_stats)):
+        assert [sequence for sequence, _, _ in frames] == list(range(len(frames)))
+        assert frames[-1][1] and frames[-1][2] == b"" and not any(final for _, final, _ in frames[:-1])
+        assert stats["frames"] == len(frames) - 1 and not stats["cancelled"]
+    assert long_stats["frames"] > 4 * short_stats["frames"]
+    assert abs(long_stats["first_frame_ms"] - short_stats["first_frame_ms"]) < 40.0, (short_stats, long_stats)
+
+    cancelled_frames, cancelled_stats = asyncio.run(stream(" ".join([sentence] * 8), cancel_after=1))
+    assert len(cancelled_frames) == 1 and not cancelled_frames[0][1] and cancelled_stats["cancelled"]
+    logger.info(f"✅ First frame at {short_stats['first_frame_ms']:.0f}ms ({short_stats['frames']} frames) and "
+                f"{long_stats['first_frame_ms']:.0f}ms ({long_stats['frames']} frames)")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "segment_boundaries": test_segment_boundaries(),
+        "audio_pipelined_with_decoding": test_audio_pipelined_with_decoding(),
+        "failed_segment_skipped": test_failed_segment_skipped(),
+        "cancelled_reply_stops_audio": test_cancelled_reply_stops_audio(),
+        "progressive_frames": test_progressive_frames(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
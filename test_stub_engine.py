@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Stub Engine Test Suite
+Tests the deterministic stand-in engine: same seed and chunk id -> same words and latencies,
+prefill scaling with audio length and decode with reply length, turns queueing on the inference
+thread, cancellation, streamed turns through the replica pool, and the stub TTS synthesize
+"""
+
+import asyncio
+import io
+import logging
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("STUB_ENGINE_TEST")
+
+from src.utils.compatibility import FallbackTTSManager, FallbackVoxtralModel
+from src.models.cancellation import CancellationToken
+from src.models.replica_pool import ModelReplicaPool
+from src.models.voxtral_model_realtime import create_model_engine
+from src.utils.config import config
+
+SPEECH = (np.random.default_rng(0).standard_normal(16000) * 0.1).astype(np.float32)
+
+
+def build_engine(**kwargs) -> FallbackVoxtralModel:
+    params = dict(prefill_base_ms=10.0, prefill_ms_per_audio_s=20.0, decode_ms_per_token=5.0, jitter_ms=2.0,
+                  output_words=6, seed=7)
+    params.update(kwargs)
+    engine = FallbackVoxtralModel(**params)
+    asyncio.run(engine.initialize())
+    return engine
+
+
+async def collect(engine, audio, chunk_id, **kwargs):
+    start = time.perf_counter()
+    chunks = [chunk async for chunk in engine.process_realtime_chunk_streaming(audio, chunk_id, **kwargs)]
+    return chunks, (time.perf_counter() - start) * 1000
+
+
+def test_deterministic_turns():
+    """Same (seed, chunk id) -> same text and delays; another seed or chunk id -> different ones"""
+    logger.info("\n[TEST 1] Deterministic turns...")
+    engine = build_engine()
+    other_seed = build_engine(seed=8)
+    try:
+        plan = engine.plan_turn(len(SPEECH), "turn-1")
+        assert plan == engine.plan_turn(len(SPEECH), "turn-1")
+        assert plan != engine.plan_turn(len(SPEECH), "turn-2") and plan != other_seed.plan_turn(len(SPEECH), "turn-1")
+        assert 28.0 <= plan["prefill_ms"] <= 32.0 and all(3.0 <= ms <= 7.0 for ms in plan["token_ms"])
+
+        chunks, _ = asyncio.run(collect(engine, SPEECH, "turn-1"))
+        assert [chunk["text"] for chunk in chunks] == plan["words"]
+        assert [chunk["chunk_index"] for chunk in chunks] == list(range(6)) and all(chunk["success"] for chunk in chunks)
+        result = asyncio.run(engine.process_realtime_chunk(SPEECH, "turn-1"))
+        assert result["success"] and result["text"] == " ".join(plan["words"])
+
+        silence = asyncio.run(collect(engine, np.zeros(16000, dtype=np.float32), "turn-3"))[0]
+        assert silence == [{'success': False, 'text': '', 'is_final': True, 'chunk_index': 0, 'error': 'No speech detected'}]
+        transcript = engine.plan_turn(16000 * 4, "turn-4", mode="transcribe")["words"]
+        assert len(transcript) == 10, "Transcripts scale with the audio"
+    finally:
+        engine.inference_executor.shutdown()
+        other_seed.inference_executor.shutdown()
+    logger.info(f"✅ Replayed '{' '.join(plan['words'])}' with identical latencies")
+    return True
+
+
+def test_latency_model_and_queueing():
+    """Prefill scales with audio, decode with words; one inference thread queues concurrent turns"""
+    logger.info("\n[TEST 2] Latency model...")
+    engine = build_engine(jitter_ms=0.0, prefill_base_ms=20.0, prefill_ms_per_audio_s=40.0, decode_ms_per_token=10.0)
+    try:
+        chunks, short_ms = asyncio.run(collect(engine, SPEECH, "a"))
+        long_chunks, long_ms = asyncio.run(collect(engine, np.tile(SPEECH, 3), "b"))
+        expected_short = 20.0 + 40.0 + 6 * 10.0
+        assert expected_short <= short_ms < expected_short + 60, short_ms
+        assert 70.0 <= long_ms - short_ms < 130.0, "Two more audio seconds -> 80ms more prefill"
+        assert chunks[0]["first_token_latency_ms"] >= 70
+
+        async def concurrent():
+            start = time.perf_counter()
+            await asyncio.gather(*(collect(engine, SPEECH, f"c{i}") for i in range(3)))
+            return (time.perf_counter() - start) * 1000
+        assert asyncio.run(concurrent()) >= 3 * expected_short, "Turns share one inference thread"
+
+        token = CancellationToken("d")
+
+        async def cancelled_turn():
+            chunks = []
+            async for chunk in engine.process_realtime_chunk_streaming(SPEECH, "d", cancel_token=token):
+                chunks.append(chunk)
+                token.cancel("barge_in")
+            return chunks
+        assert len(asyncio.run(cancelled_turn())) == 1
+        stats = engine.get_model_info()
+        assert stats["status"] == "initialized" and stats["stub_stats"]["cancelled_turns"] == 1
+    finally:
+        engine.inference_executor.shutdown()
+    logger.info(f"✅ 1s turn {short_ms:.1f}ms (model {expected_short:.0f}ms), 3s turn {long_ms:.1f}ms")
+    return True
+
+
+def test_pool_and_tts():
+    """Stub replicas behind the router stream turns; stub TTS returns deterministic WAV after its delay"""
+    logger.info("\n[TEST 3] Replica pool and TTS...")
+    previous_engine = config.model.engine
+    config.model.engine = "stub"
+    try:
+        engine = create_model_engine(device="cpu")
+    finally:
+        config.model.engine = previous_engine
+    assert isinstance(engine, FallbackVoxtralModel)
+
+    pool = ModelReplicaPool(["cpu", "cpu"], model_factory=lambda device: FallbackVoxtralModel(device, output_words=3,
+                                                                                                decode_ms_per_token=5.0))
+    asyncio.run(pool.initialize())
+
+    async def session_turn(session_id):
+        model = pool.route(session_id).model
+        utterance = model.start_streaming_utterance(f"{session_id}-u")
+        model.push_streaming_audio(utterance, SPEECH)
+        return [chunk async for chunk in pool.stream_turn(session_id, SPEECH, f"{session_id}-t", streaming_audio=utterance)]
+
+    async def run():
+        return await asyncio.gather(*(session_turn(f"s{i}") for i in range(4)))
+    try:
+        results = asyncio.run(run())
+    finally:
+        for model in pool.models():
+            model.inference_executor.shutdown()
+    assert all(len(chunks) == 3 for chunks in results)
+    assert [replica["turns_served"] for replica in pool.get_status()["replicas"]] == [2, 2]
+
+    tts = FallbackTTSManager(base_ms=10.0, ms_per_char=1.0, audio_ms_per_char=50.0)
+    start = time.perf_counter()
+    audio = asyncio.run(tts.synthesize("Hello there."))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert audio == asyncio.run(tts.synthesize("Hello there."))
+    assert elapsed_ms >= 22.0
+    with wave.open(io.BytesIO(audio)) as wav_file:
+        assert wav_file.getnframes() == int(22050 * 0.6) and wav_file.getsampwidth() == 2
+    cancelled = CancellationToken("tts")
+    cancelled.cancel()
+    assert asyncio.run(tts.synthesize("Hello there.", cancel_token=cancelled)) is None
+    logger.info(f"✅ Pool served {[replica['turns_served'] for replica in pool.get_status()['replicas']]} turns, "
+                f"TTS {len(audio)} bytes in {elapsed_ms:.1f}ms")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "deterministic_turns": test_deterministic_turns(),
+        "latency_model_and_queueing": test_latency_model_and_queueing(),
+        "pool_and_tts": test_pool_and_tts(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+TTS Backend Registry Test Suite
+Tests lazy per-language TTS backends: loading only on first use with the load time recorded,
+least-recently-used eviction under a memory budget that spares pinned and in-use backends, one
+load for concurrent first uses, and a failed load reported instead of raised
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TTS_BACKENDS_TEST")
+
+from src.models.tts_backends import TTSBackendRegistry
+
+MB = 1024 ** 2
+
+
+def fake_loader(name, size_mb, calls, delay_s=0.0):
+    """Loader of a pretend model of `size_mb`, counting its calls"""
+    def load():
+        calls.append(name)
+        time.sleep(delay_s)
+        return {"name": name, "bytes": size_mb * MB}, f"{name}-processor"
+    return load
+
+
+def make_registry(calls, budget_mb=0, delay_s=0.0):
+    loaders = {name: fake_loader(name, size_mb, calls, delay_s)
+               for name, size_mb in (("dia-tts", 300), ("indic-tts", 400), ("extra-tts", 200))}
+    registry = TTSBackendRegistry(loaders, memory_budget_bytes=budget_mb * MB, pinned=("chatterbox",),
+                                  memory_of=lambda model: model["bytes"])
+    registry.register_loaded("chatterbox", {"name": "chatterbox", "bytes": 500 * MB}, "chatterbox-processor")
+    return registry
+
+
+def test_lazy_load_on_first_use():
+    """Nothing but Chatterbox is loaded until a language of another backend is requested"""
+    logger.info("\n[TEST 1] Lazy loading...")
+    calls = []
+    registry = make_registry(calls, delay_s=0.05)
+    assert calls == [] and registry.get_stats()["resident"] == ["chatterbox"]
+
+    async def run():
+        first = await registry.acquire("dia-tts")
+        registry.release("dia-tts")
+        second = await registry.acquire("dia-tts")
+        registry.release("dia-tts")
+        return first, second
+
+    first, second = asyncio.run(run())
+    stats = registry.get_stats()["backends"]["dia-tts"]
+    assert first is second and first.processor == "dia-tts-processor"
+    assert calls == ["dia-tts"], calls
+    assert stats["loads"] == 1 and stats["uses"] == 2 and stats["resident"]
+    assert stats["last_load_ms"] >= 50.0 and stats["memory_mb"] == 300.0
+    assert asyncio.run(registry.acquire("unknown-tts")) is None
+    logger.info(f"✅ Dia-TTS loaded on first use in {stats['last_load_ms']:.0f}ms, reused after")
+    return True
+
+
+def test_lru_eviction_under_budget():
+    """Over budget, the least recently used idle backend goes; pinned and in-use ones stay"""
+    logger.info("\n[TEST 2] LRU eviction...")
+    calls = []
+    registry = make_registry(calls, budget_mb=1300)
+
+    async def run():
+        for name in ("dia-tts", "indic-tts"):
+            await registry.acquire(name)
+            registry.release(name)
+        await registry.acquire("dia-tts")  # dia-tts is now the most recently used, and in use
+        await registry.acquire("extra-tts")  # 1400MB: indic-tts is the LRU idle backend
+        registry.release("extra-tts")
+        resident_after_extra = registry.get_stats()["resident"]
+        await registry.acquire("indic-tts")  # Back in: extra-tts is idle, dia-tts still in use
+        registry.release("indic-tts")
+        return resident_after_extra
+
+    resident_after_extra = asyncio.run(run())
+    stats = registry.get_stats()
+    assert resident_after_extra == ["chatterbox", "dia-tts", "extra-tts"], resident_after_extra
+    assert stats["resident"] == ["chatterbox", "dia-tts", "indic-tts"], stats["resident"]
+    assert stats["resident_mb"] <= 1300.0
+    assert stats["backends"]["indic-tts"]["loads"] == 2 and stats["backends"]["indic-tts"]["evictions"] == 1
+    assert stats["backends"]["chatterbox"]["evictions"] == 0 and stats["backends"]["dia-tts"]["evictions"] == 0
+    assert not registry.evict("chatterbox") and not registry.evict("dia-tts")
+    registry.release("dia-tts")
+    assert registry.evict("dia-tts")
+    logger.info(f"✅ Resident {stats['resident']} within {stats['memory_budget_mb']:.0f}MB")
+    return True
+
+
+def test_concurrent_first_use_loads_once():
+    """Sessions asking for a cold backend together share one load"""
+    logger.info("\n[TEST 3] Concurrent first use...")
+    calls = []
+    registry = make_registry(calls, delay_s=0.1)
+    backends = []
+
+    def session():
+        backends.append(registry.acquire_blocking("indic-tts"))
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = registry.get_stats()["backends"]["indic-tts"]
+    assert calls == ["indic-tts"] and len({id(backend) for backend in backends}) == 1
+    assert stats["loads"] == 1 and stats["uses"] == 4 and stats["in_use"] == 4
+    logger.info("✅ 4 concurrent first uses, 1 load")
+    return True
+
+
+def test_failed_load():
+    """A backend that cannot load returns None (the caller falls back) and is not retried at once"""
+    logger.info("\n[TEST 4] Failed load...")
+    attempts = []
+
+    def broken():
+        attempts.append(time.time())
+        raise RuntimeError("checkpoint not found")
+
+    registry = TTSBackendRegistry({"dia-tts": broken}, memory_of=lambda model: 0, load_retry_s=0.1)
+    assert asyncio.run(registry.acquire("dia-tts")) is None
+    assert asyncio.run(registry.acquire("dia-tts")) is None and len(attempts) == 1, "Retried too soon"
+    time.sleep(0.15)
+    assert asyncio.run(registry.acquire("dia-tts")) is None and len(attempts) == 2
+    stats = registry.get_stats()["backends"]["dia-tts"]
+    assert stats["load_failures"] == 2 and stats["loads"] == 0 and not stats["resident"]
+    logger.info("✅ Failed loads reported and retried after the cooldown, nothing resident")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "lazy_load_on_first_use": test_lazy_load_on_first_use(),
+        "lru_eviction_under_budget": test_lru_eviction_under_budget(),
+        "concurrent_first_use_loads_once": test_concurrent_first_use_loads_once(),
+        "failed_load": test_failed_load(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+TTS Micro-Batching Test Suite
+Tests the cross-session TTS scheduler: segments from concurrent sessions joining one batch
+with each caller getting its own audio, the bounded wait of a lone request, batches split by
+language, cancelled segments dropped before synthesis, and synthesized audio seconds per
+wall-second as the number of concurrent sessions grows
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TTS_BATCHER_TEST")
+
+from src.models.cancellation import CancellationToken
+from src.models.tts_batcher import TTSBatchScheduler, wav_duration_s
+from src.utils.compatibility import FallbackTTSManager
+
+SEGMENTS = ["Sure, I can help with that.", "The weather is sunny today.", "Let me check the schedule.",
+            "Your order ships tomorrow."]
+
+
+def test_sessions_share_a_batch():
+    """Segments pending together are synthesized in one batch; every caller gets its own audio"""
+    logger.info("\n[TEST 1] Shared batch...")
+    reference = FallbackTTSManager(base_ms=0.0, ms_per_char=0.0)
+    tts = FallbackTTSManager(base_ms=60.0, ms_per_char=0.0, batch_max_size=8, batch_max_wait_ms=20.0)
+
+    async def run():
+        expected = [await reference.synthesize(text) for text in SEGMENTS]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(tts.synthesize(text) for text in SEGMENTS))
+        return expected, results, (time.perf_counter() - start) * 1000
+
+    expected, results, elapsed_ms = asyncio.run(run())
+    stats = tts.get_batch_stats()
+    assert results == expected, "Each caller gets the audio of its own segment"
+    assert stats["batches"] == 1 and stats["max_batch_size_seen"] == 4 and tts.stats["batches"] == 1
+    assert elapsed_ms < 2 * 60.0 + 20.0, f"4 segments took {elapsed_ms:.0f}ms"
+    logger.info(f"✅ 4 sessions served by one batch in {elapsed_ms:.0f}ms")
+    return True
+
+
+def test_lone_request_waits_at_most_max_wait():
+    """A single session pays at most max_wait_ms on top of its synthesis"""
+    logger.info("\n[TEST 2] Lone request...")
+    tts = FallbackTTSManager(base_ms=50.0, ms_per_char=0.0, batch_max_size=8, batch_max_wait_ms=15.0)
+
+    async def run():
+        start = time.perf_counter()
+        audio = await tts.synthesize(SEGMENTS[0])
+        return audio, (time.perf_counter() - start) * 1000
+
+    audio, elapsed_ms = asyncio.run(run())
+    assert audio and 50.0 <= elapsed_ms < 50.0 + 15.0 + 30.0, elapsed_ms
+    assert tts.get_batch_stats()["throughput_by_batch_size"][1]["batches"] == 1
+    logger.info(f"✅ Lone segment answered in {elapsed_ms:.0f}ms")
+    return True
+
+
+def test_languages_and_cancellation():
+    """Languages are batched separately and a cancelled segment is never synthesized"""
+    logger.info("\n[TEST 3] Languages and cancellation...")
+    batches = []
+
+    async def run_batch(items, cancel_token, voice):
+        batches.append([(text, language) for text, language, _ in items])
+        await asyncio.sleep(0.02)
+        return [f"{language}:{text}".encode() for text, language, _ in items]
+
+    scheduler = TTSBatchScheduler(run_batch, max_batch_size=8, max_wait_ms=20.0,
+                                  audio_seconds=lambda audio: 0.0)
+
+    async def run():
+        cancelled = CancellationToken("turn-2")
+        calls = [scheduler.synthesize("hello", "en"), scheduler.synthesize("bonjour", "fr"),
+                 scheduler.synthesize("gone", "en", cancel_token=cancelled), scheduler.synthesize("again", "en")]
+        tasks = [asyncio.create_task(call) for call in calls]
+        await asyncio.sleep(0)
+        cancelled.cancel("barge_in")
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run())
+    assert results == [b"en:hello", b"fr:bonjour", None, b"en:again"]
+    assert batches == [[("hello", "en"), ("again", "en")], [("bonjour", "fr")]], batches
+    assert scheduler.get_stats()["dropped_cancelled"] == 1
+    logger.info("✅ One batch per language, cancelled segment dropped")
+    return True
+
+
+def test_throughput_against_concurrency():
+    """Synthesized seconds per wall-second grow with concurrent sessions when batching"""
+    logger.info("\n[TEST 4] Throughput...")
+
+    async def sessions(tts, concurrency):
+        async def session(index):
+            for segment in SEGMENTS[:3]:
+                await tts.synthesize(f"{segment} ({index})")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(index) for index in range(concurrency)))
+        return tts.stats["audio_ms"] / 1000 / (time.perf_counter() - start)
+
+    throughput = {}
+    for concurrency in (1, 4, 8):
+        batched = FallbackTTSManager(base_ms=40.0, ms_per_char=1.0, batch_max_size=8, batch_max_wait_ms=10.0)
+        serial = FallbackTTSManager(base_ms=40.0, ms_per_char=1.0)
+        throughput[concurrency] = (asyncio.run(sessions(batched, concurrency)), asyncio.run(sessions(serial, concurrency)))
+        logger.info(f"   {concurrency} sessions: {throughput[concurrency][0]:.1f} audio-s/s batched, "
+                    f"{throughput[concurrency][1]:.1f} serial")
+    assert throughput[8][0] > 4 * throughput[8][1], throughput
+    assert throughput[8][0] > 4 * throughput[1][0], throughput
+    assert wav_duration_s(b"not a wav") == 0.0
+    logger.info(f"✅ 8 sessions: {throughput[8][0] / throughput[8][1]:.1f}x the serial throughput")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "sessions_share_a_batch": test_sessions_share_a_batch(),
+        "lone_request_waits_at_most_max_wait": test_lone_request_waits_at_most_max_wait(),
+        "languages_and_cancellation": test_languages_and_cancellation(),
+        "throughput_against_concurrency": test_throughput_against_concurrency(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
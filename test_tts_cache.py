@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+TTS Audio Cache Test Suite
+Tests the two-tier synthesized-audio cache: key normalization and separation, the byte-bounded
+memory LRU, the content-addressed disk tier surviving a restart, disk eviction and corrupt
+files, and the stub TTS manager answering repeated phrases without synthesizing again
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TTS_CACHE_TEST")
+
+from src.models.tts_cache import TTSAudioCache, cache_key
+from src.utils.compatibility import FallbackTTSManager
+
+
+def test_cache_key():
+    """Whitespace/Unicode variants share a key; language, emotion, voice and model do not"""
+    logger.info("\n[TEST 1] Cache keys...")
+    key = cache_key("Sure!", "en", "neutral", "default", "v1")
+    assert key == cache_key("  Sure!\n", "en", "neutral", "default", "v1")
+    assert key == cache_key("Ｓｕｒｅ！", "en", "neutral", "default", "v1"), "NFKC folds full-width forms"
+    variants = [("Sure!", "fr", "neutral", "default", "v1"), ("Sure!", "en", "happy", "default", "v1"),
+                ("Sure!", "en", "neutral", "narrator", "v1"), ("Sure!", "en", "neutral", "default", "v2"),
+                ("sure!", "en", "neutral", "default", "v1")]
+    assert len({key, *(cache_key(*variant) for variant in variants)}) == len(variants) + 1
+    logger.info("✅ Keys normalized and separated")
+    return True
+
+
+def test_memory_lru():
+    """Least recently used entries leave first once the byte budget is exceeded"""
+    logger.info("\n[TEST 2] Memory LRU...")
+    cache = TTSAudioCache(memory_budget_bytes=250, max_chars=20)
+    for text in ("one", "two", "three"):
+        cache.put(text, text[0].encode() * 80)
+    assert cache.get("one") is not None  # "one" becomes most recent
+    cache.put("four", b"f" * 80)
+    assert cache.get("two") is None and cache.get("one") == b"o" * 80 and cache.get("four") is not None
+    cache.put("a much longer phrase than allowed", b"x")
+    assert cache.get("a much longer phrase than allowed") is None
+    stats = cache.get_stats()
+    assert stats["memory_bytes"] <= 250 and stats["memory_evictions"] >= 1 and stats["skipped_too_long"] == 1
+    assert stats["memory_hits"] == 3 and stats["misses"] == 1 and stats["disk_entries"] == 0
+    logger.info(f"✅ LRU kept {stats['memory_entries']} entries in {stats['memory_bytes']} bytes")
+    return True
+
+
+def test_disk_tier_survives_restart():
+    """A new process finds earlier syntheses on disk; the disk budget and bad files are handled"""
+    logger.info("\n[TEST 3] Disk tier...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = TTSAudioCache(memory_budget_bytes=1024, disk_budget_bytes=300, disk_dir=tmp_dir)
+        cache.put("Hello there.", b"h" * 100, emotion="happy", model_version="v1")
+        cache.put("Sorry, I didn't understand that.", b"s" * 100, model_version="v1")
+
+        restarted = TTSAudioCache(memory_budget_bytes=1024, disk_budget_bytes=300, disk_dir=tmp_dir)
+        assert restarted.get_stats()["disk_entries"] == 2
+        assert restarted.get("Hello there.", emotion="happy", model_version="v1") == b"h" * 100
+        assert restarted.get("Hello there.", emotion="happy", model_version="v1") == b"h" * 100
+        assert restarted.get("Hello there.", model_version="v1") is None
+        stats = restarted.get_stats()
+        assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 1
+
+        # Over the disk budget: the least recently used file goes
+        restarted.put("Good morning!", b"g" * 150, model_version="v1")
+        assert restarted.get_stats()["disk_bytes"] <= 300 and restarted.get_stats()["disk_evictions"] == 1
+        assert TTSAudioCache(disk_budget_bytes=300, disk_dir=tmp_dir).get(
+            "Sorry, I didn't understand that.", model_version="v1") is None
+
+        # An unreadable (here: emptied) file is a miss, not bad audio
+        key = cache_key("Good morning!", "en", "neutral", "default", "v1")
+        open(os.path.join(tmp_dir, key[:2], f"{key}.audio"), "wb").close()
+        fresh = TTSAudioCache(disk_budget_bytes=300, disk_dir=tmp_dir)
+        assert fresh.get("Good morning!", model_version="v1") is None
+        assert fresh.get_stats()["disk_errors"] == 1
+
+        fresh.clear()
+        assert not any(name.endswith(".audio") for _, _, files in os.walk(tmp_dir) for name in files)
+    logger.info("✅ Disk entries reloaded, evicted and validated")
+    return True
+
+
+def test_repeated_phrases_skip_synthesis():
+    """The stub TTS pays for a phrase once; later requests are cache hits"""
+    logger.info("\n[TEST 4] Repeated phrases...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts = FallbackTTSManager(base_ms=30.0, ms_per_char=0.0,
+                                 audio_cache=TTSAudioCache(disk_budget_bytes=1024 ** 2, disk_dir=tmp_dir))
+
+        async def run():
+            first = await tts.synthesize("Sure!")
+            repeats = [await tts.synthesize(" Sure! ") for _ in range(5)]
+            other_emotion = await tts.synthesize("Sure!", emotion="happy")
+            return first, repeats, other_emotion
+
+        first, repeats, other_emotion = asyncio.run(run())
+        assert all(audio == first for audio in repeats) and other_emotion == first
+        assert tts.stats["syntheses"] == 2, "Only the two distinct keys were synthesized"
+        stats = tts.get_cache_stats()
+        assert stats["enabled"] and stats["memory_hits"] == 5 and stats["stores"] == 2
+    logger.info(f"✅ {stats['memory_hits']} of 7 requests served from the cache")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "cache_key": test_cache_key(),
+        "memory_lru": test_memory_lru(),
+        "disk_tier_survives_restart": test_disk_tier_survives_restart(),
+        "repeated_phrases_skip_synthesis": test_repeated_phrases_skip_synthesis(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
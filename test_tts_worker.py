@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+TTS Worker Process Test Suite
+Tests synthesis in worker processes: audio returned through shared memory (and the queue
+fallback for oversized audio) for single segments and batches, an event loop that keeps running while a blocking synthesis is
+in progress, workers synthesizing in parallel, cancellation reaching the worker mid-synthesis,
+a crashed worker being replaced, and in-process synthesis (workers disabled) off the event loop
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TTS_WORKER_TEST")
+
+import torch
+
+from src.models.cancellation import CancellationToken
+from src.models.tts_manager import TTSManager
+from src.models.tts_worker import TTSWorkerPool
+
+
+class BlockingTTS:
+    """Synthesizes like Chatterbox does in-process: blocking inside an async method"""
+
+    def __init__(self, synthesis_ms: float = 200.0):
+        self.synthesis_ms = synthesis_ms
+        self.is_initialized = True
+        self.model_version = f"blocking:{synthesis_ms}"
+
+    async def synthesize(self, text, language="en", emotion="neutral", cancel_token=None):
+        if text == "crash":
+            os._exit(1)
+        deadline = time.time() + (2.0 if text == "endless" else self.synthesis_ms / 1000)
+        while time.time() < deadline:
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return None
+            time.sleep(0.005)
+        return f"{language}:{emotion}:{text}".encode("utf-8") * 64
+
+
+def start_pool(**kwargs) -> TTSWorkerPool:
+    params = dict(num_workers=1, buffer_bytes=64 * 1024, start_timeout_s=60.0)
+    params.update(kwargs)
+    synthesis_ms = params.pop("synthesis_ms", 200.0)
+    pool = TTSWorkerPool(functools.partial(BlockingTTS, synthesis_ms), **params)
+    assert pool.start() and pool.model_version == f"blocking:{synthesis_ms}"
+    return pool
+
+
+def test_audio_round_trip():
+    """Audio comes back byte-identical, through shared memory or, when too large, the queue"""
+    logger.info("\n[TEST 1] Round trip...")
+    pool = start_pool(synthesis_ms=5.0)
+    small = start_pool(synthesis_ms=5.0, buffer_bytes=16)
+    try:
+        expected = b"fr:happy:Bonjour !" * 64
+        assert asyncio.run(pool.synthesize("Bonjour !", "fr", "happy")) == expected
+        assert asyncio.run(small.synthesize("Bonjour !", "fr", "happy")) == expected
+        assert pool.get_stats()["inline_transfers"] == 0 and small.get_stats()["inline_transfers"] == 1
+        assert pool.get_stats()["completed"] == 1
+        # A batch travels as one request; its audio is packed back to back (or pickled)
+        items = [("Hi", "en", "neutral"), ("Salut", "fr", "happy")]
+        expected_batch = [b"en:neutral:Hi" * 64, b"fr:happy:Salut" * 64]
+        assert asyncio.run(pool.synthesize_batch(items)) == expected_batch
+        assert asyncio.run(small.synthesize_batch(items)) == expected_batch
+        assert pool.get_stats()["segments"] == 3
+    finally:
+        pool.close()
+        small.close()
+    logger.info("✅ Shared-memory and queue transfers return the same audio")
+    return True
+
+
+def test_event_loop_keeps_running():
+    """A blocking synthesis in a worker leaves the event loop free, and workers run in parallel"""
+    logger.info("\n[TEST 2] Event loop and parallelism...")
+    pool = start_pool(num_workers=2, synthesis_ms=200.0)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(pool.synthesize(f"sentence {i}") for i in range(4)))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ticking.cancel()
+        return results, elapsed_ms, ticks
+
+    try:
+        results, elapsed_ms, ticks = asyncio.run(run())
+    finally:
+        pool.close()
+    assert all(results) and len(set(results)) == 4
+    assert ticks >= elapsed_ms / 10 * 0.5, f"Event loop stalled: {ticks} ticks in {elapsed_ms:.0f}ms"
+    assert 380.0 <= elapsed_ms < 750.0, f"4 x 200ms on 2 workers took {elapsed_ms:.0f}ms"
+    logger.info(f"✅ 4 syntheses on 2 workers in {elapsed_ms:.0f}ms, {ticks} loop ticks meanwhile")
+    return True
+
+
+def test_cancellation_reaches_worker():
+    """Cancelling the turn stops the synthesis inside the worker within a poll interval"""
+    logger.info("\n[TEST 3] Cancellation...")
+    pool = start_pool()
+
+    async def run():
+        cancel_token = CancellationToken("turn-1")
+        synthesis = asyncio.create_task(pool.synthesize("endless", cancel_token=cancel_token))
+        await asyncio.sleep(0.1)
+        cancelled_at = time.perf_counter()
+        cancel_token.cancel("barge_in")
+        audio = await synthesis
+        stop_ms = (time.perf_counter() - cancelled_at) * 1000
+        # The worker is free again right away
+        follow_up = await pool.synthesize("next")
+        return audio, stop_ms, follow_up
+
+    try:
+        audio, stop_ms, follow_up = asyncio.run(run())
+        stats = pool.get_stats()
+    finally:
+        pool.close()
+    assert audio is None and follow_up and stop_ms < 300.0, stop_ms
+    assert stats["cancelled"] == 1 and stats["completed"] == 1
+    logger.info(f"✅ Worker stopped {stop_ms:.0f}ms after the cancel")
+    return True
+
+
+def test_crashed_worker_replaced():
+    """A worker that dies returns None for its request and is replaced"""
+    logger.info("\n[TEST 4] Worker crash...")
+    pool = start_pool(synthesis_ms=5.0)
+
+    async def run():
+        return await pool.synthesize("crash"), await pool.synthesize("after the crash")
+
+    try:
+        crashed, recovered = asyncio.run(run())
+        stats = pool.get_stats()
+    finally:
+        pool.close()
+    assert crashed is None and recovered == b"en:neutral:after the crash" * 64
+    assert stats["worker_restarts"] == 1 and stats["ready_workers"] == 1
+    logger.info("✅ Crashed worker replaced")
+    return True
+
+
+class TextInputs(dict):
+    def to(self, device):
+        return self
+
+
+class SlowGenerateModel:
+    """A TTS model whose generate() blocks for the whole synthesis, like Chatterbox's decode loop"""
+
+    def __init__(self, synthesis_ms: float):
+        self.synthesis_ms = synthesis_ms
+
+    def generate(self, **inputs):
+        time.sleep(self.synthesis_ms / 1000)
+        return torch.zeros(2205)
+
+
+def test_in_process_synthesis_off_event_loop():
+    """With worker_processes=0 the model runs in-process, but generate() still runs off the event loop"""
+    logger.info("\n[TEST 5] In-process synthesis...")
+    manager = TTSManager(device="cpu", worker_processes=0, use_audio_cache=False, batch_max_size=1)
+    manager.model = SlowGenerateModel(synthesis_ms=200.0)
+    manager.processor = lambda text, return_tensors="pt", **kwargs: TextInputs(input_ids=torch.tensor([[1, 2, 3]]))
+    manager.is_initialized = True
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(manager.synthesize(f"sentence {i}") for i in range(2)))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ticking.cancel()
+        return results, elapsed_ms, ticks
+
+    results, elapsed_ms, ticks = asyncio.run(run())
+    assert manager.worker_pool is None and all(audio and audio.startswith(b"RIFF") for audio in results)
+    assert ticks >= elapsed_ms / 10 * 0.5, f"Event loop stalled: {ticks} ticks in {elapsed_ms:.0f}ms"
+    logger.info(f"✅ 2 in-process syntheses in {elapsed_ms:.0f}ms, {ticks} loop ticks meanwhile")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "audio_round_trip": test_audio_round_trip(),
+        "event_loop_keeps_running": test_event_loop_keeps_running(),
+        "cancellation_reaches_worker": test_cancellation_reaches_worker(),
+        "crashed_worker_replaced": test_crashed_worker_replaced(),
+        "in_process_synthesis_off_event_loop": test_in_process_synthesis_off_event_loop(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
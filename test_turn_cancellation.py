@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Turn Cancellation Test Suite
+Tests that a cancelled turn stops generate(), speculative decoding, the batching scheduler, the
+streaming pipeline and TTS synthesis at the next step, without disturbing other turns
+"""
+
+import asyncio
+import base64
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TURN_CANCELLATION_TEST")
+
+from transformers import (LlamaConfig, LlamaForCausalLM, VoxtralConfig, VoxtralForConditionalGeneration,
+                          WhisperFeatureExtractor)
+
+from src.models.cancellation import CancellationToken, cancellation_stopping_criteria
+from src.models.inference_scheduler import ContinuousBatchingScheduler
+from src.models.speculative_decoding import SpeculativeDecoder
+from src.models.tts_manager import TTSManager
+from src.models.voxtral_model_realtime import VoxtralModel
+
+AUDIO_TOKEN_ID = 24
+BOS_ID, EOS_ID = 1, 2
+
+
+def build_tiny_llama(seed: int = 0) -> LlamaForCausalLM:
+    torch.manual_seed(seed)
+    return LlamaForCausalLM(LlamaConfig(
+        vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, pad_token_id=0, bos_token_id=None, eos_token_id=None,
+    )).eval()
+
+
+class CancelAfter:
+    """Streamer that cancels the turn once `count` new tokens were produced"""
+
+    def __init__(self, token: CancellationToken, count: int):
+        self.token = token
+        self.count = count
+        self.seen = -1  # The first put() is the prompt
+
+    def put(self, value):
+        self.seen += 1 if self.seen < 0 else value.numel()
+        if self.seen >= self.count:
+            self.token.cancel("barge_in")
+
+    def end(self):
+        pass
+
+
+def test_generate_stops_next_step():
+    """generate() and speculative decoding stop right after the step that saw the cancel"""
+    logger.info("\n[TEST 1] Stopping criteria...")
+    model = build_tiny_llama()
+    prompt = torch.tensor([[5, 6, 7, 8]])
+
+    token = CancellationToken("t1")
+    stopped = []
+    with torch.no_grad():
+        output = model.generate(prompt, max_new_tokens=50, do_sample=False, streamer=CancelAfter(token, 3),
+                                stopping_criteria=cancellation_stopping_criteria(token, stopped.append))
+    # The cancel lands while token 3 is streamed; at most one more decode step follows
+    assert output.shape[1] - prompt.shape[1] <= 4, output.shape
+    assert stopped == [token] and token.reason == "barge_in"
+    assert token.cancel("disconnect") is False and token.reason == "barge_in", "Only the first cancel counts"
+
+    # Speculative decoding checks the criteria after every verification round
+    token = CancellationToken("t2")
+    decoder = SpeculativeDecoder(model, build_tiny_llama(), num_draft_tokens=4)
+    with torch.no_grad():
+        output = decoder.generate(input_ids=prompt, max_new_tokens=50, streamer=CancelAfter(token, 3),
+                                  stopping_criteria=cancellation_stopping_criteria(token))
+    assert output.shape[1] - prompt.shape[1] <= 3 + 5, output.shape
+    logger.info("✅ Generation ends within one step of the cancel")
+    return True
+
+
+def test_scheduler_drops_cancelled_rows():
+    """A cancelled sequence leaves the batch; the other keeps decoding to its budget"""
+    logger.info("\n[TEST 2] Scheduler cancellation...")
+    scheduler = ContinuousBatchingScheduler(build_tiny_llama(), eos_token_id=None, max_batch_size=4)
+
+    async def run():
+        token = CancellationToken("s1")
+        cancelled = scheduler.submit({"input_ids": torch.tensor([[3, 4, 5]])}, max_new_tokens=40, cancel_token=token)
+        other = scheduler.submit({"input_ids": torch.tensor([[6, 7]])}, max_new_tokens=40)
+        queued_token = CancellationToken("s3")
+        queued_token.cancel("client_cancel")
+        queued = scheduler.submit({"input_ids": torch.tensor([[8]])}, max_new_tokens=40, cancel_token=queued_token)
+
+        cancelled_tokens = []
+        async for token_id in cancelled:
+            cancelled_tokens.append(token_id)
+            if len(cancelled_tokens) == 2:
+                token.cancel("barge_in")
+        other_tokens = [token_id async for token_id in other]
+        queued_tokens = [token_id async for token_id in queued]
+        return cancelled, cancelled_tokens, other_tokens, queued_tokens
+
+    cancelled, cancelled_tokens, other_tokens, queued_tokens = asyncio.run(run())
+    scheduler.shutdown()
+    assert cancelled.finish_reason == "cancelled" and len(cancelled_tokens) < 40
+    assert len(other_tokens) == 40 and queued_tokens == []
+    assert scheduler.get_stats()["cancelled"] == 2
+    logger.info(f"✅ Cancelled row stopped after {len(cancelled_tokens)} tokens, other row unaffected")
+    return True
+
+
+class StubTokenizer:
+    bos_token_id = BOS_ID
+    eos_token_id = EOS_ID
+
+    def decode(self, token_ids, skip_special_tokens=True, **kwargs):
+        if isinstance(token_ids, torch.Tensor):
+            token_ids = token_ids.tolist()
+        return "".join(f"w{token_id} " for token_id in token_ids if token_id > 4)
+
+
+class StubProcessor:
+    """Voxtral token layout for one 30 s audio window"""
+
+    def __init__(self):
+        self.feature_extractor = WhisperFeatureExtractor(feature_size=128)
+        self.tokenizer = StubTokenizer()
+
+    def apply_chat_template(self, conversation, return_tensors=None):
+        assert base64.b64decode(conversation[0]["content"][-1]["base64"])
+        input_ids = torch.tensor([[BOS_ID, 3, 25] + [AUDIO_TOKEN_ID] * 750 + [4]])
+        return StubInputs(input_ids=input_ids, attention_mask=torch.ones_like(input_ids))
+
+
+class StubInputs(dict):
+    """Mimics BatchFeature.to()"""
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+def build_streaming_voxtral() -> VoxtralModel:
+    torch.manual_seed(0)
+    voxtral = VoxtralModel()
+    voxtral.device = "cpu"
+    voxtral.model = VoxtralForConditionalGeneration(VoxtralConfig(
+        audio_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                          num_attention_heads=2, num_mel_bins=128, max_source_positions=1500),
+        text_config=dict(vocab_size=64, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=16,
+                         max_position_embeddings=4096, initializer_range=0.3),
+        audio_token_id=AUDIO_TOKEN_ID,
+    )).eval()
+    voxtral.model.generation_config.eos_token_id = None  # Always decode the full budget unless cancelled
+    voxtral.processor = StubProcessor()
+    voxtral.session_cache_enabled = False
+    voxtral.is_initialized = True
+    voxtral.silence_threshold = 0.0
+    voxtral.tts_manager = type("NoTTS", (), {"is_initialized": False})()
+    return voxtral
+
+
+async def stream_turn(voxtral: VoxtralModel, turn_id: str, token: CancellationToken, on_chunk):
+    """Stream one turn; stop consuming when on_chunk(chunks) returns True"""
+    audio = (np.random.default_rng(0).standard_normal(16000) * 0.1).astype(np.float32)
+    utterance = voxtral.start_streaming_utterance(turn_id)
+    voxtral.push_streaming_audio(utterance, audio)
+    await utterance.encode_task
+    chunks = []
+    stream = voxtral.process_realtime_chunk_streaming(audio, turn_id, mode="transcribe",
+                                                      streaming_audio=utterance, cancel_token=token)
+    async for chunk in stream:
+        chunks.append(chunk)
+        if on_chunk(chunks):
+            break
+    await stream.aclose()
+    return chunks
+
+
+def test_streaming_turn_cancel_and_abandon():
+    """Cancelling a streamed turn stops decoding; so does dropping its generator (disconnect)"""
+    logger.info("\n[TEST 3] Streaming pipeline cancellation...")
+    voxtral = build_streaming_voxtral()
+
+    async def run():
+        # Barge-in: the token is cancelled, the pipeline stops emitting and the decode stops
+        token = CancellationToken("c1")
+
+        def barge_in(chunks):
+            if len(chunks) == 2:
+                token.cancel("barge_in")
+            return False  # Keep consuming: nothing more should arrive
+
+        chunks = await stream_turn(voxtral, "c1", token, barge_in)
+        # Disconnect: the consumer just goes away
+        abandoned = CancellationToken("c2")
+        await stream_turn(voxtral, "c2", abandoned, lambda chunks: len(chunks) == 1)
+        return chunks, abandoned
+
+    chunks, abandoned = asyncio.run(run())
+    voxtral.inference_executor.shutdown(wait=True)
+
+    assert len(chunks) == 2 and all(chunk["success"] for chunk in chunks), chunks
+    assert abandoned.reason == "abandoned"
+    stats = voxtral.get_model_info()["cancellation_stats"]
+    assert stats["cancelled_turns"] == 2 and stats["stopped_generations"] == 2, stats
+    logger.info(f"✅ Both turns stopped; avg stop latency {stats['avg_stop_latency_ms']:.1f}ms")
+    return True
+
+
+def test_tts_skips_cancelled_turn():
+    """A cancelled turn gets no synthesis"""
+    logger.info("\n[TEST 4] TTS cancellation...")
+    calls = []
+
+    class RecordingModel:
+        def generate(self, **kwargs):
+            calls.append(kwargs)
+            return torch.zeros(1, 160)
+
+    tts_manager = TTSManager.__new__(TTSManager)
+    tts_manager.model_name = "chatterbox"
+    tts_manager.device = "cpu"
+    tts_manager.model = RecordingModel()
+    tts_manager.processor = lambda **kwargs: StubInputs(input_ids=torch.zeros(1, 4))
+    tts_manager.is_initialized = True
+
+    token = CancellationToken("t4")
+    token.cancel("barge_in")
+    assert asyncio.run(tts_manager.synthesize("Hello there", "en", cancel_token=token)) is None
+    assert calls == [], "Synthesis should not start for a cancelled turn"
+    logger.info("✅ Cancelled turn skipped by TTS")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "generate_stops": test_generate_stops_next_step(),
+        "scheduler_cancel": test_scheduler_drops_cancelled_rows(),
+        "streaming_turn_cancel": test_streaming_turn_cancel_and_abandon(),
+        "tts_cancel": test_tts_skips_cancelled_turn(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
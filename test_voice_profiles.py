@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Voice Profile Conditioning Test Suite
+Tests cached speaker conditioning: one encoder pass per (voice, model version) with later
+syntheses served from memory, reuse from disk by a fresh cache (restart, other worker
+process), a new pass when the model or the reference recording changes, one pass for
+concurrent first uses, and profiles read from the config section
+"""
+
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("VOICE_PROFILES_TEST")
+
+from src.models.voice_profiles import VoiceConditioningCache, VoiceProfile, load_voice_profiles
+
+
+def make_profile(directory: str, voice_id: str = "support_en", content: bytes = b"RIFF reference") -> VoiceProfile:
+    reference = Path(directory) / f"{voice_id}.wav"
+    reference.write_bytes(content)
+    return VoiceProfile(voice_id=voice_id, reference_audio=str(reference))
+
+
+def counting_encoder(calls, delay_s=0.0):
+    """Stands in for the speaker encoder: a fixed embedding per voice, counting its passes"""
+    def compute(profile):
+        calls.append(profile.voice_id)
+        time.sleep(delay_s)
+        generator = torch.Generator().manual_seed(len(profile.voice_id))
+        return {"speaker_embedding": torch.randn(1, 256, generator=generator)}
+    return compute
+
+
+def test_computed_once_then_memory():
+    """The first synthesis pays the encoder pass; every later one reuses the tensors"""
+    logger.info("\n[TEST 1] Memory reuse...")
+    calls = []
+    with tempfile.TemporaryDirectory() as directory:
+        profile = make_profile(directory)
+        cache = VoiceConditioningCache(disk_dir=None)
+        first = cache.get(profile, "chatterbox:v1", counting_encoder(calls))
+        for _ in range(10):
+            again = cache.get(profile, "chatterbox:v1", counting_encoder(calls))
+        stats = cache.get_stats()
+    assert calls == ["support_en"] and again is first
+    assert stats["computed"] == 1 and stats["memory_hits"] == 10
+    logger.info(f"✅ 1 encoder pass for 11 syntheses")
+    return True
+
+
+def test_reused_from_disk():
+    """A fresh cache on the same directory loads the stored tensors instead of recomputing"""
+    logger.info("\n[TEST 2] Disk reuse...")
+    calls = []
+    with tempfile.TemporaryDirectory() as directory:
+        profile = make_profile(directory)
+        disk_dir = str(Path(directory) / "conditioning")
+        stored = VoiceConditioningCache(disk_dir=disk_dir).get(profile, "chatterbox:v1", counting_encoder(calls))
+        restarted = VoiceConditioningCache(disk_dir=disk_dir)
+        loaded = restarted.get(profile, "chatterbox:v1", counting_encoder(calls))
+        stats = restarted.get_stats()
+    assert calls == ["support_en"], calls
+    assert torch.equal(loaded["speaker_embedding"], stored["speaker_embedding"])
+    assert stats["disk_hits"] == 1 and stats["computed"] == 0
+    logger.info("✅ Conditioning survived a restart without an encoder pass")
+    return True
+
+
+def test_keyed_by_model_and_reference():
+    """Another model version or a re-recorded reference gets its own encoder pass"""
+    logger.info("\n[TEST 3] Cache keys...")
+    calls = []
+    with tempfile.TemporaryDirectory() as directory:
+        profile = make_profile(directory)
+        cache = VoiceConditioningCache(disk_dir=str(Path(directory) / "conditioning"))
+        cache.get(profile, "chatterbox:v1", counting_encoder(calls))
+        cache.get(profile, "chatterbox:v2", counting_encoder(calls))
+        time.sleep(0.01)
+        make_profile(directory, content=b"RIFF new recording")
+        cache.get(profile, "chatterbox:v2", counting_encoder(calls))
+        other = make_profile(directory, voice_id="sales_hi")
+        cache.get(other, "chatterbox:v2", counting_encoder(calls))
+        assert cache.get(VoiceProfile("missing", str(Path(directory) / "missing.wav")), "chatterbox:v2",
+                         counting_encoder(calls)) is None
+    assert calls == ["support_en", "support_en", "support_en", "sales_hi"], calls
+    assert cache.get_stats()["compute_errors"] == 1
+    logger.info("✅ Model version, reference content and voice ID each key the conditioning")
+    return True
+
+
+def test_concurrent_first_use_and_config():
+    """Sessions starting together on a new voice share one pass; profiles come from the config"""
+    logger.info("\n[TEST 4] Concurrent first use...")
+    calls = []
+    with tempfile.TemporaryDirectory() as directory:
+        profile = make_profile(directory)
+        cache = VoiceConditioningCache(disk_dir=None)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get(profile, "chatterbox:v1", counting_encoder(calls, delay_s=0.05)))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert calls == ["support_en"] and len({id(result) for result in results}) == 1
+
+    profiles = load_voice_profiles({"support_en": {"reference_audio": "voices/support_en.wav",
+                                                   "description": "Calm support agent"}})
+    assert profiles["support_en"] == VoiceProfile("support_en", "voices/support_en.wav", "Calm support agent")
+    assert load_voice_profiles({}) == {}
+    logger.info("✅ 4 concurrent first uses, 1 encoder pass")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "computed_once_then_memory": test_computed_once_then_memory(),
+        "reused_from_disk": test_reused_from_disk(),
+        "keyed_by_model_and_reference": test_keyed_by_model_and_reference(),
+        "concurrent_first_use_and_config": test_concurrent_first_use_and_config(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)
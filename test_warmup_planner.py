@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Warmup Planner Test Suite
+Tests that real turn shapes are bucketed into a histogram, that the plan covers the common
+buckets first, that the histogram survives a restart (atomically written, decayed on load),
+and that a warmup run goes through the live input path with a bounded decode
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("WARMUP_PLANNER_TEST")
+
+from src.models.warmup_planner import WarmupPlanner, WarmupShape
+
+import test_turn_cancellation as tiny_voxtral
+
+
+def record_traffic(planner: WarmupPlanner):
+    """80% short conversation turns, some long streamed turns with context, a rare transcription"""
+    for i in range(80):
+        planner.record("conversation", 1.5 + (i % 5) * 0.1, 0, False, prompt_tokens=420)
+    for i in range(15):
+        planner.record("conversation", 6.0, 600 + i, True, prompt_tokens=900)
+    for i in range(5):
+        planner.record("transcribe", 40.0, 0, False, prompt_tokens=1600)
+
+
+def test_histogram_and_plan():
+    """Turns land in size buckets; the plan takes the most common ones up to the coverage target"""
+    logger.info("\n[TEST 1] Histogram and plan...")
+    planner = WarmupPlanner("", max_runs=6, coverage=0.9)
+    assert [shape.key for shape in planner.plan()] == ["conversation|2|0|0"], "Default plan without history"
+
+    record_traffic(planner)
+    stats = planner.get_stats()
+    assert stats["buckets"] == 3 and stats["recorded_turns"] == 100
+    plan = planner.plan()
+    assert [shape.key for shape in plan] == ["conversation|2|0|0", "conversation|8|1024|1"], plan
+    assert plan[1].max_prompt_tokens == 900
+
+    planner.coverage = 1.0
+    assert len(planner.plan()) == 3
+    planner.max_runs = 1
+    assert len(planner.plan()) == 1
+    logger.info(f"✅ Plan: {', '.join(shape.key for shape in plan)}")
+    return True
+
+
+def test_persisted_across_restarts():
+    """save() writes atomically; load() restores the plan with decayed counts; bad files are ignored"""
+    logger.info("\n[TEST 2] Persistence...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cache", "warmup_plan.json")
+        planner = WarmupPlanner(path, save_every=40)
+        record_traffic(planner)  # 100 turns -> saved twice on the way
+        assert os.path.exists(path) and not os.path.exists(f"{path}.tmp")
+        planner.save()
+
+        restarted = WarmupPlanner(path, coverage=0.9, decay=0.5)
+        assert restarted.load()
+        assert [shape.key for shape in restarted.plan()] == ["conversation|2|0|0", "conversation|8|1024|1"]
+        assert restarted.get_stats()["plan_source"] == "history"
+        assert restarted.get_stats()["loaded_turns"] == 50.0
+
+        # New traffic outweighs the decayed history
+        for _ in range(200):
+            restarted.record("transcribe", 40.0)
+        assert restarted.plan()[0].key == "transcribe|60|0|0"
+
+        with open(path, "w") as plan_file:
+            json.dump({"version": 99, "buckets": []}, plan_file)
+        assert not WarmupPlanner(path).load()
+        with open(path, "w") as plan_file:
+            plan_file.write("{not json")
+        fresh = WarmupPlanner(path)
+        assert not fresh.load() and fresh.plan()[0].key == "conversation|2|0|0"
+        assert not WarmupPlanner(os.path.join(tmp_dir, "missing.json")).load()
+    logger.info("✅ Histogram restored after restart, newer traffic dominates, bad files ignored")
+    return True
+
+
+def test_warmup_turn_bounded_decode():
+    """warmup_turn() builds live-turn inputs for the shape and decodes exactly the token budget"""
+    logger.info("\n[TEST 3] Warmup turn...")
+    voxtral = tiny_voxtral.build_streaming_voxtral()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        voxtral.warmup_plan_path = os.path.join(tmp_dir, "warmup_plan.json")
+        planner = voxtral.get_warmup_planner()
+        assert planner is not None and planner.stats["plan_source"] == "default"
+
+        generated = []
+        generate = voxtral.model.generate
+
+        def counting_generate(*args, **kwargs):
+            output = generate(*args, **kwargs)
+            generated.append(output.shape[1] - kwargs["input_ids"].shape[1])
+            return output
+
+        voxtral.model.generate = counting_generate
+        try:
+            elapsed = asyncio.run(voxtral.warmup_turn(WarmupShape("transcribe", 4.0, 0, True), max_new_tokens=3))
+        finally:
+            voxtral.inference_executor.shutdown(wait=True)
+        assert generated == [3], generated
+        assert elapsed > 0
+        # Warmup turns are not traffic
+        assert planner.get_stats()["recorded_turns"] == 0
+    logger.info(f"✅ Streamed 4s warmup decoded {generated[0]} tokens in {elapsed:.1f}ms")
+    return True
+
+
+if __name__ == "__main__":
+    results = {
+        "histogram_and_plan": test_histogram_and_plan(),
+        "persisted_across_restarts": test_persisted_across_restarts(),
+        "warmup_turn_bounded_decode": test_warmup_turn_bounded_decode(),
+    }
+    for test_name, result in results.items():
+        logger.info(f"{test_name.upper()}: {'✅ PASS' if result else '❌ FAIL'}")
+    sys.exit(0 if all(results.values()) else 1)